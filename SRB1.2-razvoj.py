@@ -1,4 +1,11 @@
-﻿import argparse
+﻿from __future__ import annotations
+
+import time
+
+_STARTUP_T0 = time.perf_counter()
+
+import argparse
+import bisect
 import csv
 import hashlib
 import statistics
@@ -10,9 +17,15 @@ import threading
 import unicodedata
 import xml.etree.ElementTree as ET
 from datetime import date, datetime, timedelta
+from functools import partial
 from pathlib import Path
+from typing import Any, Callable
+
+from srb_modules.startup import StartupTimer, is_loaded, lazy_import
 
-import pandas as pd
+# pandas loads on first use, so the UI window and CLI commands that never touch
+# a DataFrame start without paying for it.
+pd = lazy_import("pandas")
 
 
 APP_DIR = Path(__file__).resolve().parent
@@ -800,6 +813,7 @@ CREATE TABLE IF NOT EXISTS task_progress (
 
 
 from srb_modules.db import (
+    ConnectionPool,
     connect_db,
     file_hash,
     get_app_state,
@@ -809,7 +823,27 @@ from srb_modules.db import (
     set_task_progress,
     update_task_progress,
 )
+from srb_modules.bench_suite import (
+    RESULT_VERSION as BENCH_RESULT_VERSION,
+    compare_bench_results,
+    format_bench_report,
+    synthetic_bench_data,
+    timed_median,
+    write_bench_inputs,
+)
+from srb_modules.db_stress import format_stress_report, run_db_stress
+from srb_modules.folder_watch import FolderWatcher, WatchSource
+from srb_modules.fuzzy_text import approx_contains, synthetic_bank_purposes
+from srb_modules.import_parallel import ImportJob, read_workbook, run_import_jobs
+from srb_modules.sheet_cache import DEFAULT_SHEET_CACHE_MB, SheetCache
+from srb_modules.xlsx_read import XLSX_ENGINES, read_sheet, resolve_engine, set_default_engine, sheet_names
+from srb_modules.tracking_fetch import fetch_tracking_many
+from srb_modules.tracking_mock import MockCarrierServer, rate_violations
+from srb_modules.match_index import InvoiceIndex, MemoKey, synthetic_match_data
+from srb_modules.progress_bus import LogTail, ProgressBus, install_progress_sink
+from srb_modules.progress_bus import publish as publish_progress
 from srb_modules.pipelines import run_regenerate_sku_metrics_process
+from srb_modules.sku_metrics_store import load_sku_daily, write_sku_daily_cache
 from srb_modules.ui_context import UIContext
 from srb_modules.ui_finansije import build_finansije_tab
 from srb_modules.ui_poslovanje import build_poslovanje_tab
@@ -819,23 +853,33 @@ from srb_modules.ui_prodaja import build_prodaja_tab
 from srb_modules.ui_prodaja_logic import ProdajaLogicDeps, init_prodaja_logic
 from srb_modules.ui_troskovi import build_troskovi_tab
 from srb_modules.import_sp import (
+    SP_ORDER_KEYS,
+    SP_PAYMENT_KEYS,
+    SP_RETURN_KEYS,
     import_sp_orders as _import_sp_orders,
     import_sp_payments as _import_sp_payments,
     import_sp_returns as _import_sp_returns,
+    sheet_columns,
 )
 from srb_modules.import_minimax import (
     import_minimax as _import_minimax,
     import_minimax_items as _import_minimax_items,
 )
-from srb_modules.import_bank_xml import import_bank_xml as _import_bank_xml
+from srb_modules.import_bank_xml import (
+    import_bank_xml as _import_bank_xml,
+    import_bank_xml_folder as _import_bank_xml_folder,
+    iter_bank_xml_rows,
+)
 from srb_modules.import_sp_prijemi import (
     import_sp_prijem as _import_sp_prijem,
     import_sp_prijemi_folder as _import_sp_prijemi_folder,
+    prijem_column,
 )
 from srb_modules.import_kartice_events import (
     import_kartice_events_csv as _import_kartice_events_csv,
 )
 from srb_modules.reset_sources import RESET_SPECS, reset_source as _reset_source
+from srb_modules.order_totals import check_order_totals, refresh_order_totals
 from srb_modules.queries import (
     build_refund_item_totals,
     date_filter_clause,
@@ -1052,44 +1096,97 @@ def maybe_mark_delivered_from_payment(
         add_status_history(conn, order_id, "Isporu\u010deno", "", "SP-Uplate")
 
 
+def load_sheet_cache() -> SheetCache | None:
+    """
+    Parsed-sheet cache from srb_settings.json: "sheet_cache_mb" (size limit,
+    0 = off) and "sheet_cache_path" (default sheet_cache.sqlite next to the app).
+    """
+    data = {}
+    if SETTINGS_PATH.exists():
+        try:
+            data = json.loads(SETTINGS_PATH.read_text(encoding="utf-8"))
+        except Exception:
+            data = {}
+    try:
+        limit_mb = float(data.get("sheet_cache_mb", DEFAULT_SHEET_CACHE_MB))
+    except (TypeError, ValueError):
+        limit_mb = DEFAULT_SHEET_CACHE_MB
+    if limit_mb <= 0:
+        return None
+    path = Path(data.get("sheet_cache_path") or "sheet_cache.sqlite")
+    if not path.is_absolute():
+        path = APP_DIR / path
+    return SheetCache(path, max_bytes=int(limit_mb * 1024 * 1024))
+
+
+# Importers look workbooks up here before parsing them (None = always parse).
+SHEET_CACHE = load_sheet_cache()
+
+
+def load_xlsx_engine() -> str:
+    """
+    "xlsx_engine" from srb_settings.json: "auto" (python-calamine if installed,
+    else openpyxl), "calamine", "openpyxl" or "stream" (own xlsx XML reader, opt-in).
+    """
+    data = {}
+    if SETTINGS_PATH.exists():
+        try:
+            data = json.loads(SETTINGS_PATH.read_text(encoding="utf-8"))
+        except Exception:
+            data = {}
+    engine = str(data.get("xlsx_engine") or "auto")
+    return engine if engine in XLSX_ENGINES else "auto"
+
+
+# Default engine of read_sheet; passed explicitly to the folder-import worker processes.
+XLSX_ENGINE = load_xlsx_engine()
+set_default_engine(XLSX_ENGINE)
+
+
 def import_sp_orders(
-    conn: sqlite3.Connection, path: Path, rejects: list | None = None
+    conn: sqlite3.Connection, path: Path, rejects: list | None = None, *, df=None
 ) -> None:
     _import_sp_orders(
         conn,
         path,
         rejects,
+        df=df,
         col=COL,
         sheet_orders=SHEET_SP_ORDERS,
         file_hash=file_hash,
         compute_customer_key=compute_customer_key,
         set_app_state=set_app_state,
+        sheet_cache=SHEET_CACHE,
     )
 
 
 def import_sp_payments(
-    conn: sqlite3.Connection, path: Path, rejects: list | None = None
+    conn: sqlite3.Connection, path: Path, rejects: list | None = None, *, df=None
 ) -> None:
     _import_sp_payments(
         conn,
         path,
         rejects,
+        df=df,
         col=COL,
         sheet_payments=SHEET_SP_PAYMENTS,
         file_hash=file_hash,
+        sheet_cache=SHEET_CACHE,
     )
 
 
 def import_sp_returns(
-    conn: sqlite3.Connection, path: Path, rejects: list | None = None
+    conn: sqlite3.Connection, path: Path, rejects: list | None = None, *, df=None
 ) -> None:
     _import_sp_returns(
         conn,
         path,
         rejects,
+        df=df,
         col=COL,
         sheet_orders=SHEET_SP_ORDERS,
         file_hash=file_hash,
+        sheet_cache=SHEET_CACHE,
     )
 
 
@@ -1104,20 +1201,87 @@ def import_minimax(
         sheet_minimax=SHEET_MINIMAX,
         file_hash=file_hash,
         apply_storno=apply_storno,
+        sheet_cache=SHEET_CACHE,
     )
 
 
 def import_minimax_items(conn: sqlite3.Connection, path: Path) -> None:
-    _import_minimax_items(conn, path, sheet_minimax=SHEET_MINIMAX, file_hash=file_hash)
+    _import_minimax_items(
+        conn, path, sheet_minimax=SHEET_MINIMAX, file_hash=file_hash, sheet_cache=SHEET_CACHE
+    )
 
 
 def import_sp_prijemi(
-    conn: sqlite3.Connection, path: Path, rejects: list | None = None
+    conn: sqlite3.Connection, path: Path, rejects: list | None = None, *, df=None
 ) -> None:
     if path.is_dir():
-        _import_sp_prijemi_folder(conn, path, rejects, file_hash=file_hash)
+        _import_sp_prijemi_folder(conn, path, rejects, file_hash=file_hash, sheet_cache=SHEET_CACHE)
+        return
+    _import_sp_prijem(conn, path, rejects, file_hash=file_hash, df=df, sheet_cache=SHEET_CACHE)
+
+
+# Sheet readers for the parallel folder import (picklable; run in worker processes).
+_WORKBOOK_PARSERS = {
+    import_sp_orders: partial(
+        read_workbook,
+        sheet_name=SHEET_SP_ORDERS,
+        columns=sheet_columns(COL, SP_ORDER_KEYS),
+        engine=XLSX_ENGINE,
+    ),
+    import_sp_payments: partial(
+        read_workbook,
+        sheet_name=SHEET_SP_PAYMENTS,
+        columns=sheet_columns(COL, SP_PAYMENT_KEYS),
+        engine=XLSX_ENGINE,
+    ),
+    import_sp_returns: partial(
+        read_workbook,
+        sheet_name=SHEET_SP_ORDERS,
+        columns=sheet_columns(COL, SP_RETURN_KEYS),
+        engine=XLSX_ENGINE,
+    ),
+    import_sp_prijemi: partial(read_workbook, columns=prijem_column, engine=XLSX_ENGINE),
+}
+
+
+def make_import_jobs(
+    jobs: list[tuple[str, Callable[..., Any], Path]],
+) -> list[ImportJob]:
+    parsers = {
+        fn: partial(parse, cache=SHEET_CACHE) if SHEET_CACHE is not None else parse
+        for fn, parse in _WORKBOOK_PARSERS.items()
+    }
+    return [
+        ImportJob(title=title, path=path, apply=fn, parse=parsers.get(fn))
+        for title, fn, path in jobs
+    ]
+
+
+def sheet_cache_cli(
+    *, prune: bool, max_mb: float | None, older_than_days: float | None, clear: bool, limit: int
+) -> None:
+    cache = SHEET_CACHE
+    if cache is None:
+        print('Kes parsiranih tabela je iskljucen ("sheet_cache_mb": 0).')
         return
-    _import_sp_prijem(conn, path, rejects, file_hash=file_hash)
+    if prune or clear or max_mb is not None or older_than_days is not None:
+        result = cache.prune(
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb is not None else None,
+            older_than_days=older_than_days,
+            clear=clear,
+        )
+        print(f"Obrisano {result['removed']} unosa, oslobodjeno {result['freed_bytes'] / 1048576:.1f} MB")
+    stats = cache.stats()
+    print(
+        f"{cache.path}: {stats['entries']} tabela iz {stats['files']} fajlova, "
+        f"{stats['size_bytes'] / 1048576:.1f} / {stats['max_bytes'] / 1048576:.0f} MB "
+        f"(fajl {stats['db_bytes'] / 1048576:.1f} MB)"
+    )
+    for entry in cache.entries()[: max(0, limit)]:
+        print(
+            f"  {entry['used_at'][:19]}  {entry['size_bytes'] / 1024:8.1f} KB  "
+            f"{entry['rows']:>6} x {entry['cols']:<3} {entry['source_name']} [{entry['sheet']}]"
+        )
 
 
 def import_kartice_events(
@@ -1126,6 +1290,151 @@ def import_kartice_events(
     _import_kartice_events_csv(conn, path, rejects, file_hash=file_hash)
 
 
+def folder_import_files(import_fn: Callable[..., Any], folder: Path) -> list[Path]:
+    if import_fn is import_sp_prijemi:
+        # Same order as import_sp_prijemi_folder (recursive, oldest first).
+        paths = [p for p in folder.rglob("*.xlsx") if p.is_file()]
+        paths.sort(key=lambda p: p.stat().st_mtime)
+        return paths
+    return [p for p in sorted(folder.glob("*.xlsx")) if p.is_file()]
+
+
+def _import_run_rate(conn: sqlite3.Connection, path: Path, after_id: int = 0) -> str:
+    """', N redova, X red/s' of the latest import run for `path` (finish_import stats)."""
+    row = conn.execute(
+        "SELECT row_count, rows_per_sec FROM import_runs WHERE filename = ? AND id > ? "
+        "ORDER BY id DESC LIMIT 1",
+        (str(path), after_id),
+    ).fetchone()
+    if row is None or row[1] is None:
+        return ""
+    return f", {row[0]} redova, {row[1]:.0f} red/s"
+
+
+def import_path_cli(
+    conn: sqlite3.Connection,
+    import_fn: Callable[..., Any],
+    title: str,
+    path: Path,
+    workers: int = 0,
+) -> dict[str, int]:
+    """Single file: plain import. Folder: parallel parse, ordered apply, line per file."""
+    if not path.is_dir():
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM import_runs").fetchone()[0]
+        import_fn(conn, path)
+        rate = _import_run_rate(conn, path, last_id)
+        print(f"{path.name}: " + (f"imported{rate}" if rate else "skipped"))
+        return {"imported": int(bool(rate)), "skipped": int(not rate), "failed": 0}
+    files = folder_import_files(import_fn, path)
+
+    def on_file_done(idx: int, job: ImportJob, status: str, exc: Exception | None) -> None:
+        parse = f", parsiranje {job.parse_seconds:.2f}s" if job.parse_seconds is not None else ""
+        rate = _import_run_rate(conn, job.path) if status == "imported" else ""
+        print(f"[{idx}/{len(files)}] {job.path.name}: {status}{rate}{parse}" + (f" ({exc})" if exc else ""))
+
+    started = time.perf_counter()
+    counts = run_import_jobs(
+        conn,
+        make_import_jobs([(title, import_fn, p) for p in files]),
+        file_hash=file_hash,
+        rejects=None,
+        workers=workers,
+        on_done=on_file_done,
+    )
+    print(
+        f"{title}: uvezeno {counts['imported']}, preskoceno {counts['skipped']}, "
+        f"gresaka {counts['failed']} ({time.perf_counter() - started:.1f}s)"
+    )
+    return counts
+
+
+def default_watch_sources() -> list[WatchSource]:
+    """Default project folders (as in "Uvezi sve podatke") plus SP Prijemi; first existing name wins."""
+
+    def folder(*names: str) -> Path:
+        for name in names:
+            if Path(name).exists():
+                return Path(name)
+        return Path(names[0])
+
+    return [
+        WatchSource("SP Narudzbe", folder("SP Narudzbe", "SP-Narudzbe"), "*.xlsx", import_sp_orders),
+        WatchSource("Minimax", folder("Minimax"), "*.xlsx", import_minimax),
+        WatchSource("SP Uplate", folder("SP Uplate", "SP-Uplate"), "*.xlsx", import_sp_payments),
+        WatchSource("Banka XML", folder("Banka XML", "Izvodi"), "*.xml", import_bank_xml),
+        WatchSource(
+            "SP Preuzimanja", folder("SP Preuzimanja", "SP-Preuzimanja"), "*.xlsx", import_sp_returns
+        ),
+        WatchSource(
+            "SP Prijemi",
+            folder("SP Prijemi", "Sp Prijemi"),
+            "*.xlsx",
+            import_sp_prijemi,
+            recursive=True,
+            oldest_first=True,
+        ),
+    ]
+
+
+def make_watch_importer(
+    *,
+    workers: int = 0,
+    rejects: list | None = None,
+    should_stop: Callable[[], bool] | None = None,
+) -> Callable[..., Any]:
+    """FolderWatcher import_batch: the same parallel parse / ordered apply as folder imports."""
+
+    def import_batch(conn, jobs, on_done):
+        return run_import_jobs(
+            conn,
+            make_import_jobs(jobs),
+            file_hash=file_hash,
+            rejects=rejects,
+            workers=workers,
+            on_done=on_done,
+            should_stop=should_stop,
+        )
+
+    return import_batch
+
+
+def watch_cli(
+    db_path: Path, *, interval: float, settle: float, once: bool, workers: int = 0
+) -> None:
+    sources = default_watch_sources()
+    for source in sources:
+        missing = "" if source.folder.is_dir() else " (ne postoji)"
+        print(f"Pratim {source.folder} [{source.pattern}] -> {source.title}{missing}")
+    batch = make_watch_importer(workers=workers)
+
+    def import_batch(conn, jobs, on_done):
+        def on_file_done(idx: int, job: ImportJob, status: str, exc: Exception | None) -> None:
+            on_done(idx, job, status, exc)
+            print(
+                f"{datetime.now():%H:%M:%S} {job.title}: {job.path.name}: {status}"
+                + (f" ({exc})" if exc else "")
+            )
+
+        return batch(conn, jobs, on_file_done)
+
+    watcher = FolderWatcher(lambda: connect_db(db_path), sources, import_batch, settle_seconds=settle)
+    if once:
+        # First sighting, wait for the files to settle, then import what is ready.
+        watcher.poll()
+        time.sleep(settle)
+        counts = watcher.poll()
+        print(
+            f"Uvezeno {counts['imported']}, preskoceno {counts['skipped']}, "
+            f"gresaka {counts['failed']}, ponovo {counts['retry']}, ceka {counts['pending']}"
+        )
+        return
+    print(f"Provjera svakih {interval:g}s (Ctrl+C za kraj)")
+    try:
+        watcher.run(interval)
+    except KeyboardInterrupt:
+        print("Pracenje zaustavljeno.")
+
+
 def normalize_date(value) -> date | None:
     if value is None or value == "":
         return None
@@ -1215,7 +1524,11 @@ def extract_invoice_no_from_text(text: str | None) -> tuple[str | None, str | No
     return None, None
 
 
-def classify_refund_reason(purpose: str | None) -> str | None:
+def classify_refund_reason(purpose: str | None, *, fast: bool = True) -> str | None:
+    """
+    fast=True uses the bit-parallel approx_contains; fast=False the sliding-window
+    fuzzy_contains. Same reasons for the same max distance (smoke test).
+    """
     text = normalize_text_loose(purpose)
     if not text:
         return None
@@ -1231,8 +1544,9 @@ def classify_refund_reason(purpose: str | None) -> str | None:
         ("storno racuna", "storno_racuna"),
         ("povrat robe", "povrat_robe"),
     ]
+    contains = approx_contains if fast else fuzzy_contains
     for pattern, reason in patterns:
-        if fuzzy_contains(text, pattern, max_dist=3):
+        if contains(text, pattern, max_dist=3):
             return reason
     return None
 
@@ -1595,8 +1909,8 @@ def log_tracking_request(
     latency_ms: int | None,
     result: str,
     error: str | None = None,
+    log_dir: Path = Path("exports"),
 ) -> None:
-    log_dir = Path("exports")
     log_dir.mkdir(parents=True, exist_ok=True)
     log_path = log_dir / "tracking-log.csv"
     file_exists = log_path.exists()
@@ -1805,6 +2119,66 @@ def _should_skip_tracking(
     return delta_hours < slow_hours
 
 
+def refresh_tracking_codes(
+    conn: sqlite3.Connection,
+    tracking_codes: list[str],
+    *,
+    concurrency: int = 4,
+    rate_per_min: float | dict[str, float] = 20.0,
+    progress_task: str | None = None,
+    force_refresh: bool = False,
+    base_urls: dict[str, str] | None = None,
+    log_dir: Path = Path("exports"),
+    **fetch_opts,
+) -> int:
+    """
+    Fetches the codes with fetch_tracking_many and saves each result on this
+    connection as it arrives: tracking_events / tracking_summary via
+    save_tracking_result, one tracking-log.csv row per attempt (same result
+    values as the sequential loop). Returns the number of saved codes.
+    """
+    total = len(tracking_codes)
+    scanned = 0
+    if progress_task:
+        set_task_progress(conn, progress_task, total)
+        update_task_progress(conn, progress_task, 0)
+    to_fetch = []
+    for code in tracking_codes:
+        if not force_refresh and _should_skip_tracking(conn, code):
+            log_tracking_request(
+                code, tracking_public_url(code), None, None, "skipped_cache", None, log_dir=log_dir
+            )
+            scanned += 1
+            continue
+        to_fetch.append(code)
+    if progress_task:
+        update_task_progress(conn, progress_task, scanned)
+
+    processed = 0
+    for result in fetch_tracking_many(
+        to_fetch,
+        base_urls=base_urls,
+        concurrency=concurrency,
+        rate_per_min=rate_per_min,
+        **fetch_opts,
+    ):
+        url = tracking_public_url(result.code)
+        if result.ok:
+            events, summary = analyze_tracking_history(result.history)
+            save_tracking_result(conn, result.code, events, summary)
+            processed += 1
+        for status_code, latency_ms, outcome, error in result.log:
+            log_tracking_request(
+                result.code, url, status_code, latency_ms, outcome, error, log_dir=log_dir
+            )
+        scanned += 1
+        if progress_task:
+            update_task_progress(conn, progress_task, scanned)
+    if progress_task:
+        update_task_progress(conn, progress_task, total)
+    return processed
+
+
 def update_unpicked_tracking(
     conn: sqlite3.Connection,
     batch_size: int = 20,
@@ -1816,7 +2190,14 @@ def update_unpicked_tracking(
     backoff_max: int = 600,
     progress_task: str | None = None,
     force_refresh: bool = False,
+    concurrency: int = 4,
+    rate_per_min: float = 20.0,
 ) -> int:
+    """
+    concurrency > 0 fetches through refresh_tracking_codes (worker threads,
+    per-carrier rate limit, keep-alive); concurrency=0 is the old one-by-one
+    loop with 8-12 s sleeps and batch pauses.
+    """
     import random
     import time
     import urllib.error
@@ -1825,6 +2206,15 @@ def update_unpicked_tracking(
     tracking_codes = sorted({str(r[9]).strip() for r in rows if len(r) > 9 and r[9]})
     if not tracking_codes:
         return 0
+    if concurrency > 0:
+        return refresh_tracking_codes(
+            conn,
+            tracking_codes,
+            concurrency=concurrency,
+            rate_per_min=rate_per_min,
+            progress_task=progress_task,
+            force_refresh=force_refresh,
+        )
     total = len(tracking_codes)
     scanned = 0
     if progress_task:
@@ -2160,8 +2550,14 @@ def get_text(elem, path: str) -> str:
 
 def import_bank_xml(
     conn: sqlite3.Connection, path: Path, rejects: list | None = None
-) -> None:
-    _import_bank_xml(conn, path, rejects, file_hash=file_hash, to_float=to_float)
+) -> dict | None:
+    return _import_bank_xml(conn, path, rejects, file_hash=file_hash, to_float=to_float)
+
+
+def import_bank_xml_folder(
+    conn: sqlite3.Connection, folder: Path, rejects: list | None = None
+) -> list[dict]:
+    return _import_bank_xml_folder(conn, folder, rejects, file_hash=file_hash, to_float=to_float)
 
 
 def apply_storno(conn: sqlite3.Connection) -> None:
@@ -2220,7 +2616,14 @@ def match_minimax(
     auto_threshold: int = 70,
     review_threshold: int = 50,
     progress_task: str | None = None,
+    indexed: bool = True,
 ) -> None:
+    """
+    indexed=True looks candidates up in an InvoiceIndex (normalized name and
+    amount-bucket blocking keys, names normalized once per run); indexed=False
+    scans every invoice in the date window like before. Both write the same
+    invoice_matches / order_flags / invoice_candidates rows.
+    """
     conn.execute("DELETE FROM order_flags WHERE flag = 'needs_invoice'")
     orders = []
     rows = conn.execute(
@@ -2237,6 +2640,7 @@ def match_minimax(
     ).fetchall()
     order_ids = [int(row[0]) for row in rows]
     net_map = build_order_net_map(conn, order_ids)
+    to_date = MemoKey(normalize_date) if indexed else normalize_date
 
     def is_all_zero_values(
         max_cod, max_addon, max_adv, max_addon_adv, item_count: int
@@ -2265,7 +2669,7 @@ def match_minimax(
         if is_cancelled_status(status) or is_in_progress_status(status):
             continue
         order_id = int(row[0])
-        order_date = normalize_date(row[3] or row[4])
+        order_date = to_date(row[3] or row[4])
         amount = net_map.get(order_id)
         max_cod = row[9]
         max_addon = row[12]
@@ -2318,7 +2722,7 @@ def match_minimax(
                 "note": row[5],
                 "analytics": row[6],
                 "account": row[7],
-                "turnover_date": normalize_date(row[3]),
+                "turnover_date": to_date(row[3]),
             }
         )
 
@@ -2452,7 +2856,22 @@ def match_minimax(
                 best = inv
         return best
 
+    name_key = MemoKey(normalize_text)
+    invoice_index = InvoiceIndex(invoices, name_key=name_key) if indexed else None
+
     def find_candidates(order, name_check):
+        if invoice_index is not None and name_check is name_exact:
+            # name_exact_strict(a, b) is normalize_text(a) == normalize_text(b).
+            return [
+                inv
+                for inv in invoice_index.same_name(order)
+                if inv["id"] not in matched_invoice_ids
+                and amount_exact(order.get("amount"), inv.get("amount_due"))
+                and (
+                    not order.get("picked_up_date")
+                    or date_in_window(order.get("picked_up_date"), inv.get("turnover_date"), 1, 3)
+                )
+            ]
         odate = order.get("picked_up_date")
         if odate:
             date_candidates = []
@@ -2506,6 +2925,14 @@ def match_minimax(
         odate = order.get("picked_up_date")
         if not odate:
             return []
+        if invoice_index is not None:
+            return [
+                inv
+                for inv in invoice_index.same_amount(order)
+                if inv["id"] not in matched_invoice_ids
+                and amount_exact(order.get("amount"), inv.get("amount_due"))
+                and date_in_window(odate, inv.get("turnover_date"), 1, 3)
+            ]
         date_candidates = []
         for offset in range(-1, 4):
             date_candidates.extend(invoices_by_date.get(odate + timedelta(days=offset), []))
@@ -3639,12 +4066,129 @@ def report_category_returns(conn: sqlite3.Connection, return_rows: bool = False)
         return ["category", "qty"], merged
 
 
+def _best_sp_payment_scan(payments, amount, txn_date, day_tolerance: int):
+    """Reference matcher: scores every SP payment against one bank credit."""
+    best = None
+    best_score = 0
+    best_method = "amount"
+    for pay_id, pay_amount, picked_up_at in payments:
+        if pay_amount is None or amount is None:
+            continue
+        try:
+            amount_diff = abs(float(pay_amount) - float(amount))
+        except (TypeError, ValueError):
+            continue
+        if amount_diff <= 0.01:
+            score = 60
+        elif amount_diff <= 2.0:
+            score = 40
+        else:
+            continue
+        pay_date = normalize_date(picked_up_at)
+        if txn_date and pay_date:
+            day_diff = abs((txn_date - pay_date).days)
+            if day_diff <= day_tolerance:
+                score += 20
+                best_method = "amount+date"
+        if score > best_score:
+            best_score = score
+            best = pay_id
+    if best is None:
+        return None
+    return best, best_score, best_method
+
+
+def _build_sp_payment_index(payments):
+    """
+    Groups SP payments by amount; each group keeps its payments in original order
+    and its dated payments sorted by pickup date, for bisect lookups.
+    Returns (sorted_amounts, groups).
+    """
+    dates_by_text: dict = {}
+    groups: dict[float, dict] = {}
+    for pos, (pay_id, pay_amount, picked_up_at) in enumerate(payments):
+        if pay_amount is None:
+            continue
+        try:
+            value = float(pay_amount)
+        except (TypeError, ValueError):
+            continue
+        if value != value:
+            continue  # NaN never matches
+        if picked_up_at not in dates_by_text:
+            dates_by_text[picked_up_at] = normalize_date(picked_up_at)
+        pay_date = dates_by_text[picked_up_at]
+        group = groups.setdefault(value, {"rows": [], "dated": []})
+        ordinal = pay_date.toordinal() if pay_date else None
+        group["rows"].append((pos, pay_id, ordinal))
+        if ordinal is not None:
+            group["dated"].append((ordinal, pos, pay_id))
+    for group in groups.values():
+        group["dated"].sort()
+        group["dated_keys"] = [d[0] for d in group["dated"]]
+    return sorted(groups), groups
+
+
+def _best_sp_payment_indexed(index, amount, txn_date, day_tolerance: int):
+    """Same result as _best_sp_payment_scan, using only amount groups within ±2 and a date window."""
+    if amount is None:
+        return None
+    try:
+        amount_f = float(amount)
+    except (TypeError, ValueError):
+        return None
+    if amount_f != amount_f:
+        return None
+    amounts, groups = index
+    lo_day = hi_day = None
+    if txn_date:
+        lo_day = txn_date.toordinal() - day_tolerance
+        hi_day = txn_date.toordinal() + day_tolerance
+    # Best candidate per score as (position, pay_id); ties go to the earliest payment.
+    best_by_score: dict[int, tuple[int, int]] = {}
+    any_dated = False
+    lo = bisect.bisect_left(amounts, amount_f - 2.5)
+    hi = bisect.bisect_right(amounts, amount_f + 2.5)
+    for value in amounts[lo:hi]:
+        amount_diff = abs(value - amount_f)
+        if amount_diff <= 0.01:
+            base = 60
+        elif amount_diff <= 2.0:
+            base = 40
+        else:
+            continue
+        group = groups[value]
+        in_window: set[int] = set()
+        if lo_day is not None:
+            keys = group["dated_keys"]
+            start = bisect.bisect_left(keys, lo_day)
+            stop = bisect.bisect_right(keys, hi_day)
+            for _, pos, pay_id in group["dated"][start:stop]:
+                in_window.add(pos)
+                cur = best_by_score.get(base + 20)
+                if cur is None or pos < cur[0]:
+                    best_by_score[base + 20] = (pos, pay_id)
+            any_dated = any_dated or bool(in_window)
+        for pos, pay_id, _ in group["rows"]:
+            if pos in in_window:
+                continue
+            cur = best_by_score.get(base)
+            if cur is None or pos < cur[0]:
+                best_by_score[base] = (pos, pay_id)
+            break
+    if not best_by_score:
+        return None
+    best_score = max(best_by_score)
+    return best_by_score[best_score][1], best_score, ("amount+date" if any_dated else "amount")
+
+
 def match_bank_sp_payments(
     conn: sqlite3.Connection,
     day_tolerance: int = 2,
     progress_task: str | None = None,
     start_at: int = 0,
     total: int | None = None,
+    indexed: bool = True,
 ):
     txns = conn.execute(
         "SELECT id, dtposted, amount FROM bank_transactions "
@@ -3656,6 +4200,7 @@ def match_bank_sp_payments(
         "FROM payments p "
         "LEFT JOIN orders o ON o.sp_order_no = p.sp_order_no"
     ).fetchall()
+    index = _build_sp_payment_index(payments) if indexed else None
     processed = start_at
     last_progress = start_at
     progress_every = 10
@@ -3672,32 +4217,12 @@ def match_bank_sp_payments(
 
     for txn_id, dtposted, amount in txns:
         txn_date = normalize_date(dtposted)
-        best = None
-        best_score = 0
-        best_method = "amount"
-        for pay_id, pay_amount, picked_up_at in payments:
-            if pay_amount is None or amount is None:
-                continue
-            try:
-                amount_diff = abs(float(pay_amount) - float(amount))
-            except (TypeError, ValueError):
-                continue
-            if amount_diff <= 0.01:
-                score = 60
-            elif amount_diff <= 2.0:
-                score = 40
-            else:
-                continue
-            pay_date = normalize_date(picked_up_at)
-            if txn_date and pay_date:
-                day_diff = abs((txn_date - pay_date).days)
-                if day_diff <= day_tolerance:
-                    score += 20
-                    best_method = "amount+date"
-            if score > best_score:
-                best_score = score
-                best = pay_id
-        if best is not None:
+        if indexed:
+            match = _best_sp_payment_indexed(index, amount, txn_date, day_tolerance)
+        else:
+            match = _best_sp_payment_scan(payments, amount, txn_date, day_tolerance)
+        if match is not None:
+            best, best_score, best_method = match
             conn.execute(
                 "INSERT OR IGNORE INTO bank_matches "
                 "(bank_txn_id, match_type, ref_id, score, method, matched_at) "
@@ -3826,7 +4351,11 @@ def run_close_invoices_process(db_path: str) -> None:
 
 
 def run_tracking_process(
-    db_path: str, batch_size: int = 20, force_refresh: int = 0
+    db_path: str,
+    batch_size: int = 20,
+    force_refresh: int = 0,
+    concurrency: int = 4,
+    rate_per_min: float = 20.0,
 ) -> None:
     conn = connect_db(Path(db_path))
     init_db(conn)
@@ -3836,6 +4365,8 @@ def run_tracking_process(
         batch_size=batch_size,
         progress_task="tracking",
         force_refresh=bool(force_refresh),
+        concurrency=concurrency,
+        rate_per_min=rate_per_min,
     )
     conn.close()
 
@@ -3938,7 +4469,9 @@ def _short_expense_name(label: str) -> str:
     return base or label
 
 
-def run_ui(db_path: Path) -> None:
+def run_ui(db_path: Path, *, startup_report: bool = False) -> None:
+    startup = StartupTimer(_STARTUP_T0)
+    startup.mark("run_ui")
     import customtkinter as ctk
     import concurrent.futures
     import os
@@ -3948,11 +4481,23 @@ def run_ui(db_path: Path) -> None:
     import time
     from typing import Any, Callable
     from tkinter import filedialog, messagebox, simpledialog
-    from tkcalendar import Calendar
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    from matplotlib.figure import Figure
     from tkinter import PhotoImage
 
+    startup.mark("customtkinter")
+    # matplotlib and tkcalendar are imported on first use (dashboard charts are
+    # built after the window is shown, other tabs when they are first opened).
+    chart_libs: dict[str, Any] = {}
+
+    def _chart_libs():
+        if not chart_libs:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            from matplotlib.figure import Figure
+
+            chart_libs["Figure"] = Figure
+            chart_libs["FigureCanvasTkAgg"] = FigureCanvasTkAgg
+            startup.mark("matplotlib")
+        return chart_libs["Figure"], chart_libs["FigureCanvasTkAgg"]
+
     def acquire_app_lock():
         lock_path = Path(tempfile.gettempdir()) / "srb1_app.lock"
         handle = lock_path.open("a+")
@@ -4054,24 +4599,78 @@ def run_ui(db_path: Path) -> None:
     _db_init_lock = threading.Lock()
     _db_initialized = False
 
-    def get_conn():
+    # Opt-in ("sqlite_wal": true): WAL + pooled read connections and one writer
+    # connection for imports, so UI readers/pollers do not wait on import commits.
+    sqlite_wal = bool(settings.get("sqlite_wal", False))
+    # Folder imports parse workbooks in this many processes (0 = CPU count - 1, 1 = inline).
+    import_workers = int(settings.get("import_workers", 0) or 0)
+    # Tracking refresh: parallel requests (0 = old one-by-one loop) and max requests per minute per carrier.
+    tracking_concurrency = int(settings.get("tracking_concurrency", 4) or 0)
+    tracking_rate_per_min = float(settings.get("tracking_rate_per_min", 20) or 20)
+    # set_task_progress/update_task_progress (here and in executor workers) push to this
+    # queue; the Tk loop drains it. task_progress in SQLite stays the durable fallback.
+    progress_bus = ProgressBus()
+    progress_bus.install()
+    _db_pool_ref = {"pool": None}
+
+    def _db_pool() -> ConnectionPool:
+        with _db_init_lock:
+            pool = _db_pool_ref["pool"]
+            db_path = Path(state["db_path"])
+            if pool is None or pool.db_path != db_path:
+                if pool is not None:
+                    pool.close_all()
+                pool = ConnectionPool(db_path, size=4, wal=True)
+                _db_pool_ref["pool"] = pool
+            return pool
+
+    def _ensure_db_initialized(conn) -> None:
         nonlocal _db_initialized
-        conn = connect_db(state["db_path"])
-        try:
-            conn.execute("PRAGMA busy_timeout=5000")
-        except Exception:
-            pass
         with _db_init_lock:
             if not _db_initialized:
                 init_db(conn)
                 ensure_customer_keys(conn)
                 _db_initialized = True
+
+    def get_conn():
+        if sqlite_wal:
+            conn = _db_pool().reader()
+        else:
+            conn = connect_db(state["db_path"])
+            try:
+                conn.execute("PRAGMA busy_timeout=5000")
+            except Exception:
+                pass
+        _ensure_db_initialized(conn)
         return conn
 
+    def get_write_conn(timeout: float = -1):
+        """
+        Connection for imports/long actions; the pool's single writer in WAL mode.
+        timeout >= 0 raises TimeoutError if the writer stays busy that long.
+        """
+        if not sqlite_wal:
+            return get_conn()
+        init_conn = get_conn()
+        init_conn.close()
+        return _db_pool().writer(timeout=timeout)
+
+    def get_write_conn_ui():
+        """get_write_conn() for the Tk thread: None (after a message) instead of blocking."""
+        try:
+            return get_write_conn(timeout=2.0)
+        except TimeoutError:
+            messagebox.showwarning(
+                "Info",
+                "Baza je zauzeta (uvoz ili druga akcija je u toku).\nPokusaj ponovo kad se zavrsi.",
+            )
+            return None
+
     # Runtime state for async/background work
     ctx.state.setdefault("closing", False)
     ctx.state.setdefault("active_futures", set())
     ctx.state.setdefault("import_busy", False)
+    ctx.state.setdefault("watch_busy", False)
     ctx.state.setdefault("import_cancel", False)
 
     def _shutdown_background_work(*, force: bool) -> None:
@@ -4126,7 +4725,7 @@ def run_ui(db_path: Path) -> None:
 
         futures = list(ctx.state.get("active_futures") or [])
         active = [f for f in futures if hasattr(f, "done") and not f.done()]
-        busy_import = bool(ctx.state.get("import_busy"))
+        busy_import = bool(ctx.state.get("import_busy") or ctx.state.get("watch_busy"))
         if active or busy_import:
             force = messagebox.askyesno(
                 "Upozorenje",
@@ -4144,6 +4743,9 @@ def run_ui(db_path: Path) -> None:
             lock_handle.close()
         except Exception:
             pass
+        if _db_pool_ref["pool"] is not None:
+            _db_pool_ref["pool"].close_all()
+        progress_bus.close()
         app.destroy()
 
     app.protocol("WM_DELETE_WINDOW", on_close)
@@ -4266,6 +4868,7 @@ def run_ui(db_path: Path) -> None:
 
     def _add_calendar_picker(parent, var: ctk.StringVar, width: int = 120):
         from srb_modules.ui_helpers import add_calendar_picker
+        from tkcalendar import Calendar
 
         return add_calendar_picker(
             app,
@@ -4283,6 +4886,7 @@ def run_ui(db_path: Path) -> None:
         title: str, initial_start: date | None, initial_end: date | None
     ) -> tuple[date | None, date | None]:
         from srb_modules.ui_helpers import pick_date_range_dialog
+        from tkcalendar import Calendar
 
         return pick_date_range_dialog(
             app,
@@ -4305,39 +4909,12 @@ def run_ui(db_path: Path) -> None:
         if _sku_daily_cache["mtime"] == mtime and not _sku_daily_cache["df"].empty:
             return _sku_daily_cache["df"]
         try:
-            df = pd.read_csv(path, encoding="utf-8")
+            # Columnar copy (parquet/pkl) when fresh, else CSV (+ refresh of the copy).
+            df, _source = load_sku_daily(path)
         except Exception:
             _sku_daily_cache["df"] = pd.DataFrame()
             _sku_daily_cache["mtime"] = mtime
             return _sku_daily_cache["df"]
-        if df.empty:
-            _sku_daily_cache["df"] = df
-            _sku_daily_cache["mtime"] = mtime
-            return df
-        if "date" in df.columns:
-            df["date_dt"] = pd.to_datetime(df["date"], errors="coerce").dt.date
-        else:
-            df["date_dt"] = pd.NaT
-        df["sku"] = df.get("sku", pd.Series("", index=df.index)).astype(str).str.strip()
-        numeric_cols = [
-            "stock_eod_qty",
-            "oos_flag",
-            "verified_available_flag",
-            "gross_sales_qty",
-            "return_qty",
-            "net_sales_qty",
-            "demand_baseline_qty",
-            "lost_sales_qty",
-            "lost_sales_value_est",
-            "sp_unit_net_price",
-            "sp_discount_share",
-            "sp_qty",
-            "sp_net_value",
-            "confidence_score",
-        ]
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
         _sku_daily_cache["df"] = df
         _sku_daily_cache["mtime"] = mtime
         return df
@@ -4414,6 +4991,9 @@ def run_ui(db_path: Path) -> None:
         return df.loc[mask]
 
     def get_progress_info(task: str):
+        pushed = progress_bus.get(task)
+        if pushed is not None:
+            return pushed
         conn = get_conn()
         try:
             row = get_task_progress(conn, task)
@@ -4421,12 +5001,21 @@ def run_ui(db_path: Path) -> None:
             conn.close()
         return row
 
-    def poll_global_status():
-        conn = get_conn()
-        try:
-            latest = get_latest_task_progress(conn)
-        finally:
-            conn.close()
+    def pump_progress():
+        if ctx.state.get("closing"):
+            return
+        if progress_bus.pump():
+            show_global_task()
+        app.after(200, pump_progress)
+
+    error_log_tail = LogTail(Path("exports") / "app-errors.log")
+    global_status_fallback = {"at": 0.0}
+
+    def show_global_task(latest: dict | None = None):
+        if latest is None and progress_bus.last_task is not None:
+            latest = progress_bus.get(progress_bus.last_task)
+            if latest is not None:
+                latest["task"] = progress_bus.last_task
         if latest:
             total = latest.get("total", 0)
             processed = latest.get("processed", 0)
@@ -4438,15 +5027,26 @@ def run_ui(db_path: Path) -> None:
                 task_status_var.set(f"Task: {task}")
         else:
             task_status_var.set("Task: idle")
-        log_path = Path("exports") / "app-errors.log"
-        if log_path.exists():
+
+    def poll_global_status():
+        # Pushed updates are shown by pump_progress; SQLite is only read when nothing
+        # was pushed recently (work started by another process, e.g. CLI), at most every 30 s.
+        pushed_recently = (
+            progress_bus.last_at is not None and time.time() - progress_bus.last_at < 30
+        )
+        if not pushed_recently and time.time() - global_status_fallback["at"] >= 30:
+            global_status_fallback["at"] = time.time()
+            conn = get_conn()
             try:
-                last_line = (
-                    log_path.read_text(encoding="utf-8").strip().splitlines()[-1]
-                )
-                last_error_var.set(f"Zadnja greska: {last_line[:120]}")
-            except Exception:
-                last_error_var.set("Zadnja greska: -")
+                show_global_task(get_latest_task_progress(conn))
+            finally:
+                conn.close()
+        try:
+            error_log_tail.read_new()
+        except Exception:
+            pass
+        if error_log_tail.last_line:
+            last_error_var.set(f"Zadnja greska: {error_log_tail.last_line[:120]}")
         else:
             last_error_var.set("Zadnja greska: -")
         app.after(3000, poll_global_status)
@@ -4469,6 +5069,7 @@ def run_ui(db_path: Path) -> None:
             state.get("period_days"),
             state.get("period_start"),
             state.get("period_end"),
+            materialized=True,
         )
         unpicked_all = conn.execute(
             "SELECT COUNT(*) FROM orders "
@@ -4584,7 +5185,7 @@ def run_ui(db_path: Path) -> None:
 
         conn = get_conn()
         try:
-            k_main = get_kpis(conn, main_days, main_start_str, main_end_str)
+            k_main = get_kpis(conn, main_days, main_start_str, main_end_str, materialized=True)
             gross_cash = float(k_main.get("total_revenue", 0.0) or 0.0)
             lbl_main.configure(text=format_amount(gross_cash))
 
@@ -4608,7 +5209,7 @@ def run_ui(db_path: Path) -> None:
                 cmp_start_str, cmp_end_str = _resolve_period_to_strings(
                     None, cmp_start, cmp_end
                 )
-                k_cmp = get_kpis(conn, None, cmp_start_str, cmp_end_str)
+                k_cmp = get_kpis(conn, None, cmp_start_str, cmp_end_str, materialized=True)
                 cmp_val = float(k_cmp.get("total_revenue", 0.0) or 0.0)
                 main_val = gross_cash
                 if lbl_cmp is not None:
@@ -4706,7 +5307,7 @@ def run_ui(db_path: Path) -> None:
 
             if ax_monthly is not None and canvas_monthly is not None:
                 monthly = get_finansije_monthly(
-                    conn, main_days, main_start_str, main_end_str
+                    conn, main_days, main_start_str, main_end_str, materialized=True
                 )
                 ax_monthly.clear()
                 if not monthly:
@@ -4882,14 +5483,22 @@ def run_ui(db_path: Path) -> None:
         return f"{line1}\n{line2}"
 
     def refresh_charts():
+        if ax_customers is None:
+            return
         conn = get_conn()
         period_days = state.get("period_days")
         start = state.get("period_start")
         end = state.get("period_end")
-        top_customers = get_top_customers(conn, 5, period_days, start, end)
-        top_products = get_top_products_qty(conn, 10, period_days, start, end)
+        top_customers = get_top_customers(conn, 5, period_days, start, end, materialized=True)
+        top_products = get_top_products_qty(conn, 10, period_days, start, end, materialized=True)
         top_categories = get_top_categories_qty_share(
-            conn, 5, period_days, start, end, categorize_sku=kategorija_za_sifru
+            conn,
+            5,
+            period_days,
+            start,
+            end,
+            categorize_sku=kategorija_za_sifru,
+            materialized=True,
         )
         conn.close()
 
@@ -5716,64 +6325,42 @@ def run_ui(db_path: Path) -> None:
         }
 
         def worker():
-            conn = get_conn()
+            def on_file_done(idx: int, job: ImportJob, status: str, exc: Exception | None) -> None:
+                by_title = result["by_title"]
+                if job.title not in by_title:
+                    by_title[job.title] = {"imported": 0, "skipped": 0, "failed": 0}
+                result[status] += 1
+                by_title[job.title][status] += 1
+                if exc is not None:
+                    append_reject(
+                        result["rejects"],
+                        job.title,
+                        job.path.name,
+                        None,
+                        "file_failed",
+                        str(exc),
+                    )
+                    log_app_error("import_async", f"{job.title} {job.path.name}: {exc}")
+                progress["idx"] = idx
+
+            conn = get_write_conn()
             try:
-                for idx, (title, import_fn, path) in enumerate(jobs, start=1):
-                    if ctx.state.get("closing") or ctx.state.get("import_cancel"):
-                        break
-                    by_title = result["by_title"]
-                    if title not in by_title:
-                        by_title[title] = {"imported": 0, "skipped": 0, "failed": 0}
-                    try:
-                        digest = file_hash(path)
-                        exists = conn.execute(
-                            "SELECT 1 FROM import_runs WHERE file_hash = ?",
-                            (digest,),
-                        ).fetchone()
-                        if exists:
-                            result["skipped"] += 1
-                            by_title[title]["skipped"] += 1
-                            append_reject(
-                                result["rejects"],
-                                title,
-                                path.name,
-                                None,
-                                "file_already_imported",
-                                "",
-                            )
-                        else:
-                            try:
-                                import_fn(conn, path, result["rejects"])
-                                result["imported"] += 1
-                                by_title[title]["imported"] += 1
-                            except Exception as exc:
-                                result["failed"] += 1
-                                by_title[title]["failed"] += 1
-                                append_reject(
-                                    result["rejects"],
-                                    title,
-                                    path.name,
-                                    None,
-                                    "file_failed",
-                                    str(exc),
-                                )
-                                log_app_error("import_async", f"{title} {path.name}: {exc}")
-                    except Exception as exc:
-                        result["failed"] += 1
-                        by_title[title]["failed"] += 1
-                        append_reject(
-                            result["rejects"],
-                            title,
-                            path.name,
-                            None,
-                            "file_failed",
-                            str(exc),
-                        )
-                        log_app_error("import_async", f"{title} {path.name}: {exc}")
-                    finally:
-                        progress["idx"] = idx
-                progress["done"] = True
+                # Sheets are parsed in worker processes, applied here in file order.
+                run_import_jobs(
+                    conn,
+                    make_import_jobs(jobs),
+                    file_hash=file_hash,
+                    rejects=result["rejects"],
+                    workers=import_workers,
+                    on_done=on_file_done,
+                    should_stop=lambda: bool(
+                        ctx.state.get("closing") or ctx.state.get("import_cancel")
+                    ),
+                )
+            except Exception as exc:
+                log_app_error("import_async", f"{log_title}: {exc}")
             finally:
+                progress["done"] = True
                 try:
                     conn.close()
                 except Exception:
@@ -5884,49 +6471,53 @@ def run_ui(db_path: Path) -> None:
             files=len(files),
             db=str(state.get("db_path")),
         )
+        conn = get_write_conn_ui()
+        if conn is None:
+            return 0
+        ctx.state["import_busy"] = True
         for btn in ctx.action_buttons or []:
             btn.configure(state="disabled")
         ctx.progress.configure(mode="determinate")
         ctx.progress.set(0)
         ctx.progress_pct_var.set("Napredak: 0%")
-        conn = get_conn()
         imported = 0
         skipped = []
         failed = 0
         rejects = []
         try:
             total = len(files)
-            for idx, path in enumerate(files, start=1):
-                digest = file_hash(path)
-                exists = conn.execute(
-                    "SELECT 1 FROM import_runs WHERE file_hash = ?",
-                    (digest,),
-                ).fetchone()
-                if exists:
-                    skipped.append(path.name)
+
+            def on_file_done(idx: int, job: ImportJob, status: str, exc: Exception | None) -> None:
+                nonlocal imported, failed
+                if status == "skipped":
+                    skipped.append(job.path.name)
+                elif status == "imported":
+                    imported += 1
+                else:
+                    failed += 1
                     append_reject(
-                        rejects, title, path.name, None, "file_already_imported", ""
+                        rejects,
+                        title,
+                        job.path.name,
+                        None,
+                        "file_failed",
+                        str(exc),
                     )
-                else:
-                    try:
-                        import_fn(conn, path, rejects)
-                        imported += 1
-                    except Exception as exc:
-                        failed += 1
-                        append_reject(
-                            rejects,
-                            title,
-                            path.name,
-                            None,
-                            "file_failed",
-                            str(exc),
-                        )
-                        log_app_error("import_folder", f"{title} {path.name}: {exc}")
+                    log_app_error("import_folder", f"{title} {job.path.name}: {exc}")
                 pct = idx / total if total else 1
                 ctx.progress.set(pct)
                 ctx.progress_pct_var.set(f"Napredak: {int(pct * 100)}% ({idx}/{total})")
                 ctx.status_var.set(f"Uvoz: {idx}/{total}")
                 app.update_idletasks()
+
+            run_import_jobs(
+                conn,
+                make_import_jobs([(title, import_fn, p) for p in files]),
+                file_hash=file_hash,
+                rejects=rejects,
+                workers=import_workers,
+                on_done=on_file_done,
+            )
             msg = f"Import zavrsen. Fajlova: {imported}."
             if skipped:
                 preview = ", ".join(skipped[:8])
@@ -5956,6 +6547,7 @@ def run_ui(db_path: Path) -> None:
             messagebox.showerror("Greska", str(exc))
         finally:
             conn.close()
+            ctx.state["import_busy"] = False
             ctx.status_var.set("Spremno.")
             for btn in ctx.action_buttons or []:
                 btn.configure(state="normal")
@@ -6027,49 +6619,53 @@ def run_ui(db_path: Path) -> None:
             files=len(files),
             db=str(state.get("db_path")),
         )
+        conn = get_write_conn_ui()
+        if conn is None:
+            return (0, 0)
+        ctx.state["import_busy"] = True
         for btn in ctx.action_buttons or []:
             btn.configure(state="disabled")
         ctx.progress.configure(mode="determinate")
         ctx.progress.set(0)
         ctx.progress_pct_var.set("Napredak: 0%")
-        conn = get_conn()
         imported = 0
         skipped = 0
         failed = 0
         rejects = []
         try:
             total = len(files)
-            for idx, path in enumerate(files, start=1):
-                digest = file_hash(path)
-                exists = conn.execute(
-                    "SELECT 1 FROM import_runs WHERE file_hash = ?",
-                    (digest,),
-                ).fetchone()
-                if exists:
+
+            def on_file_done(idx: int, job: ImportJob, status: str, exc: Exception | None) -> None:
+                nonlocal imported, skipped, failed
+                if status == "skipped":
                     skipped += 1
+                elif status == "imported":
+                    imported += 1
+                else:
+                    failed += 1
                     append_reject(
-                        rejects, title, path.name, None, "file_already_imported", ""
+                        rejects,
+                        title,
+                        job.path.name,
+                        None,
+                        "file_failed",
+                        str(exc),
                     )
-                else:
-                    try:
-                        import_fn(conn, path, rejects)
-                        imported += 1
-                    except Exception as exc:
-                        failed += 1
-                        append_reject(
-                            rejects,
-                            title,
-                            path.name,
-                            None,
-                            "file_failed",
-                            str(exc),
-                        )
-                        log_app_error("import_auto", f"{title} {path.name}: {exc}")
+                    log_app_error("import_auto", f"{title} {job.path.name}: {exc}")
                 pct = idx / total if total else 1
                 ctx.progress.set(pct)
                 ctx.progress_pct_var.set(f"Napredak: {int(pct * 100)}% ({idx}/{total})")
                 ctx.status_var.set(f"Uvoz: {idx}/{total}")
                 app.update_idletasks()
+
+            run_import_jobs(
+                conn,
+                make_import_jobs([(title, import_fn, p) for p in files]),
+                file_hash=file_hash,
+                rejects=rejects,
+                workers=import_workers,
+                on_done=on_file_done,
+            )
             if rejects:
                 ts = datetime.now().strftime("%Y%m%d%H%M%S")
                 out_path = Path("exports") / f"rejected-rows-{ts}.xlsx"
@@ -6079,6 +6675,7 @@ def run_ui(db_path: Path) -> None:
             messagebox.showerror("Greska", str(exc))
         finally:
             conn.close()
+            ctx.state["import_busy"] = False
             ctx.status_var.set("Spremno.")
             for btn in ctx.action_buttons or []:
                 btn.configure(state="normal")
@@ -6856,7 +7453,7 @@ def run_ui(db_path: Path) -> None:
         force_flag = 1 if tracking_force_var.get() else 0
         run_action_async_process(
             run_tracking_process,
-            [str(state["db_path"]), batch, force_flag],
+            [str(state["db_path"]), batch, force_flag, tracking_concurrency, tracking_rate_per_min],
             "Dexpress analiza",
             progress_task="tracking",
         )
@@ -7015,7 +7612,7 @@ def run_ui(db_path: Path) -> None:
         result = {"error": None}
 
         def worker():
-            conn = get_conn()
+            conn = get_write_conn()
             try:
                 action_fn(conn)
             except Exception as exc:
@@ -7065,49 +7662,70 @@ def run_ui(db_path: Path) -> None:
             ctx.progress_eta_var.set("")
             ctx.progress.start()
 
+        if progress_task:
+            progress_bus.forget(progress_task)
         future = ctx.executor.submit(fn, *args)
         try:
             ctx.state.setdefault("active_futures", set()).add(future)
         except Exception:
             pass
 
+        def show_progress(info: dict | None) -> None:
+            if info is None:
+                return
+            total = info["total"]
+            processed = info["processed"]
+            pct = min(1.0, processed / total) if total > 0 else 0.0
+            if processed > 0 and pct < 0.01:
+                pct_display = 0.01
+            else:
+                pct_display = pct
+            ctx.progress.set(pct_display)
+            if processed == 0:
+                ctx.progress_pct_var.set("Priprema...")
+                ctx.progress_eta_var.set("ETA: --")
+            else:
+                ctx.progress_pct_var.set(f"Napredak: {int(pct * 100)}%")
+                elapsed = time.time() - state.get("progress_start", time.time())
+                eta = (
+                    elapsed * (total - processed) / processed
+                    if processed > 0
+                    else None
+                )
+                ctx.progress_eta_var.set(f"ETA: {format_eta(eta)}")
+            try:
+                if progress_task == REGEN_TASK:
+                    regen_progress.set(pct_display)
+                    regen_progress_var.set(
+                        f"Regenerisanje metrika: {int(pct * 100)}%"
+                    )
+            except Exception:
+                pass
+
+        def on_pushed(task: str, info: dict) -> None:
+            if task == progress_task and not future.done():
+                show_progress(info)
+
+        unsubscribe = progress_bus.subscribe(on_pushed) if progress_task else None
+        last_db_read = {"at": time.time()}
+
         def poll():
             if ctx.state.get("closing"):
                 return
-            if progress_task:
-                info = get_progress_info(progress_task)
-                if info is not None:
-                    total = info["total"]
-                    processed = info["processed"]
-                    pct = min(1.0, processed / total) if total > 0 else 0.0
-                    if processed > 0 and pct < 0.01:
-                        pct_display = 0.01
-                    else:
-                        pct_display = pct
-                    ctx.progress.set(pct_display)
-                    if processed == 0:
-                        ctx.progress_pct_var.set("Priprema...")
-                        ctx.progress_eta_var.set("ETA: --")
-                    else:
-                        ctx.progress_pct_var.set(f"Napredak: {int(pct * 100)}%")
-                        elapsed = time.time() - state.get("progress_start", time.time())
-                        eta = (
-                            elapsed * (total - processed) / processed
-                            if processed > 0
-                            else None
-                        )
-                        ctx.progress_eta_var.set(f"ETA: {format_eta(eta)}")
-                    try:
-                        if progress_task == REGEN_TASK:
-                            regen_progress.set(pct_display)
-                            regen_progress_var.set(
-                                f"Regenerisanje metrika: {int(pct * 100)}%"
-                            )
-                    except Exception:
-                        pass
-            if not future.done():
-                app.after(5000, poll)
-                return
+            # Progress arrives through progress_bus; task_progress is read only if
+            # nothing was pushed for this task (e.g. worker without the bus).
+            if (
+                progress_task
+                and progress_bus.get(progress_task) is None
+                and time.time() - last_db_read["at"] >= 5
+            ):
+                last_db_read["at"] = time.time()
+                show_progress(get_progress_info(progress_task))
+            if not future.done():
+                app.after(250, poll)
+                return
+            if unsubscribe is not None:
+                unsubscribe()
             if progress_task:
                 ctx.progress.set(1)
                 ctx.progress_pct_var.set("Napredak: 100%")
@@ -7403,6 +8021,14 @@ def run_ui(db_path: Path) -> None:
                 str(SP_DB),
                 str(state["db_path"]),
                 REGEN_TASK,
+                # 0 = koristi sva jezgra za parsiranje PDF kartica.
+                int(settings.get("kartice_pdf_workers", 0) or 0),
+                # Obje faze u istom procesu (bez dodatnih python subprocesa i CSV citanja).
+                bool(settings.get("metrics_in_process", True)),
+                # Racunaj ponovo samo SKU/dane koji su se promijenili od prosle regeneracije.
+                bool(settings.get("metrics_incremental", True)),
+                # Nepromijenjeni SP Prijemi xlsx se citaju iz kesa parsiranih tabela.
+                SHEET_CACHE,
             ],
             "Regenerisi metrike",
             progress_task=REGEN_TASK,
@@ -7441,7 +8067,20 @@ def run_ui(db_path: Path) -> None:
         side="left", padx=6
     )
 
-    tabs = ctk.CTkTabview(app)
+    # Tab name -> (build, refresh). Built on first open, or all at startup when lazy_ui is off.
+    tab_builders: dict[str, tuple[Callable[[], None], Callable[[], None]]] = {}
+
+    def ensure_tab_built(name: str, *, refresh: bool = True) -> None:
+        entry = tab_builders.pop(name, None)
+        if entry is None:
+            return
+        build, refresh_tab = entry
+        build()
+        if refresh:
+            refresh_tab()
+        startup.mark(f"tab:{name}")
+
+    tabs = ctk.CTkTabview(app, command=lambda: ensure_tab_built(tabs.get()))
     tabs.pack(fill="both", expand=True, padx=12, pady=8)
 
     tab_dashboard = tabs.add("Dashboard")
@@ -7473,7 +8112,7 @@ def run_ui(db_path: Path) -> None:
         if df.empty:
             return df
         return (
-            df.groupby("sku", dropna=False)
+            df.groupby("sku", dropna=False, observed=True)
             .agg(
                 lost_qty=("lost_sales_qty", "sum"),
                 lost_value=("lost_sales_value_est", "sum"),
@@ -7505,26 +8144,28 @@ def run_ui(db_path: Path) -> None:
         ),
     )
 
-    ctx.state["prodaja_widgets"] = build_prodaja_tab(
-        ctx,
-        ctk=ctk,
-        tab_prodaja=tab_prodaja,
-        Figure=Figure,
-        FigureCanvasTkAgg=FigureCanvasTkAgg,
-        messagebox=messagebox,
-        add_calendar_picker=_add_calendar_picker,
-        pick_date_range_dialog=_pick_date_range_dialog,
-        parse_user_date=_parse_user_date,
-        format_user_date=_format_user_date,
-        refresh_prodaja_pregled=prodaja_logic["refresh_prodaja_pregled"],
-        refresh_trending=prodaja_logic["refresh_trending"],
-        refresh_trending_chart=prodaja_logic["refresh_trending_chart"],
-        refresh_snizenja=prodaja_logic["refresh_snizenja"],
-        export_oos_gubitci_excel=prodaja_logic["export_oos_gubitci_excel"],
-    )
+    def _build_prodaja():
+        Figure, FigureCanvasTkAgg = _chart_libs()
+        ctx.state["prodaja_widgets"] = build_prodaja_tab(
+            ctx,
+            ctk=ctk,
+            tab_prodaja=tab_prodaja,
+            Figure=Figure,
+            FigureCanvasTkAgg=FigureCanvasTkAgg,
+            messagebox=messagebox,
+            add_calendar_picker=_add_calendar_picker,
+            pick_date_range_dialog=_pick_date_range_dialog,
+            parse_user_date=_parse_user_date,
+            format_user_date=_format_user_date,
+            refresh_prodaja_pregled=prodaja_logic["refresh_prodaja_pregled"],
+            refresh_trending=prodaja_logic["refresh_trending"],
+            refresh_trending_chart=prodaja_logic["refresh_trending_chart"],
+            refresh_snizenja=prodaja_logic["refresh_snizenja"],
+            export_oos_gubitci_excel=prodaja_logic["export_oos_gubitci_excel"],
+        )
 
     refresh_prodaja_views = prodaja_logic["refresh_prodaja_views"]
-    refresh_prodaja_views()
+    tab_builders["Prodaja"] = (_build_prodaja, refresh_prodaja_views)
 
     settings_body = ctk.CTkFrame(tab_settings)
     settings_body.pack(fill="both", expand=True, padx=12, pady=12)
@@ -7828,6 +8469,81 @@ def run_ui(db_path: Path) -> None:
     )
     btn_import_all.pack(anchor="w", pady=(8, 2))
 
+    # Background auto-ingest ("watch_folders"): polls the default folders and imports
+    # only new/changed files; a poll is skipped while a manual import is running.
+    watch_state = {"thread": None, "enabled": bool(settings.get("watch_folders", False))}
+    watch_interval = max(2.0, float(settings.get("watch_interval_sec", 10) or 10))
+    watch_var = ctk.BooleanVar(value=watch_state["enabled"])
+
+    def _watch_worker():
+        def connect():
+            # Per poll, so the (WAL) writer is free between polls; busy -> skip the round.
+            return get_write_conn(timeout=1.0)
+
+        batch = make_watch_importer(
+            workers=import_workers,
+            should_stop=lambda: bool(ctx.state.get("closing") or not watch_state["enabled"]),
+        )
+
+        def import_batch(conn, jobs, on_done):
+            ctx.state["watch_busy"] = True
+            try:
+                return batch(conn, jobs, on_done)
+            finally:
+                ctx.state["watch_busy"] = False
+
+        def on_poll(counts: dict[str, int]) -> None:
+            done = counts["imported"] + counts["skipped"] + counts["failed"]
+            if not done or ctx.state.get("closing"):
+                return
+            message = (
+                f"Auto-uvoz: uvezeno {counts['imported']}, preskoceno {counts['skipped']}, "
+                f"gresaka {counts['failed']}"
+            )
+            log_app_event("watch_folders", "poll", **counts)
+
+            def show():
+                if ctx.state.get("closing"):
+                    return
+                ctx.status_var.set(message)
+                if counts["imported"]:
+                    refresh_dashboard()
+
+            app.after(0, show)
+
+        try:
+            FolderWatcher(connect, default_watch_sources(), import_batch).run(
+                watch_interval,
+                should_stop=lambda: bool(ctx.state.get("closing") or not watch_state["enabled"]),
+                should_pause=lambda: bool(ctx.state.get("import_busy") or state.get("baseline_locked")),
+                on_poll=on_poll,
+            )
+        except Exception as exc:
+            log_app_error("watch_folders", str(exc))
+        finally:
+            watch_state["thread"] = None
+
+    def _start_watch():
+        thread = watch_state["thread"]
+        if not watch_state["enabled"] or (thread is not None and thread.is_alive()):
+            return
+        thread = threading.Thread(target=_watch_worker, daemon=True)
+        watch_state["thread"] = thread
+        thread.start()
+
+    def on_watch_toggle():
+        watch_state["enabled"] = bool(watch_var.get())
+        save_app_settings({"watch_folders": watch_state["enabled"]})
+        _start_watch()
+
+    ctk.CTkCheckBox(
+        base_imports,
+        text=f"Automatski uvozi nove fajlove iz default foldera (svakih {watch_interval:g}s)",
+        variable=watch_var,
+        command=on_watch_toggle,
+    ).pack(anchor="w", pady=(2, 2))
+    app.after(2000, _start_watch)
+
     ctx.action_buttons = (ctx.action_buttons or []) + [
         btn_import_sp_orders,
         btn_import_minimax,
@@ -8057,116 +8773,492 @@ def run_ui(db_path: Path) -> None:
     load_baseline_lock()
     update_baseline_ui()
     app.after(1000, poll_global_status)
-
-    refresh_exchange_rate()
-    sync_rate_entry()
+    app.after(200, pump_progress)
 
     charts_frame = ctk.CTkFrame(tab_dashboard)
     charts_frame.pack(fill="both", expand=True, padx=10, pady=10)
+    ax_customers = ax_products = ax_sp_bank = None
+    canvas_customers = canvas_products = canvas_sp_bank = None
+
+    def _build_dashboard_charts():
+        nonlocal ax_customers, ax_products, ax_sp_bank
+        nonlocal canvas_customers, canvas_products, canvas_sp_bank
+        Figure, FigureCanvasTkAgg = _chart_libs()
+
+        fig_customers = Figure(figsize=(4, 3), dpi=100)
+        ax_customers = fig_customers.add_subplot(111)
+        canvas_customers = FigureCanvasTkAgg(fig_customers, master=charts_frame)
+        canvas_customers.get_tk_widget().pack(
+            side="left", fill="both", expand=True, padx=6, pady=6
+        )
 
-    fig_customers = Figure(figsize=(4, 3), dpi=100)
-    ax_customers = fig_customers.add_subplot(111)
-    canvas_customers = FigureCanvasTkAgg(fig_customers, master=charts_frame)
-    canvas_customers.get_tk_widget().pack(
-        side="left", fill="both", expand=True, padx=6, pady=6
-    )
+        fig_products = Figure(figsize=(4, 3), dpi=100)
+        ax_products = fig_products.add_subplot(111)
+        canvas_products = FigureCanvasTkAgg(fig_products, master=charts_frame)
+        canvas_products.get_tk_widget().pack(
+            side="left", fill="both", expand=True, padx=6, pady=6
+        )
 
-    fig_products = Figure(figsize=(4, 3), dpi=100)
-    ax_products = fig_products.add_subplot(111)
-    canvas_products = FigureCanvasTkAgg(fig_products, master=charts_frame)
-    canvas_products.get_tk_widget().pack(
-        side="left", fill="both", expand=True, padx=6, pady=6
-    )
+        fig_sp_bank = Figure(figsize=(4, 3), dpi=100)
+        ax_sp_bank = fig_sp_bank.add_subplot(111)
+        canvas_sp_bank = FigureCanvasTkAgg(fig_sp_bank, master=charts_frame)
+        canvas_sp_bank.get_tk_widget().pack(
+            side="left", fill="both", expand=True, padx=6, pady=6
+        )
 
-    fig_sp_bank = Figure(figsize=(4, 3), dpi=100)
-    ax_sp_bank = fig_sp_bank.add_subplot(111)
-    canvas_sp_bank = FigureCanvasTkAgg(fig_sp_bank, master=charts_frame)
-    canvas_sp_bank.get_tk_widget().pack(
-        side="left", fill="both", expand=True, padx=6, pady=6
-    )
+    def _build_finansije():
+        Figure, FigureCanvasTkAgg = _chart_libs()
+        ctx.state["finansije_widgets"] = build_finansije_tab(
+            ctx,
+            ctk=ctk,
+            tab_finansije=tab_finansije,
+            Figure=Figure,
+            FigureCanvasTkAgg=FigureCanvasTkAgg,
+            messagebox=messagebox,
+            unlock_finansije=unlock_finansije_password,
+            pick_date_range_dialog=_pick_date_range_dialog,
+            format_user_date=_format_user_date,
+            refresh_finansije=refresh_finansije,
+            export_unpaid_sp_orders=export_unpaid_sp_orders,
+            export_pending_sp_orders=export_pending_sp_orders,
+            export_neto_breakdown=export_finansije_neto_breakdown,
+        )
 
-    ctx.state["finansije_widgets"] = build_finansije_tab(
-        ctx,
-        ctk=ctk,
-        tab_finansije=tab_finansije,
-        Figure=Figure,
-        FigureCanvasTkAgg=FigureCanvasTkAgg,
-        messagebox=messagebox,
-        unlock_finansije=unlock_finansije_password,
-        pick_date_range_dialog=_pick_date_range_dialog,
-        format_user_date=_format_user_date,
-        refresh_finansije=refresh_finansije,
-        export_unpaid_sp_orders=export_unpaid_sp_orders,
-        export_pending_sp_orders=export_pending_sp_orders,
-        export_neto_breakdown=export_finansije_neto_breakdown,
-    )
+    def _build_troskovi():
+        Figure, FigureCanvasTkAgg = _chart_libs()
+        ctx.state["troskovi_widgets"] = build_troskovi_tab(
+            ctx,
+            ctk=ctk,
+            tab_troskovi=tab_troskovi,
+            Figure=Figure,
+            FigureCanvasTkAgg=FigureCanvasTkAgg,
+            refresh_expenses=refresh_expenses,
+        )
 
-    ctx.state["troskovi_widgets"] = build_troskovi_tab(
-        ctx,
-        ctk=ctk,
-        tab_troskovi=tab_troskovi,
-        Figure=Figure,
-        FigureCanvasTkAgg=FigureCanvasTkAgg,
-        refresh_expenses=refresh_expenses,
-    )
+    def _build_povrati():
+        Figure, FigureCanvasTkAgg = _chart_libs()
+        ctx.state["povrati_widgets"] = build_povrati_tab(
+            ctx,
+            ctk=ctk,
+            tab_povrati=tab_povrati,
+            Figure=Figure,
+            FigureCanvasTkAgg=FigureCanvasTkAgg,
+            run_export_refunds_full=run_export_refunds_full,
+        )
 
-    ctx.state["povrati_widgets"] = build_povrati_tab(
-        ctx,
-        ctk=ctk,
-        tab_povrati=tab_povrati,
-        Figure=Figure,
-        FigureCanvasTkAgg=FigureCanvasTkAgg,
-        run_export_refunds_full=run_export_refunds_full,
-    )
+    def _build_nepreuzete():
+        Figure, FigureCanvasTkAgg = _chart_libs()
+        ctx.state["nepreuzete_widgets"] = build_nepreuzete_tab(
+            ctx,
+            ctk=ctk,
+            tab_nepreuzete=tab_nepreuzete,
+            Figure=Figure,
+            FigureCanvasTkAgg=FigureCanvasTkAgg,
+            refresh_unpicked_charts=refresh_unpicked_charts,
+            run_export_unpicked_full=run_export_unpicked_full,
+            run_dexpress_tracking=run_dexpress_tracking,
+        )
 
-    ctx.state["nepreuzete_widgets"] = build_nepreuzete_tab(
-        ctx,
-        ctk=ctk,
-        tab_nepreuzete=tab_nepreuzete,
-        Figure=Figure,
-        FigureCanvasTkAgg=FigureCanvasTkAgg,
-        refresh_unpicked_charts=refresh_unpicked_charts,
-        run_export_unpicked_full=run_export_unpicked_full,
-        run_dexpress_tracking=run_dexpress_tracking,
-    )
+    def _build_poslovanje():
+        ctx.state["poslovanje_widgets"] = build_poslovanje_tab(
+            ctx,
+            ctk=ctk,
+            tab_poslovanje=tab_poslovanje,
+            show_last_imports=show_last_imports,
+            run_import_folder=run_import_folder,
+            import_sp_orders=import_sp_orders,
+            import_minimax=import_minimax,
+            import_sp_payments=import_sp_payments,
+            import_bank_xml=import_bank_xml,
+            import_sp_returns=import_sp_returns,
+            run_action_async_process=run_action_async_process,
+            run_match_minimax_process=run_match_minimax_process,
+            run_match_bank_process=run_match_bank_process,
+            close_invoices_from_confirmed_matches=close_invoices_from_confirmed_matches,
+            run_action=run_action,
+            run_reset_minimax_matches=run_reset_minimax_matches,
+            run_export_basic=run_export_basic,
+            run_export_single=run_export_single,
+            report_unmatched_reasons=report_unmatched_reasons,
+            run_export_bank_refunds=run_export_bank_refunds,
+            open_exports=open_exports,
+            refresh_poslovanje_lists=refresh_poslovanje_lists,
+            start_test_session=start_test_session,
+            _record_decision=_record_decision,
+            stop_test_session=stop_test_session,
+            update_baseline_ui=update_baseline_ui,
+            executor_factory=lambda: concurrent.futures.ProcessPoolExecutor(
+                max_workers=1,
+                initializer=install_progress_sink,
+                initargs=(progress_bus.queue,),
+            ),
+        )
 
-    ctx.state["poslovanje_widgets"] = build_poslovanje_tab(
-        ctx,
-        ctk=ctk,
-        tab_poslovanje=tab_poslovanje,
-        show_last_imports=show_last_imports,
-        run_import_folder=run_import_folder,
-        import_sp_orders=import_sp_orders,
-        import_minimax=import_minimax,
-        import_sp_payments=import_sp_payments,
-        import_bank_xml=import_bank_xml,
-        import_sp_returns=import_sp_returns,
-        run_action_async_process=run_action_async_process,
-        run_match_minimax_process=run_match_minimax_process,
-        run_match_bank_process=run_match_bank_process,
-        close_invoices_from_confirmed_matches=close_invoices_from_confirmed_matches,
-        run_action=run_action,
-        run_reset_minimax_matches=run_reset_minimax_matches,
-        run_export_basic=run_export_basic,
-        run_export_single=run_export_single,
-        report_unmatched_reasons=report_unmatched_reasons,
-        run_export_bank_refunds=run_export_bank_refunds,
-        open_exports=open_exports,
-        refresh_poslovanje_lists=refresh_poslovanje_lists,
-        start_test_session=start_test_session,
-        _record_decision=_record_decision,
-        stop_test_session=stop_test_session,
-        update_baseline_ui=update_baseline_ui,
-        executor_factory=lambda: concurrent.futures.ProcessPoolExecutor(max_workers=1),
-    )
+    tab_builders["Finansije"] = (_build_finansije, refresh_finansije)
+    tab_builders["Troskovi"] = (_build_troskovi, refresh_expenses)
+    tab_builders["Povrati"] = (_build_povrati, refresh_returns_charts)
+    tab_builders["Nepreuzete"] = (_build_nepreuzete, refresh_unpicked_charts)
+    tab_builders["Poslovanje"] = (_build_poslovanje, refresh_poslovanje_lists)
 
-    refresh_dashboard()
-    refresh_poslovanje_lists()
+    lazy_ui = bool(settings.get("lazy_ui", True))
+
+    def _record_startup():
+        startup.mark("startup_done")
+        try:
+            startup.write(
+                APP_DIR / "exports" / "startup-timing.jsonl",
+                app=APP_BASE,
+                lazy_ui=lazy_ui,
+                pandas_loaded=is_loaded(pd),
+            )
+        except Exception as exc:
+            log_app_error("startup_timing", str(exc))
+        if startup_report:
+            print(startup.report())
+
+    def _preload_pandas():
+        # Runs on the Tk thread once the dashboard is drawn, so opening Prodaja
+        # later does not pay for the import.
+        if not is_loaded(pd):
+            pd.DataFrame
+            startup.mark("pandas")
+        _record_startup()
+
+    def _finish_startup():
+        refresh_exchange_rate()
+        sync_rate_entry()
+        refresh_dashboard()
+        startup.mark("dashboard_kpis")
+        app.update_idletasks()
+        _build_dashboard_charts()
+        refresh_charts()
+        startup.mark("dashboard_charts")
+        ensure_tab_built(tabs.get())
+        app.after(200, _preload_pandas)
+
+    def _window_shown():
+        startup.mark("window_visible")
+        _record_startup()
+
+    if lazy_ui:
+        # Map the window (top bar, tabs, KPI frame) before any chart or data work.
+        app.update()
+        startup.mark("window_visible")
+        app.after(10, _finish_startup)
+    else:
+        refresh_exchange_rate()
+        sync_rate_entry()
+        _build_dashboard_charts()
+        for name in list(tab_builders):
+            ensure_tab_built(name, refresh=False)
+        refresh_dashboard()
+        refresh_poslovanje_lists()
+        app.after(10, _window_shown)
     app.mainloop()
 
 
+def _run_db_stress_once(files: list[Path], *, wal: bool, readers: int = 2) -> dict:
+    """Fresh temp DB per run so WAL and rollback journal are compared on equal terms."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "stress.db"
+        conn = connect_db(db_path)
+        try:
+            init_db(conn)
+            conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+            conn.commit()
+        finally:
+            conn.close()
+
+        def read_dashboard(c: sqlite3.Connection) -> None:
+            get_kpis(c, materialized=True)
+            get_latest_task_progress(c)
+
+        return run_db_stress(
+            db_path,
+            files,
+            import_fn=lambda c, path: import_sp_orders(c, path),
+            read_fn=read_dashboard,
+            wal=wal,
+            readers=readers,
+        )
+
+
+def _match_tables(conn: sqlite3.Connection) -> dict[str, list[tuple]]:
+    return {
+        "invoice_matches": conn.execute(
+            "SELECT id, order_id, invoice_id, score, status, method FROM invoice_matches ORDER BY id"
+        ).fetchall(),
+        "invoice_candidates": conn.execute(
+            "SELECT order_id, invoice_id, score, detail, method FROM invoice_candidates "
+            "ORDER BY order_id, invoice_id"
+        ).fetchall(),
+        "order_flags": conn.execute(
+            "SELECT order_id, flag, note FROM order_flags ORDER BY order_id, flag"
+        ).fetchall(),
+    }
+
+
+def _run_match_bench(orders: int, *, seed: int = 7) -> dict:
+    """
+    match_minimax on a synthetic temp DB, once with the date-window scan and once
+    with the InvoiceIndex. Returns timings, throughput and whether the
+    invoice_matches / invoice_candidates / order_flags tables are identical.
+    """
+    import tempfile
+
+    order_rows, item_rows, invoice_rows = synthetic_match_data(orders, seed=seed)
+    stats: dict[str, Any] = {"orders": len(order_rows), "invoices": len(invoice_rows)}
+    tables = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for indexed in (False, True):
+            conn = connect_db(Path(tmp) / f"match_{int(indexed)}.db")
+            try:
+                init_db(conn)
+                conn.executemany(
+                    "INSERT INTO orders (id, sp_order_no, customer_name, picked_up_at, created_at, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    order_rows,
+                )
+                conn.executemany(
+                    "INSERT INTO order_items (id, order_id, product_code, qty, cod_amount, "
+                    "advance_amount, discount, addon_cod, addon_advance, extra_discount) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    item_rows,
+                )
+                conn.executemany(
+                    "INSERT INTO invoices (id, number, customer_name, turnover, amount_due) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    invoice_rows,
+                )
+                conn.commit()
+                started = time.perf_counter()
+                match_minimax(conn, indexed=indexed)
+                elapsed = time.perf_counter() - started
+                tables[indexed] = _match_tables(conn)
+            finally:
+                conn.close()
+            label = "indexed" if indexed else "scan"
+            stats[f"{label}_seconds"] = elapsed
+            stats[f"{label}_orders_per_s"] = len(order_rows) / elapsed if elapsed else 0.0
+    stats["matches"] = len(tables[True]["invoice_matches"])
+    stats["identical"] = tables[False] == tables[True]
+    return stats
+
+
+def _run_tracking_bench(
+    count: int,
+    *,
+    concurrency: int = 4,
+    rate_per_min: float = 120.0,
+    burst: int = 2,
+    latency: float = 0.05,
+    record_dir: Path | None = None,
+) -> dict:
+    """
+    refresh_tracking_codes against a local MockCarrierServer on a temp DB
+    (half SPF codes, half D Express). Returns throughput, connection count,
+    per-carrier rate-limit violations and saved tracking_summary rows.
+    """
+    import tempfile
+
+    codes = [f"SPF{i:08d}" if i % 2 else f"DE{i:09d}" for i in range(count)]
+    with tempfile.TemporaryDirectory() as tmp, MockCarrierServer(
+        record_dir=record_dir, latency=latency
+    ) as server:
+        conn = connect_db(Path(tmp) / "tracking.db")
+        try:
+            init_db(conn)
+            fetch_stats: dict = {}
+            started = time.perf_counter()
+            saved = refresh_tracking_codes(
+                conn,
+                codes,
+                concurrency=concurrency,
+                rate_per_min=rate_per_min,
+                base_urls=server.base_urls,
+                log_dir=Path(tmp),
+                burst=burst,
+                stats=fetch_stats,
+            )
+            elapsed = time.perf_counter() - started
+            summaries = conn.execute("SELECT COUNT(*) FROM tracking_summary").fetchone()[0]
+            log_rows = sum(1 for _ in (Path(tmp) / "tracking-log.csv").open(encoding="utf-8")) - 1
+        finally:
+            conn.close()
+    return {
+        "codes": len(codes),
+        "saved": saved,
+        "summaries": summaries,
+        "log_rows": log_rows,
+        "seconds": elapsed,
+        "per_min": len(codes) / elapsed * 60.0 if elapsed else 0.0,
+        "client_connections": fetch_stats.get("connections", 0),
+        "server_connections": server.connections,
+        "violations": {
+            carrier: rate_violations(times, rate_per_min, burst)
+            for carrier, times in server.requests.items()
+        },
+    }
+
+
+def _run_bench(
+    scale: float = 1.0,
+    *,
+    seed: int = 19,
+    work_dir: Path | None = None,
+    dashboard_repeat: int = 5,
+) -> dict:
+    """
+    Writes the synthetic inputs (bench_suite) into a fresh folder and DB and
+    times each stage the way the app runs it: SP / Minimax / bank / kartice
+    imports, match_minimax, match_bank_sp_payments, the in-process metrics
+    pipeline (stock card PDF -> sku_daily_metrics) and the refresh_dashboard
+    query set (median of `dashboard_repeat` runs). `work_dir` keeps the inputs
+    and DB for inspection; None uses a temp folder. Returns the JSON-ready result.
+    """
+    import os
+    import platform
+    import tempfile
+
+    data = synthetic_bench_data(scale, seed=seed)
+    counts = data.counts()
+    stages: dict[str, dict] = {}
+
+    def timed(name: str, rows: int, fn) -> Any:
+        started = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - started
+        stages[name] = {"seconds": round(elapsed, 4), "rows": rows, "per_s": round(rows / elapsed, 1) if elapsed else 0.0}
+        return value
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(work_dir) if work_dir is not None else Path(tmp)
+        root.mkdir(parents=True, exist_ok=True)
+        db_path = root / "bench.db"
+        if db_path.exists():
+            db_path.unlink()
+        started = time.perf_counter()
+        inputs = write_bench_inputs(
+            root / "inputs",
+            data,
+            col=COL,
+            sheet_orders=SHEET_SP_ORDERS,
+            sheet_payments=SHEET_SP_PAYMENTS,
+            sheet_minimax=SHEET_MINIMAX,
+        )
+        generate_seconds = time.perf_counter() - started
+
+        conn = connect_db(db_path)
+        try:
+            init_db(conn)
+
+            def import_all(fn, paths):
+                return lambda: [fn(conn, p) for p in paths]
+
+            timed("import_sp_orders", counts["order_rows"], import_all(import_sp_orders, inputs["orders"]))
+            timed("import_sp_payments", counts["payments"], import_all(import_sp_payments, inputs["payments"]))
+            timed("import_sp_returns", counts["return_rows"], import_all(import_sp_returns, inputs["returns"]))
+            timed("import_minimax", counts["invoices"], import_all(import_minimax, inputs["minimax"]))
+            timed("import_bank_xml", counts["bank_txns"], import_all(import_bank_xml, inputs["bank"]))
+            timed(
+                "import_kartice_events",
+                counts["kartice_events"],
+                import_all(import_kartice_events, inputs["kartice"]),
+            )
+            timed("match_minimax", counts["orders"], lambda: match_minimax(conn))
+            credits = conn.execute(
+                "SELECT COUNT(*) FROM bank_transactions "
+                "WHERE benefit = 'credit' AND payee_name LIKE '%SLANJE PAKETA%'"
+            ).fetchone()[0]
+            timed("match_bank_sp_payments", credits, lambda: match_bank_sp_payments(conn))
+            outcome = {
+                "invoice_matches": conn.execute("SELECT COUNT(*) FROM invoice_matches").fetchone()[0],
+                "bank_matches": conn.execute("SELECT COUNT(*) FROM bank_matches").fetchone()[0],
+            }
+        finally:
+            conn.close()
+
+        timed(
+            "metrics_pipeline",
+            counts["kartice_events"],
+            lambda: run_regenerate_sku_metrics_process(
+                str(inputs["pdf"][0].parent),
+                str(root / "inputs" / "Sp Prijemi"),
+                str(root / "metrics"),
+                str(db_path),
+                str(db_path),
+                task_name="bench_metrics",
+                in_process=True,
+            ),
+        )
+        metrics_csv = root / "metrics" / "sku_daily_metrics.csv"
+        outcome["metrics_rows"] = (
+            sum(1 for _ in metrics_csv.open(encoding="utf-8")) - 1 if metrics_csv.exists() else 0
+        )
+
+        conn = connect_db(db_path)
+        try:
+
+            def refresh_dashboard_queries() -> None:
+                # Same calls as run_ui's refresh_dashboard + refresh_charts (whole period).
+                get_kpis(conn, None, None, None, materialized=True)
+                conn.execute(
+                    "SELECT COUNT(*) FROM orders "
+                    "WHERE status LIKE '%Vraćeno%' OR status LIKE '%Vraceno%'"
+                ).fetchone()
+                get_top_customers(conn, 5, None, None, None, materialized=True)
+                get_top_products_qty(conn, 10, None, None, None, materialized=True)
+                get_top_categories_qty_share(
+                    conn, 5, None, None, None, categorize_sku=kategorija_za_sifru, materialized=True
+                )
+
+            median, runs = timed_median(refresh_dashboard_queries, dashboard_repeat)
+            stages["dashboard_queries"] = {
+                "seconds": round(median, 4),
+                "rows": 1,
+                "per_s": round(1 / median, 1) if median else 0.0,
+                "runs": [round(t, 4) for t in runs],
+            }
+        finally:
+            conn.close()
+
+    commit = None
+    try:
+        import subprocess
+
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True, check=False
+        ).stdout.strip() or None
+    except Exception:
+        pass
+    return {
+        "version": BENCH_RESULT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scale": scale,
+        "seed": seed,
+        "inputs": counts,
+        "generate_seconds": round(generate_seconds, 3),
+        "outcome": outcome,
+        "stages": stages,
+        "total_seconds": round(sum(s["seconds"] for s in stages.values()), 4),
+    }
+
+
 def run_smoke_tests() -> int:
+    import os
+    import random
+    import tempfile
+
+    global SHEET_CACHE
     failures = 0
+    # Checks that want the parsed-sheet cache point it at a temp file.
+    SHEET_CACHE = None
 
     def check(label: str, cond: bool, detail: str = ""):
         nonlocal failures
@@ -8244,6 +9336,725 @@ def run_smoke_tests() -> int:
     else:
         check("sp_prijemi import (skipped)", True, "no xlsx in Sp Prijemi/")
 
+    import subprocess
+    import sys
+
+    probe = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import importlib.util, sqlite3, sys; "
+            f"spec = importlib.util.spec_from_file_location('app', {str(Path(__file__).resolve())!r}); "
+            "m = importlib.util.module_from_spec(spec); spec.loader.exec_module(m); "
+            "c = sqlite3.connect(':memory:'); m.init_db(c); m.get_kpis(c, materialized=True); "
+            "print(m.is_loaded(m.pd))",
+        ],
+        capture_output=True,
+        text=True,
+        cwd=str(APP_DIR),
+        check=False,
+    )
+    check(
+        "startup: pandas lazy",
+        probe.returncode == 0 and probe.stdout.strip() == "False",
+        (probe.stdout + probe.stderr)[-300:],
+    )
+
+    sku_daily_src = APP_DIR / "Kalkulacije_kartice_art" / "izlaz" / "sku_daily_metrics.csv"
+    if sku_daily_src.exists():
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_copy = Path(tmp) / "sku_daily_metrics.csv"
+            shutil.copy2(sku_daily_src, csv_copy)
+            legacy = pd.read_csv(csv_copy, encoding="utf-8")
+            legacy["date_dt"] = pd.to_datetime(legacy["date"], errors="coerce").dt.date
+            legacy["sku"] = legacy["sku"].astype(str).str.strip()
+            from_csv, src_csv = load_sku_daily(csv_copy, write_cache=False)
+            written = write_sku_daily_cache(csv_copy)
+            from_cache, src_cache = load_sku_daily(csv_copy)
+            cols = ["lost_sales_qty", "lost_sales_value_est", "oos_flag", "net_sales_qty"]
+            legacy_agg = legacy.groupby("sku")[cols].sum().sort_index()
+            cache_agg = from_cache.groupby("sku", observed=True)[cols].sum().sort_index()
+            same = (
+                src_csv == "csv"
+                and written is not None
+                and src_cache != "csv"
+                and from_cache.equals(from_csv)
+                and list(legacy_agg.index) == [str(x) for x in cache_agg.index]
+                and all(
+                    abs(a - b) < 1e-6
+                    for a, b in zip(legacy_agg.to_numpy().ravel(), cache_agg.to_numpy().ravel())
+                )
+                and legacy["date_dt"].max() == from_cache["date_dt"].max()
+            )
+            check(
+                "sku_daily columnar == csv",
+                same,
+                f"src={src_csv}/{src_cache} written={written}",
+            )
+            if written is not None:
+                bumped = written.stat().st_mtime + 10
+                os.utime(csv_copy, (bumped, bumped))
+                _, src_stale = load_sku_daily(csv_copy, write_cache=False)
+                check("sku_daily stale copy -> csv", src_stale == "csv", f"src={src_stale}")
+    else:
+        check("sku_daily columnar (skipped)", True, "no sku_daily_metrics.csv")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(Path(tmp) / "pool.db", size=2)
+        try:
+            c1 = pool.reader()
+            init_db(c1)
+            c1.close()
+            c2 = pool.reader()
+            reused = c2 is c1
+            mode = c2.execute("PRAGMA journal_mode").fetchone()[0]
+            c2.close()
+            w = pool.writer()
+            w.execute("INSERT INTO app_state (key, value) VALUES ('k', 'v')")
+            r = pool.reader()
+            # WAL: reader sees the last committed state while the writer is mid-transaction.
+            unseen = r.execute("SELECT COUNT(*) FROM app_state WHERE key = 'k'").fetchone()[0] == 0
+            w.commit()
+            seen = r.execute("SELECT value FROM app_state WHERE key = 'k'").fetchone()
+            r.close()
+            w.close()
+            busy = False
+            w2 = pool.writer()
+            try:
+                pool.writer(timeout=0.05)
+            except TimeoutError:
+                busy = True
+            w2.close()
+            # A repeated close() must not hand the reader out twice or release the writer twice.
+            d1 = pool.reader()
+            d1.close()
+            d1.close()
+            d2, d3 = pool.reader(), pool.reader()
+            distinct = d2 is not d3
+            d2.close()
+            d3.close()
+            w3 = pool.writer()
+            w3.close()
+            w3.close()
+            w4 = pool.writer(timeout=0.05)
+            w4.close()
+        finally:
+            pool.close_all()
+        check(
+            "db pool double close is a no-op",
+            distinct and w4 is w3,
+            f"distinct={distinct}",
+        )
+        check(
+            "db pool WAL reuse/isolation",
+            reused and mode == "wal" and unseen and seen == ("v",) and busy,
+            f"reused={reused} mode={mode} unseen={unseen} seen={seen} busy={busy}",
+        )
+
+    stress_files = sorted((APP_DIR / "SP Narudzbe").glob("*.xlsx"))[:2]
+    if stress_files:
+        stats = _run_db_stress_once(stress_files, wal=True, readers=2)
+        check(
+            "db stress (wal+pool)",
+            stats["import_error"] is None
+            and stats["import_files"] == len(stress_files)
+            and stats["reads"] > 0
+            and stats["read_errors"] == 0,
+            format_stress_report(stats),
+        )
+
+    match_stats = _run_match_bench(400)
+    check(
+        "match_minimax indexed == scan",
+        match_stats["identical"] and match_stats["matches"] > 0,
+        str(match_stats),
+    )
+
+    tracking_stats = _run_tracking_bench(12, concurrency=4, rate_per_min=600.0, latency=0.01)
+    check(
+        "tracking refresh via mock server",
+        tracking_stats["saved"] == 12
+        and tracking_stats["summaries"] == 12
+        and tracking_stats["log_rows"] == 12
+        and not any(tracking_stats["violations"].values())
+        and tracking_stats["server_connections"] <= 4,
+        str(tracking_stats),
+    )
+
+    import concurrent.futures
+
+    bus = ProgressBus()
+    bus.install()
+    try:
+        bus_db = sqlite3.connect(":memory:")
+        init_db(bus_db)
+        set_task_progress(bus_db, "smoke_bus", 10)
+        update_task_progress(bus_db, "smoke_bus", 4)
+        bus_db.close()
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=1, initializer=install_progress_sink, initargs=(bus.queue,)
+        ) as exe:
+            exe.submit(publish_progress, "smoke_bus", processed=7).result()
+        deadline = time.time() + 5
+        pushed = []
+        bus.subscribe(lambda task, info: pushed.append((task, info["processed"])))
+        while time.time() < deadline and len(pushed) < 3:
+            bus.pump()
+            time.sleep(0.02)
+        info = bus.get("smoke_bus")
+    finally:
+        bus.close()
+    check(
+        "progress bus (in-process + worker)",
+        info is not None and info["total"] == 10 and info["processed"] == 7 and len(pushed) == 3,
+        f"{info} {pushed}",
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "app-errors.log"
+        log_path.write_text("".join(f"[t] stara greska {i}\n" for i in range(2000)), encoding="utf-8")
+        tail = LogTail(log_path, initial_bytes=256)
+        first = tail.read_new()
+        with log_path.open("a", encoding="utf-8") as handle:
+            handle.write("[t] nova greska 1\n[t] nova gre")
+        second = tail.read_new()
+        with log_path.open("a", encoding="utf-8") as handle:
+            handle.write("ska 2\n")
+        third = tail.read_new()
+        log_path.write_text("[t] poslije rotacije\n", encoding="utf-8")
+        fourth = tail.read_new()
+    check(
+        "error log tail reads only new bytes",
+        first[-1] == "[t] stara greska 1999"
+        and len(first) < 20
+        and second == ["[t] nova greska 1"]
+        and third == ["[t] nova greska 2"]
+        and fourth == ["[t] poslije rotacije"]
+        and tail.last_line == "[t] poslije rotacije",
+        f"{first[-1:]} {second} {third} {fourth}",
+    )
+
+    bench = _run_bench(0.02, seed=5, dashboard_repeat=1)
+    expected_stages = {
+        "import_sp_orders",
+        "import_sp_payments",
+        "import_sp_returns",
+        "import_minimax",
+        "import_bank_xml",
+        "import_kartice_events",
+        "match_minimax",
+        "match_bank_sp_payments",
+        "metrics_pipeline",
+        "dashboard_queries",
+    }
+    same_data = synthetic_bench_data(0.02, seed=5).orders == synthetic_bench_data(0.02, seed=5).orders
+    slower = dict(bench, stages={k: dict(v, seconds=v["seconds"] * 2 + 1) for k, v in bench["stages"].items()})
+    statuses = {row["status"] for row in compare_bench_results(bench, slower)}
+    check(
+        "bench on synthetic data (all stages, matches, metrics)",
+        set(bench["stages"]) == expected_stages
+        and bench["outcome"]["invoice_matches"] > 0
+        and bench["outcome"]["bank_matches"] > 0
+        and bench["outcome"]["metrics_rows"] > 0
+        and same_data
+        and statuses == {"sporije"}
+        and json.loads(json.dumps(bench)) == bench,
+        f"{sorted(bench['stages'])} {bench['outcome']} same_data={same_data} {statuses}",
+    )
+
+    rng = random.Random(3)
+    fuzzy_diff = []
+    for _ in range(500):
+        text = "".join(rng.choice("abc ") for _ in range(rng.randrange(0, 14)))
+        pattern = "".join(rng.choice("abc") for _ in range(rng.randrange(1, 8)))
+        dist = rng.randrange(0, 4)
+        if approx_contains(text, pattern, dist) != fuzzy_contains(text, pattern, dist):
+            fuzzy_diff.append((text, pattern, dist))
+    purposes = synthetic_bank_purposes(40)
+    reason_diff = [
+        p for p in purposes if classify_refund_reason(p) != classify_refund_reason(p, fast=False)
+    ]
+    check(
+        "approx_contains == fuzzy_contains",
+        not fuzzy_diff and not reason_diff,
+        f"{fuzzy_diff[:3]} {reason_diff[:3]}",
+    )
+
+    mem = sqlite3.connect(":memory:")
+    try:
+        init_db(mem)
+        mem.execute(
+            "INSERT INTO orders (sp_order_no, created_at, picked_up_at) VALUES ('1', '10.07.2024.', NULL)"
+        )
+        mem.execute(
+            "INSERT INTO bank_transactions (fitid, dtposted) VALUES ('f1', '2026-01-01T00:00:00')"
+        )
+        mem.execute("UPDATE orders SET picked_up_at = '2024-07-12 10:00:00' WHERE sp_order_no = '1'")
+        iso_row = mem.execute(
+            "SELECT o.created_at_iso, o.picked_up_at_iso, b.dtposted_iso "
+            "FROM orders o, bank_transactions b"
+        ).fetchone()
+        check(
+            "iso date columns",
+            iso_row == ("2024-07-10", "2024-07-12", "2026-01-01"),
+            f"row={iso_row}",
+        )
+        in_period = get_kpis(mem, None, "2024-07-01", "2024-07-31")["total_orders"]
+        check("iso date period filter", in_period == 1, f"orders={in_period}")
+    finally:
+        mem.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pay_cols = [COL[k] for k in ("sp_order_no", "client", "customer_code", "payment_customer_name",
+                                      "payment_amount", "payment_order_status", "payment_client_status")]
+        pay_sheets = [
+            pd.DataFrame(
+                [
+                    ["1", "K1", "C1", "Ana", 100.0, "Isporučeno", "Isplaćeno"],
+                    ["1", "K1", "C1", "Ana", 100.0, "Isporučeno", "Isplaćeno"],
+                    ["2", "K1", "C2", "Bojan", 50, "Isporučeno", "Isplaćeno"],
+                    ["3", "K1", "C3", "Cica", None, "Isporučeno", None],
+                    ["3", "K1", "C3", "Cica", None, "Isporučeno", None],
+                    ["", "K1", "", "", 10.0, "", ""],
+                    ["9", "K1", "C9", "Nema", 5.0, "Isporučeno", "Isplaćeno"],
+                ],
+                columns=pay_cols,
+            ),
+            pd.DataFrame(
+                [["2", "K1", "C2", "Bojan", 50.0, "Isporučeno", "Isplaćeno"],
+                 ["4", "K1", "C4", "Dara", 70.0, "Isporučeno", "Isplaćeno"]],
+                columns=pay_cols,
+            ),
+        ]
+        pay_files = []
+        for i in range(len(pay_sheets)):
+            pay_files.append(Path(tmp) / f"uplate{i}.xlsx")
+            pay_files[-1].write_bytes(f"uplate {i}".encode())
+        pay_snaps = []
+        for bulk in (False, True):
+            mem = sqlite3.connect(":memory:")
+            try:
+                init_db(mem)
+                mem.executemany(
+                    "INSERT INTO orders (sp_order_no, status) VALUES (?, ?)",
+                    [("1", "Poslato"), ("2", "POSLANO"), ("3", "Isporučeno"), ("4", "poslato")],
+                )
+                rejects = []
+                for path, sheet in zip(pay_files, pay_sheets):
+                    _import_sp_payments(
+                        mem,
+                        path,
+                        rejects,
+                        col=COL,
+                        sheet_payments=SHEET_SP_PAYMENTS,
+                        file_hash=file_hash,
+                        bulk=bulk,
+                        df=sheet,
+                    )
+                pay_snaps.append(
+                    (
+                        {
+                            name: mem.execute(f"SELECT * FROM {name} ORDER BY id").fetchall()
+                            for name in ("payments", "orders", "order_status_history")
+                        },
+                        rejects,
+                    )
+                )
+            finally:
+                mem.close()
+        delivered = [r for r in pay_snaps[1][0]["orders"] if "Isporučeno" in r]
+        check(
+            "sp_payments bulk == row import",
+            pay_snaps[0] == pay_snaps[1]
+            and len(pay_snaps[1][0]["payments"]) == 6
+            and len(pay_snaps[1][0]["order_status_history"]) == 3
+            and len(delivered) == 4
+            and [r["row_index"] for r in pay_snaps[1][1]] == [2, 1],
+            f"row={pay_snaps[0][1]} bulk={pay_snaps[1][1]}",
+        )
+
+    orders_files = sorted(p for p in Path("SP Narudzbe").glob("*Porud*.xlsx") if p.is_file())[:3]
+    if orders_files:
+        snapshots = []
+        for bulk in (False, True):
+            mem = sqlite3.connect(":memory:")
+            try:
+                mem.execute("PRAGMA foreign_keys = ON;")
+                init_db(mem)
+                rejects = []
+                for path in orders_files:
+                    _import_sp_orders(
+                        mem,
+                        path,
+                        rejects,
+                        col=COL,
+                        sheet_orders=SHEET_SP_ORDERS,
+                        file_hash=file_hash,
+                        compute_customer_key=compute_customer_key,
+                        set_app_state=set_app_state,
+                        bulk=bulk,
+                    )
+                tables = {
+                    name: mem.execute(f"SELECT * FROM {name} ORDER BY id").fetchall()
+                    for name in ("orders", "order_items", "order_status_history")
+                }
+                rates = mem.execute(
+                    "SELECT COUNT(*) FROM import_runs WHERE rows_per_sec IS NOT NULL"
+                ).fetchone()[0]
+                snapshots.append((tables, rejects, rates))
+                totals_issues = check_order_totals(mem)
+                check(
+                    f"order_totals consistent ({'bulk' if bulk else 'row'})",
+                    not totals_issues,
+                    f"issues={totals_issues[:3]}",
+                )
+                if bulk:
+
+                    def _rounded(rows):
+                        return sorted(
+                            tuple(round(v, 2) if isinstance(v, float) else v for v in row)
+                            for row in rows
+                        )
+
+                    def _kpi_revenue(materialized):
+                        return round(get_kpis(mem, materialized=materialized)["total_revenue"], 2)
+
+                    live_vs_mat = [
+                        _rounded(fn(mem, 100000, materialized=False))
+                        == _rounded(fn(mem, 100000, materialized=True))
+                        for fn in (get_top_customers, get_top_products, get_top_products_qty)
+                    ]
+                    live_vs_mat.append(_kpi_revenue(False) == _kpi_revenue(True))
+                    live_vs_mat.append(
+                        _rounded(get_finansije_monthly(mem, materialized=False))
+                        == _rounded(get_finansije_monthly(mem, materialized=True))
+                    )
+                    check("order_totals queries == live", all(live_vs_mat), f"{live_vs_mat}")
+                    _reset_source(mem, "sp_orders")
+                    left = mem.execute(
+                        "SELECT (SELECT COUNT(*) FROM order_totals) + (SELECT COUNT(*) FROM order_sku_totals)"
+                    ).fetchone()[0]
+                    check("order_totals reset", left == 0, f"rows={left}")
+            finally:
+                mem.close()
+        check(
+            "sp_orders bulk == row import",
+            snapshots[0][:2] == snapshots[1][:2],
+            f"items row={len(snapshots[0][0]['order_items'])} bulk={len(snapshots[1][0]['order_items'])}",
+        )
+        check("sp_orders rows_per_sec", snapshots[1][2] == len(orders_files), f"runs={snapshots[1][2]}")
+        mem = sqlite3.connect(":memory:")
+        try:
+            mem.execute("PRAGMA foreign_keys = ON;")
+            init_db(mem)
+            rejects = []
+            jobs = [("SP Narudzbe", import_sp_orders, p) for p in orders_files]
+            counts = run_import_jobs(
+                mem,
+                make_import_jobs(jobs + [jobs[0]]),
+                file_hash=file_hash,
+                rejects=rejects,
+                workers=2,
+            )
+            tables = {
+                name: mem.execute(f"SELECT * FROM {name} ORDER BY id").fetchall()
+                for name in ("orders", "order_items", "order_status_history")
+            }
+            parse_runs = mem.execute(
+                "SELECT COUNT(*) FROM import_runs WHERE parse_sec IS NOT NULL"
+            ).fetchone()[0]
+        finally:
+            mem.close()
+        check("sp_orders parse_sec", parse_runs == len(orders_files), f"runs={parse_runs}")
+        row_rejects = [r for r in rejects if r["reason"] != "file_already_imported"]
+        check(
+            "sp_orders parallel folder == sequential",
+            tables == snapshots[1][0]
+            and row_rejects == snapshots[1][1]
+            and counts == {"imported": len(orders_files), "skipped": 1, "failed": 0},
+            f"counts={counts}",
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            SHEET_CACHE = SheetCache(Path(tmp) / "sheet_cache.sqlite")
+            cached_runs = []
+            try:
+                for _ in range(2):
+                    mem = sqlite3.connect(":memory:")
+                    try:
+                        mem.execute("PRAGMA foreign_keys = ON;")
+                        init_db(mem)
+                        for path in orders_files:
+                            import_sp_orders(mem, path)
+                        cached_runs.append(
+                            {
+                                name: mem.execute(f"SELECT * FROM {name} ORDER BY id").fetchall()
+                                for name in ("orders", "order_items", "order_status_history")
+                            }
+                        )
+                    finally:
+                        mem.close()
+                hit = read_sheet(
+                    orders_files[0],
+                    SHEET_SP_ORDERS,
+                    columns=sheet_columns(COL, SP_ORDER_KEYS),
+                    cache=SHEET_CACHE,
+                )
+                stats = SHEET_CACHE.stats()
+            finally:
+                SHEET_CACHE = None
+        check(
+            "sheet cache import == parsed import",
+            cached_runs[0] == snapshots[1][0]
+            and cached_runs[1] == snapshots[1][0]
+            and hit.attrs.get("xlsx_engine") == "cache"
+            and stats["entries"] == len(orders_files),
+            f"stats={stats}",
+        )
+    else:
+        check("sp_orders import (skipped)", True, "no xlsx in SP Narudzbe/")
+
+    xlsx_samples = [
+        (p, sheet, cols)
+        for folder, sheet, cols in (
+            ("SP Narudzbe", SHEET_SP_ORDERS, sheet_columns(COL, SP_ORDER_KEYS)),
+            ("SP Uplate", SHEET_SP_PAYMENTS, sheet_columns(COL, SP_PAYMENT_KEYS)),
+            ("SP Preuzimanja", SHEET_SP_ORDERS, sheet_columns(COL, SP_RETURN_KEYS)),
+            ("Sp Prijemi", 0, prijem_column),
+        )
+        for p in sorted(Path(folder).rglob("*.xlsx"))[:2]
+    ]
+    if xlsx_samples:
+        xlsx_diffs = []
+        for path, sheet, cols in xlsx_samples:
+            full = pd.read_excel(path, sheet_name=sheet, engine="openpyxl")
+            picked = full[[c for c in full.columns if (cols(c) if callable(cols) else c in cols)]]
+            for expected, got in (
+                (full, read_sheet(path, sheet, engine="stream")),
+                (picked, read_sheet(path, sheet, columns=cols, engine="stream")),
+            ):
+                same = (
+                    list(expected.columns) == list(got.columns)
+                    and expected.dtypes.equals(got.dtypes)
+                    and expected.equals(got)
+                    and got.attrs.get("xlsx_engine") == "stream"
+                )
+                if not same:
+                    xlsx_diffs.append(path.name)
+        # Every sheet of every kind of export, not only the imported tables.
+        every_sheet = [
+            p
+            for folder in ("SP Narudzbe", "SP Uplate", "SP Preuzimanja", "Sp Prijemi", "Minimax", "exports")
+            for p in sorted(Path(folder).rglob("*.xlsx"))[:2]
+            if not p.name.startswith("~$")
+        ]
+        for path in every_sheet:
+            for sheet in sheet_names(path):
+                expected = pd.read_excel(path, sheet_name=sheet, engine="openpyxl")
+                got = read_sheet(path, sheet, engine="stream")
+                if not (
+                    list(expected.columns) == list(got.columns)
+                    and expected.dtypes.equals(got.dtypes)
+                    and expected.equals(got)
+                    and got.attrs.get("xlsx_engine") == "stream"
+                ):
+                    xlsx_diffs.append(f"{path.name}[{sheet}]")
+        check("xlsx stream reader == read_excel", not xlsx_diffs, f"diffs={xlsx_diffs[:3]}")
+        check(
+            "xlsx auto engine: calamine or openpyxl",
+            resolve_engine("auto") in ("calamine", "openpyxl")
+            and read_sheet(xlsx_samples[0][0], xlsx_samples[0][1], engine="auto").attrs.get("xlsx_engine")
+            == resolve_engine("auto"),
+            f"auto={resolve_engine('auto')}",
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            frame = read_sheet(xlsx_samples[0][0], xlsx_samples[0][1], columns=xlsx_samples[0][2])
+            probe = SheetCache(Path(tmp) / "probe.sqlite")
+            probe.put("k", frame, file_hash="h", source_name="f", sheet=0)
+            size = probe.entries()[0]["size_bytes"]
+            # Room for two entries: the least recently used one is dropped for the third.
+            small = SheetCache(Path(tmp) / "small.sqlite", max_bytes=2 * size)
+            small.put("k0", frame, file_hash="h0", source_name="f0", sheet=0)
+            small.put("k1", frame, file_hash="h1", source_name="f1", sheet=0)
+            reloaded = small.get("k0")
+            small.put("k2", frame, file_hash="h2", source_name="f2", sheet=0)
+            kept = sorted(e["key"] for e in small.entries())
+            cleared = small.prune(clear=True)
+            check(
+                "sheet cache LRU eviction",
+                kept == ["k0", "k2"]
+                and reloaded is not None
+                and reloaded.equals(frame)
+                and small.entries() == []
+                and cleared["removed"] == 2,
+                f"kept={kept} cleared={cleared}",
+            )
+    else:
+        check("xlsx stream reader (skipped)", True, "no xlsx samples")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        watch_dir = Path(tmp) / "in"
+        watch_dir.mkdir()
+        now = [1000.0]
+        applied: list[str] = []
+
+        locked_once = [True]
+
+        def fake_batch(conn, jobs, on_done):
+            for idx, (title, _fn, path) in enumerate(jobs, start=1):
+                applied.append(path.name)
+                if path.name.startswith("stuck") or (path.name.startswith("locked") and locked_once[0]):
+                    locked_once[0] = locked_once[0] and not path.name.startswith("locked")
+                    on_done(idx, None, "failed", sqlite3.OperationalError("database is locked"))
+                    continue
+                if path.name.startswith("integrity"):
+                    on_done(idx, None, "failed", sqlite3.IntegrityError("UNIQUE constraint failed"))
+                    continue
+                on_done(idx, None, "failed" if path.name.startswith("bad") else "imported", None)
+
+        watch_db = Path(tmp) / "watch.db"
+        watcher = FolderWatcher(
+            lambda: sqlite3.connect(watch_db),
+            [WatchSource("T", watch_dir, "*.xlsx", import_sp_orders)],
+            fake_batch,
+            settle_seconds=3.0,
+            max_retries=1,
+            clock=lambda: now[0],
+        )
+        (watch_dir / "a.xlsx").write_bytes(b"a")
+        (watch_dir / "bad.xlsx").write_bytes(b"b")
+        (watch_dir / "locked.xlsx").write_bytes(b"l")
+        (watch_dir / "stuck.xlsx").write_bytes(b"s")
+        (watch_dir / "integrity.xlsx").write_bytes(b"i")
+        (watch_dir / "~$a.xlsx").write_bytes(b"lock")
+        first = watcher.poll()
+        now[0] += 1
+        early = watcher.poll()
+        now[0] += 3
+        settled = watcher.poll()
+        now[0] += 5
+        retried = watcher.poll()
+        now[0] += 5
+        again = watcher.poll()
+        (watch_dir / "a.xlsx").write_bytes(b"a2")
+        os.utime(watch_dir / "a.xlsx", ns=(5_000_000_000, 5_000_000_000))
+        now[0] += 1
+        changed_first = watcher.poll()
+        now[0] += 3
+        changed = watcher.poll()
+        check(
+            "folder watch imports settled delta only",
+            first["imported"] == 0
+            and first["pending"] == 5
+            and early["imported"] == 0
+            and settled["imported"] == 1
+            and settled["failed"] == 2
+            and settled["retry"] == 2
+            and retried["imported"] == 1
+            and retried["failed"] == 1
+            and retried["retry"] == 0
+            and again == {"imported": 0, "skipped": 0, "failed": 0, "retry": 0, "pending": 0}
+            and changed_first["imported"] == 0
+            and changed["imported"] == 1
+            and applied
+            == ["a.xlsx", "bad.xlsx", "integrity.xlsx", "locked.xlsx", "stuck.xlsx", "locked.xlsx", "stuck.xlsx", "a.xlsx"],
+            f"applied={applied} settled={settled} retried={retried} again={again} changed={changed}",
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        crafted = Path(tmp) / "crafted.xml"
+        bank_files = sorted(p for p in Path("Banka XML").glob("*.xml") if p.is_file())[:2]
+        first_fitid = ""
+        if bank_files:
+            first_row = next(iter_bank_xml_rows(bank_files[0], to_float), None)
+            first_fitid = first_row[0] if first_row else ""
+
+        def _trn(fitid: str, amount: str) -> str:
+            return (
+                f"<stmttrn><fitid>{fitid}</fitid><benefit>credit</benefit>"
+                f"<dtposted>2025-03-0{len(fitid) % 9 + 1}T00:00:00</dtposted><trnamt>{amount}</trnamt>"
+                "<payeeinfo><name>SLANJE PAKETA</name><city>BG</city></payeeinfo>"
+                "<purpose>test</purpose><fee>1,5</fee></stmttrn>"
+            )
+
+        crafted.write_text(
+            "<stmtrslist><stmtrs><stmtnumber>7</stmtnumber><trnlist>"
+            + _trn("C1", "100.5")
+            + _trn("C1", "100.5")
+            + (_trn(first_fitid, "1") if first_fitid else "")
+            + "</trnlist></stmtrs>"
+            + "<stmtrs><trnlist>" + _trn("C2", "3") + "</trnlist><stmtnumber>8</stmtnumber></stmtrs>"
+            + "</stmtrslist>",
+            encoding="utf-8",
+        )
+        bank_xml_snapshots = []
+        for streaming in (False, True):
+            mem = sqlite3.connect(":memory:")
+            try:
+                init_db(mem)
+                rejects = []
+                for path in [*bank_files, crafted]:
+                    _import_bank_xml(
+                        mem, path, rejects, file_hash=file_hash, to_float=to_float, streaming=streaming
+                    )
+                bank_xml_snapshots.append(
+                    (
+                        mem.execute("SELECT * FROM bank_transactions ORDER BY id").fetchall(),
+                        mem.execute("SELECT id, filename, row_count FROM import_runs ORDER BY id").fetchall(),
+                        rejects,
+                    )
+                )
+            finally:
+                mem.close()
+        check(
+            "bank xml streaming == tree",
+            bank_xml_snapshots[0] == bank_xml_snapshots[1]
+            and len(bank_xml_snapshots[1][2]) == (2 if first_fitid else 1),
+            f"rows={len(bank_xml_snapshots[0][0])}/{len(bank_xml_snapshots[1][0])} "
+            f"rejects={len(bank_xml_snapshots[0][2])}/{len(bank_xml_snapshots[1][2])}",
+        )
+
+    bank_snapshots = []
+    for indexed in (False, True):
+        rng = random.Random(7)
+        mem = sqlite3.connect(":memory:")
+        try:
+            init_db(mem)
+            prices = [3990, 3990.5, 4490, 4491.5, 5990, 5988]
+            for i in range(150):
+                day = date(2025, 1, 1) + timedelta(days=rng.randint(0, 60))
+                picked = rng.choice([day.strftime("%d.%m.%Y"), day.isoformat(), None])
+                mem.execute(
+                    "INSERT INTO orders (sp_order_no, picked_up_at) VALUES (?, ?)",
+                    (str(i), picked),
+                )
+                mem.execute(
+                    "INSERT INTO payments (sp_order_no, amount, client_status) VALUES (?, ?, ?)",
+                    (str(i), rng.choice(prices), str(i)),
+                )
+            for j in range(60):
+                day = date(2025, 1, 1) + timedelta(days=rng.randint(0, 60))
+                mem.execute(
+                    "INSERT INTO bank_transactions (fitid, benefit, dtposted, amount, payee_name) "
+                    "VALUES (?, 'credit', ?, ?, 'SLANJE PAKETA DOO')",
+                    (f"t{j}", day.strftime("%Y%m%d"), rng.choice(prices) + rng.choice([0, 0.005, 1.5, 3])),
+                )
+            match_bank_sp_payments(mem, 2, indexed=indexed)
+            bank_snapshots.append(
+                mem.execute(
+                    "SELECT bank_txn_id, match_type, ref_id, score, method "
+                    "FROM bank_matches ORDER BY bank_txn_id"
+                ).fetchall()
+            )
+        finally:
+            mem.close()
+    check(
+        "bank sp_payment indexed == scan",
+        bank_snapshots[0] == bank_snapshots[1] and len(bank_snapshots[0]) > 0,
+        f"matches scan={len(bank_snapshots[0])} indexed={len(bank_snapshots[1])}",
+    )
+
     events_csv = Path("Kalkulacije_kartice_art") / "izlaz" / "kartice_events.csv"
     if events_csv.exists():
         mem = None
@@ -8268,9 +10079,169 @@ def run_smoke_tests() -> int:
                     mem.close()
             except Exception:
                 pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # Repeated keys (later values win), empty SKU / Referenca, non-numeric amounts.
+            crafted_csv = Path(tmp) / "kartice_events_dupes.csv"
+            header = pd.read_csv(events_csv, nrows=0).columns.tolist()
+            crafted = pd.DataFrame(
+                [
+                    {"SKU": "A1", "Datum": "2025-01-02", "Broj": 7, "Tip": "IS", "Smer": "izlaz",
+                     "Referenca": "SP-1", "Izdavanje kolicina": 1, "Artikal": "prvi"},
+                    {"SKU": "A1", "Datum": "2025-01-02", "Broj": 7, "Tip": "IS", "Smer": "izlaz",
+                     "Referenca": "SP-1", "Izdavanje kolicina": 2, "Artikal": "drugi"},
+                    {"SKU": "", "Datum": "2025-01-03", "Cena": 3},
+                    {"SKU": "B2", "Datum": "2025-01-04", "Tip": "PS", "Cena": "1,5"},
+                ],
+                columns=header,
+            )
+            crafted.to_csv(crafted_csv, index=False)
+            event_snaps = []
+            for bulk in (False, True):
+                mem = sqlite3.connect(":memory:")
+                try:
+                    init_db(mem)
+                    rejects = []
+                    for csv_path in (events_csv, crafted_csv):
+                        _import_kartice_events_csv(mem, csv_path, rejects, file_hash=file_hash, bulk=bulk)
+                    event_snaps.append(
+                        (mem.execute("SELECT * FROM kartice_events ORDER BY id").fetchall(), rejects)
+                    )
+                finally:
+                    mem.close()
+            dupes = [r for r in event_snaps[1][0] if r[2] == "A1" and r[4] == "2025-01-02"]
+            check(
+                "kartice_events bulk == row import",
+                event_snaps[0] == event_snaps[1]
+                and len(dupes) == 1
+                and dupes[0][3] == "drugi",
+                f"rows row={len(event_snaps[0][0])} bulk={len(event_snaps[1][0])}",
+            )
     else:
         check("kartice_events import (skipped)", True, "no kartice_events.csv")
 
+    metrics_pdf = APP_DIR / "Kartice artikala" / "Kartica_20260123_075134.pdf"
+    if metrics_pdf.exists() and prijemi_files:
+        metric_names = ("sku_daily_metrics.csv", "sku_controls_audit.csv", "sku_promo_periods.csv")
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_p = Path(tmp)
+            (tmp_p / "pdf").mkdir()
+            shutil.copy2(metrics_pdf, tmp_p / "pdf" / metrics_pdf.name)
+            sp_db = tmp_p / "sp.db"
+            conn = sqlite3.connect(sp_db)
+            try:
+                init_db(conn)
+                for path in sorted((APP_DIR / "SP Narudzbe").glob("*Porud*.xlsx")):
+                    import_sp_orders(conn, path)
+            finally:
+                conn.close()
+            metric_outputs = {}
+            for in_process in (True, False):
+                out = tmp_p / f"out_{int(in_process)}"
+                run_regenerate_sku_metrics_process(
+                    str(tmp_p / "pdf"),
+                    str(prijemi_root),
+                    str(out),
+                    str(sp_db),
+                    str(tmp_p / f"progress_{int(in_process)}.db"),
+                    in_process=in_process,
+                    incremental=False,
+                )
+                metric_outputs[in_process] = {
+                    name: (out / name).read_bytes() if (out / name).exists() else None
+                    for name in metric_names
+                }
+        check(
+            "sku metrics in_process == subprocess",
+            metric_outputs[True] == metric_outputs[False]
+            and metric_outputs[True]["sku_daily_metrics.csv"] is not None,
+            str({
+                name: (metric_outputs[True][name] == metric_outputs[False][name])
+                for name in metric_names
+            }),
+        )
+    else:
+        check("sku metrics in_process (skipped)", True, "no sample PDF / Sp Prijemi")
+
+    import extract_kalkulacije_kartice as kartice_extract
+
+    if kartice_extract.pdfplumber is not None:
+        from types import SimpleNamespace
+
+        from pdfminer.psparser import LIT
+
+        def _fake_page(cmap: bytes):
+            stream = SimpleNamespace(get_data=lambda: b"BT /F1 9 Tf <0001> Tj ET")
+            font = {
+                "Subtype": LIT("Type0"),
+                "BaseFont": LIT("AAAAAA+SegoeUI"),
+                "Encoding": LIT("Identity-H"),
+                "ToUnicode": SimpleNamespace(get_data=lambda: cmap),
+            }
+            return SimpleNamespace(page_obj=SimpleNamespace(contents=[stream], resources={"Font": {"F1": font}}))
+
+        fp_a = kartice_extract._page_fingerprint(_fake_page(b"<0001> <0041>"))
+        fp_a2 = kartice_extract._page_fingerprint(_fake_page(b"<0001> <0041>"))
+        fp_b = kartice_extract._page_fingerprint(_fake_page(b"<0001> <0042>"))
+        check(
+            "page cache fingerprint follows ToUnicode",
+            fp_a == fp_a2 and fp_a != fp_b,
+            f"a={fp_a} b={fp_b}",
+        )
+
+    if events_csv.exists():
+        import build_sku_daily_metrics as sku_metrics
+
+        events_df = sku_metrics.load_kartice_events(events_csv)
+        daily_loop = sku_metrics.build_daily_from_kartice(events_df, engine="loop")
+        daily_columnar = sku_metrics.build_daily_from_kartice(events_df, engine="columnar")
+        check(
+            "daily metrics columnar == loop",
+            daily_loop.reset_index(drop=True).equals(daily_columnar.reset_index(drop=True)),
+            f"rows loop={len(daily_loop)} columnar={len(daily_columnar)}",
+        )
+        if not daily_loop.empty:
+            cfg = sku_metrics.Config()
+            base_loop, audit_loop = sku_metrics.apply_control_group_baseline(daily_loop, cfg, engine="loop")
+            base_matrix, audit_matrix = sku_metrics.apply_control_group_baseline(daily_loop, cfg, engine="matrix")
+            check(
+                "control baseline matrix == loop",
+                base_loop.equals(base_matrix) and audit_loop.equals(audit_matrix),
+                f"audit rows loop={len(audit_loop)} matrix={len(audit_matrix)}",
+            )
+
+            raw_events = pd.read_csv(events_csv, dtype=str)
+            last_day = str(raw_events["Datum"].max())
+            cut_day = (datetime.strptime(last_day, "%Y-%m-%d") - timedelta(days=10)).strftime("%Y-%m-%d")
+            no_receipts = pd.DataFrame()
+            with tempfile.TemporaryDirectory() as tmp:
+                tmp_p = Path(tmp)
+                no_db = tmp_p / "none.db"
+                sku_metrics.build_sku_metrics(
+                    sku_metrics.prepare_kartice_events(raw_events.loc[raw_events["Datum"] < cut_day]),
+                    no_receipts,
+                    no_db,
+                    tmp_p / "prev",
+                )
+                sku_metrics.build_sku_metrics(events_df, no_receipts, no_db, tmp_p / "full")
+                inc_stats: dict = {}
+                sku_metrics.build_sku_metrics(
+                    events_df, no_receipts, no_db, tmp_p / "inc", incremental_from=tmp_p / "prev", stats=inc_stats
+                )
+                same = all(
+                    (tmp_p / "full" / name).exists() == (tmp_p / "inc" / name).exists()
+                    and (
+                        not (tmp_p / "full" / name).exists()
+                        or (tmp_p / "full" / name).read_bytes() == (tmp_p / "inc" / name).read_bytes()
+                    )
+                    for name in ("sku_daily_metrics.csv", "sku_controls_audit.csv", "sku_promo_periods.csv")
+                )
+                check(
+                    "sku metrics incremental == full rebuild",
+                    same and inc_stats.get("mode") == "incremental",
+                    f"stats={inc_stats}",
+                )
+
     print(f"Tests finished. Failures: {failures}")
     return failures
 
@@ -8282,19 +10253,24 @@ def main() -> None:
 
     sub.add_parser("init-db")
 
+    workers_help = "Folder: broj procesa za citanje xlsx (0 = auto, 1 = bez paralelizma)"
     sp_orders = sub.add_parser("import-sp-orders")
-    sp_orders.add_argument("path", type=Path)
+    sp_orders.add_argument("path", type=Path, help="Fajl ili folder (*.xlsx)")
+    sp_orders.add_argument("--workers", type=int, default=0, help=workers_help)
 
     sp_payments = sub.add_parser("import-sp-payments")
-    sp_payments.add_argument("path", type=Path)
+    sp_payments.add_argument("path", type=Path, help="Fajl ili folder (*.xlsx)")
+    sp_payments.add_argument("--workers", type=int, default=0, help=workers_help)
 
     sp_returns = sub.add_parser("import-sp-returns")
-    sp_returns.add_argument("path", type=Path)
+    sp_returns.add_argument("path", type=Path, help="Fajl ili folder (*.xlsx)")
+    sp_returns.add_argument("--workers", type=int, default=0, help=workers_help)
 
     sp_prijemi = sub.add_parser("import-sp-prijemi")
     sp_prijemi.add_argument(
         "path", type=Path, help="Fajl ili folder sa SP Prijemi (*.xlsx)"
     )
+    sp_prijemi.add_argument("--workers", type=int, default=0, help=workers_help)
 
     kartice = sub.add_parser("import-kartice-events")
     kartice.add_argument(
@@ -8310,7 +10286,7 @@ def main() -> None:
     minimax_items.add_argument("path", type=Path)
 
     bank = sub.add_parser("import-bank-xml")
-    bank.add_argument("path", type=Path)
+    bank.add_argument("path", type=Path, help="Izvod (.xml) ili folder sa izvodima")
 
     bank_match = sub.add_parser("match-bank")
     bank_match.add_argument("--day-tolerance", type=int, default=2)
@@ -8324,6 +10300,88 @@ def main() -> None:
         help="Koji izvor obrisati iz baze (bez brisanja DB fajla)",
     )
 
+    order_totals = sub.add_parser("check-order-totals")
+    order_totals.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Nakon provjere ponovo izracunaj order_totals iz order_items",
+    )
+    order_totals.add_argument("--limit", type=int, default=20)
+
+    stress = sub.add_parser(
+        "stress-db",
+        help="Import SP Narudzbe uz paralelne dashboard upite; ispisuje latenciju citanja",
+    )
+    stress.add_argument("--folder", type=Path, default=APP_DIR / "SP Narudzbe")
+    stress.add_argument("--files", type=int, default=10)
+    stress.add_argument("--readers", type=int, default=2)
+    stress.add_argument("--mode", choices=["both", "wal", "rollback"], default="both")
+
+    bench_match = sub.add_parser(
+        "bench-match",
+        help="match_minimax na sintetickim podacima: scan vs indeks, brzina i poredjenje rezultata",
+    )
+    bench_match.add_argument("--orders", type=int, default=5000)
+    bench_match.add_argument("--seed", type=int, default=7)
+
+    bench_refunds = sub.add_parser(
+        "bench-refund-reasons",
+        help="classify_refund_reason na sintetickim svrhama placanja: fuzzy_contains vs approx_contains",
+    )
+    bench_refunds.add_argument("--count", type=int, default=300)
+    bench_refunds.add_argument("--seed", type=int, default=11)
+
+    tracking = sub.add_parser(
+        "refresh-tracking",
+        help="Osvjezi pracenje posiljki za nepreuzete (paralelno, uz limit zahtjeva po kuriru)",
+    )
+    tracking.add_argument("--concurrency", type=int, default=4, help="0 = stari sekvencijalni nacin")
+    tracking.add_argument("--rate-per-min", type=float, default=20.0)
+    tracking.add_argument("--force", action="store_true")
+    tracking.add_argument(
+        "--record", type=Path, default=None, help="Snimi odgovore kurira (<kod>.json) za bench-tracking"
+    )
+
+    bench_tracking = sub.add_parser(
+        "bench-tracking",
+        help="Pracenje posiljki protiv lokalnog mock servera: brzina, konekcije, postovanje limita",
+    )
+    bench_tracking.add_argument("--codes", type=int, default=60)
+    bench_tracking.add_argument("--concurrency", type=int, default=4)
+    bench_tracking.add_argument("--rate-per-min", type=float, default=120.0)
+    bench_tracking.add_argument("--burst", type=int, default=2)
+    bench_tracking.add_argument("--latency", type=float, default=0.05, help="Kasnjenje servera (s)")
+    bench_tracking.add_argument("--pages", type=Path, default=None, help="Folder sa snimljenim odgovorima")
+
+    bench = sub.add_parser(
+        "bench",
+        help="Sinteticki podaci: vremena importa, uparivanja, metrika i dashboard upita (JSON za poredjenje)",
+    )
+    bench.add_argument("--scale", type=float, default=1.0, help="1.0 = 2000 narudzbi")
+    bench.add_argument("--seed", type=int, default=19)
+    bench.add_argument("--out", type=Path, default=None, help="JSON rezultat (podrazumijevano exports/bench/)")
+    bench.add_argument("--compare", type=Path, default=None, help="Prethodni JSON rezultat za poredjenje")
+    bench.add_argument("--tolerance", type=float, default=0.10, help="Razlika koja se ne broji (0.10 = 10%%)")
+    bench.add_argument("--repeat", type=int, default=5, help="Ponavljanja dashboard upita")
+    bench.add_argument("--work-dir", type=Path, default=None, help="Zadrzi ulazne fajlove i bazu u ovom folderu")
+
+    sheet_cache = sub.add_parser(
+        "sheet-cache", help="Kes parsiranih xlsx tabela: pregled i ciscenje"
+    )
+    sheet_cache.add_argument("--prune", action="store_true", help="Smanji kes na zadatu velicinu")
+    sheet_cache.add_argument("--max-mb", type=float, default=None, help="Ciljna velicina (podrazumijevano sheet_cache_mb)")
+    sheet_cache.add_argument("--older-than-days", type=float, default=None, help="Obrisi unose nekoristene N dana")
+    sheet_cache.add_argument("--clear", action="store_true", help="Obrisi sve")
+    sheet_cache.add_argument("--limit", type=int, default=20, help="Koliko posljednjih unosa ispisati")
+
+    watch = sub.add_parser(
+        "watch", help="Prati default foldere i uvozi samo nove/izmijenjene fajlove"
+    )
+    watch.add_argument("--interval", type=float, default=5.0, help="Sekundi izmedju provjera")
+    watch.add_argument("--settle", type=float, default=3.0, help="Fajl mora biti nepromijenjen N sekundi")
+    watch.add_argument("--once", action="store_true", help="Jedna provjera pa kraj")
+    watch.add_argument("--workers", type=int, default=0, help="Procesi za parsiranje (0 = CPU-1)")
+
     match = sub.add_parser("match-minimax")
     match.add_argument("--auto-threshold", type=int, default=70)
     match.add_argument("--review-threshold", type=int, default=50)
@@ -8422,6 +10480,11 @@ def main() -> None:
 
     ui = sub.add_parser("ui")
     ui.add_argument("--db", type=Path, default=DB_PATH)
+    ui.add_argument(
+        "--startup-report",
+        action="store_true",
+        help="Ispisi vremena pokretanja (upisuju se i u exports/startup-timing.jsonl)",
+    )
 
     sub.add_parser("tests")
 
@@ -8451,13 +10514,13 @@ def main() -> None:
         run_smoke_tests()
         return
     if args.cmd == "import-sp-orders":
-        import_sp_orders(conn, args.path)
+        import_path_cli(conn, import_sp_orders, "SP-Narudzbe", args.path, args.workers)
     elif args.cmd == "import-sp-payments":
-        import_sp_payments(conn, args.path)
+        import_path_cli(conn, import_sp_payments, "SP-Uplate", args.path, args.workers)
     elif args.cmd == "import-sp-returns":
-        import_sp_returns(conn, args.path)
+        import_path_cli(conn, import_sp_returns, "SP-Preuzimanja", args.path, args.workers)
     elif args.cmd == "import-sp-prijemi":
-        import_sp_prijemi(conn, args.path)
+        import_path_cli(conn, import_sp_prijemi, "SP-Prijemi", args.path, args.workers)
     elif args.cmd == "import-kartice-events":
         import_kartice_events(conn, args.path)
     elif args.cmd == "import-minimax":
@@ -8465,7 +10528,18 @@ def main() -> None:
     elif args.cmd == "import-minimax-items":
         import_minimax_items(conn, args.path)
     elif args.cmd == "import-bank-xml":
-        import_bank_xml(conn, args.path)
+        if args.path.is_dir():
+            summary = import_bank_xml_folder(conn, args.path)
+            for entry in summary:
+                print(
+                    f"{entry['file']}: {entry['status']} | redova {entry['rows']}, "
+                    f"novih {entry['inserted']}, duplikata {entry['duplicates']} "
+                    f"({entry['seconds']:.2f}s)" + (f" greska: {entry['error']}" if entry["error"] else "")
+                )
+            done = sum(1 for e in summary if e["status"] == "imported")
+            print(f"Banka XML: {done}/{len(summary)} fajlova uvezeno")
+        else:
+            import_bank_xml(conn, args.path)
     elif args.cmd == "match-bank":
         match_bank_sp_payments(conn, args.day_tolerance)
         match_bank_refunds(conn)
@@ -8474,6 +10548,109 @@ def main() -> None:
     elif args.cmd == "reset-source":
         deleted = _reset_source(conn, args.source)
         print(f"Reset zavrsen ({args.source}). Obrisano import runova: {deleted}")
+    elif args.cmd == "check-order-totals":
+        issues = check_order_totals(conn)
+        for table, order_id, sku, detail in issues[: args.limit]:
+            print(f"{table} order_id={order_id} sku={sku or '-'}: {detail}")
+        print(f"order_totals provjera: {len(issues)} odstupanja")
+        if args.rebuild:
+            refreshed = refresh_order_totals(conn)
+            conn.commit()
+            print(f"order_totals ponovo izracunat: {refreshed} narudzbi")
+    elif args.cmd == "stress-db":
+        files = sorted(args.folder.glob("*.xlsx"))[: max(1, args.files)]
+        if not files:
+            print(f"Nema xlsx fajlova u {args.folder}")
+        modes = [True, False] if args.mode == "both" else [args.mode == "wal"]
+        for wal in modes:
+            print(format_stress_report(_run_db_stress_once(files, wal=wal, readers=args.readers)))
+    elif args.cmd == "bench-match":
+        stats = _run_match_bench(max(1, args.orders), seed=args.seed)
+        print(f"Narudzbe: {stats['orders']}, racuni: {stats['invoices']}, match-eva: {stats['matches']}")
+        for label in ("scan", "indexed"):
+            print(
+                f"{label:<8} {stats[f'{label}_seconds']:.2f}s "
+                f"({stats[f'{label}_orders_per_s']:.0f} narudzbi/s)"
+            )
+        print("Rezultati isti: " + ("DA" if stats["identical"] else "NE"))
+    elif args.cmd == "bench-refund-reasons":
+        purposes = synthetic_bank_purposes(max(1, args.count), seed=args.seed)
+        results = {}
+        for fast in (False, True):
+            started = time.perf_counter()
+            results[fast] = [classify_refund_reason(p, fast=fast) for p in purposes]
+            elapsed = time.perf_counter() - started
+            label = "approx" if fast else "fuzzy"
+            print(f"{label:<7} {elapsed:.2f}s ({len(purposes) / elapsed if elapsed else 0:.0f} svrha/s)")
+        found = sum(1 for r in results[True] if r)
+        print(f"Svrha: {len(purposes)}, prepoznat razlog: {found}")
+        print("Rezultati isti: " + ("DA" if results[False] == results[True] else "NE"))
+    elif args.cmd == "refresh-tracking":
+        if args.record is not None and args.concurrency > 0:
+            rows = get_unpicked_rows(conn)
+            codes = sorted({str(r[9]).strip() for r in rows if len(r) > 9 and r[9]})
+            saved = refresh_tracking_codes(
+                conn,
+                codes,
+                concurrency=args.concurrency,
+                rate_per_min=args.rate_per_min,
+                force_refresh=args.force,
+                record_dir=args.record,
+            )
+        else:
+            saved = update_unpicked_tracking(
+                conn,
+                force_refresh=args.force,
+                concurrency=args.concurrency,
+                rate_per_min=args.rate_per_min,
+            )
+        print(f"Pracenje osvjezeno: {saved} posiljki")
+    elif args.cmd == "bench-tracking":
+        stats = _run_tracking_bench(
+            max(1, args.codes),
+            concurrency=args.concurrency,
+            rate_per_min=args.rate_per_min,
+            burst=args.burst,
+            latency=args.latency,
+            record_dir=args.pages,
+        )
+        print(
+            f"Kodova: {stats['codes']}, sacuvano: {stats['saved']}, "
+            f"za {stats['seconds']:.1f}s ({stats['per_min']:.0f}/min)"
+        )
+        print(f"TCP konekcija: {stats['server_connections']} (workera: {args.concurrency})")
+        for carrier, bad in stats["violations"].items():
+            print(f"  {carrier:<13} prekoracenja limita {args.rate_per_min:.0f}/min: {bad}")
+    elif args.cmd == "bench":
+        baseline = None
+        if args.compare is not None:
+            baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        result = _run_bench(
+            max(0.01, args.scale), seed=args.seed, work_dir=args.work_dir, dashboard_repeat=args.repeat
+        )
+        out = args.out or APP_DIR / "exports" / "bench" / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(format_bench_report(result))
+        if baseline is not None:
+            print(format_bench_report(result, baseline, tolerance=args.tolerance))
+        print(f"Rezultat: {out}")
+    elif args.cmd == "sheet-cache":
+        sheet_cache_cli(
+            prune=args.prune,
+            max_mb=args.max_mb,
+            older_than_days=args.older_than_days,
+            clear=args.clear,
+            limit=args.limit,
+        )
+    elif args.cmd == "watch":
+        watch_cli(
+            args.db,
+            interval=max(0.5, args.interval),
+            settle=max(0.0, args.settle),
+            once=args.once,
+            workers=args.workers,
+        )
     elif args.cmd == "match-minimax":
         match_minimax(conn, args.auto_threshold, args.review_threshold)
     elif args.cmd == "list-review":
@@ -8621,7 +10798,7 @@ def main() -> None:
     elif args.cmd == "import-confirm":
         apply_review_decisions(conn, args.path)
     elif args.cmd == "ui":
-        run_ui(args.db)
+        run_ui(args.db, startup_report=args.startup_report)
     elif args.cmd == "category":
         if args.action == "add-prefix":
             add_category_prefix(args.prefix, args.name)
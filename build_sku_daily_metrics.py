@@ -7,8 +7,11 @@ from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
+from srb_modules.sku_metrics_store import write_sku_daily_cache
+
 
 @dataclass(frozen=True)
 class Config:
@@ -22,6 +25,8 @@ class Config:
     promo_min_consecutive_days: int = 2
     control_min_corr: float = 0.1
     control_min_control_avg: float = 0.05
+    # Matrix control engine scores candidates in blocks of this many SKUs (memory cap).
+    control_block_skus: int = 2000
 
 
 def _to_datetime_series(values: pd.Series) -> pd.Series:
@@ -44,9 +49,13 @@ def _date_range(start: date, end: date) -> list[date]:
 
 
 def load_kartice_events(events_csv: Path) -> pd.DataFrame:
-    df = pd.read_csv(events_csv, encoding="utf-8")
+    return prepare_kartice_events(pd.read_csv(events_csv, encoding="utf-8"))
+
+
+def prepare_kartice_events(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
+    df = df.copy()
     df["SKU"] = df["SKU"].astype(str).str.strip()
     df = df.loc[df["SKU"].astype(str).str.len() > 0]
     if "Broj" in df.columns:
@@ -77,9 +86,16 @@ def load_kartice_events(events_csv: Path) -> pd.DataFrame:
     return df
 
 
-def build_daily_from_kartice(events: pd.DataFrame) -> pd.DataFrame:
+DAILY_ENGINES = ("loop", "columnar")
+
+
+def build_daily_from_kartice(events: pd.DataFrame, engine: str = "loop") -> pd.DataFrame:
     if events.empty:
         return pd.DataFrame()
+    if engine == "columnar":
+        return _build_daily_from_kartice_columnar(events)
+    if engine != "loop":
+        raise ValueError(f"Unknown daily engine: {engine}")
 
     rows = []
     for sku, group in events.groupby("SKU"):
@@ -149,12 +165,79 @@ def build_daily_from_kartice(events: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
+def _build_daily_from_kartice_columnar(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Same output as the per-SKU loop, computed for all SKUs at once on a full SKU x date grid.
+    """
+    ev = events.sort_values(["SKU", "Datum", "Broj"])
+    ev = ev.assign(_day=pd.to_datetime(ev["Datum"]).values.astype("datetime64[D]"))
+    keys = ["SKU", "_day"]
+
+    # Grid: every calendar day between first and last event of each SKU.
+    bounds = ev.groupby("SKU")["_day"].agg(["min", "max"])
+    n_days = ((bounds["max"] - bounds["min"]).dt.days + 1).to_numpy()
+    grid_sku = np.repeat(bounds.index.to_numpy(), n_days)
+    first_pos = np.repeat(np.cumsum(n_days) - n_days, n_days)
+    offsets = (np.arange(int(n_days.sum())) - first_pos).astype("timedelta64[D]")
+    grid_day = np.repeat(bounds["min"].to_numpy().astype("datetime64[D]"), n_days) + offsets
+    grid = pd.MultiIndex.from_arrays([grid_sku, grid_day], names=keys)
+
+    # EOD stock: last known stock per day, forward-filled within SKU.
+    eod = (
+        ev.drop_duplicates(keys, keep="last")
+        .set_index(keys)["Stanje_kolicina"]
+        .astype(float)
+        .reindex(grid)
+    )
+    stock = eod.groupby(level="SKU").ffill().fillna(0.0).to_numpy()
+
+    def _daily_sum(mask: pd.Series, values: pd.Series) -> np.ndarray:
+        summed = (
+            values.loc[mask].astype(float).groupby([ev.loc[mask, "SKU"], ev.loc[mask, "_day"]]).sum()
+        )
+        return summed.reindex(grid, fill_value=0.0).to_numpy()
+
+    gross = _daily_sum(ev["is_sale"], ev["Izdavanje_kolicina"])
+    ret = _daily_sum(ev["is_return"], ev["Izdavanje_kolicina"].abs())
+    ps_qty = _daily_sum(ev["is_ps_receipt"], ev["Prijem_kolicina"])
+    ps_val = _daily_sum(ev["is_ps_receipt"], ev["Prijem_vrednost"])
+    net = gross - ret
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ps_unit = np.where(ps_qty > 0, ps_val / ps_qty, math.nan)
+
+    out = pd.DataFrame(
+        {
+            "date": np.datetime_as_string(grid_day, unit="D"),
+            "sku": grid_sku,
+            "stock_eod_qty": stock,
+            "oos_flag": (stock <= 0).astype(np.int64),
+            "gross_sales_qty": gross,
+            "return_qty": ret,
+            "net_sales_qty": net,
+            "net_sales_qty_pos": np.maximum(net, 0.0),
+            "ps_prijem_qty": ps_qty,
+            "ps_prijem_value": ps_val,
+            "ps_unit_cost": ps_unit,
+        }
+    )
+    out["date_dt"] = pd.to_datetime(out["date"], errors="coerce")
+    # Purchase cost is known only on PS receipt days; forward-fill per SKU.
+    out["ps_unit_cost"] = (
+        out["ps_unit_cost"].replace(0.0, math.nan).groupby(out["sku"]).ffill().fillna(0.0)
+    )
+    return out
+
+
 def load_receipts_summary(receipts_summary_csv: Path) -> pd.DataFrame:
     if not receipts_summary_csv.exists():
         return pd.DataFrame()
-    df = pd.read_csv(receipts_summary_csv, encoding="utf-8")
+    return prepare_receipts_summary(pd.read_csv(receipts_summary_csv, encoding="utf-8"))
+
+
+def prepare_receipts_summary(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
+    df = df.copy()
     df["SKU"] = df["SKU"].astype(str).str.strip()
     df = df.loc[df["SKU"].astype(str).str.len() > 0]
     df["prvi_verifikovan_dt"] = pd.to_datetime(df.get("prvi_verifikovan"), errors="coerce").dt.date
@@ -304,9 +387,9 @@ def detect_promos(price_daily: pd.DataFrame, cfg: Config) -> pd.DataFrame:
     return pd.DataFrame(results)
 
 
-def ewma_baseline(series: pd.Series, oos_flag: pd.Series, alpha: float) -> pd.Series:
-    # series and oos_flag are aligned by date order.
-    ewma = None
+def ewma_baseline(series: pd.Series, oos_flag: pd.Series, alpha: float, start: float | None = None) -> pd.Series:
+    # series and oos_flag are aligned by date order; start = state carried over from earlier days.
+    ewma = start
     baseline = []
     for qty, oos in zip(series.tolist(), oos_flag.tolist()):
         if oos == 0:
@@ -345,14 +428,364 @@ def _find_oos_intervals(df: pd.DataFrame) -> list[tuple[date, date]]:
     return intervals
 
 
+CONTROL_ENGINES = ("loop", "matrix")
+# Matrix scores within this distance of a cut-off are re-scored exactly before ranking.
+_CONTROL_CORR_TOL = 1e-9
+
+
+def _control_corr(
+    pivot_qty: pd.DataFrame,
+    pivot_oos: pd.DataFrame,
+    look_mask: np.ndarray,
+    sku: str,
+    cand: str,
+    cfg: Config,
+) -> tuple[str, float, int] | None:
+    both_instock = (pivot_oos.loc[look_mask, sku] == 0) & (pivot_oos.loc[look_mask, cand] == 0)
+    overlap_days = int(both_instock.sum())
+    if overlap_days < cfg.min_overlap_days:
+        return None
+    a = pivot_qty.loc[look_mask, sku].loc[both_instock]
+    b = pivot_qty.loc[look_mask, cand].loc[both_instock]
+    c = _pearson_corr(a, b)
+    if c is None or c < cfg.control_min_corr:
+        return None
+    return cand, c, overlap_days
+
+
+def _rank_controls(corr_scores: list[tuple[str, float, int]], cfg: Config) -> list[tuple[str, float, int]]:
+    corr_scores.sort(key=lambda x: x[1], reverse=True)
+    return corr_scores[: cfg.n_controls]
+
+
+def _masked_corr_block(
+    target_qty: np.ndarray,
+    target_instock: np.ndarray,
+    qty: np.ndarray,
+    instock: np.ndarray,
+    min_overlap: int,
+) -> np.ndarray:
+    # Pearson correlation of the target against every column, each over the
+    # days both are in stock. NaN where the pair would be skipped.
+    mask = instock & target_instock[:, None]
+    overlap = mask.sum(axis=0)
+    w = mask.astype(float)
+    n = np.maximum(overlap, 1)
+    a = np.broadcast_to(target_qty[:, None], qty.shape)
+    da = (a - (w * a).sum(axis=0) / n) * w
+    db = (qty - (w * qty).sum(axis=0) / n) * w
+    saa = (da * da).sum(axis=0)
+    sbb = (db * db).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = (da * db).sum(axis=0) / np.sqrt(saa * sbb)
+    corr[(overlap < max(min_overlap, 2)) | (saa == 0) | (sbb == 0)] = np.nan
+    return corr
+
+
+def _matrix_top_controls(
+    qty: np.ndarray,
+    instock: np.ndarray,
+    columns: pd.Index,
+    look_mask: np.ndarray,
+    sku_idx: int,
+    cand_idx: np.ndarray,
+    cfg: Config,
+) -> list[tuple[str, float, int]]:
+    look_rows = np.flatnonzero(look_mask)
+    target_qty = qty[look_rows, sku_idx]
+    target_instock = instock[look_rows, sku_idx]
+    block = max(1, int(cfg.control_block_skus))
+    approx = np.empty(len(cand_idx), dtype=float)
+    for pos in range(0, len(cand_idx), block):
+        cols = cand_idx[pos : pos + block]
+        rows_cols = np.ix_(look_rows, cols)
+        approx[pos : pos + len(cols)] = _masked_corr_block(
+            target_qty, target_instock, qty[rows_cols], instock[rows_cols], cfg.min_overlap_days
+        )
+
+    # Shortlist everything that could make the top n_controls, then score the
+    # shortlist exactly as the loop does so ties and cut-offs match.
+    with np.errstate(invalid="ignore"):
+        shortlist = np.flatnonzero(approx >= cfg.control_min_corr - _CONTROL_CORR_TOL)
+    if len(shortlist) > cfg.n_controls > 0:
+        kth = np.sort(approx[shortlist])[::-1][cfg.n_controls - 1]
+        shortlist = shortlist[approx[shortlist] >= kth - 2 * _CONTROL_CORR_TOL]
+
+    corr_scores = []
+    for pos in shortlist:
+        col = cand_idx[pos]
+        both_instock = target_instock & instock[look_rows, col]
+        overlap_days = int(both_instock.sum())
+        if overlap_days < cfg.min_overlap_days:
+            continue
+        c = _pearson_corr(pd.Series(target_qty[both_instock]), pd.Series(qty[look_rows, col][both_instock]))
+        if c is None or c < cfg.control_min_corr:
+            continue
+        corr_scores.append((columns[col], c, overlap_days))
+    return _rank_controls(corr_scores, cfg)
+
+
+METRICS_STATE_FILE = "sku_metrics_state.json"
+# Bump when the meaning of sku_daily_metrics.csv changes; older state forces a full rebuild.
+METRICS_STATE_VERSION = 1
+
+
+@dataclass
+class PreviousMetrics:
+    """
+    Outputs of the previous run, ready for reuse. `valid_before` is the first
+    day on which any SKU's kartice series (net sales, stock) or the set of days
+    differs from that run (None = nothing changed). Control-group intervals
+    that closed before it saw exactly the same pivot window
+    [start - lookback, end] for every SKU, and EWMA is causal, so rows up to
+    there are copied (see _reuse_cuts) instead of recomputed.
+    """
+
+    valid_before: date | None
+    # sku, date_dt, demand_baseline_qty, method_used, confidence_score, verified_old
+    rows: pd.DataFrame
+    audit: dict[str, list[dict]]
+    promos: pd.DataFrame
+    price_digests: dict[str, str]
+
+
+def _metrics_params(cfg: Config, sp_date_field: str, start_date: date | None, end_date: date | None) -> dict:
+    return {
+        "config": dict(cfg.__dict__),
+        "sp_date_field": sp_date_field,
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+    }
+
+
+def _price_digests(price_daily: pd.DataFrame) -> dict[str, str]:
+    # One digest per SKU over its SP price rows (promo detection input).
+    if price_daily.empty:
+        return {}
+    row_hash = pd.util.hash_pandas_object(price_daily.reset_index(drop=True), index=False)
+    out = {}
+    for sku, hashes in row_hash.groupby(price_daily["sku"].to_numpy()):
+        out[str(sku)] = f"{len(hashes)}:{int(hashes.sum()) & 0xFFFFFFFFFFFFFFFF:016x}"
+    return out
+
+
+def _output_sizes(out_dir: Path, written: list[Path] | None = None) -> dict[str, int | None]:
+    # Size per output CSV; None when missing (or, with `written`, left over from an older run).
+    sizes = {}
+    names = {p.name for p in written} if written is not None else None
+    for name in ("sku_daily_metrics.csv", "sku_controls_audit.csv", "sku_promo_periods.csv"):
+        path = out_dir / name
+        ok = path.exists() and (names is None or name in names)
+        sizes[name] = path.stat().st_size if ok else None
+    return sizes
+
+
+def load_previous_metrics(
+    prev_dir: Path,
+    daily: pd.DataFrame,
+    params: dict,
+    stats: dict | None = None,
+) -> PreviousMetrics | None:
+    """
+    Reads the previous run's outputs + sku_metrics_state.json from `prev_dir`
+    and finds what changed against the new pre-baseline `daily` frame. Returns
+    None (full rebuild, reason in stats) when the state is missing, was built
+    with other parameters, or the outputs were replaced since.
+    """
+    stats = stats if stats is not None else {}
+
+    def full(reason: str) -> None:
+        stats["mode"] = "full"
+        stats["reason"] = reason
+        return None
+
+    state_path = prev_dir / METRICS_STATE_FILE
+    if not state_path.exists():
+        return full("nema prethodnog stanja")
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return full("stanje nije citljivo")
+    if state.get("version") != METRICS_STATE_VERSION:
+        return full("druga verzija stanja")
+    if state.get("params") != params:
+        return full("drugi parametri")
+    sizes = state.get("outputs") or {}
+    current = _output_sizes(prev_dir)
+    if sizes.get("sku_daily_metrics.csv") is None or any(
+        size is not None and current.get(name) != size for name, size in sizes.items()
+    ):
+        return full("izlazi su mijenjani")
+
+    prev = pd.read_csv(
+        prev_dir / "sku_daily_metrics.csv",
+        usecols=[
+            "date",
+            "sku",
+            "stock_eod_qty",
+            "net_sales_qty",
+            "verified_available_flag",
+            "demand_baseline_qty",
+            "method_used",
+            "confidence_score",
+        ],
+        dtype={"sku": str, "date": str, "method_used": str},
+        float_precision="round_trip",
+    )
+
+    # Kartice inputs of the control-group pivot, old vs new, per (sku, date).
+    new = daily[["sku", "date", "stock_eod_qty", "net_sales_qty", "verified_available_flag"]]
+    both = prev.merge(new, on=["sku", "date"], how="outer", suffixes=("_old", ""), indicator=True)
+    changed = (both["_merge"] != "both").to_numpy().copy()
+    for col in ("stock_eod_qty", "net_sales_qty"):
+        old_vals = pd.to_numeric(both[f"{col}_old"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+        new_vals = pd.to_numeric(both[col], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+        changed |= old_vals != new_vals
+    valid_before = None
+    if changed.any():
+        valid_before = date.fromisoformat(str(both.loc[changed, "date"].min()))
+
+    # A zeroed baseline (not yet verified) is only reusable where it stays zeroed.
+    known = both["_merge"].eq("both") & (
+        both["verified_available_flag_old"].eq(1) | both["verified_available_flag"].eq(0)
+    )
+    rows = both.loc[known, ["sku", "date", "demand_baseline_qty", "method_used", "confidence_score"]]
+    rows = rows.assign(
+        date_dt=pd.to_datetime(rows["date"]),
+        verified_old=both.loc[known, "verified_available_flag_old"].astype(int),
+    ).drop(columns=["date"])
+
+    audit: dict[str, list[dict]] = {}
+    if sizes.get("sku_controls_audit.csv") is not None:
+        audit_df = pd.read_csv(prev_dir / "sku_controls_audit.csv", dtype=str, keep_default_na=False)
+        for rec in audit_df.to_dict("records"):
+            audit.setdefault(rec["sku"], []).append(rec)
+
+    promos = pd.DataFrame()
+    if sizes.get("sku_promo_periods.csv") is not None:
+        promos = pd.read_csv(
+            prev_dir / "sku_promo_periods.csv",
+            dtype={"sku": str, "promo_start": str, "promo_end": str},
+            float_precision="round_trip",
+        )
+
+    stats["mode"] = "incremental"
+    stats["changed_rows"] = int(changed.sum())
+    stats["changed_skus"] = int(both.loc[changed, "sku"].nunique())
+    stats["first_changed"] = valid_before.isoformat() if valid_before else None
+    return PreviousMetrics(
+        valid_before=valid_before,
+        rows=rows,
+        audit=audit,
+        promos=promos,
+        price_digests=dict(state.get("price_digests") or {}),
+    )
+
+
+def _promos_incremental(
+    price_daily: pd.DataFrame,
+    cfg: Config,
+    previous: PreviousMetrics,
+    digests: dict[str, str],
+    stats: dict,
+) -> pd.DataFrame:
+    # Promo periods depend only on the SKU's own price rows: redo changed SKUs.
+    redo = {sku for sku, digest in digests.items() if previous.price_digests.get(sku) != digest}
+    stats["promo_skus"] = len(redo)
+    parts = []
+    if not previous.promos.empty:
+        keep = previous.promos.loc[previous.promos["sku"].isin(set(digests) - redo)]
+        if not keep.empty:
+            parts.append(keep)
+    if redo:
+        fresh = detect_promos(price_daily.loc[price_daily["sku"].isin(redo)], cfg)
+        if not fresh.empty:
+            parts.append(fresh)
+    if not parts:
+        return pd.DataFrame()
+    out = pd.concat(parts, ignore_index=True)
+    return out.sort_values("sku", kind="mergesort").reset_index(drop=True)
+
+
+def _reuse_cuts(
+    previous: PreviousMetrics,
+    pivot_oos: pd.DataFrame,
+    daily: pd.DataFrame,
+) -> dict[str, tuple[int, float | None, np.ndarray]]:
+    """
+    Per SKU: (first pivot row to recompute, EWMA state just before it,
+    positions in previous.rows of the rows before it); SKUs recomputed in full
+    are left out. The cut is the first changed day, moved back to the start of
+    an OOS interval still open the day before (it may run longer now). The
+    EWMA state is the baseline of the last in-stock day before the cut (0.0 on
+    the zero-filled days before the SKU's first row). A SKU is recomputed in
+    full when a needed previous row is missing or was zeroed as not verified.
+    """
+    index = pivot_oos.index
+    n = len(index)
+    pos_v = n if previous.valid_before is None else int(index.searchsorted(pd.Timestamp(previous.valid_before)))
+    oos = pivot_oos.to_numpy()
+    new_dt = daily["date_dt"].to_numpy()
+    new_idx = daily.groupby("sku", sort=False).indices
+    prev_dt = previous.rows["date_dt"].to_numpy()
+    prev_base = previous.rows["demand_baseline_qty"].to_numpy(dtype=float)
+    prev_verified = previous.rows["verified_old"].to_numpy()
+    prev_idx = previous.rows.groupby("sku", sort=False).indices
+
+    cuts = {}
+    for j, sku in enumerate(pivot_oos.columns.tolist()):
+        if previous.valid_before is None:
+            cut = n
+        else:
+            in_stock = np.flatnonzero(oos[:pos_v, j] == 0)
+            cut = int(in_stock[-1]) + 1 if len(in_stock) else 0
+        if cut == 0 or sku not in prev_idx:
+            continue
+        dates = np.sort(new_dt[new_idx[sku]])
+        pos = prev_idx[sku]
+        pos = pos[np.argsort(prev_dt[pos], kind="stable")]
+        cut_day = index[cut].to_datetime64() if cut < n else None
+        n_new = len(dates) if cut_day is None else int(np.searchsorted(dates, cut_day))
+        n_old = len(pos) if cut_day is None else int(np.searchsorted(prev_dt[pos], cut_day))
+        if n_old != n_new:
+            continue
+        before = pos[:n_old]
+        if n_new == len(dates):
+            # Nothing of this SKU from the cut on.
+            cuts[sku] = (n, None, before)
+            continue
+        last_in = np.flatnonzero(oos[:cut, j] == 0)
+        if not len(last_in):
+            seed = None
+        elif not len(dates) or index[last_in[-1]].to_datetime64() < dates[0]:
+            seed = 0.0
+        else:
+            k = int(np.searchsorted(prev_dt[before], index[last_in[-1]].to_datetime64()))
+            if k >= len(before) or prev_dt[before[k]] != index[last_in[-1]].to_datetime64() or prev_verified[before[k]] != 1:
+                continue
+            seed = float(prev_base[before[k]])
+        cuts[sku] = (cut, seed, before)
+    return cuts
+
+
 def apply_control_group_baseline(
     daily: pd.DataFrame,
     cfg: Config,
+    engine: str = "loop",
+    *,
+    previous: PreviousMetrics | None = None,
+    stats: dict | None = None,
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Adds demand_baseline_qty, method_used, confidence_score, lost_sales_qty.
     Returns (daily_out, audit_df).
+
+    engine="matrix" scores all candidate controls of an OOS interval at once
+    (masked correlation over the pivot) and gives the same result as "loop".
+    With `previous`, each SKU is recomputed only from its _reuse_cuts point on.
     """
+    if engine not in CONTROL_ENGINES:
+        raise ValueError(f"Unknown control engine: {engine}")
     if daily.empty:
         return daily, pd.DataFrame()
 
@@ -366,16 +799,30 @@ def apply_control_group_baseline(
         daily[qty_col] = pd.to_numeric(daily[qty_col], errors="coerce").fillna(0.0).clip(lower=0.0)
     pivot_qty = daily.pivot(index="date_dt", columns="sku", values=qty_col).fillna(0.0)
     pivot_oos = daily.pivot(index="date_dt", columns="sku", values="oos_flag").fillna(0).astype(int)
+    index_dates = pivot_qty.index.date
+    if engine == "matrix":
+        qty_arr = pivot_qty.to_numpy(dtype=float)
+        instock_arr = pivot_oos.to_numpy() == 0
 
     baselines = {}
     methods = {}
     confidences = {}
     audits = []
-
-    for sku in pivot_qty.columns.tolist():
-        sku_series = pivot_qty[sku]
-        sku_oos = pivot_oos[sku]
-        base_ewma = ewma_baseline(sku_series, sku_oos, cfg.ewma_alpha)
+    n_intervals = 0
+    cuts = _reuse_cuts(previous, pivot_oos, daily) if previous is not None else {}
+    reused = []
+
+    for sku_idx, sku in enumerate(pivot_qty.columns.tolist()):
+        cut, seed, before = cuts.get(sku, (0, None, None))
+        if cut:
+            reused.append(before)
+            cut_day = pivot_qty.index[cut].date().isoformat() if cut < len(pivot_qty.index) else None
+            audits.extend(r for r in previous.audit.get(sku, []) if cut_day is None or r["oos_start"] < cut_day)
+            if cut_day is None:
+                continue
+        sku_series = pivot_qty[sku].iloc[cut:]
+        sku_oos = pivot_oos[sku].iloc[cut:]
+        base_ewma = ewma_baseline(sku_series, sku_oos, cfg.ewma_alpha, start=seed)
 
         baseline = base_ewma.copy()
         method = pd.Series(["EWMA_FALLBACK"] * len(sku_series), index=sku_series.index)
@@ -384,51 +831,62 @@ def apply_control_group_baseline(
         df_sku = pd.DataFrame({"date_dt": sku_series.index, "oos_flag": sku_oos.values})
         intervals = _find_oos_intervals(df_sku.sort_values("date_dt"))
         for start, end in intervals:
+            n_intervals += 1
             look_start = start - timedelta(days=cfg.lookback_days)
             look_end = start - timedelta(days=1)
             pre_start = start - timedelta(days=cfg.preoos_days)
             pre_end = start - timedelta(days=1)
 
-            look_mask = (pivot_qty.index.date >= look_start) & (pivot_qty.index.date <= look_end)
-            pre_mask = (pivot_qty.index.date >= pre_start) & (pivot_qty.index.date <= pre_end)
-            oos_mask = (pivot_qty.index.date >= start) & (pivot_qty.index.date <= end)
+            look_mask = (index_dates >= look_start) & (index_dates <= look_end)
+            pre_mask = (index_dates >= pre_start) & (index_dates <= pre_end)
+            oos_mask = (index_dates >= start) & (index_dates <= end)
 
             if not look_mask.any() or not pre_mask.any():
                 continue
 
             # Candidate controls: in-stock during entire OOS interval for target.
-            in_stock_during_oos = (pivot_oos.loc[oos_mask, :] == 0).all(axis=0)
-            in_stock_during_oos = in_stock_during_oos[in_stock_during_oos.index != sku]
-            candidates = in_stock_during_oos[in_stock_during_oos].index.tolist()
-            if not candidates:
-                continue
-
-            corr_scores = []
-            for cand in candidates:
-                both_instock = (pivot_oos.loc[look_mask, sku] == 0) & (pivot_oos.loc[look_mask, cand] == 0)
-                if int(both_instock.sum()) < cfg.min_overlap_days:
+            if engine == "matrix":
+                candidate_mask = instock_arr[oos_mask].all(axis=0)
+                candidate_mask[sku_idx] = False
+                if not candidate_mask.any():
                     continue
-                a = pivot_qty.loc[look_mask, sku].loc[both_instock]
-                b = pivot_qty.loc[look_mask, cand].loc[both_instock]
-                c = _pearson_corr(a, b)
-                if c is None or c < cfg.control_min_corr:
+            else:
+                in_stock_during_oos = (pivot_oos.loc[oos_mask, :] == 0).all(axis=0)
+                in_stock_during_oos = in_stock_during_oos[in_stock_during_oos.index != sku]
+                candidates = in_stock_during_oos[in_stock_during_oos].index.tolist()
+                if not candidates:
                     continue
-                corr_scores.append((cand, c, int(both_instock.sum())))
 
-            if not corr_scores:
+            if engine == "matrix":
+                cand_idx = np.flatnonzero(candidate_mask)
+                top = _matrix_top_controls(qty_arr, instock_arr, pivot_qty.columns, look_mask, sku_idx, cand_idx, cfg)
+            else:
+                corr_scores = []
+                for cand in candidates:
+                    scored = _control_corr(pivot_qty, pivot_oos, look_mask, sku, cand, cfg)
+                    if scored is not None:
+                        corr_scores.append(scored)
+                top = _rank_controls(corr_scores, cfg)
+
+            if not top:
                 continue
 
-            corr_scores.sort(key=lambda x: x[1], reverse=True)
-            top = corr_scores[: cfg.n_controls]
-
             # Calibration ratios on pre window.
             controls = []
             for cand, cval, overlap_days in top:
-                both_instock = (pivot_oos.loc[pre_mask, sku] == 0) & (pivot_oos.loc[pre_mask, cand] == 0)
-                if not both_instock.any():
-                    continue
-                target_avg = float(pivot_qty.loc[pre_mask, sku].loc[both_instock].mean())
-                control_avg = float(pivot_qty.loc[pre_mask, cand].loc[both_instock].mean())
+                if engine == "matrix":
+                    col = pivot_qty.columns.get_loc(cand)
+                    both_instock = instock_arr[pre_mask, sku_idx] & instock_arr[pre_mask, col]
+                    if not both_instock.any():
+                        continue
+                    target_avg = float(qty_arr[pre_mask, sku_idx][both_instock].mean())
+                    control_avg = float(qty_arr[pre_mask, col][both_instock].mean())
+                else:
+                    both_instock = (pivot_oos.loc[pre_mask, sku] == 0) & (pivot_oos.loc[pre_mask, cand] == 0)
+                    if not both_instock.any():
+                        continue
+                    target_avg = float(pivot_qty.loc[pre_mask, sku].loc[both_instock].mean())
+                    control_avg = float(pivot_qty.loc[pre_mask, cand].loc[both_instock].mean())
                 if control_avg < cfg.control_min_control_avg:
                     continue
                 ratio = target_avg / control_avg if control_avg else None
@@ -479,15 +937,27 @@ def apply_control_group_baseline(
         methods[sku] = method
         confidences[sku] = conf
 
-    # Unpivot back.
-    base_df = pd.DataFrame(baselines).stack().reset_index()
-    base_df.columns = ["date_dt", "sku", "demand_baseline_qty"]
-    method_df = pd.DataFrame(methods).stack().reset_index()
-    method_df.columns = ["date_dt", "sku", "method_used"]
-    conf_df = pd.DataFrame(confidences).stack().reset_index()
-    conf_df.columns = ["date_dt", "sku", "confidence_score"]
+    if stats is not None:
+        stats["skus_recomputed"] = len(baselines)
+        stats["intervals_recomputed"] = n_intervals
+
+    # Unpivot back (SKUs recomputed from a cut only cover the days from it).
+    skus = list(baselines)
+    base_df = pd.DataFrame(
+        {
+            "date_dt": np.concatenate([baselines[k].index.to_numpy() for k in skus]) if skus else [],
+            "sku": np.repeat(np.array(skus, dtype=object), [len(baselines[k]) for k in skus]),
+            "demand_baseline_qty": np.concatenate([baselines[k].to_numpy(dtype=float) for k in skus]) if skus else [],
+            "method_used": np.concatenate([methods[k].to_numpy(dtype=object) for k in skus]) if skus else [],
+            "confidence_score": np.concatenate([confidences[k].to_numpy(dtype=float) for k in skus]) if skus else [],
+        }
+    )
+    if reused:
+        cols = ["date_dt", "sku", "demand_baseline_qty", "method_used", "confidence_score"]
+        old = previous.rows.iloc[np.concatenate(reused)][cols]
+        base_df = pd.concat([base_df, old], ignore_index=True) if skus else old
 
-    merged = daily.merge(base_df, on=["date_dt", "sku"], how="left").merge(method_df, on=["date_dt", "sku"], how="left").merge(conf_df, on=["date_dt", "sku"], how="left")
+    merged = daily.merge(base_df, on=["date_dt", "sku"], how="left")
     merged["demand_baseline_qty"] = pd.to_numeric(merged["demand_baseline_qty"], errors="coerce").fillna(0.0).clip(lower=0.0)
     merged["confidence_score"] = pd.to_numeric(merged["confidence_score"], errors="coerce").fillna(0.0)
     merged["method_used"] = merged["method_used"].fillna("EWMA_FALLBACK")
@@ -497,40 +967,44 @@ def apply_control_group_baseline(
     return merged, pd.DataFrame(audits)
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Build per-SKU daily metrics (OOS + demand baseline + lost sales).")
-    parser.add_argument("--events", type=Path, default=Path(r"Kalkulacije_kartice_art\izlaz\kartice_events.csv"))
-    parser.add_argument("--receipts-summary", type=Path, default=Path(r"Kalkulacije_kartice_art\izlaz\sp_prijemi_summary.csv"))
-    parser.add_argument("--db", type=Path, default=Path(r"SRB1.1-razvoj.db"))
-    parser.add_argument("--sp-date-field", type=str, default="picked_up_at", choices=["picked_up_at", "created_at", "delivered_at"])
-    parser.add_argument("--out", type=Path, default=Path(r"Kalkulacije_kartice_art\izlaz"))
-    parser.add_argument("--start", type=str, default="")
-    parser.add_argument("--end", type=str, default="")
-    parser.add_argument("--config", type=Path, default=None, help="Optional JSON config override.")
-    args = parser.parse_args()
-
-    cfg = Config()
-    if args.config and args.config.exists():
-        data = json.loads(args.config.read_text(encoding="utf-8"))
-        cfg = Config(**{**cfg.__dict__, **{k: data[k] for k in data if k in cfg.__dict__}})
-
-    start_date = datetime.strptime(args.start, "%Y-%m-%d").date() if args.start else None
-    end_date = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else None
-
-    args.out.mkdir(parents=True, exist_ok=True)
+def build_sku_metrics(
+    events: pd.DataFrame,
+    receipts: pd.DataFrame,
+    db_path: Path,
+    out_dir: Path,
+    cfg: Config = Config(),
+    sp_date_field: str = "picked_up_at",
+    start_date: date | None = None,
+    end_date: date | None = None,
+    daily_engine: str = "columnar",
+    control_engine: str = "matrix",
+    *,
+    incremental_from: Path | None = None,
+    stats: dict | None = None,
+) -> list[Path]:
+    """
+    Builds sku_daily_metrics.csv (+ controls audit, promo periods) from prepared
+    kartice events and SP Prijemi summary frames. Returns the written paths.
+
+    incremental_from: folder with the previous run's outputs and
+    sku_metrics_state.json. Daily rows are always rebuilt (vectorized), but
+    control-group intervals closed before the first changed day and promo
+    periods of SKUs with unchanged SP prices are reused; the result is the same
+    as a full rebuild. Falls back to a full rebuild when the state does not fit.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stats = stats if stats is not None else {}
+    stats["mode"] = "full"
 
-    events = load_kartice_events(args.events)
-    daily = build_daily_from_kartice(events)
+    daily = build_daily_from_kartice(events, engine=daily_engine)
     if daily.empty:
-        print("No kartice events to process.")
-        return 0
+        return []
 
     if start_date:
         daily = daily.loc[pd.to_datetime(daily["date"]) >= pd.to_datetime(start_date)]
     if end_date:
         daily = daily.loc[pd.to_datetime(daily["date"]) <= pd.to_datetime(end_date)]
 
-    receipts = load_receipts_summary(args.receipts_summary)
     if not receipts.empty:
         daily = daily.merge(receipts.rename(columns={"SKU": "sku"}), on="sku", how="left")
         daily["verified_available_flag"] = 1
@@ -542,7 +1016,7 @@ def main() -> int:
     else:
         daily["verified_available_flag"] = 1
 
-    price_daily = load_sp_price_daily(args.db, args.sp_date_field, start_date, end_date)
+    price_daily = load_sp_price_daily(db_path, sp_date_field, start_date, end_date)
     if not price_daily.empty:
         daily = daily.merge(price_daily, left_on=["date", "sku"], right_on=["date", "sku"], how="left")
     else:
@@ -570,8 +1044,13 @@ def main() -> int:
             price.groupby(daily["sku"]).ffill().bfill().fillna(0.0)
         )
 
+    params = _metrics_params(cfg, sp_date_field, start_date, end_date)
+    previous = None
+    if incremental_from is not None:
+        previous = load_previous_metrics(Path(incremental_from), daily, params, stats)
+
     # Baseline + lost sales from qty series.
-    daily, audit = apply_control_group_baseline(daily, cfg)
+    daily, audit = apply_control_group_baseline(daily, cfg, engine=control_engine, previous=previous, stats=stats)
 
     # Don't count lost sales before first verified receipt (if known).
     if "verified_available_flag" in daily.columns:
@@ -588,9 +1067,13 @@ def main() -> int:
     daily["lost_purchase_cost_est"] = daily["lost_sales_qty"] * unit_cost
     daily["lost_profit_est"] = daily["lost_sales_qty"] * (unit_price - unit_cost).clip(lower=0.0)
 
-    promos = detect_promos(price_daily, cfg)
+    digests = _price_digests(price_daily)
+    if previous is not None:
+        promos = _promos_incremental(price_daily, cfg, previous, digests, stats)
+    else:
+        promos = detect_promos(price_daily, cfg)
 
-    out_daily = args.out / "sku_daily_metrics.csv"
+    out_daily = out_dir / "sku_daily_metrics.csv"
     keep_cols = [
         "date",
         "sku",
@@ -620,17 +1103,98 @@ def main() -> int:
     ]
     keep = [c for c in keep_cols if c in daily.columns]
     daily[keep].sort_values(["sku", "date"]).to_csv(out_daily, index=False, encoding="utf-8")
-    print(f"wrote: {out_daily}")
+    written = [out_daily]
+    # Columnar copy for the UI (parquet, or pkl without pyarrow); CSV stays the artifact.
+    columnar = write_sku_daily_cache(out_daily)
+    if columnar is not None:
+        written.append(columnar)
 
-    out_audit = args.out / "sku_controls_audit.csv"
+    out_audit = out_dir / "sku_controls_audit.csv"
     if not audit.empty:
         audit.to_csv(out_audit, index=False, encoding="utf-8")
-        print(f"wrote: {out_audit}")
+        written.append(out_audit)
 
-    out_promos = args.out / "sku_promo_periods.csv"
+    out_promos = out_dir / "sku_promo_periods.csv"
     if not promos.empty:
         promos.to_csv(out_promos, index=False, encoding="utf-8")
-        print(f"wrote: {out_promos}")
+        written.append(out_promos)
+
+    # What the next run needs to tell which SKUs/days changed (see load_previous_metrics).
+    out_state = out_dir / METRICS_STATE_FILE
+    state = {
+        "version": METRICS_STATE_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "params": params,
+        "outputs": _output_sizes(out_dir, written),
+        "price_digests": digests,
+        "last_run": stats,
+    }
+    out_state.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    written.append(out_state)
+    return written
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build per-SKU daily metrics (OOS + demand baseline + lost sales).")
+    parser.add_argument("--events", type=Path, default=Path(r"Kalkulacije_kartice_art\izlaz\kartice_events.csv"))
+    parser.add_argument("--receipts-summary", type=Path, default=Path(r"Kalkulacije_kartice_art\izlaz\sp_prijemi_summary.csv"))
+    parser.add_argument("--db", type=Path, default=Path(r"SRB1.1-razvoj.db"))
+    parser.add_argument("--sp-date-field", type=str, default="picked_up_at", choices=["picked_up_at", "created_at", "delivered_at"])
+    parser.add_argument("--out", type=Path, default=Path(r"Kalkulacije_kartice_art\izlaz"))
+    parser.add_argument("--start", type=str, default="")
+    parser.add_argument("--end", type=str, default="")
+    parser.add_argument("--config", type=Path, default=None, help="Optional JSON config override.")
+    parser.add_argument(
+        "--daily-engine",
+        type=str,
+        default="columnar",
+        choices=list(DAILY_ENGINES),
+        help="Daily rebuild from kartice: columnar (all SKUs at once) or loop (per SKU/day).",
+    )
+    parser.add_argument(
+        "--control-engine",
+        type=str,
+        default="matrix",
+        choices=list(CONTROL_ENGINES),
+        help="Control-group baseline: matrix (all candidates per OOS interval at once) or loop (one candidate at a time).",
+    )
+    parser.add_argument(
+        "--incremental-from",
+        type=Path,
+        default=None,
+        help="Folder with the previous run's outputs + sku_metrics_state.json; recompute only what changed since.",
+    )
+    args = parser.parse_args()
+
+    cfg = Config()
+    if args.config and args.config.exists():
+        data = json.loads(args.config.read_text(encoding="utf-8"))
+        cfg = Config(**{**cfg.__dict__, **{k: data[k] for k in data if k in cfg.__dict__}})
+
+    start_date = datetime.strptime(args.start, "%Y-%m-%d").date() if args.start else None
+    end_date = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else None
+
+    stats: dict = {}
+    written = build_sku_metrics(
+        load_kartice_events(args.events),
+        load_receipts_summary(args.receipts_summary),
+        args.db,
+        args.out,
+        cfg=cfg,
+        sp_date_field=args.sp_date_field,
+        start_date=start_date,
+        end_date=end_date,
+        daily_engine=args.daily_engine,
+        control_engine=args.control_engine,
+        incremental_from=args.incremental_from,
+        stats=stats,
+    )
+    if not written:
+        print("No kartice events to process.")
+        return 0
+    print("run: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+    for path in written:
+        print(f"wrote: {path}")
     return 0
 
 
@@ -1,14 +1,21 @@
 import argparse
 import csv
+import hashlib
 import json
+import os
 import re
+import sqlite3
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
 
 import pandas as pd
 
+from srb_modules.sheet_cache import DEFAULT_SHEET_CACHE_MB, SheetCache
+from srb_modules.xlsx_read import read_sheet, sheet_names
+
 try:
     import pdfplumber
 except Exception:  # pragma: no cover - optional dependency
@@ -19,6 +26,11 @@ DATE_RE = re.compile(r"\b(\d{2}\.\d{2}\.\d{4})\b")
 DOC_RE = re.compile(r"^([A-Z]{1,3}-[0-9A-Z-]+)")
 NUM_RE = re.compile(r"[-+]?\d{1,3}(?:\.\d{3})*(?:,\d+)?|[-+]?\d+(?:,\d+)?")
 SP_MM_RE = re.compile(r"\bSP-MM-\d+\b", re.IGNORECASE)
+# Below this page count process start-up costs more than it saves.
+PARALLEL_MIN_PAGES = 40
+# Bump when _parse_page_records output or the page fingerprint changes so cached pages are re-parsed.
+PAGE_CACHE_VERSION = "2"
+PAGE_CACHE_KEEP_DAYS = 60
 
 
 @dataclass
@@ -138,13 +150,329 @@ def _parse_kartica_numeric_tail(line: str) -> tuple[float, float, float, float,
     )
 
 
-def parse_kartica_pdf(pdf_path: Path) -> list[KarticaRow]:
-    if pdfplumber is None:
-        raise RuntimeError("pdfplumber is required for PDF parsing")
+def _parse_page_records(text: str) -> list[tuple]:
+    """
+    Parses one page of kartica text into context-free records.
+    SKU context (ARTIKAL) is carried across pages, so rows are assembled later in page order.
+    """
+    records: list[tuple] = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+
+        norm = _normalize(line).lower()
+        if norm.startswith("kartica zaliha"):
+            dates = DATE_RE.findall(line)
+            if len(dates) >= 2:
+                records.append(("range", dates[0], dates[1]))
+            continue
+
+        if line.startswith("ARTIKAL:"):
+            article = line.replace("ARTIKAL:", "", 1).strip()
+            records.append(("article", article, _extract_sku_from_text(article) or article))
+            continue
+
+        # Initial balance line: "Početno stanje na dan 01.04.2024: 0 0,00 0,00"
+        if norm.startswith("pocetno stanje na dan"):
+            date_match = DATE_RE.search(line)
+            if not date_match:
+                continue
+            after_colon = line.split(":", 1)[1] if ":" in line else line
+            nums = NUM_RE.findall(after_colon)
+            if not nums:
+                continue
+            stanje_kolicina = _num_from_token(nums[0])
+            stanje_vrednost = _num_from_token(nums[1]) if len(nums) > 1 else 0.0
+            records.append(("pocetno", date_match.group(1), stanje_kolicina, stanje_vrednost))
+            continue
+
+        if norm.startswith("konacno stanje na dan"):
+            date_match = DATE_RE.search(line)
+            if date_match:
+                records.append(("final", date_match.group(1)))
+            continue
+
+        doc_match = DOC_RE.match(line)
+        date_match = DATE_RE.search(line)
+        if not doc_match or not date_match:
+            continue
+
+        parsed = _parse_kartica_numeric_tail(line)
+        if parsed is None:
+            continue
+
+        opis, referenca = _extract_description_and_reference(line, date_match)
+        records.append(("row", doc_match.group(1), date_match.group(1), opis, referenca, *parsed))
+    return records
+
+
+def _extract_page_records(pdf_path: str, page_numbers: list[int]) -> list[list[tuple]]:
+    # Worker entry point (must stay top-level so ProcessPoolExecutor can pickle it).
+    out = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_no in page_numbers:
+            text = pdf.pages[page_no].extract_text() or ""
+            out.append(_parse_page_records(text))
+    return out
+
+
+def _resolve_workers(workers: int | None) -> int:
+    if workers is None or workers <= 0:
+        return max(1, os.cpu_count() or 1)
+    return int(workers)
+
+
+def _split_pages(pages: list[int], parts: int) -> list[list[int]]:
+    # Contiguous chunks keep each worker's pdfplumber reads sequential.
+    parts = max(1, min(parts, len(pages)))
+    size, extra = divmod(len(pages), parts)
+    chunks = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(pages[start:end])
+        start = end
+    return chunks
+
+
+def _pdf_object_digest(h, obj, depth: int = 0) -> None:
+    # Feeds a resolved PDF object into h: names, numbers, arrays, dicts and stream data.
+    from pdfminer.psparser import PSLiteral
+    from pdfminer.pdftypes import resolve1
+
+    obj = resolve1(obj)
+    if depth > 8:
+        return
+    if hasattr(obj, "get_data"):
+        h.update(b"stream:")
+        h.update(obj.get_data())
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for key in sorted(obj):
+            h.update(f"{key}:".encode("utf-8", errors="ignore"))
+            _pdf_object_digest(h, obj[key], depth + 1)
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for item in obj:
+            _pdf_object_digest(h, item, depth + 1)
+        h.update(b"]")
+    elif isinstance(obj, PSLiteral):
+        h.update(f"/{obj.name}".encode("utf-8", errors="ignore"))
+    elif isinstance(obj, bytes):
+        h.update(obj)
+    else:
+        h.update(repr(obj).encode("utf-8", errors="ignore"))
+    h.update(b";")
+
+
+def _font_digest(font) -> str:
+    """
+    What decides how the font's codes become text: Encoding (incl. Differences) and
+    the ToUnicode CMap, or the embedded font program when there is no ToUnicode.
+    Subset fonts number glyphs per export, so the same content bytes can decode
+    to different text in two PDFs; the font name alone is not enough.
+    """
+    from pdfminer.pdftypes import resolve1
+
+    h = hashlib.sha1()
+    h.update(str(font.get("Subtype") or "").encode("utf-8", errors="ignore"))
+    _pdf_object_digest(h, font.get("Encoding"))
+    to_unicode = font.get("ToUnicode")
+    if to_unicode is not None:
+        _pdf_object_digest(h, to_unicode)
+    else:
+        descriptors = [font.get("FontDescriptor")] + [
+            (resolve1(d) or {}).get("FontDescriptor")
+            for d in resolve1(font.get("DescendantFonts")) or []
+        ]
+        for descriptor in descriptors:
+            descriptor = resolve1(descriptor) or {}
+            for key in ("FontFile", "FontFile2", "FontFile3"):
+                if key in descriptor:
+                    _pdf_object_digest(h, descriptor[key])
+    return h.hexdigest()
+
+
+def _page_fingerprint(page, font_digests: dict | None = None) -> str:
+    """
+    Hash of the raw page content stream + a digest of every font's text mapping
+    (_font_digest), without running layout/text extraction. `font_digests`
+    memoizes font digests by object id within one PDF.
+    """
+    from pdfminer.pdftypes import resolve1
+
+    if font_digests is None:
+        font_digests = {}
+    h = hashlib.sha1(PAGE_CACHE_VERSION.encode("ascii"))
+    page_obj = page.page_obj
+    for ref in page_obj.contents or []:
+        stream = resolve1(ref)
+        if hasattr(stream, "get_data"):
+            h.update(stream.get_data())
+    fonts = resolve1((page_obj.resources or {}).get("Font")) or {}
+    for name in sorted(fonts):
+        ref = fonts[name]
+        objid = getattr(ref, "objid", None)
+        digest = font_digests.get(objid) if objid is not None else None
+        if digest is None:
+            digest = _font_digest(resolve1(ref) or {})
+            if objid is not None:
+                font_digests[objid] = digest
+        h.update(f"|{name}={digest}".encode("ascii"))
+    return h.hexdigest()
+
+
+def _open_page_cache(cache_path: Path) -> sqlite3.Connection:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(cache_path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS page_cache ("
+        "fingerprint TEXT PRIMARY KEY, "
+        "records TEXT NOT NULL, "
+        "used_at TEXT NOT NULL"
+        ")"
+    )
+    return conn
+
+
+def _page_cache_get(conn: sqlite3.Connection, fingerprints: list[str]) -> dict[str, list]:
+    found: dict[str, list] = {}
+    unique = sorted(set(fingerprints))
+    chunk_size = 800
+    for i in range(0, len(unique), chunk_size):
+        chunk = unique[i : i + chunk_size]
+        placeholders = ",".join("?" for _ in chunk)
+        for fp, records in conn.execute(
+            f"SELECT fingerprint, records FROM page_cache WHERE fingerprint IN ({placeholders})",
+            chunk,
+        ).fetchall():
+            found[fp] = json.loads(records)
+    return found
+
+
+def _page_cache_store(
+    conn: sqlite3.Connection,
+    fingerprints: list[str],
+    page_records: list[list],
+    new_pages: list[int],
+) -> None:
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.executemany(
+        "INSERT INTO page_cache (fingerprint, records, used_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(fingerprint) DO UPDATE SET records = excluded.records, used_at = excluded.used_at",
+        [
+            (fingerprints[i], json.dumps(page_records[i], ensure_ascii=False), now)
+            for i in new_pages
+        ],
+    )
+    # Touch hits too, so pages still present in the latest export are not pruned.
+    conn.executemany(
+        "UPDATE page_cache SET used_at = ? WHERE fingerprint = ?",
+        [(now, fp) for fp in set(fingerprints)],
+    )
+    cutoff = (datetime.now() - timedelta(days=PAGE_CACHE_KEEP_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute("DELETE FROM page_cache WHERE used_at < ?", (cutoff,))
+    conn.commit()
+
 
+def _assemble_kartica_rows(
+    page_records: list[list[tuple]], meta: dict[str, object]
+) -> list[KarticaRow]:
     rows: list[KarticaRow] = []
     current_article = ""
     current_sku = ""
+    for records in page_records:
+        for rec in records:
+            kind = rec[0]
+            if kind == "range":
+                meta["range_pages"] = int(meta.get("range_pages") or 0) + 1
+                if meta.get("range_start") is None:
+                    meta["range_start"] = rec[1]
+                if meta.get("range_end") is None:
+                    meta["range_end"] = rec[2]
+                continue
+
+            if kind == "article":
+                current_article = rec[1]
+                current_sku = rec[2]
+                continue
+
+            if not current_sku:
+                continue
+
+            if kind == "pocetno":
+                rows.append(
+                    KarticaRow(
+                        sku=current_sku,
+                        article=current_article,
+                        date=datetime.strptime(rec[1], "%d.%m.%Y"),
+                        doc="POCETNO",
+                        opis="Početno stanje",
+                        referenca="",
+                        prijem_kolicina=0.0,
+                        prijem_vrednost=0.0,
+                        izdavanje_kolicina=0.0,
+                        izdavanje_vrednost=0.0,
+                        cena=0.0,
+                        stanje_kolicina=rec[2],
+                        stanje_vrednost=rec[3],
+                    )
+                )
+                continue
+
+            if kind == "final":
+                meta["final_pages"] = int(meta.get("final_pages") or 0) + 1
+                meta["final_end"] = rec[1]
+                continue
+
+            (
+                _,
+                doc,
+                dmy,
+                opis,
+                referenca,
+                prijem_kolicina,
+                prijem_vrednost,
+                izdavanje_kolicina,
+                izdavanje_vrednost,
+                cena,
+                stanje_kolicina,
+                stanje_vrednost,
+            ) = rec
+            rows.append(
+                KarticaRow(
+                    sku=current_sku,
+                    article=current_article,
+                    date=datetime.strptime(dmy, "%d.%m.%Y"),
+                    doc=doc,
+                    opis=opis,
+                    referenca=referenca,
+                    prijem_kolicina=prijem_kolicina,
+                    prijem_vrednost=prijem_vrednost,
+                    izdavanje_kolicina=izdavanje_kolicina,
+                    izdavanje_vrednost=izdavanje_vrednost,
+                    cena=cena,
+                    stanje_kolicina=stanje_kolicina,
+                    stanje_vrednost=stanje_vrednost,
+                )
+            )
+    return rows
+
+
+def parse_kartica_pdf(
+    pdf_path: Path, workers: int = 1, cache_path: Path | None = None
+) -> list[KarticaRow]:
+    """
+    workers=1 parses pages sequentially; workers>1 (or 0 = all cores) splits the page
+    range across processes. Page results are merged in page order, so rows are identical.
+    cache_path enables the persistent per-page cache: pages whose content fingerprint was
+    already parsed are served from it, only new/changed pages go through pdfplumber.
+    """
+    if pdfplumber is None:
+        raise RuntimeError("pdfplumber is required for PDF parsing")
+
     meta: dict[str, object] = {
         "pdf_name": pdf_path.name,
         "range_start": None,
@@ -152,111 +480,48 @@ def parse_kartica_pdf(pdf_path: Path) -> list[KarticaRow]:
         "final_end": None,
         "range_pages": 0,
         "final_pages": 0,
+        "page_count": 0,
+        "page_cache_hits": None,
+        "page_cache_misses": None,
     }
 
-    with pdfplumber.open(str(pdf_path)) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text() or ""
-            for raw in text.splitlines():
-                line = raw.strip()
-                if not line:
-                    continue
-
-                norm = _normalize(line).lower()
-                if norm.startswith("kartica zaliha"):
-                    dates = DATE_RE.findall(line)
-                    if len(dates) >= 2:
-                        meta["range_pages"] = int(meta.get("range_pages") or 0) + 1
-                        if meta.get("range_start") is None:
-                            meta["range_start"] = dates[0]
-                        if meta.get("range_end") is None:
-                            meta["range_end"] = dates[1]
-                    continue
-
-                if line.startswith("ARTIKAL:"):
-                    current_article = line.replace("ARTIKAL:", "", 1).strip()
-                    current_sku = _extract_sku_from_text(current_article) or current_article
-                    continue
-
-                if not current_sku:
-                    continue
-
-                # Initial balance line: "Početno stanje na dan 01.04.2024: 0 0,00 0,00"
-                if norm.startswith("pocetno stanje na dan"):
-                    date_match = DATE_RE.search(line)
-                    if not date_match:
-                        continue
-                    after_colon = line.split(":", 1)[1] if ":" in line else line
-                    nums = NUM_RE.findall(after_colon)
-                    if not nums:
-                        continue
-                    stanje_kolicina = _num_from_token(nums[0])
-                    stanje_vrednost = _num_from_token(nums[1]) if len(nums) > 1 else 0.0
-                    dt = datetime.strptime(date_match.group(1), "%d.%m.%Y")
-                    rows.append(
-                        KarticaRow(
-                            sku=current_sku,
-                            article=current_article,
-                            date=dt,
-                            doc="POCETNO",
-                            opis="Početno stanje",
-                            referenca="",
-                            prijem_kolicina=0.0,
-                            prijem_vrednost=0.0,
-                            izdavanje_kolicina=0.0,
-                            izdavanje_vrednost=0.0,
-                            cena=0.0,
-                            stanje_kolicina=stanje_kolicina,
-                            stanje_vrednost=stanje_vrednost,
-                        )
-                    )
-                    continue
-
-                if norm.startswith("konacno stanje na dan"):
-                    date_match = DATE_RE.search(line)
-                    if date_match:
-                        meta["final_pages"] = int(meta.get("final_pages") or 0) + 1
-                        meta["final_end"] = date_match.group(1)
-                    continue
-
-                doc_match = DOC_RE.match(line)
-                date_match = DATE_RE.search(line)
-                if not doc_match or not date_match:
-                    continue
-
-                parsed = _parse_kartica_numeric_tail(line)
-                if parsed is None:
-                    continue
-
-                opis, referenca = _extract_description_and_reference(line, date_match)
-                dt = datetime.strptime(date_match.group(1), "%d.%m.%Y")
-                (
-                    prijem_kolicina,
-                    prijem_vrednost,
-                    izdavanje_kolicina,
-                    izdavanje_vrednost,
-                    cena,
-                    stanje_kolicina,
-                    stanje_vrednost,
-                ) = parsed
-                rows.append(
-                    KarticaRow(
-                        sku=current_sku,
-                        article=current_article,
-                        date=dt,
-                        doc=doc_match.group(1),
-                        opis=opis,
-                        referenca=referenca,
-                        prijem_kolicina=prijem_kolicina,
-                        prijem_vrednost=prijem_vrednost,
-                        izdavanje_kolicina=izdavanje_kolicina,
-                        izdavanje_vrednost=izdavanje_vrednost,
-                        cena=cena,
-                        stanje_kolicina=stanje_kolicina,
-                        stanje_vrednost=stanje_vrednost,
-                    )
-                )
-
+    cache = _open_page_cache(cache_path) if cache_path is not None else None
+    try:
+        with pdfplumber.open(str(pdf_path)) as pdf:
+            page_count = len(pdf.pages)
+            page_records: list[list | None] = [None] * page_count
+            fingerprints: list[str] = []
+            if cache is not None:
+                font_digests: dict = {}
+                fingerprints = [_page_fingerprint(page, font_digests) for page in pdf.pages]
+                cached = _page_cache_get(cache, fingerprints)
+                page_records = [cached.get(fp) for fp in fingerprints]
+            missing = [i for i, records in enumerate(page_records) if records is None]
+
+            n_workers = min(_resolve_workers(workers), len(missing))
+            use_pool = n_workers > 1 and len(missing) >= PARALLEL_MIN_PAGES
+            if not use_pool:
+                for i in missing:
+                    page_records[i] = _parse_page_records(pdf.pages[i].extract_text() or "")
+
+        if use_pool:
+            chunks = _split_pages(missing, n_workers)
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                futures = [pool.submit(_extract_page_records, str(pdf_path), chunk) for chunk in chunks]
+                for chunk, fut in zip(chunks, futures):
+                    for page_no, records in zip(chunk, fut.result()):
+                        page_records[page_no] = records
+
+        meta["page_count"] = page_count
+        if cache is not None:
+            meta["page_cache_hits"] = page_count - len(missing)
+            meta["page_cache_misses"] = len(missing)
+            _page_cache_store(cache, fingerprints, page_records, missing)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    rows = _assemble_kartica_rows(page_records, meta)
     if meta.get("range_end") is None and meta.get("final_end") is not None:
         meta["range_end"] = meta["final_end"]
     setattr(parse_kartica_pdf, "_last_meta", meta)
@@ -267,7 +532,7 @@ def parse_kartica_pdf(pdf_path: Path) -> list[KarticaRow]:
 def extract_kalkulacije(
     excel_path: Path, output_dir: Path, sheet_name: str = "Minimax"
 ) -> tuple[Path, Path]:
-    df = pd.read_excel(excel_path, sheet_name=sheet_name)
+    df = read_sheet(excel_path, sheet_name)
     orig_cols = list(df.columns)
     norm_map = {c: _normalize(c) for c in orig_cols}
 
@@ -342,8 +607,10 @@ def extract_kalkulacije(
     return out_detail, out_agg
 
 
-def extract_zero_intervals(pdf_path: Path, output_dir: Path) -> Path:
-    parsed = parse_kartica_pdf(pdf_path)
+def extract_zero_intervals(
+    pdf_path: Path, output_dir: Path, workers: int = 1, cache_path: Path | None = None
+) -> Path:
+    parsed = parse_kartica_pdf(pdf_path, workers=workers, cache_path=cache_path)
     return write_zero_intervals_from_parsed(parsed, output_dir)
 
 
@@ -491,8 +758,20 @@ def _rewrite_zero_intervals_with_availability(
     out.to_csv(zero_csv, index=False, encoding="utf-8")
 
 
-def extract_kartica_events_and_summary(pdf_path: Path, output_dir: Path) -> tuple[Path, Path, Path]:
-    parsed = parse_kartica_pdf(pdf_path)
+def extract_kartica_events_and_summary(
+    pdf_path: Path, output_dir: Path, workers: int = 1, cache_path: Path | None = None
+) -> tuple[Path, Path, Path]:
+    _, out_events, out_summary, zero_csv = extract_kartica_events_frame(
+        pdf_path, output_dir, workers=workers, cache_path=cache_path
+    )
+    return out_events, out_summary, zero_csv
+
+
+def extract_kartica_events_frame(
+    pdf_path: Path, output_dir: Path, workers: int = 1, cache_path: Path | None = None
+) -> tuple[pd.DataFrame, Path, Path, Path]:
+    """Same as extract_kartica_events_and_summary, plus the events as a DataFrame."""
+    parsed = parse_kartica_pdf(pdf_path, workers=workers, cache_path=cache_path)
     meta = getattr(parse_kartica_pdf, "_last_meta", {}) or {}
 
     def _to_iso(dmy: str | None) -> str | None:
@@ -513,6 +792,9 @@ def extract_kartica_events_and_summary(pdf_path: Path, output_dir: Path) -> tupl
         "final_end_iso": _to_iso(meta.get("final_end") if isinstance(meta, dict) else None),
         "range_pages": meta.get("range_pages"),
         "final_pages": meta.get("final_pages"),
+        "page_count": meta.get("page_count"),
+        "page_cache_hits": meta.get("page_cache_hits"),
+        "page_cache_misses": meta.get("page_cache_misses"),
         "mismatch_final_vs_range_end": (
             bool(meta.get("final_end") and meta.get("range_end") and meta.get("final_end") != meta.get("range_end"))
             if isinstance(meta, dict)
@@ -534,7 +816,7 @@ def extract_kartica_events_and_summary(pdf_path: Path, output_dir: Path) -> tupl
         pd.DataFrame().to_csv(out_events, index=False)
         pd.DataFrame().to_csv(out_summary, index=False)
         pd.DataFrame().to_csv(out_zero, index=False)
-        return out_events, out_summary, out_zero
+        return pd.DataFrame(), out_events, out_summary, out_zero
 
     out_events = output_dir / "kartice_events.csv"
     event_rows = []
@@ -566,12 +848,13 @@ def extract_kartica_events_and_summary(pdf_path: Path, output_dir: Path) -> tupl
                 "Delta kolicina": r.delta_kolicina,
             }
         )
-    pd.DataFrame(event_rows).to_csv(out_events, index=False, encoding="utf-8")
+    events = pd.DataFrame(event_rows)
+    events.to_csv(out_events, index=False, encoding="utf-8")
 
     zero_csv = write_zero_intervals_from_parsed(parsed, output_dir)
     zero_intervals = _load_zero_intervals(zero_csv)
 
-    df = pd.DataFrame(event_rows)
+    df = events.copy()
     df["Datum_dt"] = df["Datum"].apply(_parse_date)
     df = df.loc[df["Datum_dt"].notna()]
 
@@ -638,7 +921,7 @@ def extract_kartica_events_and_summary(pdf_path: Path, output_dir: Path) -> tupl
 
     out_summary = output_dir / "kartice_sku_summary.csv"
     pd.DataFrame(summary_rows).to_csv(out_summary, index=False, encoding="utf-8")
-    return out_events, out_summary, zero_csv
+    return events, out_events, out_summary, zero_csv
 
 
 def _iter_sales_files(sales_path: Path) -> list[Path]:
@@ -657,12 +940,38 @@ def _iter_receipt_files(receipts_path: Path) -> list[Path]:
     return sorted([p for p in receipts_path.glob("*.xlsx") if p.is_file()])
 
 
-def _load_receipt_rows(receipts_path: Path) -> pd.DataFrame:
+# Columns (after _normalize) the receipts summary / sales availability use;
+# the sheets are read without the rest.
+RECEIPT_COLUMNS = frozenset(
+    {"Sifra proizvoda", "Ime proizvoda", "Status", "Poslata kolicina", "Pristigla kolicina", "Datum verifikacije"}
+)
+SALES_COLUMNS = frozenset(
+    {
+        "Status",
+        "Sifra proizvoda",
+        "Kolicina proizvoda",
+        "Otkup proizvoda",
+        "Popust proizvoda",
+        "Datum isporuke",
+        "Datum kreiranja",
+        "Datum",
+    }
+)
+
+
+def _receipt_column(name) -> bool:
+    return _normalize(name) in RECEIPT_COLUMNS
+
+
+def _sales_column(name) -> bool:
+    return _normalize(name) in SALES_COLUMNS
+
+
+def _load_receipt_rows(receipts_path: Path, sheet_cache: SheetCache | None = None) -> pd.DataFrame:
     frames = []
     for path in _iter_receipt_files(receipts_path):
-        xls = pd.ExcelFile(path)
-        for sheet in xls.sheet_names:
-            df = pd.read_excel(path, sheet_name=sheet)
+        for sheet in sheet_names(path):
+            df = read_sheet(path, sheet, columns=_receipt_column, cache=sheet_cache)
             if df.empty:
                 continue
             norm_cols = {c: _normalize(c) for c in df.columns}
@@ -677,15 +986,28 @@ def _load_receipt_rows(receipts_path: Path) -> pd.DataFrame:
     return pd.concat(frames, ignore_index=True)
 
 
-def build_receipts_summary(receipts_path: Path, output_dir: Path) -> tuple[Path | None, Path | None]:
-    df = _load_receipt_rows(receipts_path)
+def build_receipts_summary(
+    receipts_path: Path, output_dir: Path, sheet_cache: SheetCache | None = None
+) -> tuple[Path | None, Path | None]:
+    _, out_detail, out_summary = build_receipts_summary_frame(receipts_path, output_dir, sheet_cache)
+    return out_detail, out_summary
+
+
+def build_receipts_summary_frame(
+    receipts_path: Path, output_dir: Path, sheet_cache: SheetCache | None = None
+) -> tuple[pd.DataFrame, Path | None, Path | None]:
+    """
+    Same as build_receipts_summary, plus the per-SKU summary as a DataFrame.
+    With `sheet_cache`, unchanged Prijemi workbooks are loaded from it instead of re-parsed.
+    """
+    df = _load_receipt_rows(receipts_path, sheet_cache)
     if df.empty:
-        return None, None
+        return pd.DataFrame(), None, None
 
     df["SKU"] = df["Sifra proizvoda"].astype(str).str.strip()
     df = df.loc[df["SKU"].astype(str).str.len() > 0]
     if df.empty:
-        return None, None
+        return pd.DataFrame(), None, None
 
     def _num(name: str) -> pd.Series:
         if name in df.columns:
@@ -728,7 +1050,7 @@ def build_receipts_summary(receipts_path: Path, output_dir: Path) -> tuple[Path
 
     out_summary = output_dir / "sp_prijemi_summary.csv"
     grp.to_csv(out_summary, index=False, encoding="utf-8")
-    return out_detail, out_summary
+    return grp, out_detail, out_summary
 
 
 def merge_receipts_into_kartice_summary(kartice_summary: Path, receipts_summary: Path) -> Path:
@@ -762,13 +1084,35 @@ def merge_receipts_into_kartice_summary(kartice_summary: Path, receipts_summary:
     return kartice_summary
 
 
+def run_kartice_stage(
+    pdf_path: Path,
+    prijemi_path: Path,
+    output_dir: Path,
+    workers: int = 1,
+    cache_path: Path | None = None,
+    sheet_cache: SheetCache | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    In-process equivalent of `--skip-excel --pdf ... --prijemi ... [--sheet-cache ...]`.
+    Writes the same CSV artifacts and returns (events, receipts_summary).
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    events, _, summary_path, zero_path = extract_kartica_events_frame(
+        pdf_path, output_dir, workers=workers, cache_path=cache_path
+    )
+    receipts, _, receipts_summary = build_receipts_summary_frame(prijemi_path, output_dir, sheet_cache)
+    if receipts_summary:
+        merge_receipts_into_kartice_summary(summary_path, receipts_summary)
+        _rewrite_zero_intervals_with_availability(zero_path, receipts_summary)
+    return events, receipts
+
+
 def _load_sales_rows(sales_path: Path) -> pd.DataFrame:
     frames = []
     files = _iter_sales_files(sales_path)
     for path in files:
-        xls = pd.ExcelFile(path)
-        for sheet in xls.sheet_names:
-            df = pd.read_excel(path, sheet_name=sheet)
+        for sheet in sheet_names(path):
+            df = read_sheet(path, sheet, columns=_sales_column)
             if df.empty:
                 continue
             norm_cols = {c: _normalize(c) for c in df.columns}
@@ -943,6 +1287,30 @@ def main() -> int:
         action="store_true",
         help="Skip PDF parsing for kartice",
     )
+    parser.add_argument(
+        "--pdf-workers",
+        type=int,
+        default=1,
+        help="Worker processes for PDF parsing (1 = sequential, 0 = all cores)",
+    )
+    parser.add_argument(
+        "--page-cache",
+        type=Path,
+        default=None,
+        help="Optional SQLite file for the per-page kartica parse cache (re-parse only changed pages)",
+    )
+    parser.add_argument(
+        "--sheet-cache",
+        type=Path,
+        default=None,
+        help="Optional SQLite parsed-sheet cache (SP Prijemi workbooks are re-parsed only when changed)",
+    )
+    parser.add_argument(
+        "--sheet-cache-mb",
+        type=float,
+        default=DEFAULT_SHEET_CACHE_MB,
+        help="Size limit of --sheet-cache in MB",
+    )
     parser.add_argument(
         "--skip-excel",
         action="store_true",
@@ -979,6 +1347,11 @@ def main() -> int:
         help="Build SP sales availability + net loss CSVs (legacy; uses SP-Narudzbe).",
     )
     args = parser.parse_args()
+    sheet_cache = (
+        SheetCache(args.sheet_cache, max_bytes=int(args.sheet_cache_mb * 1024 * 1024))
+        if args.sheet_cache is not None
+        else None
+    )
 
     args.out.mkdir(parents=True, exist_ok=True)
     detail_path = args.out / "kalkulacije_marza.csv"
@@ -990,8 +1363,14 @@ def main() -> int:
 
     if not args.skip_pdf:
         events_path, summary_path, zero_path = extract_kartica_events_and_summary(
-            args.pdf, args.out
+            args.pdf, args.out, workers=args.pdf_workers, cache_path=args.page_cache
         )
+        meta = getattr(parse_kartica_pdf, "_last_meta", {}) or {}
+        if meta.get("page_cache_hits") is not None:
+            print(
+                f"kartice page cache: {meta.get('page_cache_hits')} hit / "
+                f"{meta.get('page_cache_misses')} miss ({meta.get('page_count')} strana)"
+            )
         print(f"kartice events: {events_path}")
         print(f"kartice summary: {summary_path}")
         print(f"kartice zero: {zero_path}")
@@ -999,7 +1378,7 @@ def main() -> int:
         zero_path = args.out / "kartice_zero_intervali.csv"
 
     if not args.skip_prijemi:
-        receipts_detail, receipts_summary = build_receipts_summary(args.prijemi, args.out)
+        receipts_detail, receipts_summary = build_receipts_summary(args.prijemi, args.out, sheet_cache)
         if receipts_detail and receipts_summary:
             print(f"sp prijemi detail: {receipts_detail}")
             print(f"sp prijemi summary: {receipts_summary}")
@@ -0,0 +1,524 @@
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from .startup import lazy_import
+
+pd = lazy_import("pandas")
+
+# Orders per 1.0 of scale; everything else (items, payments, invoices, bank
+# lines, stock-card rows) follows from the orders.
+ORDERS_PER_SCALE = 2000
+ORDERS_PER_FILE = 500
+RESULT_VERSION = 1
+
+_FIRST = ["Marko", "Jelena", "Nikola", "Milica", "Stefan", "Ana", "Ivana", "Dorde", "Snezana", "Petar",
+          "Jovana", "Milena", "Dragana", "Bojana", "Katarina", "Sofija"]
+_LAST = ["Petrovic", "Jovanovic", "Nikolic", "Markovic", "Dordevic", "Ilic", "Stojanovic", "Pavlovic",
+         "Stevanovic", "Ristic", "Mudrinic", "Isakovic"]
+_CITIES = [("Beograd", "11000"), ("Novi Sad", "21000"), ("Nis", "18000"), ("Kragujevac", "34000"),
+           ("Subotica", "24000"), ("Mladenovac", "11400"), ("Sokobanja", "18230"), ("Cacak", "32000")]
+_SKU_PREFIXES = ["AF-", "RR-", "OPK-", "DR-", "KRR-", "TRK-", "EKS-", "BD-", "SIS-", "PR"]
+_REFUND_PHRASES = ["Povrat robe", "Reklamirana roba - povrat sredstava", "Povrat robe - storno"]
+_EXPENSES = [
+    ("ZAKUPODAVAC DOO", "Zakup poslovnog prostora", 45000.0),
+    ("D EXPRESS DOO", "Kurirske usluge", 18000.0),
+    ("TELEKOM SRBIJA", "Racun za internet", 3500.0),
+    ("META PLATFORMS IRELAND", "Facebook ads", 25000.0),
+]
+_SP_PAYEE = "SLANJE PAKETA DOO, ZIKE MARICICA 20,"
+
+
+@dataclass
+class BenchData:
+    """Row sets for one synthetic data set; written to disk by write_bench_inputs."""
+
+    scale: float
+    seed: int
+    orders: list[dict] = field(default_factory=list)
+    payments: list[dict] = field(default_factory=list)
+    invoices: list[dict] = field(default_factory=list)
+    bank: list[dict] = field(default_factory=list)
+    kartica: dict[str, list[dict]] = field(default_factory=dict)
+    articles: dict[str, str] = field(default_factory=dict)
+    start: date = date(2025, 1, 1)
+    end: date = date(2025, 1, 1)
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "orders": len(self.orders),
+            "order_rows": sum(len(o["items"]) for o in self.orders),
+            "payments": len(self.payments),
+            "return_rows": sum(len(o["items"]) for o in self.orders if o["status"] != "Poslato"),
+            "invoices": len(self.invoices),
+            "bank_txns": len(self.bank),
+            "kartice_events": sum(len(rows) for rows in self.kartica.values()),
+            "skus": len(self.articles),
+        }
+
+
+def _dmy(d: date) -> str:
+    return d.strftime("%d.%m.%Y")
+
+
+def synthetic_bench_data(scale: float = 1.0, *, seed: int = 19) -> BenchData:
+    """
+    Deterministic SP orders, payments, Minimax invoices, bank lines and stock
+    card rows that reference each other the way the real exports do: invoices
+    follow delivered orders (some with re-cased names), bank credits repeat SP
+    payment amounts near the pickup date, refunds quote invoice numbers and
+    stock cards issue every invoiced item. Same (scale, seed), same rows.
+    """
+    rng = random.Random(seed)
+    n_orders = max(20, int(round(ORDERS_PER_SCALE * scale)))
+    n_skus = max(5, int(round(40 * max(scale, 0.01) ** 0.5)))
+    days = max(30, n_orders // 20)
+    data = BenchData(scale=scale, seed=seed, start=date(2025, 1, 1))
+    data.end = data.start + timedelta(days=days + 10)
+
+    prices: dict[str, float] = {}
+    for k in range(n_skus):
+        sku = f"{_SKU_PREFIXES[k % len(_SKU_PREFIXES)]}{k // len(_SKU_PREFIXES) + 1}"
+        data.articles[sku] = f"{sku} - Artikal {k + 1}"
+        prices[sku] = float(rng.randrange(1990, 9990, 100))
+    skus = list(data.articles)
+
+    invoice_seq = 0
+    for no in range(1, n_orders + 1):
+        name = f"{rng.choice(_FIRST)} {rng.choice(_LAST)}"
+        city, postal = rng.choice(_CITIES)
+        created = data.start + timedelta(days=rng.randrange(days))
+        picked = created + timedelta(days=rng.choice([0, 0, 1]))
+        delivered = picked + timedelta(days=rng.randrange(1, 5))
+        roll = rng.random()
+        status = "Isporučeno" if roll < 0.82 else "Vraćeno" if roll < 0.9 else "Poslato" if roll < 0.97 else "Otkazano"
+        items = []
+        for sku in rng.sample(skus, rng.choice([1, 1, 1, 2, 2, 3])):
+            qty = rng.choice([1, 1, 1, 1, 2])
+            discount = rng.choice([0.0, 0.0, 10.0, 22.47])
+            items.append({"sku": sku, "qty": qty, "price": prices[sku], "discount": discount})
+        total = round(sum(i["qty"] * i["price"] * (1 - i["discount"] / 100.0) for i in items), 2)
+        order = {
+            "sp_order_no": no,
+            "name": name,
+            "city": city,
+            "postal": postal,
+            "phone": f"06{rng.randrange(10**7, 10**8)}",
+            "tracking": f"VN{no + 570000:010d}",
+            "status": status,
+            "created": created,
+            "picked": picked,
+            "delivered": delivered if status == "Isporučeno" else None,
+            "items": items,
+            "total": total,
+            "invoice": None,
+        }
+        data.orders.append(order)
+
+        if status == "Otkazano":
+            continue
+        if status in {"Isporučeno", "Poslato"} and rng.random() < 0.92:
+            # "Poslato" orders that show up as paid are flipped to delivered by the payment import.
+            data.payments.append(
+                {"sp_order_no": no, "name": name, "amount": total, "picked": picked}
+            )
+        if rng.random() < 0.1:
+            continue
+        invoice_seq += 1
+        number = f"SP-MM-{picked.year}{invoice_seq:06d}"
+        order["invoice"] = number
+        inv_name = name
+        if rng.random() < 0.12:
+            inv_name = name.upper() + "."
+        turnover = picked + timedelta(days=rng.choice([0, 0, 1, 1, 2]))
+        data.invoices.append(
+            {
+                "number": number,
+                "name": inv_name,
+                "date": datetime.combine(turnover, datetime.min.time()) + timedelta(
+                    hours=rng.randrange(8, 20), minutes=rng.randrange(60)
+                ),
+                "turnover": turnover,
+                "amount": total,
+                "open": 0.0 if status == "Isporučeno" else total,
+            }
+        )
+
+    fitid = 9704903209880000
+    for pay in data.payments:
+        if rng.random() < 0.7:
+            fitid += 1
+            data.bank.append(
+                {
+                    "fitid": str(fitid),
+                    "benefit": "credit",
+                    "payee": _SP_PAYEE,
+                    "city": "KUPINOVO (PECINCI)",
+                    "date": pay["picked"] + timedelta(days=rng.randrange(0, 4)),
+                    "amount": pay["amount"],
+                    "purpose": f"Isplata klijentu prema ugovoru [FT{fitid % 10**10}]",
+                    "purposecode": "290",
+                }
+            )
+    for order in data.orders:
+        if order["status"] == "Vraćeno" and order["invoice"] and rng.random() < 0.5:
+            fitid += 1
+            data.bank.append(
+                {
+                    "fitid": str(fitid),
+                    "benefit": "debit",
+                    "payee": order["name"].upper(),
+                    "city": order["city"].upper(),
+                    "date": order["picked"] + timedelta(days=rng.randrange(7, 20)),
+                    "amount": order["total"],
+                    "purpose": f"{rng.choice(_REFUND_PHRASES)} {order['invoice']}",
+                    "purposecode": "289",
+                }
+            )
+    month = date(data.start.year, data.start.month, 5)
+    while month <= data.end:
+        for payee, purpose, amount in _EXPENSES:
+            fitid += 1
+            data.bank.append(
+                {
+                    "fitid": str(fitid),
+                    "benefit": "debit",
+                    "payee": payee,
+                    "city": "BEOGRAD",
+                    "date": month + timedelta(days=rng.randrange(0, 20)),
+                    "amount": round(amount * rng.uniform(0.8, 1.2), 2),
+                    "purpose": f"{purpose} {month.strftime('%m/%Y')}",
+                    "purposecode": "221",
+                }
+            )
+        month = date(month.year + (month.month == 12), month.month % 12 + 1, 5)
+    data.bank.sort(key=lambda t: (t["date"], t["fitid"]))
+
+    _build_kartica(data, rng)
+    return data
+
+
+def _build_kartica(data: BenchData, rng: random.Random) -> None:
+    """Stock card rows per SKU: receipts (PS) whenever stock runs low, one IS row per shipped item."""
+    moves: dict[str, list[tuple]] = {sku: [] for sku in data.articles}
+    for order in data.orders:
+        if order["status"] == "Otkazano":
+            continue
+        for item in order["items"]:
+            moves[item["sku"]].append((order["picked"], item["qty"], order))
+            if order["status"] == "Vraćeno":
+                moves[item["sku"]].append((order["picked"] + timedelta(days=6), -item["qty"], order))
+    is_no = ps_no = 0
+    for sku, events in moves.items():
+        events.sort(key=lambda e: (e[0], e[2]["sp_order_no"], -e[1]))
+        cost = round(rng.uniform(600.0, 1800.0), 6)
+        stock = 0
+        rows: list[dict] = []
+
+        def receipt(on: date) -> None:
+            nonlocal stock, ps_no
+            ps_no += 1
+            qty = rng.choice([30, 40, 50])
+            stock += qty
+            rows.append(
+                {"doc": f"PS-{ps_no}", "date": on, "opis": "", "ref": "", "partner": "XUCHANG MORGAN HAIR PRODUCTS CO.",
+                 "in_qty": qty, "out_qty": 0, "cost": cost, "stock": stock}
+            )
+
+        for on, qty, order in events:
+            if stock - qty < 0:
+                receipt(on)
+            is_no += 1
+            stock -= qty
+            invoice = order["invoice"] or ""
+            opis = "Povrat robe" if qty < 0 else (f"Iz izdatog racuna: {invoice}" if invoice else "online prodaja")
+            rows.append(
+                {"doc": f"IS-{is_no}", "date": on, "opis": opis, "ref": invoice if qty > 0 else "",
+                 "partner": order["name"], "in_qty": 0, "out_qty": qty, "cost": cost, "stock": stock}
+            )
+        data.kartica[sku] = rows
+
+
+def _sr_number(value: float, decimals: int = 2) -> str:
+    text = f"{abs(value):,.{decimals}f}".replace(",", " ").replace(".", ",").replace(" ", ".")
+    return ("-" if value < 0 else "") + text
+
+
+def _kartica_lines(data: BenchData) -> list[str]:
+    lines = [
+        "FEMMAS D.O.O. BEOGRAD (PALILULA)",
+        f"KARTICA ZALIHA {_dmy(data.start)} - {_dmy(data.end)}",
+        "Broj Datum Opis PRIJEM IZDAVANJE Cena STANJE ZALIHA",
+    ]
+    for sku, rows in data.kartica.items():
+        lines.append(f"ARTIKAL: {data.articles[sku]} ({sku}) kom")
+        lines.append(f"Pocetno stanje na dan {_dmy(data.start)}: 0 0,00 0,00")
+        for r in rows:
+            in_val = r["in_qty"] * r["cost"]
+            out_val = r["out_qty"] * r["cost"]
+            nums = [
+                _sr_number(r["in_qty"], 0), _sr_number(in_val), _sr_number(r["out_qty"], 0), _sr_number(out_val),
+                _sr_number(r["cost"], 6), _sr_number(r["stock"], 0), _sr_number(r["stock"] * r["cost"]),
+            ]
+            lines.append(" ".join([r["doc"], _dmy(r["date"]), r["opis"], *nums]).replace("  ", " "))
+            lines.append(f"{r['partner']} Skladiste Slanje Paketa")
+        lines.append(f"Konacno stanje na dan {_dmy(data.end)}")
+    return lines
+
+
+def write_text_pdf(path: Path, lines: list[str], *, lines_per_page: int = 52) -> int:
+    """
+    Minimal landscape A4 PDF (Helvetica, one text line per row) that pdfplumber
+    reads back line by line, like the Minimax stock card export. Text must be
+    Latin-1. Returns the page count.
+    """
+    pages = [lines[i : i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects: list[bytes] = []
+
+    def pdf_str(text: str) -> str:
+        return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+    n = len(pages)
+    font_id = 3
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(n))
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    for i, page in enumerate(pages):
+        body = ["BT", "/F1 7 Tf", "10 TL", "20 570 Td"]
+        for line in page:
+            body.append(f"{pdf_str(line)} Tj T*")
+        body.append(f"{pdf_str(f'Odstampano: {i + 1}/{n}')} Tj")
+        body.append("ET")
+        stream = "\n".join(body).encode("latin-1", errors="replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 842 595] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{num} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    Path(path).write_bytes(bytes(out))
+    return n
+
+
+def _bank_xml(stmt_number: int, txns: list[dict]) -> str:
+    parts = [
+        "<stmtrslist><stmtrs><rstype>ibank.payment.stmtrs.past</rstype><curdef>RSD</curdef>"
+        f"<acctid>220-0000000163444-95</acctid><stmtnumber>{stmt_number}</stmtnumber>"
+        f'<trnlist count="{len(txns)}">'
+    ]
+    for t in txns:
+        parts.append(
+            "<stmttrn><trntype>ibank.payment.pp3</trntype>"
+            f"<fitid>{t['fitid']}</fitid><trnuid /><benefit>{t['benefit']}</benefit>"
+            f"<payeeinfo><name>{escape(t['payee'])}</name><city>{escape(t['city'])}</city></payeeinfo>"
+            "<payeeaccountinfo><acctid>340-0000011022293-60</acctid><bankid>340</bankid>"
+            "<bankname>Erste Banka</bankname></payeeaccountinfo>"
+            f"<dtposted>{t['date'].isoformat()}T00:00:00</dtposted><trnamt>{t['amount']:.2f}</trnamt>"
+            f"<purpose>{escape(t['purpose'])}</purpose><purposecode>{t['purposecode']}</purposecode>"
+            "<curdef>RSD</curdef><payeerefnumber /><refnumber /><urgency>INT</urgency><fee>0.00</fee>"
+            "</stmttrn>"
+        )
+    parts.append("</trnlist></stmtrs></stmtrslist>")
+    return "".join(parts)
+
+
+def write_bench_inputs(
+    root: Path,
+    data: BenchData,
+    *,
+    col: dict[str, str],
+    sheet_orders: str,
+    sheet_payments: str,
+    sheet_minimax: str,
+) -> dict[str, list[Path]]:
+    """
+    Writes `data` in the app's input layout under `root`: SP Narudzbe / SP Uplate /
+    SP Preuzimanja xlsx (ORDERS_PER_FILE orders per file), one Minimax xlsx, one
+    bank XML statement per month (UTF-16, like the e-banking export), a
+    kartice_events.csv in the extractor's format, the stock card PDF and an empty
+    Sp Prijemi folder. Returns the written paths per source.
+    """
+    root = Path(root)
+    out: dict[str, list[Path]] = {k: [] for k in ("orders", "payments", "returns", "minimax", "bank", "kartice", "pdf")}
+    for folder in ("SP Narudzbe", "SP Uplate", "SP Preuzimanja", "Minimax", "Banka XML", "Kartice artikala", "Sp Prijemi"):
+        (root / folder).mkdir(parents=True, exist_ok=True)
+
+    order_cols = [
+        col[k]
+        for k in (
+            "client", "tracking", "sp_order_no", "woo_order_no", "location", "customer_code", "customer_name",
+            "city", "address", "postal_code", "phone", "email", "note", "product_code", "qty", "cod_amount",
+            "advance_amount", "discount", "discount_type", "addon_cod", "addon_advance", "extra_discount",
+            "extra_discount_type", "status", "created_at", "picked_up_at", "delivered_at",
+        )
+    ]
+    for part, start in enumerate(range(0, len(data.orders), ORDERS_PER_FILE), start=1):
+        chunk = data.orders[start : start + ORDERS_PER_FILE]
+        rows = []
+        for o in chunk:
+            for item in o["items"]:
+                rows.append(
+                    [
+                        "K0173", o["tracking"], o["sp_order_no"], None, "Slanje Paketa magacin",
+                        f"SP_TEST_K0173_{o['sp_order_no']}", o["name"], o["city"], f"Ulica {o['sp_order_no'] % 97 + 1}",
+                        o["postal"], o["phone"], None, None, item["sku"], item["qty"], item["price"] * item["qty"],
+                        0, item["discount"], "Procenat", 0, 0, 0, "Procenat", o["status"],
+                        _dmy(o["created"]) + ".", _dmy(o["picked"]) + ".",
+                        _dmy(o["delivered"]) + "." if o["delivered"] else None,
+                    ]
+                )
+        path = root / "SP Narudzbe" / f"Slanje Paketa - Porudzbine ({part}).xlsx"
+        pd.DataFrame(rows, columns=order_cols).to_excel(path, sheet_name=sheet_orders, index=False)
+        out["orders"].append(path)
+
+        returns = [r for r in rows if r[23] != "Poslato"]
+        path = root / "SP Preuzimanja" / f"Slanje Paketa - Preuzimanja ({part}).xlsx"
+        pd.DataFrame(returns, columns=order_cols).to_excel(path, sheet_name=sheet_orders, index=False)
+        out["returns"].append(path)
+
+    pay_cols = [col[k] for k in ("client", "sp_order_no", "customer_code", "payment_customer_name",
+                                 "payment_amount", "payment_order_status", "payment_client_status")]
+    for part, start in enumerate(range(0, len(data.payments), ORDERS_PER_FILE), start=1):
+        rows = [
+            ["K0173", p["sp_order_no"], f"SP_TEST_K0173_{p['sp_order_no']}", p["name"], p["amount"],
+             "Isporučeno", "Uplaćeno"]
+            for p in data.payments[start : start + ORDERS_PER_FILE]
+        ]
+        path = root / "SP Uplate" / f"{part}.xlsx"
+        pd.DataFrame(rows, columns=pay_cols).to_excel(path, sheet_name=sheet_payments, index=False)
+        out["payments"].append(path)
+
+    mm_keys = ("mm_number", "mm_customer", "mm_country", "mm_date", "mm_due_date", "mm_revenue", "mm_amount_local",
+               "mm_amount_due", "mm_analytics", "mm_turnover", "mm_account", "mm_basis", "mm_note",
+               "mm_payment_amount", "mm_open_amount")
+    rows = []
+    for inv in sorted(data.invoices, key=lambda i: i["number"], reverse=True):
+        turnover = datetime.combine(inv["turnover"], datetime.min.time())
+        rows.append(
+            [inv["number"], inv["name"], "Republika Srbija", inv["date"], turnover, round(inv["amount"] / 1.2, 2),
+             None, inv["amount"], None, turnover, None, None, None, inv["amount"] - inv["open"], inv["open"]]
+        )
+    path = root / "Minimax" / f"Izdati racuni za period od {_dmy(data.start)} do {_dmy(data.end)}.xlsx"
+    pd.DataFrame(rows, columns=[col[k] for k in mm_keys]).to_excel(path, sheet_name=sheet_minimax, index=False)
+    out["minimax"].append(path)
+
+    by_month: dict[tuple[int, int], list[dict]] = {}
+    for t in data.bank:
+        by_month.setdefault((t["date"].year, t["date"].month), []).append(t)
+    for stmt, ((year, month), txns) in enumerate(sorted(by_month.items()), start=1):
+        path = root / "Banka XML" / f"{stmt}_220000000016344495_{year}{month:02d}01000000_0.xml"
+        path.write_bytes(_bank_xml(stmt, txns).encode("utf-16"))
+        out["bank"].append(path)
+
+    events = []
+    for sku, card in data.kartica.items():
+        for r in card:
+            smer = "PRIJEM" if r["in_qty"] else ("POVRAT" if r["out_qty"] < 0 else "IZDAVANJE")
+            events.append(
+                {
+                    "SKU": sku,
+                    "Artikal": f"{data.articles[sku]} ({sku}) kom",
+                    "Datum": r["date"].isoformat(),
+                    "Broj": r["doc"],
+                    "Tip": r["doc"].split("-", 1)[0],
+                    "Smer": smer,
+                    "Opis": r["opis"],
+                    "Referenca": r["ref"],
+                    "Prijem kolicina": float(r["in_qty"]),
+                    "Prijem vrednost": round(r["in_qty"] * r["cost"], 2),
+                    "Izdavanje kolicina": float(r["out_qty"]),
+                    "Izdavanje vrednost": round(r["out_qty"] * r["cost"], 2),
+                    "Cena": r["cost"],
+                    "Stanje zaliha kolicina": float(r["stock"]),
+                    "Stanje zaliha vrednost": round(r["stock"] * r["cost"], 2),
+                    "Delta kolicina": float(r["in_qty"] - r["out_qty"]),
+                }
+            )
+    path = root / "kartice_events.csv"
+    pd.DataFrame(events).to_csv(path, index=False, encoding="utf-8")
+    out["kartice"].append(path)
+
+    path = root / "Kartice artikala" / "kartica_artikala.pdf"
+    write_text_pdf(path, _kartica_lines(data))
+    out["pdf"].append(path)
+    return out
+
+
+def timed_median(fn, repeat: int) -> tuple[float, list[float]]:
+    """Runs fn() `repeat` times; returns (median seconds, all timings)."""
+    times = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), times
+
+
+def compare_bench_results(old: dict, new: dict, *, tolerance: float = 0.10) -> list[dict]:
+    """
+    Stage-by-stage comparison of two bench result dicts (as written by the
+    bench command). ratio = new / old seconds; status is "sporije" / "brze"
+    outside +-tolerance, "isto" inside, "novo" / "nema" for one-sided stages.
+    """
+    rows = []
+    old_stages = old.get("stages", {})
+    new_stages = new.get("stages", {})
+    for name in list(old_stages) + [n for n in new_stages if n not in old_stages]:
+        o = old_stages.get(name, {}).get("seconds")
+        n = new_stages.get(name, {}).get("seconds")
+        ratio = n / o if o and n is not None else None
+        if o is None:
+            status = "novo"
+        elif n is None:
+            status = "nema"
+        elif ratio is None:
+            status = "isto"
+        elif ratio > 1 + tolerance:
+            status = "sporije"
+        elif ratio < 1 - tolerance:
+            status = "brze"
+        else:
+            status = "isto"
+        rows.append({"stage": name, "old": o, "new": n, "ratio": ratio, "status": status})
+    return rows
+
+
+def format_bench_report(result: dict, baseline: dict | None = None, *, tolerance: float = 0.10) -> str:
+    lines = [
+        f"Bench scale={result.get('scale')} seed={result.get('seed')} "
+        f"({', '.join(f'{k}={v}' for k, v in result.get('inputs', {}).items())})"
+    ]
+    if baseline is None:
+        for name, stage in result.get("stages", {}).items():
+            rate = f" ({stage['per_s']:.0f}/s)" if stage.get("per_s") else ""
+            lines.append(f"  {name:<24} {stage['seconds']:8.3f}s{rate}")
+        lines.append(f"  {'ukupno':<24} {result.get('total_seconds', 0.0):8.3f}s")
+        return "\n".join(lines)
+    lines = [f"Poredjenje sa {baseline.get('created_at') or '-'} (commit {baseline.get('commit') or '-'}):"]
+    if (baseline.get("scale"), baseline.get("seed")) != (result.get("scale"), result.get("seed")):
+        lines.append(
+            f"  Upozorenje: poredjenje sa scale={baseline.get('scale')} seed={baseline.get('seed')}"
+        )
+    for row in compare_bench_results(baseline, result, tolerance=tolerance):
+        old = f"{row['old']:.3f}s" if row["old"] is not None else "-"
+        new = f"{row['new']:.3f}s" if row["new"] is not None else "-"
+        ratio = f"x{row['ratio']:.2f}" if row["ratio"] is not None else ""
+        lines.append(f"  {row['stage']:<24} {old:>10} -> {new:>10} {ratio:>7} {row['status']}")
+    return "\n".join(lines)
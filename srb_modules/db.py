@@ -1,14 +1,151 @@
 import hashlib
 import sqlite3
+import threading
 from pathlib import Path
 
+from .order_totals import backfill_order_totals
+from .progress_bus import publish as publish_progress
+from .queries import ISO_DATE_COLUMNS, date_expr
 
-def connect_db(db_path: Path) -> sqlite3.Connection:
+
+def connect_db(db_path: Path, *, wal: bool = False) -> sqlite3.Connection:
     conn = sqlite3.connect(db_path)
     conn.execute("PRAGMA foreign_keys = ON;")
+    if wal:
+        _apply_wal_pragmas(conn)
     return conn
 
 
+def _apply_wal_pragmas(conn: sqlite3.Connection) -> None:
+    # journal_mode=WAL is stored in the DB file, so child processes that open it
+    # with plain connect_db() also get non-blocking readers.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+
+
+class PooledConnection(sqlite3.Connection):
+    """close() hands the connection back to its pool instead of closing it."""
+
+    _pool: "ConnectionPool | None" = None
+    _is_writer = False
+    _checked_out = False
+
+    def close(self) -> None:
+        pool = self._pool
+        if pool is None:
+            super().close()
+            return
+        # A second close() of the same checkout is a no-op (it would hand the
+        # connection out twice, or release the writer lock twice).
+        with pool._lock:
+            if not self._checked_out:
+                return
+            self._checked_out = False
+        pool._release(self)
+
+    def close_now(self) -> None:
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Reusable connections for one DB file: up to `size` idle read connections and
+    a single writer connection that one thread holds at a time (writer() blocks
+    until the previous holder calls close()). Reader checkout never blocks; past
+    `size` idle connections extra ones are closed on release.
+    Callers keep the usual `conn = ...; try: ... finally: conn.close()` pattern.
+    """
+
+    def __init__(self, db_path: Path, *, size: int = 4, wal: bool = True) -> None:
+        self.db_path = Path(db_path)
+        self.size = max(1, int(size))
+        self.wal = wal
+        self._lock = threading.Lock()
+        self._idle: list[PooledConnection] = []
+        self._writer: PooledConnection | None = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+        self.opened = 0
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path, factory=PooledConnection, check_same_thread=False
+        )
+        conn.execute("PRAGMA foreign_keys = ON;")
+        if self.wal:
+            _apply_wal_pragmas(conn)
+        else:
+            conn.execute("PRAGMA busy_timeout=5000")
+        conn._pool = self
+        self.opened += 1
+        return conn
+
+    def reader(self) -> PooledConnection:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ConnectionPool je zatvoren.")
+            if self._idle:
+                conn = self._idle.pop()
+                conn._checked_out = True
+                return conn
+        conn = self._open()
+        conn._checked_out = True
+        return conn
+
+    def writer(self, timeout: float = -1) -> PooledConnection:
+        if not self._writer_lock.acquire(timeout=timeout):
+            raise TimeoutError("Writer konekcija je zauzeta.")
+        try:
+            if self._closed:
+                raise RuntimeError("ConnectionPool je zatvoren.")
+            if self._writer is None:
+                self._writer = self._open()
+                self._writer._is_writer = True
+            self._writer._checked_out = True
+        except Exception:
+            self._writer_lock.release()
+            raise
+        return self._writer
+
+    def _release(self, conn: PooledConnection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close_now()
+            if conn._is_writer:
+                self._writer = None
+                self._writer_lock.release()
+            return
+        if conn._is_writer:
+            if self._closed:
+                conn.close_now()
+                self._writer = None
+            self._writer_lock.release()
+            return
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close_now()
+
+    def close_all(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close_now()
+        if self._writer_lock.acquire(blocking=False):
+            try:
+                if self._writer is not None:
+                    self._writer.close_now()
+                    self._writer = None
+            finally:
+                self._writer_lock.release()
+
+
 def set_task_progress(conn: sqlite3.Connection, task: str, total: int) -> None:
     conn.execute(
         "INSERT INTO task_progress (task, total, processed, updated_at) "
@@ -18,6 +155,7 @@ def set_task_progress(conn: sqlite3.Connection, task: str, total: int) -> None:
         (task, total),
     )
     conn.commit()
+    publish_progress(task, total=total)
 
 
 def update_task_progress(conn: sqlite3.Connection, task: str, processed: int) -> None:
@@ -27,6 +165,7 @@ def update_task_progress(conn: sqlite3.Connection, task: str, processed: int) ->
         (processed, task),
     )
     conn.commit()
+    publish_progress(task, processed=processed)
 
 
 def get_task_progress(conn: sqlite3.Connection, task: str):
@@ -66,11 +205,29 @@ def get_app_state(conn: sqlite3.Connection, key: str) -> str | None:
     return row[0]
 
 
-def ensure_column(conn: sqlite3.Connection, table: str, column: str, col_type: str) -> None:
+def ensure_column(conn: sqlite3.Connection, table: str, column: str, col_type: str) -> bool:
     cols = conn.execute(f"PRAGMA table_info({table})").fetchall()
     if any(row[1] == column for row in cols):
-        return
+        return False
     conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+    return True
+
+
+def ensure_iso_date_columns(conn: sqlite3.Connection) -> None:
+    # `<col>_iso` are VIRTUAL generated columns (SQLite >= 3.31): computed on read,
+    # so imports pay nothing per row and the index keeps range scans cheap.
+    for table, columns in ISO_DATE_COLUMNS.items():
+        # table_xinfo (not table_info) also lists generated columns.
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+        for c in columns:
+            if f"{c}_iso" not in existing:
+                conn.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {c}_iso TEXT "
+                    f"GENERATED ALWAYS AS ({date_expr(c)}) VIRTUAL"
+                )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_{c}_iso ON {table}({c}_iso)"
+            )
 
 
 def init_db(conn: sqlite3.Connection, schema_sql: str) -> None:
@@ -80,4 +237,9 @@ def init_db(conn: sqlite3.Connection, schema_sql: str) -> None:
     ensure_column(conn, "minimax_items", "updated_at", "TEXT")
     ensure_column(conn, "tracking_summary", "last_status", "TEXT")
     ensure_column(conn, "tracking_summary", "last_status_at", "TEXT")
+    ensure_column(conn, "import_runs", "duration_sec", "REAL")
+    ensure_column(conn, "import_runs", "rows_per_sec", "REAL")
+    ensure_column(conn, "import_runs", "parse_sec", "REAL")
+    ensure_iso_date_columns(conn)
+    backfill_order_totals(conn)
     conn.commit()
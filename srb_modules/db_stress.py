@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from .db import ConnectionPool, connect_db
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def run_db_stress(
+    db_path: Path,
+    files: Iterable[Path],
+    *,
+    import_fn: Callable[[sqlite3.Connection, Path], None],
+    read_fn: Callable[[sqlite3.Connection], object],
+    wal: bool,
+    readers: int = 2,
+    pause: float = 0.01,
+) -> dict:
+    """
+    Imports `files` on one writer thread while `readers` threads run `read_fn`
+    (dashboard queries) in a loop until the import finishes. With wal=True both
+    sides go through ConnectionPool (WAL, pooled readers, single writer); with
+    wal=False each call opens its own connect_db() connection like the old UI.
+    Returns reader latency stats in ms plus import time and error counts.
+    """
+    files = list(files)
+    pool = ConnectionPool(db_path, size=readers, wal=True) if wal else None
+    stop = threading.Event()
+    latencies: list[float] = []
+    read_errors: list[str] = []
+    result_lock = threading.Lock()
+    import_info = {"seconds": 0.0, "files": 0, "error": None}
+
+    def _reader_conn() -> sqlite3.Connection:
+        if pool is not None:
+            return pool.reader()
+        conn = connect_db(db_path)
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def reader_loop() -> None:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                conn = _reader_conn()
+                try:
+                    read_fn(conn)
+                finally:
+                    conn.close()
+                elapsed = (time.perf_counter() - t0) * 1000.0
+                with result_lock:
+                    latencies.append(elapsed)
+            except Exception as exc:
+                with result_lock:
+                    read_errors.append(str(exc))
+            time.sleep(pause)
+
+    def writer_loop() -> None:
+        t0 = time.perf_counter()
+        try:
+            conn = pool.writer() if pool is not None else connect_db(db_path)
+            if pool is None:
+                conn.execute("PRAGMA busy_timeout=5000")
+            try:
+                for path in files:
+                    import_fn(conn, path)
+                    import_info["files"] += 1
+            finally:
+                conn.close()
+        except Exception as exc:
+            import_info["error"] = str(exc)
+        finally:
+            import_info["seconds"] = time.perf_counter() - t0
+            stop.set()
+
+    threads = [threading.Thread(target=reader_loop, daemon=True) for _ in range(max(1, readers))]
+    for th in threads:
+        th.start()
+    writer = threading.Thread(target=writer_loop, daemon=True)
+    writer.start()
+    writer.join()
+    for th in threads:
+        th.join()
+    if pool is not None:
+        pool.close_all()
+
+    return {
+        "mode": "wal+pool" if wal else "rollback",
+        "reads": len(latencies),
+        "read_errors": len(read_errors),
+        "first_read_error": read_errors[0] if read_errors else None,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "max_ms": max(latencies) if latencies else 0.0,
+        "import_seconds": import_info["seconds"],
+        "import_files": import_info["files"],
+        "import_error": import_info["error"],
+    }
+
+
+def format_stress_report(stats: dict) -> str:
+    return (
+        f"{stats['mode']:<9} citanja={stats['reads']:<5} greske={stats['read_errors']:<3} "
+        f"p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms max={stats['max_ms']:.1f}ms | "
+        f"import {stats['import_files']} fajlova za {stats['import_seconds']:.1f}s"
+        + (f" (greska: {stats['import_error']})" if stats["import_error"] else "")
+    )
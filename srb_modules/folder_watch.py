@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+# import_batch(conn, jobs, on_done): runs [(title, importer, path)] in order on conn and
+# calls on_done(idx, job, status, error) per file, i.e. run_import_jobs(make_import_jobs(jobs)).
+ImportBatch = Callable[
+    [
+        sqlite3.Connection,
+        list[tuple[str, Callable[..., Any], Path]],
+        Callable[[int, Any, str, Exception | None], None],
+    ],
+    Any,
+]
+
+
+def _is_transient(exc: Exception | None) -> bool:
+    # Only a busy/locked DB (another writer) is not the file's fault; constraint and
+    # data errors (IntegrityError, bad values) are recorded as failed right away.
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+@dataclass(frozen=True)
+class WatchSource:
+    """A watched folder: files matching `pattern` go to `importer(conn, path, rejects)`."""
+
+    title: str
+    folder: Path
+    pattern: str
+    importer: Callable[..., Any]
+    recursive: bool = False
+    # Import order inside one poll: by name (like the folder imports) or oldest first (SP Prijemi).
+    oldest_first: bool = False
+
+
+def ensure_watch_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS watch_files ("
+        "path TEXT PRIMARY KEY, "
+        "source TEXT NOT NULL, "
+        "size INTEGER NOT NULL, "
+        "mtime_ns INTEGER NOT NULL, "
+        "status TEXT NOT NULL, "
+        "error TEXT, "
+        "processed_at TEXT NOT NULL"
+        ")"
+    )
+    conn.commit()
+
+
+def _can_open(path: Path) -> bool:
+    # Excel/Windows keep a file locked while it is still being saved or copied.
+    try:
+        with path.open("rb"):
+            return True
+    except OSError:
+        return False
+
+
+class FolderWatcher:
+    """
+    Delta ingest for the default import folders. Each poll opens its own
+    connection with `connect()` (closed before the next poll, so a pooled
+    writer is not held while idle) and only stats the files: a file is a
+    candidate when its (size, mtime) differs from the one recorded in
+    watch_files after its last import, and it is imported once the same
+    (size, mtime) was seen on two polls at least `settle_seconds` apart and it
+    can be opened, so files still being written or copied wait. Ready files go
+    to import_batch in source order; every outcome (imported, skipped, failed)
+    is recorded with the stat it was read with, so a failed file is retried
+    only after it changes and unchanged files are never hashed or parsed
+    again. A "database is locked/busy" failure is not recorded and the file is
+    tried again on the next poll, at most `max_retries` times before it is
+    recorded as failed.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        sources: list[WatchSource],
+        import_batch: ImportBatch,
+        *,
+        settle_seconds: float = 3.0,
+        max_retries: int = 5,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.connect = connect
+        self.sources = list(sources)
+        self.import_batch = import_batch
+        self.settle_seconds = settle_seconds
+        self.max_retries = max_retries
+        self.clock = clock
+        self.pending: dict[str, tuple[tuple[int, int], float]] = {}
+        # Lock failures per (path, stat) since the file last changed.
+        self.retries: dict[tuple[str, tuple[int, int]], int] = {}
+
+    def scan(self, conn: sqlite3.Connection) -> list[tuple[WatchSource, Path, tuple[int, int]]]:
+        """New or changed files that are ready to import, in import order."""
+        now = self.clock()
+        known = {
+            path: (int(size), int(mtime_ns))
+            for path, size, mtime_ns in conn.execute(
+                "SELECT path, size, mtime_ns FROM watch_files"
+            ).fetchall()
+        }
+        seen: set[str] = set()
+        ready = []
+        for source in self.sources:
+            if not source.folder.is_dir():
+                continue
+            found = []
+            paths = source.folder.rglob(source.pattern) if source.recursive else source.folder.glob(source.pattern)
+            for path in paths:
+                if path.name.startswith(("~$", ".")):
+                    continue
+                try:
+                    if not path.is_file():
+                        continue
+                    st = path.stat()
+                except OSError:
+                    continue
+                key = str(path.resolve())
+                seen.add(key)
+                sig = (st.st_size, st.st_mtime_ns)
+                if known.get(key) == sig:
+                    self.pending.pop(key, None)
+                    continue
+                previous = self.pending.get(key)
+                if previous is None or previous[0] != sig:
+                    self.pending[key] = (sig, now)
+                    continue
+                if now - previous[1] < self.settle_seconds or not _can_open(path):
+                    continue
+                found.append((st.st_mtime_ns if source.oldest_first else 0, path.name, path, sig))
+            found.sort(key=lambda item: (item[0], item[1]))
+            ready.extend((source, path, sig) for _, _, path, sig in found)
+        for key in [k for k in self.pending if k not in seen]:
+            del self.pending[key]
+        self.retries = {
+            k: n for k, n in self.retries.items() if k[0] in self.pending and self.pending[k[0]][0] == k[1]
+        }
+        return ready
+
+    def poll(self) -> dict[str, int]:
+        """
+        One scan + import of the ready files; returns status counts, files to
+        retry (transient DB errors) and files still settling.
+        """
+        conn = self.connect()
+        try:
+            ensure_watch_table(conn)
+            return self._poll(conn)
+        finally:
+            conn.close()
+
+    def _poll(self, conn: sqlite3.Connection) -> dict[str, int]:
+        ready = self.scan(conn)
+        counts = {
+            "imported": 0,
+            "skipped": 0,
+            "failed": 0,
+            "retry": 0,
+            "pending": len(self.pending) - len(ready),
+        }
+        if not ready:
+            return counts
+        jobs = [(source.title, source.importer, path) for source, path, _ in ready]
+
+        def on_done(idx: int, job: Any, status: str, exc: Exception | None) -> None:
+            source, path, sig = ready[idx - 1]
+            key = str(path.resolve())
+            if status == "failed" and _is_transient(exc):
+                tries = self.retries.get((key, sig), 0) + 1
+                if tries <= self.max_retries:
+                    # Still settled in self.pending, so it is ready again next poll.
+                    self.retries[(key, sig)] = tries
+                    counts["retry"] += 1
+                    return
+            self.retries.pop((key, sig), None)
+            counts[status] = counts.get(status, 0) + 1
+            conn.execute(
+                "INSERT INTO watch_files (path, source, size, mtime_ns, status, error, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET source = excluded.source, size = excluded.size, "
+                "mtime_ns = excluded.mtime_ns, status = excluded.status, error = excluded.error, "
+                "processed_at = excluded.processed_at",
+                (
+                    key,
+                    source.title,
+                    sig[0],
+                    sig[1],
+                    status,
+                    str(exc) if exc is not None else None,
+                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                ),
+            )
+            conn.commit()
+            self.pending.pop(key, None)
+
+        self.import_batch(conn, jobs, on_done)
+        return counts
+
+    def run(
+        self,
+        interval: float,
+        *,
+        should_stop: Callable[[], bool] = lambda: False,
+        should_pause: Callable[[], bool] = lambda: False,
+        on_poll: Callable[[dict[str, int]], None] | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Polls every `interval` seconds until should_stop(); should_pause() skips a
+        round, and so does a connect() that raises TimeoutError (writer busy).
+        """
+        while not should_stop():
+            if not should_pause():
+                try:
+                    counts = self.poll()
+                except TimeoutError:
+                    counts = None
+                if counts is not None and on_poll is not None:
+                    on_poll(counts)
+            waited = 0.0
+            while waited < interval and not should_stop():
+                step = min(0.5, interval - waited)
+                sleep(step)
+                waited += step
+
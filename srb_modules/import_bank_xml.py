@@ -1,12 +1,24 @@
 from __future__ import annotations
 
 import sqlite3
+import time
 import xml.etree.ElementTree as ET
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Callable
 
 from .import_common import append_reject, start_import
 
+_INSERT_SQL = (
+    "INSERT OR IGNORE INTO bank_transactions ("
+    "fitid, stmt_number, benefit, dtposted, amount, purpose, purposecode, "
+    "payee_name, payee_city, payee_acctid, payee_bankid, payee_bankname, "
+    "refnumber, payeerefnumber, urgency, fee, import_run_id"
+    ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_BATCH = 500
+
 
 def _get_text(elem, path: str) -> str:
     if elem is None:
@@ -17,6 +29,147 @@ def _get_text(elem, path: str) -> str:
     return child.text.strip()
 
 
+def _txn_row_find(trn, stmt_number: str, to_float: Callable[[object], float | None]) -> tuple:
+    return (
+        _get_text(trn, "fitid"),
+        stmt_number,
+        _get_text(trn, "benefit"),
+        _get_text(trn, "dtposted"),
+        to_float(_get_text(trn, "trnamt")),
+        _get_text(trn, "purpose"),
+        _get_text(trn, "purposecode"),
+        _get_text(trn, "payeeinfo/name"),
+        _get_text(trn, "payeeinfo/city"),
+        _get_text(trn, "payeeaccountinfo/acctid"),
+        _get_text(trn, "payeeaccountinfo/bankid"),
+        _get_text(trn, "payeeaccountinfo/bankname"),
+        _get_text(trn, "refnumber"),
+        _get_text(trn, "payeerefnumber"),
+        _get_text(trn, "urgency"),
+        to_float(_get_text(trn, "fee")),
+    )
+
+
+def _txn_row(trn, stmt_number: str, to_float: Callable[[object], float | None]) -> tuple:
+    # One pass over children (and grandchildren) instead of 16 find() calls; the
+    # first match wins, same as _get_text(trn, "tag") / _get_text(trn, "a/b").
+    texts: dict[str, str | None] = {}
+    for child in trn:
+        texts.setdefault(child.tag, child.text)
+        for sub in child:
+            texts.setdefault(f"{child.tag}/{sub.tag}", sub.text)
+
+    def get(key: str) -> str:
+        value = texts.get(key)
+        return value.strip() if value is not None else ""
+
+    return (
+        get("fitid"),
+        stmt_number,
+        get("benefit"),
+        get("dtposted"),
+        to_float(get("trnamt")),
+        get("purpose"),
+        get("purposecode"),
+        get("payeeinfo/name"),
+        get("payeeinfo/city"),
+        get("payeeaccountinfo/acctid"),
+        get("payeeaccountinfo/bankid"),
+        get("payeeaccountinfo/bankname"),
+        get("refnumber"),
+        get("payeerefnumber"),
+        get("urgency"),
+        to_float(get("fee")),
+    )
+
+
+def iter_bank_xml_rows(
+    path: Path, to_float: Callable[[object], float | None]
+) -> Iterator[tuple]:
+    """
+    Streams transaction rows with iterparse, in the same order and with the same
+    values as the ElementTree path (every stmttrn under a stmtrs, stmt_number
+    from that stmtrs' own <stmtnumber>). Parsed transactions are removed from
+    the tree right away, so memory does not grow with the statement size.
+    """
+    stack: list[ET.Element] = []
+    stmt_number: str | None = None
+    waiting: list[ET.Element] = []  # stmttrn seen before the statement's <stmtnumber>
+    stmtrs_depth = 0
+    for event, elem in ET.iterparse(str(path), events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            if elem.tag == "stmtrs":
+                stmtrs_depth += 1
+                if stmtrs_depth == 1:
+                    stmt_number = None
+                    waiting = []
+            continue
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if elem.tag == "stmtnumber" and parent is not None and parent.tag == "stmtrs":
+            if stmtrs_depth == 1 and stmt_number is None:
+                stmt_number = (elem.text or "").strip()
+                for trn in waiting:
+                    yield _txn_row(trn, stmt_number, to_float)
+                waiting = []
+        elif elem.tag == "stmttrn" and stmtrs_depth > 0:
+            if stmt_number is None:
+                waiting.append(elem)
+            else:
+                yield _txn_row(elem, stmt_number, to_float)
+            if parent is not None and stmt_number is not None:
+                parent.remove(elem)
+        elif elem.tag == "stmtrs":
+            stmtrs_depth -= 1
+            if stmtrs_depth == 0:
+                for trn in waiting:
+                    yield _txn_row(trn, "", to_float)
+                waiting = []
+                stmt_number = None
+                elem.clear()
+
+
+def _tree_rows(path: Path, to_float: Callable[[object], float | None]) -> list[tuple]:
+    tree = ET.parse(path)
+    root = tree.getroot()
+    rows = []
+    for stmtrs in root.findall(".//stmtrs"):
+        stmt_number = _get_text(stmtrs, "stmtnumber")
+        for trn in stmtrs.findall(".//stmttrn"):
+            rows.append(_txn_row_find(trn, stmt_number, to_float))
+    return rows
+
+
+def _insert_batch(
+    conn: sqlite3.Connection,
+    batch: list[tuple[int, tuple]],
+    import_id: int,
+    rejects: list | None,
+    file_name: str,
+) -> int:
+    """executemany for one batch; duplicate fitids (DB or earlier in batch) become rejects."""
+    fitids = list({row[0] for _, row in batch})
+    ph = ",".join("?" for _ in fitids)
+    existing = {
+        r[0]
+        for r in conn.execute(
+            f"SELECT fitid FROM bank_transactions WHERE fitid IN ({ph})", fitids
+        ).fetchall()
+    }
+    fresh = []
+    for idx, row in batch:
+        if row[0] in existing:
+            append_reject(
+                rejects, "Bank-XML", file_name, idx, "bank_txn_duplicate", f"fitid={row[0]}"
+            )
+            continue
+        existing.add(row[0])
+        fresh.append((*row, import_id))
+    conn.executemany(_INSERT_SQL, fresh)
+    return len(fresh)
+
+
 def import_bank_xml(
     conn: sqlite3.Connection,
     path: Path,
@@ -24,49 +177,63 @@ def import_bank_xml(
     *,
     file_hash: Callable[[Path], str],
     to_float: Callable[[object], float | None],
-) -> None:
-    tree = ET.parse(path)
-    root = tree.getroot()
+    streaming: bool = True,
+) -> dict | None:
+    """
+    streaming=True parses with iterparse and inserts in executemany batches in
+    one transaction per file (the import_runs row is removed again if the file
+    fails midway); streaming=False is the original ElementTree + row-by-row
+    path. Same rows and rejects either way.
+    Returns {"rows", "inserted", "duplicates"} or None when already imported.
+    """
+    if not streaming:
+        return _import_bank_xml_tree(conn, path, rejects, file_hash=file_hash, to_float=to_float)
 
-    rows = []
-    for stmtrs in root.findall(".//stmtrs"):
-        stmt_number = _get_text(stmtrs, "stmtnumber")
-        for trn in stmtrs.findall(".//stmttrn"):
-            rows.append(
-                (
-                    _get_text(trn, "fitid"),
-                    stmt_number,
-                    _get_text(trn, "benefit"),
-                    _get_text(trn, "dtposted"),
-                    to_float(_get_text(trn, "trnamt")),
-                    _get_text(trn, "purpose"),
-                    _get_text(trn, "purposecode"),
-                    _get_text(trn, "payeeinfo/name"),
-                    _get_text(trn, "payeeinfo/city"),
-                    _get_text(trn, "payeeaccountinfo/acctid"),
-                    _get_text(trn, "payeeaccountinfo/bankid"),
-                    _get_text(trn, "payeeaccountinfo/bankname"),
-                    _get_text(trn, "refnumber"),
-                    _get_text(trn, "payeerefnumber"),
-                    _get_text(trn, "urgency"),
-                    to_float(_get_text(trn, "fee")),
-                )
-            )
+    import_id = start_import(conn, "Bank-XML", path, 0, file_hash=file_hash)
+    if import_id is None:
+        append_reject(rejects, "Bank-XML", path.name, None, "file_already_imported", "")
+        return None
+
+    rows = 0
+    inserted = 0
+    try:
+        batch: list[tuple[int, tuple]] = []
+        for row in iter_bank_xml_rows(path, to_float):
+            rows += 1
+            batch.append((rows, row))
+            if len(batch) >= _BATCH:
+                inserted += _insert_batch(conn, batch, import_id, rejects, path.name)
+                batch = []
+        if batch:
+            inserted += _insert_batch(conn, batch, import_id, rejects, path.name)
+        conn.execute("UPDATE import_runs SET row_count = ? WHERE id = ?", (rows, import_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        conn.execute("DELETE FROM import_runs WHERE id = ?", (import_id,))
+        conn.commit()
+        raise
+    return {"rows": rows, "inserted": inserted, "duplicates": rows - inserted}
+
+
+def _import_bank_xml_tree(
+    conn: sqlite3.Connection,
+    path: Path,
+    rejects: list | None,
+    *,
+    file_hash: Callable[[Path], str],
+    to_float: Callable[[object], float | None],
+) -> dict | None:
+    rows = _tree_rows(path, to_float)
 
     import_id = start_import(conn, "Bank-XML", path, len(rows), file_hash=file_hash)
     if import_id is None:
         append_reject(rejects, "Bank-XML", path.name, None, "file_already_imported", "")
-        return
+        return None
 
+    inserted = 0
     for idx, row in enumerate(rows):
-        cur = conn.execute(
-            "INSERT OR IGNORE INTO bank_transactions ("
-            "fitid, stmt_number, benefit, dtposted, amount, purpose, purposecode, "
-            "payee_name, payee_city, payee_acctid, payee_bankid, payee_bankname, "
-            "refnumber, payeerefnumber, urgency, fee, import_run_id"
-            ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (*row, import_id),
-        )
+        cur = conn.execute(_INSERT_SQL, (*row, import_id))
         if cur.rowcount == 0:
             append_reject(
                 rejects,
@@ -76,5 +243,48 @@ def import_bank_xml(
                 "bank_txn_duplicate",
                 f"fitid={row[0]}",
             )
+        else:
+            inserted += 1
     conn.commit()
+    return {"rows": len(rows), "inserted": inserted, "duplicates": len(rows) - inserted}
+
 
+def import_bank_xml_folder(
+    conn: sqlite3.Connection,
+    folder: Path,
+    rejects: list | None = None,
+    *,
+    file_hash: Callable[[Path], str],
+    to_float: Callable[[object], float | None],
+    pattern: str = "*.xml",
+) -> list[dict]:
+    """
+    Imports every statement in `folder` (sorted by name). A failing file is
+    reported and skipped, the rest continue. Returns one summary dict per file:
+    file, status (imported/skipped/failed), rows, inserted, duplicates, seconds, error.
+    """
+    summary = []
+    for path in sorted(p for p in Path(folder).glob(pattern) if p.is_file()):
+        started = time.perf_counter()
+        entry = {
+            "file": path.name,
+            "status": "imported",
+            "rows": 0,
+            "inserted": 0,
+            "duplicates": 0,
+            "seconds": 0.0,
+            "error": None,
+        }
+        try:
+            stats = import_bank_xml(conn, path, rejects, file_hash=file_hash, to_float=to_float)
+            if stats is None:
+                entry["status"] = "skipped"
+            else:
+                entry.update(stats)
+        except Exception as exc:
+            entry["status"] = "failed"
+            entry["error"] = str(exc)
+            append_reject(rejects, "Bank-XML", path.name, None, "file_failed", str(exc))
+        entry["seconds"] = round(time.perf_counter() - started, 3)
+        summary.append(entry)
+    return summary
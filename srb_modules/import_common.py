@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from pathlib import Path
 from typing import Any
 
@@ -63,3 +64,25 @@ def start_import(conn: Any, source: str, path: Path, row_count: int, *, file_has
     )
     conn.commit()
     return int(cur.lastrowid)
+
+
+def finish_import(
+    conn: Any, import_id: int, row_count: int, started: float, *, parse_seconds: float | None = None
+) -> None:
+    """
+    Stores wall time and throughput (rows/sec) of an import run; `started` is
+    time.perf_counter(). `parse_seconds` is the workbook read time (df.attrs from
+    xlsx_read.read_sheet), also when the sheet was parsed in a worker process.
+    The columns come from init_db (ensure_column).
+    """
+    elapsed = max(time.perf_counter() - started, 1e-6)
+    conn.execute(
+        "UPDATE import_runs SET duration_sec = ?, rows_per_sec = ?, parse_sec = ? WHERE id = ?",
+        (
+            round(elapsed, 3),
+            round(row_count / elapsed, 1),
+            round(parse_seconds, 3) if parse_seconds is not None else None,
+            import_id,
+        ),
+    )
+    conn.commit()
@@ -2,12 +2,14 @@ from __future__ import annotations
 
 import hashlib
 import sqlite3
+import time
 from pathlib import Path
 from typing import Any, Callable
 
-import pandas as pd
+from .import_common import append_reject, finish_import, start_import
+from .startup import lazy_import
 
-from .import_common import append_reject, start_import
+pd = lazy_import("pandas")
 
 
 def _norm_text(value: Any) -> str:
@@ -20,13 +22,58 @@ def _sha1(text: str) -> str:
     return hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()
 
 
+def _to_float(v: Any):
+    try:
+        if v is None or v == "":
+            return None
+        return float(v)
+    except Exception:
+        return None
+
+
+_UPSERT_SQL = (
+    "INSERT INTO kartice_events ("
+    "event_key, sku, item_name, event_date, broj, tip, smer, opis, referenca, ref_key, "
+    "prijem_qty, prijem_value, izdavanje_qty, izdavanje_value, cena, stanje_qty, stanje_value, "
+    "delta_qty, source_file, import_run_id"
+    ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(event_key) DO UPDATE SET "
+    "item_name=excluded.item_name, broj=excluded.broj, tip=excluded.tip, smer=excluded.smer, "
+    "opis=excluded.opis, referenca=excluded.referenca, ref_key=excluded.ref_key, "
+    "prijem_qty=excluded.prijem_qty, prijem_value=excluded.prijem_value, "
+    "izdavanje_qty=excluded.izdavanje_qty, izdavanje_value=excluded.izdavanje_value, "
+    "cena=excluded.cena, stanje_qty=excluded.stanje_qty, stanje_value=excluded.stanje_value, "
+    "delta_qty=excluded.delta_qty, source_file=excluded.source_file, import_run_id=excluded.import_run_id"
+)
+
+_TEXT_COLUMNS = ("SKU", "Artikal", "Datum", "Broj", "Tip", "Smer", "Opis", "Referenca")
+_NUMBER_COLUMNS = (
+    "Prijem kolicina",
+    "Prijem vrednost",
+    "Izdavanje kolicina",
+    "Izdavanje vrednost",
+    "Cena",
+    "Stanje zaliha kolicina",
+    "Stanje zaliha vrednost",
+    "Delta kolicina",
+)
+
+
 def import_kartice_events_csv(
     conn: sqlite3.Connection,
     path: Path,
     rejects: list | None = None,
     *,
     file_hash: Callable[[Path], str],
+    bulk: bool = True,
 ) -> None:
+    """
+    Upserts kartice_events by event_key (sha1 of sku|datum|broj|tip|smer|referenca).
+    bulk=True builds the keys column by column, keeps one row per key and applies
+    the upsert with one executemany; bulk=False is the per-row upsert. Both leave
+    the same kartice_events rows.
+    """
+    started = time.perf_counter()
     df = pd.read_csv(path)
     import_id = start_import(conn, "Kartice-Events-CSV", path, len(df), file_hash=file_hash)
     if import_id is None:
@@ -72,6 +119,21 @@ def import_kartice_events_csv(
         )
         return
 
+    import_rows = _import_event_rows_bulk if bulk else _import_event_rows
+    import_rows(conn, df, path, rejects, import_id=import_id)
+
+    conn.commit()
+    finish_import(conn, import_id, len(df), started)
+
+
+def _import_event_rows(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    path: Path,
+    rejects: list | None,
+    *,
+    import_id: int,
+) -> None:
     src = path.name
     for idx, row in df.iterrows():
         sku = _norm_text(row.get("SKU"))
@@ -86,14 +148,6 @@ def import_kartice_events_csv(
 
         event_key = _sha1("|".join([sku, event_date, broj, tip, smer, ref_key]))
 
-        def _to_float(v: Any):
-            try:
-                if v is None or v == "":
-                    return None
-                return float(v)
-            except Exception:
-                return None
-
         values = (
             event_key,
             sku,
@@ -117,21 +171,7 @@ def import_kartice_events_csv(
             import_id,
         )
         try:
-            conn.execute(
-                "INSERT INTO kartice_events ("
-                "event_key, sku, item_name, event_date, broj, tip, smer, opis, referenca, ref_key, "
-                "prijem_qty, prijem_value, izdavanje_qty, izdavanje_value, cena, stanje_qty, stanje_value, "
-                "delta_qty, source_file, import_run_id"
-                ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
-                "ON CONFLICT(event_key) DO UPDATE SET "
-                "item_name=excluded.item_name, broj=excluded.broj, tip=excluded.tip, smer=excluded.smer, "
-                "opis=excluded.opis, referenca=excluded.referenca, ref_key=excluded.ref_key, "
-                "prijem_qty=excluded.prijem_qty, prijem_value=excluded.prijem_value, "
-                "izdavanje_qty=excluded.izdavanje_qty, izdavanje_value=excluded.izdavanje_value, "
-                "cena=excluded.cena, stanje_qty=excluded.stanje_qty, stanje_value=excluded.stanje_value, "
-                "delta_qty=excluded.delta_qty, source_file=excluded.source_file, import_run_id=excluded.import_run_id",
-                values,
-            )
+            conn.execute(_UPSERT_SQL, values)
         except Exception as exc:
             append_reject(
                 rejects,
@@ -142,4 +182,59 @@ def import_kartice_events_csv(
                 f"{exc}",
             )
 
-    conn.commit()
+
+def _import_event_rows_bulk(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    path: Path,
+    rejects: list | None,
+    *,
+    import_id: int,
+) -> None:
+    src = path.name
+    text = {name: [_norm_text(v) for v in df[name].tolist()] for name in _TEXT_COLUMNS}
+    numbers = [[_to_float(v) for v in df[name].tolist()] for name in _NUMBER_COLUMNS]
+    # A key seen twice keeps the id of its first row and the values of its last,
+    # as the per-row upsert did.
+    by_key: dict[str, tuple[int, tuple]] = {}
+    for pos, (sku, item_name, event_date, broj, tip, smer, opis, referenca) in enumerate(
+        zip(*(text[name] for name in _TEXT_COLUMNS))
+    ):
+        if not sku:
+            continue
+        event_key = _sha1("|".join([sku, event_date, broj, tip, smer, referenca]))
+        by_key[event_key] = (
+            pos,
+            (
+                event_key,
+                sku,
+                item_name or None,
+                event_date,
+                broj or None,
+                tip or None,
+                smer or None,
+                opis or None,
+                referenca or None,
+                referenca,
+                *(column[pos] for column in numbers),
+                src,
+                import_id,
+            ),
+        )
+    try:
+        with conn:
+            conn.executemany(_UPSERT_SQL, [values for _, values in by_key.values()])
+    except sqlite3.Error:
+        # Rolled back; redo per row so only the bad rows become rejects.
+        for pos, values in by_key.values():
+            try:
+                conn.execute(_UPSERT_SQL, values)
+            except Exception as exc:
+                append_reject(
+                    rejects,
+                    "Kartice-Events-CSV",
+                    path.name,
+                    int(df.index[pos]) + 1,
+                    "row_failed",
+                    f"{exc}",
+                )
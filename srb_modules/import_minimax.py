@@ -2,13 +2,28 @@ from __future__ import annotations
 
 import re
 import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Callable
 
-import pandas as pd
+from .import_common import append_reject, finish_import, format_missing_int_ranges, start_import
+from .sheet_cache import SheetCache
+from .xlsx_read import read_sheet
 
-from .import_common import append_reject, format_missing_int_ranges, start_import
+# Columns each Minimax export is read with; other columns are not parsed.
+MINIMAX_INVOICE_KEYS = (
+    "mm_number", "mm_customer", "mm_country", "mm_date", "mm_due_date", "mm_revenue",
+    "mm_amount_local", "mm_amount_due", "mm_analytics", "mm_turnover", "mm_account",
+    "mm_basis", "mm_note", "mm_payment_amount", "mm_open_amount",
+)
+MINIMAX_ITEM_COLUMNS = (
+    "Šifra", "Naziv artikla", "Jedinica mere", "Masa(kg)", "Stanje",
+    "Početna količina", "Početna nabavna vrednost", "Početna prodajna vrednost",
+    "Količina prijema", "Nabavna vrednost prijema", "Prodajna vrednost prijema",
+    "Količina izdavanja", "Nabavna vrednost izdavanja", "Prodajna vrednost izdavanja",
+    "Stanje.1", "Konačna količina", "Konačna nabavna vrednost", "Konačna prodajna vrednost",
+)
 
 
 def _parse_invoice_number(number: str | None) -> tuple[str | None, int | None]:
@@ -35,8 +50,10 @@ def import_minimax(
     sheet_minimax: str,
     file_hash: Callable[[Path], str],
     apply_storno: Callable[[sqlite3.Connection], None],
+    sheet_cache: SheetCache | None = None,
 ) -> None:
-    df = pd.read_excel(path, sheet_name=sheet_minimax)
+    started = time.perf_counter()
+    df = read_sheet(path, sheet_minimax, columns=[col[k] for k in MINIMAX_INVOICE_KEYS], cache=sheet_cache)
     import_id = start_import(conn, "Minimax", path, len(df), file_hash=file_hash)
     if import_id is None:
         append_reject(rejects, "Minimax", path.name, None, "file_already_imported", "")
@@ -112,6 +129,7 @@ def import_minimax(
             )
 
     conn.commit()
+    finish_import(conn, import_id, len(df), started, parse_seconds=df.attrs.get("parse_seconds"))
     apply_storno(conn)
 
 
@@ -121,8 +139,10 @@ def import_minimax_items(
     *,
     sheet_minimax: str,
     file_hash: Callable[[Path], str],
+    sheet_cache: SheetCache | None = None,
 ) -> None:
-    df = pd.read_excel(path, sheet_name=sheet_minimax)
+    started = time.perf_counter()
+    df = read_sheet(path, sheet_minimax, columns=MINIMAX_ITEM_COLUMNS, cache=sheet_cache)
     import_id = start_import(conn, "Minimax-Items", path, len(df), file_hash=file_hash)
     if import_id is None:
         return
@@ -166,3 +186,4 @@ def import_minimax_items(
         )
 
     conn.commit()
+    finish_import(conn, import_id, len(df), started, parse_seconds=df.attrs.get("parse_seconds"))
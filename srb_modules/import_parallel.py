@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import concurrent.futures
+import os
+import sqlite3
+from collections import deque
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .import_common import append_reject
+from .sheet_cache import SheetCache
+from .startup import lazy_import
+from .xlsx_read import read_sheet
+
+pd = lazy_import("pandas")
+
+
+def read_workbook(
+    path: str,
+    sheet_name: Any = 0,
+    engine: str | None = None,
+    columns: Any = None,
+    cache: SheetCache | None = None,
+) -> pd.DataFrame:
+    # Worker entry point (must stay top-level so ProcessPoolExecutor can pickle it).
+    return read_sheet(path, sheet_name, columns=columns, engine=engine, cache=cache)
+
+
+@dataclass
+class ImportJob:
+    """
+    One file of a folder import. `apply(conn, path, rejects, df=None)` is the
+    normal importer; `parse(path_str) -> DataFrame` (picklable, e.g. a partial of
+    read_workbook) lets the sheet be read in a worker process. parse=None means
+    the importer reads the file itself on the writer thread. parse_seconds is
+    filled in by run_import_jobs from the parsed sheet's df.attrs.
+    """
+
+    title: str
+    path: Path
+    apply: Callable[..., Any]
+    parse: Callable[[str], Any] | None = None
+    parse_seconds: float | None = None
+
+
+def resolve_import_workers(workers: int | None, parse_jobs: int) -> int:
+    if parse_jobs <= 1:
+        return 1
+    if workers is None or workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) - 1)
+    return max(1, min(int(workers), parse_jobs))
+
+
+def run_import_jobs(
+    conn: sqlite3.Connection,
+    jobs: Iterable[ImportJob],
+    *,
+    file_hash: Callable[[Path], str],
+    rejects: list | None,
+    workers: int | None = 1,
+    on_done: Callable[[int, ImportJob, str, Exception | None], None] | None = None,
+    should_stop: Callable[[], bool] | None = None,
+    executor_factory: Callable[[int], concurrent.futures.Executor] | None = None,
+) -> dict[str, int]:
+    """
+    Runs a folder import: workbooks are parsed in a process pool (bounded
+    read-ahead of 2 x workers) while this thread applies them to `conn` strictly
+    in job order, so import_runs ids, merges and rejects match the sequential
+    import. Files whose hash is already in import_runs are not parsed and are
+    reported as "skipped"; start_import inside the importer stays the final
+    dedupe check. workers=1 parses inline (no pool).
+
+    on_done(idx, job, status, error) is called after every file (1-based idx)
+    with status "imported" / "skipped" / "failed". Returns the status counts.
+    """
+    jobs = list(jobs)
+    counts = {"imported": 0, "skipped": 0, "failed": 0}
+    hashes: dict[int, str] = {}
+
+    def already_imported(i: int) -> bool:
+        if i not in hashes:
+            hashes[i] = file_hash(jobs[i].path)
+        return bool(
+            conn.execute(
+                "SELECT 1 FROM import_runs WHERE file_hash = ?", (hashes[i],)
+            ).fetchone()
+        )
+
+    to_parse = []
+    for i, job in enumerate(jobs):
+        if job.parse is None:
+            continue
+        try:
+            if already_imported(i):
+                continue
+        except Exception:
+            pass  # unreadable file: reported as "failed" when its turn comes
+        to_parse.append(i)
+    n_workers = resolve_import_workers(workers, len(to_parse))
+    executor = None
+    if n_workers > 1:
+        factory = executor_factory or (
+            lambda n: concurrent.futures.ProcessPoolExecutor(max_workers=n)
+        )
+        executor = factory(n_workers)
+
+    futures: dict[int, concurrent.futures.Future] = {}
+    pending = deque(to_parse)
+
+    def fill_window() -> None:
+        while executor is not None and pending and len(futures) < n_workers * 2:
+            i = pending.popleft()
+            futures[i] = executor.submit(jobs[i].parse, str(jobs[i].path))
+
+    try:
+        fill_window()
+        for i, job in enumerate(jobs):
+            if should_stop is not None and should_stop():
+                break
+            status = "imported"
+            error: Exception | None = None
+            try:
+                if already_imported(i):
+                    status = "skipped"
+                    futures.pop(i, None)
+                    append_reject(
+                        rejects, job.title, job.path.name, None, "file_already_imported", ""
+                    )
+                elif job.parse is None:
+                    job.apply(conn, job.path, rejects)
+                else:
+                    future = futures.pop(i, None)
+                    df = future.result() if future is not None else job.parse(str(job.path))
+                    job.parse_seconds = getattr(df, "attrs", {}).get("parse_seconds")
+                    job.apply(conn, job.path, rejects, df=df)
+            except Exception as exc:
+                status = "failed"
+                error = exc
+            finally:
+                if i in pending:
+                    pending.remove(i)
+                fill_window()
+            counts[status] += 1
+            if on_done is not None:
+                on_done(i + 1, job, status, error)
+    finally:
+        if executor is not None:
+            for future in futures.values():
+                future.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+    return counts
@@ -1,12 +1,38 @@
 from __future__ import annotations
 
 import sqlite3
+import time
 from pathlib import Path
 from typing import Any, Callable
 
-import pandas as pd
+from .import_common import append_reject, finish_import, format_missing_int_ranges, start_import
+from .order_totals import refresh_order_totals
+from .sheet_cache import SheetCache
+from .startup import lazy_import
+from .xlsx_read import read_sheet
 
-from .import_common import append_reject, format_missing_int_ranges, start_import
+pd = lazy_import("pandas")
+
+# COL keys each SP sheet is read with; other columns are not parsed.
+SP_ORDER_KEYS = (
+    "client", "tracking", "sp_order_no", "woo_order_no", "location", "customer_code",
+    "customer_name", "city", "address", "postal_code", "phone", "email", "note",
+    "product_code", "qty", "cod_amount", "advance_amount", "discount", "discount_type",
+    "addon_cod", "addon_advance", "extra_discount", "extra_discount_type", "status",
+    "created_at", "picked_up_at", "delivered_at",
+)
+SP_PAYMENT_KEYS = (
+    "sp_order_no", "client", "customer_code", "payment_customer_name", "payment_amount",
+    "payment_order_status", "payment_client_status",
+)
+SP_RETURN_KEYS = (
+    "sp_order_no", "tracking", "customer_name", "phone", "city", "status",
+    "created_at", "picked_up_at", "delivered_at",
+)
+
+
+def sheet_columns(col: dict[str, str], keys: tuple[str, ...]) -> list[str]:
+    return [col[k] for k in keys]
 
 
 def get_or_create_order(conn: sqlite3.Connection, sp_order_no: str, values: dict) -> tuple[int, bool]:
@@ -51,6 +77,161 @@ def maybe_mark_delivered_from_payment(conn: sqlite3.Connection, sp_order_no: str
         add_status_history(conn, order_id, "Isporučeno", "", "SP-Uplate")
 
 
+def _to_float(v) -> float | None:
+    if v is None:
+        return None
+    try:
+        if isinstance(v, str) and not v.strip():
+            return None
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _round2(v: float) -> float:
+    return round(float(v), 2)
+
+
+def _approx(a: float, b: float, tol: float = 0.01) -> bool:
+    try:
+        return abs(float(a) - float(b)) <= tol
+    except Exception:
+        return False
+
+
+def _pick_unit_modes(candidates: dict[str, list[float]], out: dict[str, float]) -> None:
+    # Choose the most common candidate as unit value (mode); ties go to the lower value.
+    for sku, vals in candidates.items():
+        if not vals:
+            continue
+        counts: dict[float, int] = {}
+        for v in vals:
+            counts[v] = counts.get(v, 0) + 1
+        out[sku] = sorted(counts.items(), key=lambda x: (-x[1], x[0]))[0][0]
+
+
+def _iter_sheet_rows(df: pd.DataFrame):
+    """
+    Yields (index, get) per row, where get(column, default) behaves like
+    `row.get(...)` on the Series from `df.iterrows()`, without building a Series per row.
+    """
+    positions: dict[Any, int] = {}
+    for i, name in enumerate(df.columns):
+        positions.setdefault(name, i)
+    for idx, values in zip(df.index, df.values):
+
+        def get(name, default=None, _values=values):
+            pos = positions.get(name)
+            return default if pos is None else _values[pos]
+
+        yield idx, get
+
+
+def _order_values(get, col: dict[str, str], import_id: int, compute_customer_key) -> dict:
+    customer_key = compute_customer_key(
+        get(col["phone"], None),
+        get(col["email"], None),
+        get(col["customer_name"], None),
+        get(col["city"], None),
+    )
+    return {
+        "sp_order_no": str(get(col["sp_order_no"], "")).strip(),
+        "woo_order_no": str(get(col["woo_order_no"], "")).strip() or None,
+        "client_code": str(get(col["client"], "")).strip() or None,
+        "tracking_code": str(get(col["tracking"], "")).strip() or None,
+        "customer_code": str(get(col["customer_code"], "")).strip() or None,
+        "customer_name": str(get(col["customer_name"], "")).strip() or None,
+        "city": str(get(col["city"], "")).strip() or None,
+        "address": str(get(col["address"], "")).strip() or None,
+        "postal_code": str(get(col["postal_code"], "")).strip() or None,
+        "phone": str(get(col["phone"], "")).strip() or None,
+        "email": str(get(col["email"], "")).strip() or None,
+        "customer_key": customer_key or None,
+        "note": str(get(col["note"], "")).strip() or None,
+        "location": str(get(col["location"], "")).strip() or None,
+        "status": str(get(col["status"], "")).strip() or None,
+        "created_at": str(get(col["created_at"], "")).strip() or None,
+        "picked_up_at": str(get(col["picked_up_at"], "")).strip() or None,
+        "delivered_at": str(get(col["delivered_at"], "")).strip() or None,
+        "import_run_id": import_id,
+    }
+
+
+def _item_values(get, col: dict[str, str], order_id: int | None) -> tuple:
+    return (
+        order_id,
+        str(get(col["product_code"], "")).strip() or None,
+        get(col["qty"], None),
+        get(col["cod_amount"], None),
+        get(col["advance_amount"], None),
+        get(col["discount"], None),
+        str(get(col["discount_type"], "")).strip() or None,
+        get(col["addon_cod"], None),
+        get(col["addon_advance"], None),
+        get(col["extra_discount"], None),
+        str(get(col["extra_discount_type"], "")).strip() or None,
+    )
+
+
+def _normalize_item_units(
+    item_values: tuple,
+    sp_order_no: str,
+    unit_cod_map: dict[str, float],
+    unit_adv_map: dict[str, float],
+) -> tuple[tuple, list[tuple[str, str]]]:
+    """
+    Normalize qty>1 lines so cod_amount/advance_amount are stored as unit values.
+    SP export typically provides totals for qty>1 (e.g. 2x3990 => 7980), but occasionally exports unit values.
+    We store unit values in DB so all downstream logic can safely do qty * unit_price.
+    Returns (item_values, [(reject_reason, details), ...]).
+    """
+    notes: list[tuple[str, str]] = []
+    try:
+        sku = item_values[1]
+        qty = _to_float(item_values[2])
+        cod = _to_float(item_values[3])
+        adv = _to_float(item_values[4])
+        if sku and qty and qty > 1:
+            unit_cod = unit_cod_map.get(str(sku))
+            unit_adv = unit_adv_map.get(str(sku))
+
+            if cod is not None and cod > 0:
+                # If the file already gives unit (cod == known unit), keep it.
+                if unit_cod is not None and _approx(cod, unit_cod):
+                    pass
+                else:
+                    # Otherwise treat cod as line total and normalize to unit.
+                    item_values = item_values[:3] + (_round2(cod / qty),) + item_values[4:]
+                    notes.append(
+                        (
+                            "normalized_cod_total_to_unit",
+                            f"sp_order_no={sp_order_no}, sku={sku}, qty={qty}, cod_total={cod}",
+                        )
+                    )
+
+            if adv is not None and adv > 0:
+                if unit_adv is not None and _approx(adv, unit_adv):
+                    pass
+                else:
+                    item_values = item_values[:4] + (_round2(adv / qty),) + item_values[5:]
+                    notes.append(
+                        (
+                            "normalized_advance_total_to_unit",
+                            f"sp_order_no={sp_order_no}, sku={sku}, qty={qty}, adv_total={adv}",
+                        )
+                    )
+    except Exception:
+        # Best-effort: keep original values if normalization fails for any reason.
+        pass
+    return item_values, notes
+
+
+def _status_history_at(values: dict) -> str:
+    status = values["status"] or ""
+    status_at = values["delivered_at"] if status.lower() == "isporučeno" else values["picked_up_at"]
+    return status_at or values["created_at"] or ""
+
+
 def import_sp_orders(
     conn: sqlite3.Connection,
     path: Path,
@@ -61,8 +242,20 @@ def import_sp_orders(
     file_hash: Callable[[Path], str],
     compute_customer_key: Callable[[Any, Any, Any, Any], str],
     set_app_state: Callable[[Any, str, str], None],
+    bulk: bool = True,
+    df: pd.DataFrame | None = None,
+    sheet_cache: SheetCache | None = None,
 ) -> None:
-    df = pd.read_excel(path, sheet_name=sheet_orders)
+    """
+    bulk=True loads the sheet into a temp staging table and resolves orders, items,
+    duplicate merges and status history with set-based SQL; bulk=False is the
+    row-by-row importer. Both produce the same rows and rejects. order_totals is
+    refreshed for every order the file touched. `df` is an already parsed sheet
+    (parallel folder import); None reads `path` (through `sheet_cache` if given).
+    """
+    started = time.perf_counter()
+    if df is None:
+        df = read_sheet(path, sheet_orders, columns=sheet_columns(col, SP_ORDER_KEYS), cache=sheet_cache)
     import_id = start_import(conn, "SP-Narudzbe", path, len(df), file_hash=file_hash)
     if import_id is None:
         append_reject(rejects, "SP-Narudzbe", path.name, None, "file_already_imported", "")
@@ -72,24 +265,6 @@ def import_sp_orders(
     # - sometimes `cod_amount` is a unit price (e.g. 3990) and should be multiplied by qty
     # - sometimes `cod_amount` is already a line total (e.g. 7980 for qty=2) and must NOT be multiplied again
     # We normalize during import so DB always stores unit prices for `cod_amount` and `advance_amount`.
-    def _to_float(v) -> float | None:
-        if v is None:
-            return None
-        try:
-            if isinstance(v, str) and not v.strip():
-                return None
-            return float(v)
-        except (TypeError, ValueError):
-            return None
-
-    def _round2(v: float) -> float:
-        return round(float(v), 2)
-
-    def _approx(a: float, b: float, tol: float = 0.01) -> bool:
-        try:
-            return abs(float(a) - float(b)) <= tol
-        except Exception:
-            return False
 
     # Build per-SKU unit price candidates from qty==1 rows.
     unit_cod_map: dict[str, float] = {}
@@ -98,36 +273,23 @@ def import_sp_orders(
     adv_candidates: dict[str, list[float]] = {}
 
     skus_in_file: set[str] = set()
-    for _, r in df.iterrows():
-        sku = str(r.get(col["product_code"], "")).strip()
+    for _, get in _iter_sheet_rows(df):
+        sku = str(get(col["product_code"], "")).strip()
         if not sku:
             continue
         skus_in_file.add(sku)
-        qty = _to_float(r.get(col["qty"], None))
+        qty = _to_float(get(col["qty"], None))
         if qty is None or _round2(qty) != 1.0:
             continue
-        cod = _to_float(r.get(col["cod_amount"], None))
+        cod = _to_float(get(col["cod_amount"], None))
         if cod is not None and cod > 0:
             cod_candidates.setdefault(sku, []).append(_round2(cod))
-        adv = _to_float(r.get(col["advance_amount"], None))
+        adv = _to_float(get(col["advance_amount"], None))
         if adv is not None and adv > 0:
             adv_candidates.setdefault(sku, []).append(_round2(adv))
 
-    # Choose the most common candidate as unit value (mode). Fallback: last value.
-    for sku, vals in cod_candidates.items():
-        if not vals:
-            continue
-        counts: dict[float, int] = {}
-        for v in vals:
-            counts[v] = counts.get(v, 0) + 1
-        unit_cod_map[sku] = sorted(counts.items(), key=lambda x: (-x[1], x[0]))[0][0]
-    for sku, vals in adv_candidates.items():
-        if not vals:
-            continue
-        counts = {}
-        for v in vals:
-            counts[v] = counts.get(v, 0) + 1
-        unit_adv_map[sku] = sorted(counts.items(), key=lambda x: (-x[1], x[0]))[0][0]
+    _pick_unit_modes(cod_candidates, unit_cod_map)
+    _pick_unit_modes(adv_candidates, unit_adv_map)
 
     # Also learn unit prices from the existing DB (qty==1 rows), limited to SKUs present in this file.
     # This handles cases where the file contains only qty>1 totals (e.g. qty=2, cod_amount=7980 for unit 3990).
@@ -168,20 +330,8 @@ def import_sp_orders(
                 adv_candidates.setdefault(sku, []).append(_round2(adv_f))
 
         # Re-pick modes after adding DB candidates.
-        for sku, vals in cod_candidates.items():
-            if not vals:
-                continue
-            counts: dict[float, int] = {}
-            for v in vals:
-                counts[v] = counts.get(v, 0) + 1
-            unit_cod_map[sku] = sorted(counts.items(), key=lambda x: (-x[1], x[0]))[0][0]
-        for sku, vals in adv_candidates.items():
-            if not vals:
-                continue
-            counts: dict[float, int] = {}
-            for v in vals:
-                counts[v] = counts.get(v, 0) + 1
-            unit_adv_map[sku] = sorted(counts.items(), key=lambda x: (-x[1], x[0]))[0][0]
+        _pick_unit_modes(cod_candidates, unit_cod_map)
+        _pick_unit_modes(adv_candidates, unit_adv_map)
 
     db_max = conn.execute(
         "SELECT MAX(CAST(sp_order_no AS INTEGER)) "
@@ -192,11 +342,10 @@ def import_sp_orders(
     except Exception:
         db_max_int = None
 
-    seen_orders = set()
     file_numbers: set[int] = set()
     max_sp_order_no = None
-    for idx, row in df.iterrows():
-        sp_order_no = str(row.get(col["sp_order_no"], "")).strip()
+    for _, get in _iter_sheet_rows(df):
+        sp_order_no = str(get(col["sp_order_no"], "")).strip()
         if not sp_order_no:
             continue
         try:
@@ -207,35 +356,62 @@ def import_sp_orders(
         except ValueError:
             pass
 
-        customer_key = compute_customer_key(
-            row.get(col["phone"], None),
-            row.get(col["email"], None),
-            row.get(col["customer_name"], None),
-            row.get(col["city"], None),
-        )
-        values = {
-            "sp_order_no": sp_order_no,
-            "woo_order_no": str(row.get(col["woo_order_no"], "")).strip() or None,
-            "client_code": str(row.get(col["client"], "")).strip() or None,
-            "tracking_code": str(row.get(col["tracking"], "")).strip() or None,
-            "customer_code": str(row.get(col["customer_code"], "")).strip() or None,
-            "customer_name": str(row.get(col["customer_name"], "")).strip() or None,
-            "city": str(row.get(col["city"], "")).strip() or None,
-            "address": str(row.get(col["address"], "")).strip() or None,
-            "postal_code": str(row.get(col["postal_code"], "")).strip() or None,
-            "phone": str(row.get(col["phone"], "")).strip() or None,
-            "email": str(row.get(col["email"], "")).strip() or None,
-            "customer_key": customer_key or None,
-            "note": str(row.get(col["note"], "")).strip() or None,
-            "location": str(row.get(col["location"], "")).strip() or None,
-            "status": str(row.get(col["status"], "")).strip() or None,
-            "created_at": str(row.get(col["created_at"], "")).strip() or None,
-            "picked_up_at": str(row.get(col["picked_up_at"], "")).strip() or None,
-            "delivered_at": str(row.get(col["delivered_at"], "")).strip() or None,
-            "import_run_id": import_id,
-        }
+    import_rows = _import_order_rows_bulk if bulk else _import_order_rows
+    touched_orders = import_rows(
+        conn,
+        df,
+        path,
+        rejects,
+        col=col,
+        import_id=import_id,
+        compute_customer_key=compute_customer_key,
+        unit_cod_map=unit_cod_map,
+        unit_adv_map=unit_adv_map,
+    )
+    refresh_order_totals(conn, touched_orders)
+
+    conn.commit()
+    if db_max_int is not None and max_sp_order_no is not None and max_sp_order_no > db_max_int:
+        expected_start = db_max_int + 1
+        expected_end = int(max_sp_order_no)
+        gaps = format_missing_int_ranges(expected_start, file_numbers, expected_end)
+        if gaps:
+            append_reject(
+                rejects,
+                "SP-Narudzbe",
+                path.name,
+                None,
+                "gap_warning",
+                f"Ocekivano {expected_start}..{expected_end}, nedostaje: {gaps}",
+            )
+    if max_sp_order_no is not None:
+        set_app_state(conn, "last_sp_order_no", str(max_sp_order_no))
+        conn.commit()
+    finish_import(conn, import_id, len(df), started, parse_seconds=df.attrs.get("parse_seconds"))
+
+
+def _import_order_rows(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    path: Path,
+    rejects: list | None,
+    *,
+    col: dict[str, str],
+    import_id: int,
+    compute_customer_key: Callable[[Any, Any, Any, Any], str],
+    unit_cod_map: dict[str, float],
+    unit_adv_map: dict[str, float],
+) -> set[int]:
+    seen_orders = set()
+    touched_orders: set[int] = set()
+    for idx, get in _iter_sheet_rows(df):
+        values = _order_values(get, col, import_id, compute_customer_key)
+        sp_order_no = values["sp_order_no"]
+        if not sp_order_no:
+            continue
 
         order_id, created = get_or_create_order(conn, sp_order_no, values)
+        touched_orders.add(order_id)
         if not created:
             append_reject(
                 rejects,
@@ -246,88 +422,11 @@ def import_sp_orders(
                 f"sp_order_no={sp_order_no}",
             )
 
-        item_values = (
-            order_id,
-            str(row.get(col["product_code"], "")).strip() or None,
-            row.get(col["qty"], None),
-            row.get(col["cod_amount"], None),
-            row.get(col["advance_amount"], None),
-            row.get(col["discount"], None),
-            str(row.get(col["discount_type"], "")).strip() or None,
-            row.get(col["addon_cod"], None),
-            row.get(col["addon_advance"], None),
-            row.get(col["extra_discount"], None),
-            str(row.get(col["extra_discount_type"], "")).strip() or None,
+        item_values, notes = _normalize_item_units(
+            _item_values(get, col, order_id), sp_order_no, unit_cod_map, unit_adv_map
         )
-
-        # Normalize qty>1 lines so cod_amount/advance_amount are stored as unit values.
-        # SP export typically provides totals for qty>1 (e.g. 2x3990 => 7980), but occasionally exports unit values.
-        # We store unit values in DB so all downstream logic can safely do qty * unit_price.
-        try:
-            sku = item_values[1]
-            qty = _to_float(item_values[2])
-            cod = _to_float(item_values[3])
-            adv = _to_float(item_values[4])
-            if sku and qty and qty > 1:
-                unit_cod = unit_cod_map.get(str(sku))
-                unit_adv = unit_adv_map.get(str(sku))
-
-                if cod is not None and cod > 0:
-                    # If the file already gives unit (cod == known unit), keep it.
-                    if unit_cod is not None and _approx(cod, unit_cod):
-                        pass
-                    else:
-                        # Otherwise treat cod as line total and normalize to unit.
-                        item_values = (
-                            item_values[0],
-                            item_values[1],
-                            item_values[2],
-                            _round2(cod / qty),
-                            item_values[4],
-                            item_values[5],
-                            item_values[6],
-                            item_values[7],
-                            item_values[8],
-                            item_values[9],
-                            item_values[10],
-                        )
-                        append_reject(
-                            rejects,
-                            "SP-Narudzbe",
-                            path.name,
-                            int(idx) + 1,
-                            "normalized_cod_total_to_unit",
-                            f"sp_order_no={sp_order_no}, sku={sku}, qty={qty}, cod_total={cod}",
-                        )
-
-                if adv is not None and adv > 0:
-                    if unit_adv is not None and _approx(adv, unit_adv):
-                        pass
-                    else:
-                        item_values = (
-                            item_values[0],
-                            item_values[1],
-                            item_values[2],
-                            item_values[3],
-                            _round2(adv / qty),
-                            item_values[5],
-                            item_values[6],
-                            item_values[7],
-                            item_values[8],
-                            item_values[9],
-                            item_values[10],
-                        )
-                        append_reject(
-                            rejects,
-                            "SP-Narudzbe",
-                            path.name,
-                            int(idx) + 1,
-                            "normalized_advance_total_to_unit",
-                            f"sp_order_no={sp_order_no}, sku={sku}, qty={qty}, adv_total={adv}",
-                        )
-        except Exception:
-            # Best-effort: keep original values if normalization fails for any reason.
-            pass
+        for reason, details in notes:
+            append_reject(rejects, "SP-Narudzbe", path.name, int(idx) + 1, reason, details)
 
         cur = conn.execute(
             "INSERT OR IGNORE INTO order_items ("
@@ -405,71 +504,281 @@ def import_sp_orders(
                 )
 
         if sp_order_no not in seen_orders:
-            status = values["status"] or ""
-            status_at = values["delivered_at"] if status.lower() == "isporučeno" else values["picked_up_at"]
-            if status:
+            if values["status"]:
                 add_status_history(
                     conn,
                     order_id,
-                    status,
-                    status_at or values["created_at"] or "",
+                    values["status"],
+                    _status_history_at(values),
                     "SP-Narudzbe",
                 )
             seen_orders.add(sp_order_no)
+    return touched_orders
+
+
+_ORDER_COLUMNS = (
+    "sp_order_no",
+    "woo_order_no",
+    "client_code",
+    "tracking_code",
+    "customer_code",
+    "customer_name",
+    "city",
+    "address",
+    "postal_code",
+    "phone",
+    "email",
+    "customer_key",
+    "note",
+    "location",
+    "status",
+    "created_at",
+    "picked_up_at",
+    "delivered_at",
+    "import_run_id",
+)
+
+# Column types mirror orders/order_items so staged values get the same affinity conversions.
+_ORDER_STAGE_SQL = (
+    "CREATE TEMP TABLE sp_orders_stage ("
+    "row_no INTEGER PRIMARY KEY, "
+    "is_first INTEGER NOT NULL, "
+    "sp_order_no TEXT NOT NULL, woo_order_no TEXT, client_code TEXT, tracking_code TEXT, "
+    "customer_code TEXT, customer_name TEXT, city TEXT, address TEXT, postal_code TEXT, "
+    "phone TEXT, email TEXT, customer_key TEXT, note TEXT, location TEXT, status TEXT, "
+    "created_at TEXT, picked_up_at TEXT, delivered_at TEXT, import_run_id INTEGER, "
+    "status_at TEXT, "
+    "product_code TEXT, qty REAL, cod_amount REAL, advance_amount REAL, discount REAL, "
+    "discount_type TEXT, addon_cod REAL, addon_advance REAL, extra_discount REAL, "
+    "extra_discount_type TEXT, "
+    "order_id INTEGER, order_existed INTEGER, item_id INTEGER, lead_row INTEGER, merge_seq INTEGER"
+    ")"
+)
+
+_ITEM_KEY_MATCH = (
+    "{a}.order_id = {b}.order_id "
+    "AND {a}.product_code = {b}.product_code "
+    "AND {a}.cod_amount = {b}.cod_amount "
+    "AND {a}.discount = {b}.discount "
+    "AND {a}.extra_discount = {b}.extra_discount"
+)
+
+# Only lines with a full non-NULL key can hit idx_order_items_unique.
+_ITEM_KEY_NOT_NULL = (
+    "product_code IS NOT NULL AND cod_amount IS NOT NULL "
+    "AND discount IS NOT NULL AND extra_discount IS NOT NULL"
+)
+
+
+def _import_order_rows_bulk(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    path: Path,
+    rejects: list | None,
+    *,
+    col: dict[str, str],
+    import_id: int,
+    compute_customer_key: Callable[[Any, Any, Any, Any], str],
+    unit_cod_map: dict[str, float],
+    unit_adv_map: dict[str, float],
+) -> set[int]:
+    # (row_index, phase, reason, details); sorted at the end so rejects come out
+    # in the same order as the row-by-row importer.
+    notes: list[tuple[int, int, str, str]] = []
+    labels: dict[int, tuple[str, Any]] = {}
+    staged = []
+    seen_orders = set()
+    for idx, get in _iter_sheet_rows(df):
+        values = _order_values(get, col, import_id, compute_customer_key)
+        sp_order_no = values["sp_order_no"]
+        if not sp_order_no:
+            continue
+        row_no = int(idx) + 1
+        item_values, item_notes = _normalize_item_units(
+            _item_values(get, col, None), sp_order_no, unit_cod_map, unit_adv_map
+        )
+        for phase, (reason, details) in enumerate(item_notes, start=1):
+            notes.append((row_no, phase, reason, details))
+        labels[row_no] = (sp_order_no, item_values[1])
+        is_first = sp_order_no not in seen_orders
+        seen_orders.add(sp_order_no)
+        staged.append(
+            (row_no, int(is_first))
+            + tuple(values[c] for c in _ORDER_COLUMNS)
+            + (_status_history_at(values),)
+            + item_values[1:]
+        )
+    if not staged:
+        return set()
 
-    conn.commit()
-    if db_max_int is not None and max_sp_order_no is not None and max_sp_order_no > db_max_int:
-        expected_start = db_max_int + 1
-        expected_end = int(max_sp_order_no)
-        gaps = format_missing_int_ranges(expected_start, file_numbers, expected_end)
-        if gaps:
-            append_reject(
-                rejects,
-                "SP-Narudzbe",
-                path.name,
-                None,
-                "gap_warning",
-                f"Ocekivano {expected_start}..{expected_end}, nedostaje: {gaps}",
+    conn.execute("DROP TABLE IF EXISTS temp.sp_orders_stage")
+    conn.execute(_ORDER_STAGE_SQL)
+    try:
+        order_cols = ", ".join(_ORDER_COLUMNS)
+        item_cols = (
+            "product_code, qty, cod_amount, advance_amount, discount, discount_type, "
+            "addon_cod, addon_advance, extra_discount, extra_discount_type"
+        )
+        conn.executemany(
+            f"INSERT INTO sp_orders_stage (row_no, is_first, {order_cols}, status_at, {item_cols}) "
+            f"VALUES ({', '.join('?' for _ in staged[0])})",
+            staged,
+        )
+        conn.execute("CREATE INDEX temp.idx_sp_orders_stage_order ON sp_orders_stage(sp_order_no)")
+
+        # Orders: first row of each sp_order_no creates it unless it is already in the DB.
+        conn.execute(
+            "UPDATE sp_orders_stage SET order_existed = EXISTS ("
+            "SELECT 1 FROM orders o WHERE o.sp_order_no = sp_orders_stage.sp_order_no)"
+        )
+        conn.execute(
+            f"INSERT INTO orders ({order_cols}) "
+            f"SELECT {order_cols} FROM sp_orders_stage "
+            "WHERE is_first = 1 AND order_existed = 0 ORDER BY row_no"
+        )
+        conn.execute(
+            "UPDATE sp_orders_stage SET order_id = ("
+            "SELECT o.id FROM orders o WHERE o.sp_order_no = sp_orders_stage.sp_order_no)"
+        )
+        for row_no, sp_order_no in conn.execute(
+            "SELECT row_no, sp_order_no FROM sp_orders_stage "
+            "WHERE order_existed = 1 OR is_first = 0"
+        ).fetchall():
+            notes.append((row_no, 0, "order_exists", f"sp_order_no={sp_order_no}"))
+
+        # Items: a line whose key already exists (in the DB, or earlier in this sheet)
+        # is merged into that row instead of being inserted.
+        conn.execute(
+            "UPDATE sp_orders_stage SET item_id = ("
+            "SELECT oi.id FROM order_items oi WHERE "
+            + _ITEM_KEY_MATCH.format(a="oi", b="sp_orders_stage")
+            + f") WHERE {_ITEM_KEY_NOT_NULL}"
+        )
+        conn.execute(
+            "CREATE INDEX temp.idx_sp_orders_stage_key ON sp_orders_stage("
+            "order_id, product_code, cod_amount, discount, extra_discount)"
+        )
+        conn.execute(
+            "UPDATE sp_orders_stage SET lead_row = ("
+            "SELECT MIN(s.row_no) FROM sp_orders_stage s WHERE "
+            + _ITEM_KEY_MATCH.format(a="s", b="sp_orders_stage")
+            + f") WHERE item_id IS NULL AND {_ITEM_KEY_NOT_NULL}"
+        )
+        conn.execute(
+            "INSERT INTO order_items ("
+            "order_id, product_code, qty, cod_amount, advance_amount, "
+            "discount, discount_type, addon_cod, addon_advance, "
+            "extra_discount, extra_discount_type"
+            ") SELECT "
+            "order_id, product_code, qty, cod_amount, advance_amount, "
+            "discount, discount_type, addon_cod, addon_advance, "
+            "extra_discount, extra_discount_type "
+            "FROM sp_orders_stage "
+            "WHERE item_id IS NULL AND (lead_row IS NULL OR lead_row = row_no) "
+            "ORDER BY row_no"
+        )
+        conn.execute(
+            "UPDATE sp_orders_stage SET item_id = ("
+            "SELECT oi.id FROM order_items oi WHERE "
+            + _ITEM_KEY_MATCH.format(a="oi", b="sp_orders_stage")
+            + ") WHERE lead_row IS NOT NULL AND lead_row != row_no"
+        )
+        conn.execute("CREATE INDEX temp.idx_sp_orders_stage_item ON sp_orders_stage(item_id, row_no)")
+        conn.execute(
+            "UPDATE sp_orders_stage SET merge_seq = ("
+            "SELECT COUNT(*) FROM sp_orders_stage s "
+            "WHERE s.item_id = sp_orders_stage.item_id AND s.row_no <= sp_orders_stage.row_no "
+            "AND (s.lead_row IS NULL OR s.lead_row != s.row_no)"
+            ") WHERE item_id IS NOT NULL AND (lead_row IS NULL OR lead_row != row_no)"
+        )
+        # One UPDATE per merge depth keeps the row-order arithmetic of the row-by-row importer.
+        max_seq = conn.execute("SELECT MAX(merge_seq) FROM sp_orders_stage").fetchone()[0] or 0
+        for seq in range(1, int(max_seq) + 1):
+            conn.execute(
+                "UPDATE order_items SET "
+                "qty = COALESCE(order_items.qty, 0) + COALESCE(s.qty, 0), "
+                "advance_amount = COALESCE(order_items.advance_amount, 0) + COALESCE(s.advance_amount, 0), "
+                "addon_cod = MAX(COALESCE(order_items.addon_cod, 0), COALESCE(s.addon_cod, 0)), "
+                "addon_advance = MAX(COALESCE(order_items.addon_advance, 0), COALESCE(s.addon_advance, 0)), "
+                "extra_discount = MAX(COALESCE(order_items.extra_discount, 0), COALESCE(s.extra_discount, 0)) "
+                "FROM sp_orders_stage s WHERE s.item_id = order_items.id AND s.merge_seq = ?",
+                (seq,),
             )
-    if max_sp_order_no is not None:
-        set_app_state(conn, "last_sp_order_no", str(max_sp_order_no))
-        conn.commit()
+        for (row_no,) in conn.execute(
+            "SELECT row_no FROM sp_orders_stage WHERE merge_seq IS NOT NULL"
+        ).fetchall():
+            sp_order_no, sku = labels[row_no]
+            notes.append((row_no, 3, "item_merged_duplicate", f"sp_order_no={sp_order_no}, sku={sku}"))
 
+        conn.execute(
+            "INSERT INTO order_status_history (order_id, status, status_at, source) "
+            "SELECT order_id, status, status_at, 'SP-Narudzbe' FROM sp_orders_stage "
+            "WHERE is_first = 1 AND status IS NOT NULL AND status != '' ORDER BY row_no"
+        )
+        touched_orders = {
+            int(r[0]) for r in conn.execute("SELECT DISTINCT order_id FROM sp_orders_stage").fetchall()
+        }
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.sp_orders_stage")
+
+    notes.sort(key=lambda n: (n[0], n[1]))
+    for row_no, _, reason, details in notes:
+        append_reject(rejects, "SP-Narudzbe", path.name, row_no, reason, details)
+    return touched_orders
+
+
+# Column types mirror payments so staged values get the same affinity conversions.
+_PAYMENT_STAGE_SQL = (
+    "CREATE TEMP TABLE sp_payments_stage ("
+    "row_no INTEGER PRIMARY KEY, "
+    "sp_order_no TEXT NOT NULL, client_code TEXT, customer_code TEXT, customer_name TEXT, "
+    "amount REAL, order_status TEXT, client_status TEXT, import_run_id INTEGER, "
+    "is_duplicate INTEGER"
+    ")"
+)
+
+_PAYMENT_COLUMNS = (
+    "sp_order_no, client_code, customer_code, customer_name, amount, "
+    "order_status, client_status, import_run_id"
+)
+
+# Same key as idx_payments_dedupe; `=` never matches NULLs, like the unique index.
+_PAYMENT_KEY_MATCH = (
+    "{a}.sp_order_no = {b}.sp_order_no "
+    "AND {a}.amount = {b}.amount "
+    "AND {a}.client_status = {b}.client_status"
+)
+
+
+def _payment_values(get, col: dict[str, str], import_id: int) -> tuple:
+    return (
+        str(get(col["sp_order_no"], "")).strip(),
+        str(get(col["client"], "")).strip() or None,
+        str(get(col["customer_code"], "")).strip() or None,
+        str(get(col["payment_customer_name"], "")).strip() or None,
+        get(col["payment_amount"], None),
+        str(get(col["payment_order_status"], "")).strip() or None,
+        str(get(col["payment_client_status"], "")).strip() or None,
+        import_id,
+    )
 
-def import_sp_payments(
+
+def _import_payment_rows(
     conn: sqlite3.Connection,
+    df: pd.DataFrame,
     path: Path,
-    rejects: list | None = None,
+    rejects: list | None,
     *,
     col: dict[str, str],
-    sheet_payments: str,
-    file_hash: Callable[[Path], str],
+    import_id: int,
 ) -> None:
-    df = pd.read_excel(path, sheet_name=sheet_payments)
-    import_id = start_import(conn, "SP-Uplate", path, len(df), file_hash=file_hash)
-    if import_id is None:
-        append_reject(rejects, "SP-Uplate", path.name, None, "file_already_imported", "")
-        return
-
     for idx, row in df.iterrows():
-        sp_order_no = str(row.get(col["sp_order_no"], "")).strip()
+        values = _payment_values(row.get, col, import_id)
+        sp_order_no = values[0]
         if not sp_order_no:
             continue
-        values = (
-            sp_order_no,
-            str(row.get(col["client"], "")).strip() or None,
-            str(row.get(col["customer_code"], "")).strip() or None,
-            str(row.get(col["payment_customer_name"], "")).strip() or None,
-            row.get(col["payment_amount"], None),
-            str(row.get(col["payment_order_status"], "")).strip() or None,
-            str(row.get(col["payment_client_status"], "")).strip() or None,
-            import_id,
-        )
         cur = conn.execute(
-            "INSERT OR IGNORE INTO payments ("
-            "sp_order_no, client_code, customer_code, customer_name, amount, "
-            "order_status, client_status, import_run_id"
-            ") VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            f"INSERT OR IGNORE INTO payments ({_PAYMENT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
             values,
         )
         if cur.rowcount == 0:
@@ -483,7 +792,105 @@ def import_sp_payments(
             )
         maybe_mark_delivered_from_payment(conn, sp_order_no)
 
+
+def _import_payment_rows_bulk(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    path: Path,
+    rejects: list | None,
+    *,
+    col: dict[str, str],
+    import_id: int,
+) -> None:
+    staged = []
+    for idx, get in _iter_sheet_rows(df):
+        values = _payment_values(get, col, import_id)
+        if values[0]:
+            staged.append((int(idx) + 1,) + values)
+    details = {row[0]: f"sp_order_no={row[1]}, amount={row[5]}, status={row[7]}" for row in staged}
+    if not staged:
+        return
+
+    conn.execute("DROP TABLE IF EXISTS temp.sp_payments_stage")
+    conn.execute(_PAYMENT_STAGE_SQL)
+    try:
+        conn.executemany(
+            f"INSERT INTO sp_payments_stage (row_no, {_PAYMENT_COLUMNS}) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            staged,
+        )
+        conn.execute(
+            "CREATE INDEX temp.idx_sp_payments_stage_key "
+            "ON sp_payments_stage(sp_order_no, amount, client_status)"
+        )
+        # A row whose key is already in the DB, or earlier in this sheet, is ignored.
+        conn.execute(
+            "UPDATE sp_payments_stage SET is_duplicate = ("
+            "EXISTS (SELECT 1 FROM payments p WHERE "
+            + _PAYMENT_KEY_MATCH.format(a="p", b="sp_payments_stage")
+            + ") OR EXISTS (SELECT 1 FROM sp_payments_stage s WHERE "
+            + _PAYMENT_KEY_MATCH.format(a="s", b="sp_payments_stage")
+            + " AND s.row_no < sp_payments_stage.row_no))"
+        )
+        conn.execute(
+            f"INSERT OR IGNORE INTO payments ({_PAYMENT_COLUMNS}) "
+            f"SELECT {_PAYMENT_COLUMNS} FROM sp_payments_stage "
+            "WHERE is_duplicate = 0 ORDER BY row_no"
+        )
+        for (row_no,) in conn.execute(
+            "SELECT row_no FROM sp_payments_stage WHERE is_duplicate = 1 ORDER BY row_no"
+        ).fetchall():
+            append_reject(rejects, "SP-Uplate", path.name, row_no, "payment_duplicate", details[row_no])
+
+        # maybe_mark_delivered_from_payment for the whole sheet: history in the
+        # order the orders first appear, then one UPDATE.
+        conn.execute(
+            "INSERT INTO order_status_history (order_id, status, status_at, source) "
+            "SELECT o.id, 'Isporučeno', '', 'SP-Uplate' FROM orders o "
+            "JOIN (SELECT sp_order_no, MIN(row_no) AS first_row FROM sp_payments_stage "
+            "GROUP BY sp_order_no) s ON s.sp_order_no = o.sp_order_no "
+            "WHERE lower(o.status) IN ('poslato', 'poslano') ORDER BY s.first_row"
+        )
+        conn.execute(
+            "UPDATE orders SET status = 'Isporučeno' "
+            "WHERE lower(status) IN ('poslato', 'poslano') "
+            "AND sp_order_no IN (SELECT sp_order_no FROM sp_payments_stage)"
+        )
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.sp_payments_stage")
+
+
+def import_sp_payments(
+    conn: sqlite3.Connection,
+    path: Path,
+    rejects: list | None = None,
+    *,
+    col: dict[str, str],
+    sheet_payments: str,
+    file_hash: Callable[[Path], str],
+    bulk: bool = True,
+    df: pd.DataFrame | None = None,
+    sheet_cache: SheetCache | None = None,
+) -> None:
+    """
+    bulk=True stages the sheet with one executemany, inserts the new payments and
+    marks paid "Poslato" orders as delivered with set-based SQL; bulk=False is the
+    row-by-row importer (maybe_mark_delivered_from_payment per row). Both produce
+    the same rows and rejects.
+    """
+    started = time.perf_counter()
+    if df is None:
+        df = read_sheet(path, sheet_payments, columns=sheet_columns(col, SP_PAYMENT_KEYS), cache=sheet_cache)
+    import_id = start_import(conn, "SP-Uplate", path, len(df), file_hash=file_hash)
+    if import_id is None:
+        append_reject(rejects, "SP-Uplate", path.name, None, "file_already_imported", "")
+        return
+
+    import_rows = _import_payment_rows_bulk if bulk else _import_payment_rows
+    import_rows(conn, df, path, rejects, col=col, import_id=import_id)
+
     conn.commit()
+    finish_import(conn, import_id, len(df), started, parse_seconds=df.attrs.get("parse_seconds"))
 
 
 def import_sp_returns(
@@ -494,8 +901,12 @@ def import_sp_returns(
     col: dict[str, str],
     sheet_orders: str,
     file_hash: Callable[[Path], str],
+    df: pd.DataFrame | None = None,
+    sheet_cache: SheetCache | None = None,
 ) -> None:
-    df = pd.read_excel(path, sheet_name=sheet_orders)
+    started = time.perf_counter()
+    if df is None:
+        df = read_sheet(path, sheet_orders, columns=sheet_columns(col, SP_RETURN_KEYS), cache=sheet_cache)
     import_id = start_import(conn, "SP-Preuzimanja", path, len(df), file_hash=file_hash)
     if import_id is None:
         append_reject(rejects, "SP-Preuzimanja", path.name, None, "file_already_imported", "")
@@ -533,3 +944,4 @@ def import_sp_returns(
             )
 
     conn.commit()
+    finish_import(conn, import_id, len(df), started, parse_seconds=df.attrs.get("parse_seconds"))
@@ -2,14 +2,18 @@ from __future__ import annotations
 
 import hashlib
 import sqlite3
+import time
 import unicodedata
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Callable
 
-import pandas as pd
+from .import_common import append_reject, finish_import, start_import
+from .sheet_cache import SheetCache
+from .startup import lazy_import
+from .xlsx_read import read_sheet
 
-from .import_common import append_reject, start_import
+pd = lazy_import("pandas")
 
 
 def _canon_col(name: Any) -> str:
@@ -19,6 +23,21 @@ def _canon_col(name: Any) -> str:
     return "".join(ch for ch in text if ch.isalnum() or ch.isspace()).strip()
 
 
+# Columns import_sp_prijem uses (matched through _canon_col); others are not parsed.
+PRIJEM_COLUMNS = frozenset(
+    _canon_col(name)
+    for name in (
+        "Šifra klijenta", "Šifra proizvoda", "Ime proizvoda", "Poslata količina",
+        "Pristigla količina", "Datum dodavanja", "Datum verifikacije", "Status",
+    )
+)
+
+
+def prijem_column(name: Any) -> bool:
+    # Header filter for read_sheet (top-level so worker processes can pickle it).
+    return _canon_col(name) in PRIJEM_COLUMNS
+
+
 def _parse_dt(value: Any) -> str | None:
     if value is None or value == "":
         return None
@@ -45,8 +64,12 @@ def import_sp_prijem(
     rejects: list | None = None,
     *,
     file_hash: Callable[[Path], str],
+    df: pd.DataFrame | None = None,
+    sheet_cache: SheetCache | None = None,
 ) -> None:
-    df = pd.read_excel(path, engine="openpyxl")
+    started = time.perf_counter()
+    if df is None:
+        df = read_sheet(path, columns=prijem_column, cache=sheet_cache)
     colmap = {_canon_col(c): c for c in df.columns}
 
     def col(key: str) -> Any:
@@ -146,6 +169,7 @@ def import_sp_prijem(
             )
 
         conn.commit()
+        finish_import(conn, import_id, len(df), started, parse_seconds=df.attrs.get("parse_seconds"))
     except Exception as exc:
         conn.rollback()
         conn.execute("DELETE FROM import_runs WHERE id = ?", (import_id,))
@@ -167,8 +191,9 @@ def import_sp_prijemi_folder(
     rejects: list | None = None,
     *,
     file_hash: Callable[[Path], str],
+    sheet_cache: SheetCache | None = None,
 ) -> None:
     paths = [p for p in root.rglob("*.xlsx") if p.is_file()] if root.exists() else []
     paths.sort(key=lambda p: p.stat().st_mtime)
     for path in paths:
-        import_sp_prijem(conn, path, rejects, file_hash=file_hash)
+        import_sp_prijem(conn, path, rejects, file_hash=file_hash, sheet_cache=sheet_cache)
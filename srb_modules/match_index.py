@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import math
+import random
+from collections.abc import Callable, Iterable
+from datetime import date, timedelta
+from typing import Any
+
+
+def amount_key(value) -> int | None:
+    """
+    Bucket for the +-0.5 amount tolerance used by match_minimax: two amounts
+    that pass amount_exact are at most one bucket apart. None for values that
+    never match (None, text, NaN, inf).
+    """
+    if value is None:
+        return None
+    try:
+        return math.floor(round(float(value), 2))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class MemoKey:
+    """Per-run memo around a pure normalizer (names and dates repeat a lot)."""
+
+    def __init__(self, fn: Callable[[Any], Any]) -> None:
+        self.fn = fn
+        self.cache: dict[Any, Any] = {}
+
+    def __call__(self, value):
+        try:
+            return self.cache[value]
+        except KeyError:
+            result = self.fn(value)
+            self.cache[value] = result
+            return result
+        except TypeError:  # unhashable
+            return self.fn(value)
+
+
+class InvoiceIndex:
+    """
+    Blocking index over match_minimax invoices. Lookups return a superset of
+    the invoices the date-window scan would accept for the same key (exact
+    normalized name, or neighbouring amount bucket), so the caller still runs
+    its own amount/date/used checks on a handful of rows instead of every
+    invoice in the window.
+    """
+
+    def __init__(self, invoices: Iterable[dict], *, name_key: Callable[[Any], str]) -> None:
+        self.name_key = name_key
+        self.by_date_name: dict[tuple[date, str], list[dict]] = {}
+        self.by_name: dict[str, list[dict]] = {}
+        self.by_date_amount: dict[tuple[date, int], list[dict]] = {}
+        for inv in invoices:
+            name = name_key(inv.get("customer_name"))
+            idate = inv.get("turnover_date")
+            self.by_name.setdefault(name, []).append(inv)
+            if idate:
+                self.by_date_name.setdefault((idate, name), []).append(inv)
+                akey = amount_key(inv.get("amount_due"))
+                if akey is not None:
+                    self.by_date_amount.setdefault((idate, akey), []).append(inv)
+
+    def same_name(self, order: dict, days_back: int = 1, days_forward: int = 3) -> list[dict]:
+        # Undated invoices only qualify for undated orders (date_in_window needs both dates).
+        name = self.name_key(order.get("customer_name"))
+        odate = order.get("picked_up_date")
+        if not odate:
+            return self.by_name.get(name, [])
+        out: list[dict] = []
+        for offset in range(-days_back, days_forward + 1):
+            out.extend(self.by_date_name.get((odate + timedelta(days=offset), name), []))
+        return out
+
+    def same_amount(self, order: dict, days_back: int = 1, days_forward: int = 3) -> list[dict]:
+        odate = order.get("picked_up_date")
+        akey = amount_key(order.get("amount"))
+        if not odate or akey is None:
+            return []
+        out: list[dict] = []
+        for offset in range(-days_back, days_forward + 1):
+            day = odate + timedelta(days=offset)
+            for key in (akey - 1, akey, akey + 1):
+                out.extend(self.by_date_amount.get((day, key), []))
+        return out
+
+
+def synthetic_match_data(
+    orders: int, *, seed: int = 7, start: date = date(2025, 1, 1)
+) -> tuple[list[tuple], list[tuple], list[tuple]]:
+    """
+    Synthetic SP orders / order items / Minimax invoices for the matching
+    benchmark: most orders have an invoice with the same (sometimes re-cased
+    or accented) name and amount a few days later, some only match on amount,
+    some have no invoice. Returns (orders, order_items, invoices) rows for
+    INSERT into the tables of the same name.
+    """
+    rng = random.Random(seed)
+    first = ["Marko", "Jelena", "Nikola", "Milica", "Stefan", "Ana", "Ivana", "Dorde", "Snezana", "Petar"]
+    last = ["Petrovic", "Jovanovic", "Nikolic", "Markovic", "Dordevic", "Ilic", "Stojanovic", "Pavlovic"]
+    order_rows, item_rows, invoice_rows = [], [], []
+    days = max(30, orders // 40)
+    for i in range(1, orders + 1):
+        name = f"{rng.choice(first)} {rng.choice(last)}"
+        picked = start + timedelta(days=rng.randrange(days))
+        amount = float(rng.randrange(1500, 12000, 50))
+        order_rows.append(
+            (
+                i,
+                f"SP{i:07d}",
+                name,
+                f"{picked.isoformat()} {rng.randrange(8, 20):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}",
+                picked.isoformat(),
+                "Isporuceno",
+            )
+        )
+        item_rows.append((i, i, f"ART{rng.randrange(200):03d}", 1.0, amount, 0.0, 0.0, 0.0, 0.0, 0.0))
+        roll = rng.random()
+        if roll < 0.12:
+            continue
+        inv_name = name
+        if roll < 0.22:
+            inv_name = f"{rng.choice(first)} {rng.choice(last)}"
+        elif roll < 0.35:
+            inv_name = name.upper() + "."
+        turnover = picked + timedelta(days=rng.choice([-1, 0, 0, 1, 1, 2, 3]))
+        due = amount + (0.4 if rng.random() < 0.05 else 0.0)
+        invoice_rows.append((i, f"SP-MM-{i:06d}", inv_name, turnover.strftime("%d.%m.%Y"), due))
+    return order_rows, item_rows, invoice_rows
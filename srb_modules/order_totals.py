@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterable
+
+ORDER_TOTALS_SQL = """
+CREATE TABLE IF NOT EXISTS order_totals (
+  order_id INTEGER PRIMARY KEY,
+  order_discount REAL NOT NULL,
+  addon_cod REAL NOT NULL,
+  items_net REAL NOT NULL,
+  cash_total REAL NOT NULL,
+  qty_total REAL NOT NULL,
+  item_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS order_sku_totals (
+  order_id INTEGER NOT NULL,
+  product_code TEXT NOT NULL,
+  qty REAL NOT NULL,
+  net_total REAL NOT NULL,
+  PRIMARY KEY (order_id, product_code)
+);
+
+CREATE INDEX IF NOT EXISTS idx_order_sku_totals_product
+  ON order_sku_totals(product_code);
+"""
+
+# Same arithmetic as the `od` / `order_totals` CTEs in queries.py, without the
+# status/date filters (those are applied when reading through the orders join).
+# {items_where} / {orders_where} take an optional order_id filter.
+_LIVE_ORDER_TOTALS_SQL = (
+    "WITH od AS ("
+    "  SELECT order_id, "
+    "    MAX(COALESCE(discount, 0)) AS order_discount, "
+    "    MAX(COALESCE(addon_cod, 0)) AS addon_cod "
+    "  FROM order_items {items_where} "
+    "  GROUP BY order_id"
+    "), "
+    "t AS ("
+    "  SELECT "
+    "    o.id AS order_id, "
+    "    COALESCE(od.order_discount, 0) AS order_discount, "
+    "    COALESCE(od.addon_cod, 0) AS addon_cod, "
+    "    COALESCE(SUM("
+    "      COALESCE(oi.qty, 0) * COALESCE(oi.cod_amount, 0) "
+    "      * (1 - COALESCE(od.order_discount, 0) / 100.0) "
+    "      * (1 - COALESCE(oi.extra_discount, 0) / 100.0)"
+    "    ), 0) AS items_net, "
+    "    COALESCE(SUM(COALESCE(oi.qty, 0)), 0) AS qty_total, "
+    "    COUNT(oi.id) AS item_count "
+    "  FROM orders o "
+    "  LEFT JOIN order_items oi ON oi.order_id = o.id "
+    "  LEFT JOIN od ON od.order_id = o.id "
+    "  {orders_where} "
+    "  GROUP BY o.id"
+    ") "
+    "SELECT order_id, order_discount, addon_cod, items_net, "
+    "  items_net + addon_cod * (1 - order_discount / 100.0) AS cash_total, "
+    "  qty_total, item_count "
+    "FROM t"
+)
+
+_LIVE_SKU_TOTALS_SQL = (
+    "WITH od AS ("
+    "  SELECT order_id, MAX(COALESCE(discount, 0)) AS order_discount "
+    "  FROM order_items {items_where} "
+    "  GROUP BY order_id"
+    ") "
+    "SELECT oi.order_id, oi.product_code, "
+    "  SUM(COALESCE(oi.qty, 0)) AS qty, "
+    "  SUM("
+    "    COALESCE(oi.qty, 0) * COALESCE(oi.cod_amount, 0) "
+    "    * (1 - COALESCE(od.order_discount, 0) / 100.0) "
+    "    * (1 - COALESCE(oi.extra_discount, 0) / 100.0)"
+    "  ) AS net_total "
+    "FROM order_items oi "
+    "LEFT JOIN od ON od.order_id = oi.order_id "
+    "WHERE oi.product_code IS NOT NULL {and_items} "
+    "GROUP BY oi.order_id, oi.product_code"
+)
+
+_CHUNK = 500
+
+
+def ensure_order_totals_tables(conn: sqlite3.Connection) -> None:
+    conn.executescript(ORDER_TOTALS_SQL)
+
+
+def _live_queries(order_ids: list[int] | None) -> tuple[str, str]:
+    if order_ids is None:
+        return (
+            _LIVE_ORDER_TOTALS_SQL.format(items_where="", orders_where=""),
+            _LIVE_SKU_TOTALS_SQL.format(items_where="", and_items=""),
+        )
+    ph = ",".join("?" for _ in order_ids)
+    return (
+        _LIVE_ORDER_TOTALS_SQL.format(
+            items_where=f"WHERE order_id IN ({ph})", orders_where=f"WHERE o.id IN ({ph})"
+        ),
+        _LIVE_SKU_TOTALS_SQL.format(
+            items_where=f"WHERE order_id IN ({ph})", and_items=f"AND oi.order_id IN ({ph})"
+        ),
+    )
+
+
+def delete_order_totals(conn: sqlite3.Connection, order_ids: Iterable[int]) -> None:
+    ids = sorted({int(x) for x in order_ids})
+    for i in range(0, len(ids), _CHUNK):
+        chunk = ids[i : i + _CHUNK]
+        ph = ",".join("?" for _ in chunk)
+        conn.execute(f"DELETE FROM order_totals WHERE order_id IN ({ph})", chunk)
+        conn.execute(f"DELETE FROM order_sku_totals WHERE order_id IN ({ph})", chunk)
+
+
+def refresh_order_totals(
+    conn: sqlite3.Connection, order_ids: Iterable[int] | None = None
+) -> int:
+    """
+    Rebuilds order_totals/order_sku_totals for the given orders (all orders when
+    order_ids is None). Returns number of refreshed order rows. Caller commits.
+    """
+    ensure_order_totals_tables(conn)
+    if order_ids is None:
+        conn.execute("DELETE FROM order_totals")
+        conn.execute("DELETE FROM order_sku_totals")
+        orders_sql, sku_sql = _live_queries(None)
+        cur = conn.execute(f"INSERT INTO order_totals {orders_sql}")
+        conn.execute(f"INSERT INTO order_sku_totals {sku_sql}")
+        return int(cur.rowcount)
+
+    ids = sorted({int(x) for x in order_ids})
+    delete_order_totals(conn, ids)
+    refreshed = 0
+    for i in range(0, len(ids), _CHUNK):
+        chunk = ids[i : i + _CHUNK]
+        orders_sql, sku_sql = _live_queries(chunk)
+        cur = conn.execute(f"INSERT INTO order_totals {orders_sql}", (*chunk, *chunk))
+        conn.execute(f"INSERT INTO order_sku_totals {sku_sql}", (*chunk, *chunk))
+        refreshed += int(cur.rowcount)
+    return refreshed
+
+
+def backfill_order_totals(conn: sqlite3.Connection) -> bool:
+    """Fills the tables once for databases created before they existed."""
+    ensure_order_totals_tables(conn)
+    if conn.execute("SELECT 1 FROM order_totals LIMIT 1").fetchone():
+        return False
+    if not conn.execute("SELECT 1 FROM orders LIMIT 1").fetchone():
+        return False
+    refresh_order_totals(conn)
+    return True
+
+
+def check_order_totals(
+    conn: sqlite3.Connection, tolerance: float = 0.005
+) -> list[tuple[str, int, str | None, str]]:
+    """
+    Compares the materialized tables with the live aggregation over order_items.
+    Returns (table, order_id, product_code, detail) per mismatch; empty list = OK.
+    """
+    ensure_order_totals_tables(conn)
+    orders_sql, sku_sql = _live_queries(None)
+    issues: list[tuple[str, int, str | None, str]] = []
+
+    live = {int(r[0]): r[1:] for r in conn.execute(orders_sql).fetchall()}
+    stored = {
+        int(r[0]): r[1:]
+        for r in conn.execute(
+            "SELECT order_id, order_discount, addon_cod, items_net, cash_total, "
+            "qty_total, item_count FROM order_totals"
+        ).fetchall()
+    }
+    names = ("order_discount", "addon_cod", "items_net", "cash_total", "qty_total", "item_count")
+    for order_id in sorted(live.keys() | stored.keys()):
+        a = live.get(order_id)
+        b = stored.get(order_id)
+        if b is None:
+            issues.append(("order_totals", order_id, None, "missing"))
+            continue
+        if a is None:
+            issues.append(("order_totals", order_id, None, "stale (order deleted)"))
+            continue
+        for name, x, y in zip(names, a, b):
+            if abs(float(x or 0) - float(y or 0)) > tolerance:
+                issues.append(("order_totals", order_id, None, f"{name}: live={x} stored={y}"))
+
+    live_sku = {(int(r[0]), str(r[1])): r[2:] for r in conn.execute(sku_sql).fetchall()}
+    stored_sku = {
+        (int(r[0]), str(r[1])): r[2:]
+        for r in conn.execute(
+            "SELECT order_id, product_code, qty, net_total FROM order_sku_totals"
+        ).fetchall()
+    }
+    for key in sorted(live_sku.keys() | stored_sku.keys()):
+        a = live_sku.get(key)
+        b = stored_sku.get(key)
+        if b is None:
+            issues.append(("order_sku_totals", key[0], key[1], "missing"))
+            continue
+        if a is None:
+            issues.append(("order_sku_totals", key[0], key[1], "stale"))
+            continue
+        for name, x, y in zip(("qty", "net_total"), a, b):
+            if abs(float(x or 0) - float(y or 0)) > tolerance:
+                issues.append(
+                    ("order_sku_totals", key[0], key[1], f"{name}: live={x} stored={y}")
+                )
+    return issues
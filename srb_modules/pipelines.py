@@ -6,6 +6,7 @@ from pathlib import Path
 
 from srb_modules.db import (
     connect_db,
+    ensure_column,
     file_hash,
     set_app_state,
     set_task_progress,
@@ -13,6 +14,7 @@ from srb_modules.db import (
 )
 from srb_modules.import_kartice_events import import_kartice_events_csv
 from srb_modules.import_sp_prijemi import import_sp_prijemi_folder
+from srb_modules.sheet_cache import SheetCache
 
 
 def _ensure_task_progress_table(db_path: Path) -> None:
@@ -28,6 +30,10 @@ def _ensure_task_progress_table(db_path: Path) -> None:
             "row_count INTEGER NOT NULL"
             ")"
         )
+        # finish_import writes these; this DB may not have gone through init_db.
+        ensure_column(conn, "import_runs", "duration_sec", "REAL")
+        ensure_column(conn, "import_runs", "rows_per_sec", "REAL")
+        ensure_column(conn, "import_runs", "parse_sec", "REAL")
         conn.execute(
             "CREATE UNIQUE INDEX IF NOT EXISTS idx_import_runs_file_hash "
             "ON import_runs(file_hash)"
@@ -142,7 +148,19 @@ def run_regenerate_sku_metrics_process(
     sp_db_path: str,
     progress_db_path: str,
     task_name: str = "regen_metrics",
+    pdf_workers: int = 1,
+    in_process: bool = False,
+    incremental: bool = True,
+    sheet_cache: SheetCache | None = None,
 ) -> None:
+    """
+    in_process=True runs both stages in this process and hands DataFrames from
+    extract to build directly; CSVs are still written as the final artifacts.
+    incremental=True lets the build reuse the latest outputs in out_dir for the
+    SKUs/days that did not change (same result as a full rebuild).
+    sheet_cache: SP Prijemi workbooks (import and receipts summary) are loaded
+    from it when unchanged.
+    """
     pdf_root_p = Path(pdf_root)
     prijemi_root_p = Path(prijemi_root)
     out_dir_p = Path(out_dir)
@@ -176,22 +194,48 @@ def run_regenerate_sku_metrics_process(
         run_dir = _make_run_dir(out_dir_p)
 
         update_task_progress(conn, task_name, 1)
-        cmd1 = [
-            sys.executable,
-            str(extract_script),
-            "--skip-excel",
-            "--pdf",
-            str(pdf_path),
-            "--prijemi",
-            str(prijemi_root_p),
-            "--out",
-            str(run_dir),
-        ]
-        r1 = subprocess.run(cmd1, capture_output=True, text=True, check=False)
-        if r1.returncode != 0:
-            raise RuntimeError(
-                f"extract_kalkulacije_kartice.py greska:\n{r1.stderr or r1.stdout}"
+        page_cache = out_dir_p / "kartice_page_cache.sqlite"
+        events_df = None
+        receipts_df = None
+        if in_process:
+            import extract_kalkulacije_kartice as kartice_stage
+
+            events_df, receipts_df = kartice_stage.run_kartice_stage(
+                pdf_path,
+                prijemi_root_p,
+                run_dir,
+                workers=int(pdf_workers),
+                cache_path=page_cache,
+                sheet_cache=sheet_cache,
             )
+        else:
+            cmd1 = [
+                sys.executable,
+                str(extract_script),
+                "--skip-excel",
+                "--pdf",
+                str(pdf_path),
+                "--prijemi",
+                str(prijemi_root_p),
+                "--out",
+                str(run_dir),
+                "--pdf-workers",
+                str(int(pdf_workers)),
+                "--page-cache",
+                str(page_cache),
+            ]
+            if sheet_cache is not None:
+                cmd1 += [
+                    "--sheet-cache",
+                    str(sheet_cache.path),
+                    "--sheet-cache-mb",
+                    str(sheet_cache.max_bytes / (1024 * 1024)),
+                ]
+            r1 = subprocess.run(cmd1, capture_output=True, text=True, check=False)
+            if r1.returncode != 0:
+                raise RuntimeError(
+                    f"extract_kalkulacije_kartice.py greska:\n{r1.stderr or r1.stdout}"
+                )
 
         try:
             set_app_state(conn, "kartice_pdf_name", pdf_path.name)
@@ -207,11 +251,20 @@ def run_regenerate_sku_metrics_process(
                     set_app_state(conn, "kartice_range_end", str(data["range_end_iso"]))
                 if data.get("final_end_iso"):
                     set_app_state(conn, "kartice_final_end", str(data["final_end_iso"]))
+                if data.get("page_cache_hits") is not None:
+                    set_app_state(
+                        conn,
+                        "kartice_page_cache",
+                        f"hits={data['page_cache_hits']}, misses={data.get('page_cache_misses')}, "
+                        f"pages={data.get('page_count')}",
+                    )
         except Exception:
             pass
 
         update_task_progress(conn, task_name, 2)
-        import_sp_prijemi_folder(conn, prijemi_root_p, rejects=None, file_hash=file_hash)
+        import_sp_prijemi_folder(
+            conn, prijemi_root_p, rejects=None, file_hash=file_hash, sheet_cache=sheet_cache
+        )
 
         update_task_progress(conn, task_name, 3)
         events_csv = run_dir / "kartice_events.csv"
@@ -219,23 +272,48 @@ def run_regenerate_sku_metrics_process(
             import_kartice_events_csv(conn, events_csv, rejects=None, file_hash=file_hash)
 
         update_task_progress(conn, task_name, 4)
-        cmd2 = [
-            sys.executable,
-            str(build_script),
-            "--events",
-            str(run_dir / "kartice_events.csv"),
-            "--receipts-summary",
-            str(run_dir / "sp_prijemi_summary.csv"),
-            "--db",
-            str(sp_db_p),
-            "--out",
-            str(run_dir),
-        ]
-        r2 = subprocess.run(cmd2, capture_output=True, text=True, check=False)
-        if r2.returncode != 0:
-            raise RuntimeError(
-                f"build_sku_daily_metrics.py greska:\n{r2.stderr or r2.stdout}"
+        if in_process:
+            import build_sku_daily_metrics as metrics_stage
+
+            metrics_stage.build_sku_metrics(
+                metrics_stage.prepare_kartice_events(events_df),
+                metrics_stage.prepare_receipts_summary(receipts_df),
+                sp_db_p,
+                run_dir,
+                incremental_from=out_dir_p if incremental else None,
             )
+        else:
+            cmd2 = [
+                sys.executable,
+                str(build_script),
+                "--events",
+                str(run_dir / "kartice_events.csv"),
+                "--receipts-summary",
+                str(run_dir / "sp_prijemi_summary.csv"),
+                "--db",
+                str(sp_db_p),
+                "--out",
+                str(run_dir),
+            ]
+            if incremental:
+                cmd2 += ["--incremental-from", str(out_dir_p)]
+            r2 = subprocess.run(cmd2, capture_output=True, text=True, check=False)
+            if r2.returncode != 0:
+                raise RuntimeError(
+                    f"build_sku_daily_metrics.py greska:\n{r2.stderr or r2.stdout}"
+                )
+
+        try:
+            state_path = run_dir / "sku_metrics_state.json"
+            if state_path.exists():
+                import json
+
+                last_run = json.loads(state_path.read_text(encoding="utf-8")).get("last_run") or {}
+                set_app_state(
+                    conn, "sku_metrics_last_run", ", ".join(f"{k}={v}" for k, v in last_run.items())
+                )
+        except Exception:
+            pass
 
         # Copy outputs to root out_dir as "latest" so UI stays stable, while run_dir keeps history.
         try:
@@ -247,8 +325,11 @@ def run_regenerate_sku_metrics_process(
                 "sp_prijemi_detail.csv",
                 "sp_prijemi_summary.csv",
                 "sku_daily_metrics.csv",
+                "sku_daily_metrics.parquet",
+                "sku_daily_metrics.pkl",
                 "sku_controls_audit.csv",
                 "sku_promo_periods.csv",
+                "sku_metrics_state.json",
             ]:
                 src = run_dir / name
                 if src.exists():
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import multiprocessing
+import queue as queue_mod
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+# Where publish() sends updates in this process: the UI's queue (also passed to
+# executor workers through install_progress_sink), or nowhere (CLI, tests).
+_sink: Any = None
+
+
+def install_progress_sink(queue) -> None:
+    """Executor initializer / UI setup: route this process' progress updates to `queue`."""
+    global _sink
+    _sink = queue
+
+
+def publish(task: str, *, total: int | None = None, processed: int | None = None) -> None:
+    """
+    Called by set_task_progress / update_task_progress after the DB write. Never
+    raises and never blocks: without a sink (or if the queue is gone) the
+    task_progress row is the only record, exactly as before.
+    """
+    sink = _sink
+    if sink is None:
+        return
+    try:
+        sink.put_nowait((task, total, processed, time.time()))
+    except Exception:
+        pass
+
+
+class ProgressBus:
+    """
+    UI side of the progress channel. Updates published in this process or in
+    executor workers arrive on one multiprocessing queue; pump() (run from the
+    Tk main loop) drains it, keeps the latest state per task and calls the
+    subscribers on the main thread. get() returns the same dict shape as
+    db.get_task_progress, or None when nothing was pushed for the task yet
+    (callers then fall back to task_progress).
+    """
+
+    def __init__(self, queue=None) -> None:
+        self.queue = queue if queue is not None else multiprocessing.Queue()
+        self.latest: dict[str, dict] = {}
+        self.last_task: str | None = None
+        self.last_at: float | None = None
+        self.subscribers: list[Callable[[str, dict], None]] = []
+
+    def install(self) -> None:
+        install_progress_sink(self.queue)
+
+    def subscribe(self, callback: Callable[[str, dict], None]) -> Callable[[], None]:
+        self.subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            try:
+                self.subscribers.remove(callback)
+            except ValueError:
+                pass
+
+        return unsubscribe
+
+    def forget(self, task: str) -> None:
+        # Drop the previous run's numbers before a task starts again.
+        self.latest.pop(task, None)
+
+    def get(self, task: str) -> dict | None:
+        info = self.latest.get(task)
+        if info is None or info.get("total") is None:
+            return None
+        return dict(info)
+
+    def pump(self, limit: int = 1000) -> int:
+        handled = 0
+        while handled < limit:
+            try:
+                task, total, processed, at = self.queue.get_nowait()
+            except (queue_mod.Empty, EOFError, OSError, ValueError):
+                break
+            handled += 1
+            info = self.latest.setdefault(task, {"total": None, "processed": 0, "updated_at": None})
+            if total is not None:
+                info["total"] = int(total)
+                info["processed"] = 0
+            if processed is not None:
+                info["processed"] = int(processed)
+            info["updated_at"] = datetime.fromtimestamp(at).strftime("%Y-%m-%d %H:%M:%S")
+            self.last_task = task
+            self.last_at = at
+            for callback in list(self.subscribers):
+                try:
+                    callback(task, dict(info))
+                except Exception:
+                    pass
+        return handled
+
+    def close(self) -> None:
+        global _sink
+        if _sink is self.queue:
+            _sink = None
+        try:
+            self.queue.close()
+            self.queue.cancel_join_thread()
+        except Exception:
+            pass
+
+
+class LogTail:
+    """
+    Follows a growing text log by byte offset: read_new() returns only the
+    lines appended since the last call. The first call reads at most the last
+    `initial_bytes`; a truncated or replaced file is read from the start again.
+    """
+
+    def __init__(self, path: Path, initial_bytes: int = 8192) -> None:
+        self.path = Path(path)
+        self.initial_bytes = initial_bytes
+        self.offset: int | None = None
+        self.partial = b""
+        self.last_line: str | None = None
+
+    def read_new(self) -> list[str]:
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            self.offset = None
+            self.partial = b""
+            return []
+        skip_first = False
+        if self.offset is None:
+            self.offset = max(0, size - self.initial_bytes)
+            skip_first = self.offset > 0
+        elif size < self.offset:
+            self.offset = 0
+            self.partial = b""
+        if size == self.offset:
+            return []
+        with self.path.open("rb") as handle:
+            if skip_first:
+                # Started mid-file: drop the first line only if it was cut.
+                handle.seek(self.offset - 1)
+                skip_first = handle.read(1) != b"\n"
+            handle.seek(self.offset)
+            data = handle.read(size - self.offset)
+        self.offset += len(data)
+        data = self.partial + data
+        chunks = data.split(b"\n")
+        self.partial = chunks.pop()
+        if skip_first and chunks:
+            chunks = chunks[1:]
+        lines = [c.decode("utf-8", errors="replace").rstrip("\r") for c in chunks]
+        lines = [line for line in lines if line.strip()]
+        if lines:
+            self.last_line = lines[-1].strip()
+        return lines
@@ -6,7 +6,20 @@ import unicodedata
 from collections.abc import Callable
 from datetime import date, datetime, timedelta
 
-import pandas as pd
+from .startup import lazy_import
+
+pd = lazy_import("pandas")
+
+
+# Text date columns that get a normalized `<column>_iso` (YYYY-MM-DD) twin,
+# a VIRTUAL generated column computed from date_expr (see db.ensure_iso_date_columns).
+ISO_DATE_COLUMNS: dict[str, tuple[str, ...]] = {
+    "orders": ("created_at", "picked_up_at", "delivered_at"),
+    "returns": ("created_at", "picked_up_at", "delivered_at"),
+    "invoices": ("date",),
+    "bank_transactions": ("dtposted",),
+}
+_ISO_DATE_NAMES = {c for cols in ISO_DATE_COLUMNS.values() for c in cols}
 
 
 def date_expr(column: str) -> str:
@@ -20,12 +33,20 @@ def date_expr(column: str) -> str:
     )
 
 
+def iso_date_expr(column: str) -> str:
+    """`o.created_at` -> `o.created_at_iso` for normalized columns, else date_expr(column)."""
+    name = column.rpartition(".")[2]
+    if name in _ISO_DATE_NAMES:
+        return f"{column}_iso"
+    return date_expr(column)
+
+
 def date_filter_clause(
     column: str, days: int | None, start: str | None = None, end: str | None = None
 ):
     params: list[str] = []
     clauses: list[str] = []
-    expr = date_expr(column)
+    expr = iso_date_expr(column)
     if start:
         clauses.append(f"{expr} >= date(?)")
         params.append(start)
@@ -48,8 +69,27 @@ def get_top_customers(
     days: int | None = None,
     start: str | None = None,
     end: str | None = None,
+    *,
+    materialized: bool = False,
 ):
     date_clause, params = date_filter_clause("o.created_at", days, start, end)
+    if materialized:
+        return conn.execute(
+            "SELECT "
+            "  COALESCE(NULLIF(TRIM(MAX(o.customer_name)), ''), o.customer_key) AS display_name, "
+            "  COUNT(DISTINCT o.id) AS orders_cnt, "
+            "  SUM(COALESCE(ot.cash_total, 0)) AS net_total "
+            "FROM orders o "
+            "LEFT JOIN order_totals ot ON ot.order_id = o.id "
+            "WHERE o.customer_key IS NOT NULL AND TRIM(o.customer_key) != '' "
+            "  AND o.created_at IS NOT NULL "
+            "  AND (o.status IS NULL OR (o.status NOT LIKE '%Vra\u0107eno%' AND o.status NOT LIKE '%Vraceno%')) "
+            + date_clause
+            + " GROUP BY o.customer_key "
+            "ORDER BY net_total DESC "
+            "LIMIT ?",
+            (*params, limit),
+        ).fetchall()
     rows = conn.execute(
         "WITH od AS ("
         "  SELECT order_id, "
@@ -99,8 +139,26 @@ def get_top_products(
     days: int | None = None,
     start: str | None = None,
     end: str | None = None,
+    *,
+    materialized: bool = False,
 ):
     date_clause, params = date_filter_clause("o.created_at", days, start, end)
+    if materialized:
+        return conn.execute(
+            "SELECT st.product_code, "
+            "  SUM(st.qty) AS total_qty, "
+            "  SUM(st.net_total) AS net_total "
+            "FROM order_sku_totals st "
+            "JOIN orders o ON o.id = st.order_id "
+            "WHERE TRIM(st.product_code) != '' "
+            "  AND o.created_at IS NOT NULL "
+            "  AND (o.status IS NULL OR (o.status NOT LIKE '%Vra\u0107eno%' AND o.status NOT LIKE '%Vraceno%')) "
+            + date_clause
+            + " GROUP BY st.product_code "
+            "ORDER BY net_total DESC "
+            "LIMIT ?",
+            (*params, limit),
+        ).fetchall()
     rows = conn.execute(
         "WITH od AS ("
         "  SELECT order_id, MAX(COALESCE(discount, 0)) AS order_discount "
@@ -135,8 +193,24 @@ def get_top_products_qty(
     days: int | None = None,
     start: str | None = None,
     end: str | None = None,
+    *,
+    materialized: bool = False,
 ):
     date_clause, params = date_filter_clause("o.created_at", days, start, end)
+    if materialized:
+        return conn.execute(
+            "SELECT st.product_code, SUM(st.qty) AS total_qty "
+            "FROM order_sku_totals st "
+            "JOIN orders o ON o.id = st.order_id "
+            "WHERE st.product_code != '' "
+            "AND o.created_at IS NOT NULL "
+            "AND (o.status IS NULL OR (o.status NOT LIKE '%Vra\u0107eno%' AND o.status NOT LIKE '%Vraceno%')) "
+            + date_clause
+            + " GROUP BY st.product_code "
+            "ORDER BY total_qty DESC "
+            "LIMIT ?",
+            (*params, limit),
+        ).fetchall()
     rows = conn.execute(
         "SELECT oi.product_code, "
         "SUM(COALESCE(oi.qty, 0)) AS total_qty "
@@ -162,19 +236,33 @@ def get_top_categories_qty_share(
     end: str | None = None,
     *,
     categorize_sku: Callable[[str], str] | None = None,
+    materialized: bool = False,
 ) -> list[tuple[str, float, float]]:
     if categorize_sku is None:
         raise ValueError("categorize_sku callback is required for category totals")
     date_clause, params = date_filter_clause("o.created_at", days, start, end)
+    if materialized:
+        source, group_col = (
+            "SELECT st.product_code, SUM(st.qty) AS total_qty "
+            "FROM order_sku_totals st "
+            "JOIN orders o ON o.id = st.order_id "
+            "WHERE st.product_code != '' ",
+            "st.product_code",
+        )
+    else:
+        source, group_col = (
+            "SELECT oi.product_code, SUM(COALESCE(oi.qty, 0)) AS total_qty "
+            "FROM order_items oi "
+            "JOIN orders o ON o.id = oi.order_id "
+            "WHERE oi.product_code IS NOT NULL AND oi.product_code != '' ",
+            "oi.product_code",
+        )
     sku_rows = conn.execute(
-        "SELECT oi.product_code, SUM(COALESCE(oi.qty, 0)) AS total_qty "
-        "FROM order_items oi "
-        "JOIN orders o ON o.id = oi.order_id "
-        "WHERE oi.product_code IS NOT NULL AND oi.product_code != '' "
-        "AND o.created_at IS NOT NULL "
+        source
+        + "AND o.created_at IS NOT NULL "
         "AND (o.status IS NULL OR (o.status NOT LIKE '%Vra\u0107eno%' AND o.status NOT LIKE '%Vraceno%')) "
         + date_clause
-        + " GROUP BY oi.product_code ",
+        + f" GROUP BY {group_col} ",
         params,
     ).fetchall()
     totals: dict[str, float] = {}
@@ -199,6 +287,8 @@ def get_kpis(
     days: int | None = None,
     start: str | None = None,
     end: str | None = None,
+    *,
+    materialized: bool = False,
 ):
     date_clause, params = date_filter_clause("o.created_at", days, start, end)
     total_orders = conn.execute(
@@ -208,36 +298,47 @@ def get_kpis(
         + date_clause,
         params,
     ).fetchone()[0]
-    total_revenue = conn.execute(
-        "WITH od AS ("
-        "  SELECT order_id, "
-        "    MAX(COALESCE(discount, 0)) AS order_discount, "
-        "    MAX(COALESCE(addon_cod, 0)) AS addon_cod "
-        "  FROM order_items "
-        "  GROUP BY order_id"
-        "), "
-        "order_totals AS ("
-        "  SELECT "
-        "    o.id AS order_id, "
-        "    ("
-        "      COALESCE(SUM("
-        "        COALESCE(oi.qty, 0) * COALESCE(oi.cod_amount, 0) "
-        "        * (1 - COALESCE(od.order_discount, 0) / 100.0) "
-        "        * (1 - COALESCE(oi.extra_discount, 0) / 100.0)"
-        "      ), 0) "
-        "      + COALESCE(od.addon_cod, 0) * (1 - COALESCE(od.order_discount, 0) / 100.0) "
-        "    ) AS cash_total "
-        "  FROM orders o "
-        "  LEFT JOIN order_items oi ON oi.order_id = o.id "
-        "  LEFT JOIN od ON od.order_id = o.id "
-        "  WHERE o.created_at IS NOT NULL "
-        "    AND (o.status IS NULL OR (o.status NOT LIKE '%Vra\u0107eno%' AND o.status NOT LIKE '%Vraceno%')) "
-        + date_clause
-        + "  GROUP BY o.id"
-        ") "
-        "SELECT SUM(COALESCE(cash_total, 0)) FROM order_totals",
-        params,
-    ).fetchone()[0]
+    if materialized:
+        total_revenue = conn.execute(
+            "SELECT SUM(COALESCE(ot.cash_total, 0)) "
+            "FROM orders o "
+            "LEFT JOIN order_totals ot ON ot.order_id = o.id "
+            "WHERE o.created_at IS NOT NULL "
+            "AND (o.status IS NULL OR (o.status NOT LIKE '%Vra\u0107eno%' AND o.status NOT LIKE '%Vraceno%')) "
+            + date_clause,
+            params,
+        ).fetchone()[0]
+    else:
+        total_revenue = conn.execute(
+            "WITH od AS ("
+            "  SELECT order_id, "
+            "    MAX(COALESCE(discount, 0)) AS order_discount, "
+            "    MAX(COALESCE(addon_cod, 0)) AS addon_cod "
+            "  FROM order_items "
+            "  GROUP BY order_id"
+            "), "
+            "order_totals AS ("
+            "  SELECT "
+            "    o.id AS order_id, "
+            "    ("
+            "      COALESCE(SUM("
+            "        COALESCE(oi.qty, 0) * COALESCE(oi.cod_amount, 0) "
+            "        * (1 - COALESCE(od.order_discount, 0) / 100.0) "
+            "        * (1 - COALESCE(oi.extra_discount, 0) / 100.0)"
+            "      ), 0) "
+            "      + COALESCE(od.addon_cod, 0) * (1 - COALESCE(od.order_discount, 0) / 100.0) "
+            "    ) AS cash_total "
+            "  FROM orders o "
+            "  LEFT JOIN order_items oi ON oi.order_id = o.id "
+            "  LEFT JOIN od ON od.order_id = o.id "
+            "  WHERE o.created_at IS NOT NULL "
+            "    AND (o.status IS NULL OR (o.status NOT LIKE '%Vra\u0107eno%' AND o.status NOT LIKE '%Vraceno%')) "
+            + date_clause
+            + "  GROUP BY o.id"
+            ") "
+            "SELECT SUM(COALESCE(cash_total, 0)) FROM order_totals",
+            params,
+        ).fetchone()[0]
     unpicked_clause, unpicked_params = date_filter_clause("o.created_at", days, start, end)
     total_unpicked = conn.execute(
         "SELECT COUNT(*) FROM orders o "
@@ -312,48 +413,65 @@ def get_finansije_monthly(
     days: int | None = None,
     start: str | None = None,
     end: str | None = None,
+    *,
+    materialized: bool = False,
 ) -> list[tuple[str, float, float, float]]:
     """
     Returns rows: (period_yyyy_mm, bruto_cash, troskovi, neto)
     - bruto_cash: SP COD (+dodatno) poslije popusta, po orders.created_at, bez Vraćeno/Vraceno
     - troskovi: bank debit totals (existing filters), po dtposted
+    materialized=True reads bruto_cash from the order_totals table.
     """
     order_date_clause, order_params = date_filter_clause("o.created_at", days, start, end)
-    order_expr = date_expr("o.created_at")
-    bruto_rows = conn.execute(
-        "WITH od AS ("
-        "  SELECT order_id, "
-        "    MAX(COALESCE(discount, 0)) AS order_discount, "
-        "    MAX(COALESCE(addon_cod, 0)) AS addon_cod "
-        "  FROM order_items "
-        "  GROUP BY order_id"
-        "), "
-        "order_totals AS ("
-        "  SELECT "
-        "    substr(" + order_expr + ", 1, 7) AS period, "
-        "    o.id AS order_id, "
-        "    ("
-        "      COALESCE(SUM("
-        "        COALESCE(oi.qty, 0) * COALESCE(oi.cod_amount, 0) "
-        "        * (1 - COALESCE(od.order_discount, 0) / 100.0) "
-        "        * (1 - COALESCE(oi.extra_discount, 0) / 100.0)"
-        "      ), 0) "
-        "      + COALESCE(od.addon_cod, 0) * (1 - COALESCE(od.order_discount, 0) / 100.0) "
-        "    ) AS cash_total "
-        "  FROM orders o "
-        "  LEFT JOIN order_items oi ON oi.order_id = o.id "
-        "  LEFT JOIN od ON od.order_id = o.id "
-        "  WHERE o.created_at IS NOT NULL "
-        "    AND (o.status IS NULL OR (o.status NOT LIKE '%Vra\u0107eno%' AND o.status NOT LIKE '%Vraceno%')) "
-        + order_date_clause
-        + "  GROUP BY o.id"
-        ") "
-        "SELECT period, SUM(COALESCE(cash_total, 0)) AS bruto_cash "
-        "FROM order_totals "
-        "GROUP BY period "
-        "ORDER BY period",
-        order_params,
-    ).fetchall()
+    order_expr = iso_date_expr("o.created_at")
+    if materialized:
+        bruto_rows = conn.execute(
+            "SELECT substr(" + order_expr + ", 1, 7) AS period, "
+            "  SUM(COALESCE(ot.cash_total, 0)) AS bruto_cash "
+            "FROM orders o "
+            "LEFT JOIN order_totals ot ON ot.order_id = o.id "
+            "WHERE o.created_at IS NOT NULL "
+            "  AND (o.status IS NULL OR (o.status NOT LIKE '%Vra\u0107eno%' AND o.status NOT LIKE '%Vraceno%')) "
+            + order_date_clause
+            + " GROUP BY period "
+            "ORDER BY period",
+            order_params,
+        ).fetchall()
+    else:
+        bruto_rows = conn.execute(
+            "WITH od AS ("
+            "  SELECT order_id, "
+            "    MAX(COALESCE(discount, 0)) AS order_discount, "
+            "    MAX(COALESCE(addon_cod, 0)) AS addon_cod "
+            "  FROM order_items "
+            "  GROUP BY order_id"
+            "), "
+            "order_totals AS ("
+            "  SELECT "
+            "    substr(" + order_expr + ", 1, 7) AS period, "
+            "    o.id AS order_id, "
+            "    ("
+            "      COALESCE(SUM("
+            "        COALESCE(oi.qty, 0) * COALESCE(oi.cod_amount, 0) "
+            "        * (1 - COALESCE(od.order_discount, 0) / 100.0) "
+            "        * (1 - COALESCE(oi.extra_discount, 0) / 100.0)"
+            "      ), 0) "
+            "      + COALESCE(od.addon_cod, 0) * (1 - COALESCE(od.order_discount, 0) / 100.0) "
+            "    ) AS cash_total "
+            "  FROM orders o "
+            "  LEFT JOIN order_items oi ON oi.order_id = o.id "
+            "  LEFT JOIN od ON od.order_id = o.id "
+            "  WHERE o.created_at IS NOT NULL "
+            "    AND (o.status IS NULL OR (o.status NOT LIKE '%Vra\u0107eno%' AND o.status NOT LIKE '%Vraceno%')) "
+            + order_date_clause
+            + "  GROUP BY o.id"
+            ") "
+            "SELECT period, SUM(COALESCE(cash_total, 0)) AS bruto_cash "
+            "FROM order_totals "
+            "GROUP BY period "
+            "ORDER BY period",
+            order_params,
+        ).fetchall()
 
     bank_rows = get_sp_bank_monthly(conn, days, start, end)
 
@@ -460,7 +578,7 @@ def get_expense_summary(
     rows = conn.execute(
         "SELECT dtposted, amount, purpose, purposecode, payee_name "
         "FROM bank_transactions "
-        "WHERE benefit = 'debit' AND dtposted IS NOT NULL " + date_clause,
+        "WHERE benefit = 'debit' AND dtposted IS NOT NULL " + date_clause + " ORDER BY id",
         params,
     ).fetchall()
     total = 0.0
@@ -708,7 +826,7 @@ def get_unpicked_rows(
         "SELECT o.id, o.sp_order_no, o.customer_name, o.phone, o.email, o.city, "
         "o.status, o.created_at, o.customer_key, o.tracking_code, o.picked_up_at, o.delivered_at "
         "FROM orders o "
-        "WHERE o.status IS NOT NULL " + date_clause,
+        "WHERE o.status IS NOT NULL " + date_clause + " ORDER BY o.id",
         params,
     ).fetchall()
     return [row for row in rows if is_unpicked_status(row[6])]
@@ -1068,7 +1186,7 @@ def get_unpaid_sp_orders_summary(
     start_date: str | None,
     end_date: str | None,
 ) -> tuple[int, float]:
-    delivered_expr = date_expr("o.delivered_at")
+    delivered_expr = iso_date_expr("o.delivered_at")
     where_period = ""
     params: list[object] = []
     if start_date:
@@ -1123,7 +1241,7 @@ def get_unpaid_sp_orders_details(
     start_date: str | None,
     end_date: str | None,
 ) -> tuple[list[str], list[tuple]]:
-    delivered_expr = date_expr("o.delivered_at")
+    delivered_expr = iso_date_expr("o.delivered_at")
     where_period = ""
     params: list[object] = []
     if start_date:
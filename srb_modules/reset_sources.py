@@ -4,6 +4,8 @@ import sqlite3
 from dataclasses import dataclass
 from typing import Iterable
 
+from .order_totals import delete_order_totals
+
 
 @dataclass(frozen=True)
 class ResetSpec:
@@ -41,6 +43,10 @@ def _delete_import_runs(conn: sqlite3.Connection, run_ids: list[int]) -> None:
         return
     placeholders = ",".join("?" for _ in run_ids)
     conn.execute(f"DELETE FROM import_runs WHERE id IN ({placeholders})", run_ids)
+    # The folder watcher skips files by their recorded stat; make it look at every
+    # file again (already imported ones are still skipped by hash).
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'watch_files'").fetchone():
+        conn.execute("DELETE FROM watch_files")
 
 
 def _delete_app_state_keys(conn: sqlite3.Connection, keys: Iterable[str]) -> None:
@@ -84,6 +90,7 @@ def reset_source(conn: sqlite3.Connection, key: str) -> int:
             conn.execute(f"DELETE FROM order_status_history WHERE order_id IN ({ph})", order_ids)
             conn.execute(f"DELETE FROM order_items WHERE order_id IN ({ph})", order_ids)
             conn.execute(f"DELETE FROM orders WHERE id IN ({ph})", order_ids)
+            delete_order_totals(conn, order_ids)
         _delete_import_runs(conn, run_ids)
         _delete_app_state_keys(conn, ["last_sp_order_no"])
         conn.commit()
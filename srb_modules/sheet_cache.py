@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import pickle
+import sqlite3
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from .startup import lazy_import
+
+pd = lazy_import("pandas")
+
+DEFAULT_SHEET_CACHE_MB = 256
+
+
+def _now() -> str:
+    # Microseconds keep the LRU order of entries used within the same second.
+    return datetime.now().isoformat(sep=" ", timespec="microseconds")
+
+
+@dataclass(frozen=True)
+class SheetCache:
+    """
+    Content-addressed store of parsed sheets (one SQLite file). Keys come from
+    xlsx_read.sheet_cache_key (file SHA-256 + reader version + sheet + columns),
+    so a changed export or a reader change is simply a miss. Frames are stored
+    as zlib-compressed pickles; after every store the least recently used
+    entries are dropped until the payloads fit in max_bytes. Plain data, so it
+    can be passed to import worker processes. Errors never reach the importer:
+    a broken cache behaves like an empty one.
+    """
+
+    path: Path
+    max_bytes: int = DEFAULT_SHEET_CACHE_MB * 1024 * 1024
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sheet_cache ("
+            "key TEXT PRIMARY KEY, "
+            "file_hash TEXT NOT NULL, "
+            "source_name TEXT, "
+            "sheet TEXT, "
+            "row_count INTEGER, "
+            "col_count INTEGER, "
+            "size_bytes INTEGER NOT NULL, "
+            "payload BLOB NOT NULL, "
+            "created_at TEXT NOT NULL, "
+            "used_at TEXT NOT NULL"
+            ")"
+        )
+        return conn
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        if not self.path.exists():
+            return None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT payload FROM sheet_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE sheet_cache SET used_at = ? WHERE key = ?", (_now(), key))
+                conn.commit()
+            finally:
+                conn.close()
+            return pickle.loads(zlib.decompress(row[0]))
+        except Exception:
+            return None
+
+    def put(self, key: str, df: pd.DataFrame, *, file_hash: str, source_name: str, sheet: Any) -> None:
+        try:
+            payload = zlib.compress(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL), 6)
+            if len(payload) > self.max_bytes:
+                return
+            now = _now()
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sheet_cache ("
+                    "key, file_hash, source_name, sheet, row_count, col_count, size_bytes, "
+                    "payload, created_at, used_at"
+                    ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        file_hash,
+                        source_name,
+                        str(sheet),
+                        int(df.shape[0]),
+                        int(df.shape[1]),
+                        len(payload),
+                        payload,
+                        now,
+                        now,
+                    ),
+                )
+                _evict(conn, self.max_bytes)
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception:
+            pass
+
+    def entries(self) -> list[dict]:
+        """Cached sheets, most recently used first (payloads are not loaded)."""
+        if not self.path.exists():
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT key, file_hash, source_name, sheet, row_count, col_count, size_bytes, "
+                "created_at, used_at FROM sheet_cache ORDER BY used_at DESC, key"
+            ).fetchall()
+        finally:
+            conn.close()
+        names = ("key", "file_hash", "source_name", "sheet", "rows", "cols", "size_bytes", "created_at", "used_at")
+        return [dict(zip(names, row)) for row in rows]
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        return {
+            "entries": len(entries),
+            "files": len({e["file_hash"] for e in entries}),
+            "size_bytes": sum(e["size_bytes"] for e in entries),
+            "max_bytes": self.max_bytes,
+            "db_bytes": self.path.stat().st_size if self.path.exists() else 0,
+        }
+
+    def prune(
+        self,
+        *,
+        max_bytes: int | None = None,
+        older_than_days: float | None = None,
+        clear: bool = False,
+    ) -> dict:
+        """
+        Drops entries not used for `older_than_days`, then least recently used
+        ones above max_bytes (default: the cache limit); clear=True empties the
+        cache. The file is vacuumed afterwards. Returns removed / freed_bytes.
+        """
+        if not self.path.exists():
+            return {"removed": 0, "freed_bytes": 0}
+        conn = self._connect()
+        try:
+            before = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM sheet_cache"
+            ).fetchone()
+            if clear:
+                conn.execute("DELETE FROM sheet_cache")
+            if older_than_days is not None:
+                cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+                conn.execute("DELETE FROM sheet_cache WHERE used_at < ?", (cutoff,))
+            _evict(conn, self.max_bytes if max_bytes is None else max_bytes)
+            conn.commit()
+            after = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM sheet_cache"
+            ).fetchone()
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        return {"removed": before[0] - after[0], "freed_bytes": before[1] - after[1]}
+
+
+def _evict(conn: sqlite3.Connection, max_bytes: int) -> None:
+    total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM sheet_cache").fetchone()[0]
+    if total <= max_bytes:
+        return
+    drop = []
+    for key, size in conn.execute(
+        "SELECT key, size_bytes FROM sheet_cache ORDER BY used_at, created_at, key"
+    ).fetchall():
+        if total <= max_bytes:
+            break
+        drop.append((key,))
+        total -= size
+    conn.executemany("DELETE FROM sheet_cache WHERE key = ?", drop)
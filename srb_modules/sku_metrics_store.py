@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+
+from .startup import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+SKU_DAILY_NUMERIC_COLUMNS = (
+    "stock_eod_qty",
+    "oos_flag",
+    "verified_available_flag",
+    "gross_sales_qty",
+    "return_qty",
+    "net_sales_qty",
+    "demand_baseline_qty",
+    "lost_sales_qty",
+    "lost_sales_value_est",
+    "sp_unit_net_price",
+    "sp_discount_share",
+    "sp_qty",
+    "sp_net_value",
+    "confidence_score",
+)
+
+# Low-cardinality text columns (repeat per SKU/day) are stored as categoricals.
+_CATEGORY_COLUMNS = ("date", "sku", "method_used", "prvi_verifikovan_dt")
+
+
+def _has_parquet_engine() -> bool:
+    return any(importlib.util.find_spec(m) is not None for m in ("pyarrow", "fastparquet"))
+
+
+def cache_paths(csv_path: Path) -> list[Path]:
+    """Columnar copies next to the CSV, in load preference order."""
+    return [csv_path.with_suffix(".parquet"), csv_path.with_suffix(".pkl")]
+
+
+def prepare_sku_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizes a raw sku_daily_metrics frame for the Prodaja tab: date_dt
+    (datetime.date), stripped SKU, numeric columns with NaN -> 0. Integral
+    numeric columns become int32 and text columns categoricals; values are
+    unchanged, so sums/filters match the plain CSV frame.
+    """
+    if df.empty:
+        return df
+    if "date" in df.columns:
+        date_text = df["date"].astype("category")
+        cats = pd.to_datetime(pd.Series(date_text.cat.categories), errors="coerce")
+        cat_dates = np.array([d.date() if not pd.isna(d) else pd.NaT for d in cats], dtype=object)
+        codes = date_text.cat.codes.to_numpy()
+        if len(cat_dates):
+            df["date_dt"] = np.where(codes >= 0, cat_dates[np.maximum(codes, 0)], pd.NaT)
+        else:
+            df["date_dt"] = pd.NaT
+    else:
+        df["date_dt"] = pd.NaT
+    df["sku"] = df.get("sku", pd.Series("", index=df.index)).astype(str).str.strip()
+    for col in SKU_DAILY_NUMERIC_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors="coerce").fillna(0)
+        arr = values.to_numpy(dtype="float64")
+        if len(arr) and np.all(arr == np.round(arr)) and np.all(np.abs(arr) < 2**31):
+            values = values.astype("int32")
+        df[col] = values
+    for col in _CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def write_sku_daily_cache(csv_path: Path, df: pd.DataFrame | None = None) -> Path | None:
+    """
+    Writes the prepared frame next to the CSV: Parquet when pyarrow/fastparquet
+    is installed, otherwise a pandas pickle. `df` must come from
+    prepare_sku_daily(read_csv(csv_path)) so both load paths are identical.
+    Returns the written path, or None when writing failed (CSV stays the source).
+    """
+    csv_path = Path(csv_path)
+    if df is None:
+        df = prepare_sku_daily(pd.read_csv(csv_path, encoding="utf-8"))
+    parquet_path, pickle_path = cache_paths(csv_path)
+    target = parquet_path if _has_parquet_engine() else pickle_path
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        if target is parquet_path:
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_pickle(tmp)
+        tmp.replace(target)
+    except Exception:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return None
+    # Drop the other format so a stale copy is never preferred later.
+    other = pickle_path if target is parquet_path else parquet_path
+    try:
+        other.unlink()
+    except OSError:
+        pass
+    return target
+
+
+def _read_cache(path: Path) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+        if "date_dt" in df.columns and pd.api.types.is_datetime64_any_dtype(df["date_dt"]):
+            df["date_dt"] = df["date_dt"].dt.date
+        return df
+    return pd.read_pickle(path)
+
+
+def load_sku_daily(csv_path: Path, *, write_cache: bool = True) -> tuple[pd.DataFrame, str]:
+    """
+    Loads sku_daily_metrics from the columnar copy when it is at least as new as
+    the CSV, else parses the CSV (and, with write_cache, refreshes the copy).
+    Returns (df, source) with source in {"parquet", "pickle", "csv"}.
+    Raises FileNotFoundError when the CSV does not exist.
+    """
+    csv_path = Path(csv_path)
+    csv_mtime = csv_path.stat().st_mtime
+    for path in cache_paths(csv_path):
+        try:
+            if path.stat().st_mtime < csv_mtime:
+                continue
+            if path.suffix == ".parquet" and not _has_parquet_engine():
+                continue
+            return _read_cache(path), ("parquet" if path.suffix == ".parquet" else "pickle")
+        except Exception:
+            continue
+    df = prepare_sku_daily(pd.read_csv(csv_path, encoding="utf-8"))
+    if write_cache and not df.empty:
+        write_sku_daily_cache(csv_path, df)
+    return df, "csv"
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import importlib.util
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Registers `name` in sys.modules without executing it; the real import runs on
+    first attribute access. Later `import name` statements get the same object.
+    """
+    existing = sys.modules.get(name)
+    if existing is not None:
+        return existing
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_loaded(module: ModuleType) -> bool:
+    # LazyLoader swaps the module class back to ModuleType once it has executed.
+    return type(module).__name__ != "_LazyModule"
+
+
+class StartupTimer:
+    """Milliseconds since process start (t0) for named startup milestones."""
+
+    def __init__(self, t0: float | None = None) -> None:
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.marks: list[tuple[str, float]] = []
+
+    def mark(self, label: str) -> float:
+        ms = (time.perf_counter() - self.t0) * 1000.0
+        self.marks.append((label, ms))
+        return ms
+
+    def get(self, label: str) -> float | None:
+        for name, ms in self.marks:
+            if name == label:
+                return ms
+        return None
+
+    def report(self) -> str:
+        lines = ["Startup timing (ms od pokretanja):"]
+        prev = 0.0
+        for label, ms in self.marks:
+            lines.append(f"  {label:<28} {ms:9.1f}  (+{ms - prev:.1f})")
+            prev = ms
+        return "\n".join(lines)
+
+    def write(self, path: Path, **extra) -> None:
+        """Appends one JSON line per run so releases can be compared."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            **extra,
+            "marks": {label: round(ms, 1) for label, ms in self.marks},
+        }
+        with path.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
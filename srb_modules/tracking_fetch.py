@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import http.client
+import json
+import random
+import threading
+import time
+import urllib.parse
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from pathlib import Path
+
+CARRIER_BASE_URLS = {
+    "dexpress": "https://www.dexpress.rs",
+    "slanjepaketa": "https://softver.slanjepaketa.rs",
+}
+
+_SLANJEPAKETA_AUTH = "External 7b028ded-ebe4-4d74-ae79-ff516a64a851"
+
+_BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "bs-BA,bs;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Connection": "keep-alive",
+}
+
+# Status codes worth another attempt after a backoff (throttling / carrier hiccups).
+_RETRY_STATUS = {403, 429, 500, 502, 503, 504}
+
+
+def carrier_for(tracking_code: str) -> str:
+    return "slanjepaketa" if tracking_code.upper().startswith("SPF") else "dexpress"
+
+
+def build_tracking_request(
+    carrier: str, tracking_code: str, base_url: str
+) -> tuple[str, str, bytes | None, dict]:
+    """Same requests as fetch_dexpress_tracking / fetch_slanjepaketa_tracking."""
+    base_url = base_url.rstrip("/")
+    if carrier == "slanjepaketa":
+        url = f"{base_url}/api/v1/product-orders/status-info/{tracking_code}"
+        headers = {
+            "Authorization": _SLANJEPAKETA_AUTH,
+            "Referer": f"https://www.slanjepaketa.rs/pracenje-posiljaka/{tracking_code}",
+            "Origin": "https://www.slanjepaketa.rs",
+        }
+        return "GET", url, None, headers
+    url = f"{base_url}/rs/pracenje-posiljaka"
+    body = urllib.parse.urlencode(
+        {"ajax": "yes", "task": "search", "data[package_tracking_search]": tracking_code}
+    ).encode("utf-8")
+    headers = {
+        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+        "X-Requested-With": "XMLHttpRequest",
+        "Origin": "https://www.dexpress.rs",
+        "Referer": f"https://www.dexpress.rs/rs/pracenje-posiljaka/{tracking_code}",
+    }
+    return "POST", url, body, headers
+
+
+def history_from_payload(carrier: str, data) -> list[dict] | None:
+    """Carrier JSON -> [{"statusTime", "statusValue"}]; None when the carrier has no data."""
+    if carrier == "slanjepaketa":
+        if not data or "notes" not in data:
+            return None
+        return [
+            {"statusTime": note.get("date"), "statusValue": note.get("note")}
+            for note in (data.get("notes") or [])
+        ]
+    if not data or not data.get("flag"):
+        return None
+    return data.get("historyStatuses") or []
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate_per_min` tokens per minute, at most `burst`
+    saved up. acquire() blocks until a token is free (or should_stop() is true).
+    """
+
+    def __init__(
+        self,
+        rate_per_min: float,
+        burst: int = 1,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = max(float(rate_per_min), 0.001) / 60.0
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, should_stop: Callable[[], bool] | None = None) -> bool:
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return True
+                wait_s = (1.0 - self.tokens) / self.rate
+            if should_stop is not None and should_stop():
+                return False
+            self.sleep(min(wait_s, 1.0))
+
+
+class KeepAliveClient:
+    """
+    One persistent HTTP(S) connection per worker thread and host, with the
+    cookies each host sets (like the cookie-jar opener of http_request).
+    A connection that fails is dropped and reopened on the next request.
+    """
+
+    def __init__(self, timeout: float = 20.0) -> None:
+        self.timeout = timeout
+        self.local = threading.local()
+        self.cookies: dict[str, dict[str, str]] = {}
+        self.cookie_lock = threading.Lock()
+        self.opened = 0
+        self.all_conns: list[http.client.HTTPConnection] = []
+        self.conns_lock = threading.Lock()
+
+    def _conn(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        conns = getattr(self.local, "conns", None)
+        if conns is None:
+            conns = self.local.conns = {}
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = cls(netloc, timeout=self.timeout)
+            conns[(scheme, netloc)] = conn
+            with self.conns_lock:
+                self.opened += 1
+                self.all_conns.append(conn)
+        return conn
+
+    def _drop(self, scheme: str, netloc: str) -> None:
+        conn = self.local.conns.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def request(
+        self, method: str, url: str, body: bytes | None = None, headers: dict | None = None
+    ) -> tuple[int, str]:
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        send_headers = {**_BROWSER_HEADERS, **(headers or {})}
+        with self.cookie_lock:
+            jar = dict(self.cookies.get(parts.netloc, {}))
+        if jar:
+            send_headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in jar.items())
+        # A kept-alive socket the server already closed fails on first use; retry once fresh.
+        for attempt in (1, 2):
+            conn = self._conn(parts.scheme, parts.netloc)
+            try:
+                conn.request(method, path, body=body, headers=send_headers)
+                resp = conn.getresponse()
+                payload = resp.read().decode("utf-8", errors="ignore")
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self._drop(parts.scheme, parts.netloc)
+                if attempt == 2:
+                    raise
+                continue
+            except Exception:
+                self._drop(parts.scheme, parts.netloc)
+                raise
+            set_cookies = resp.headers.get_all("Set-Cookie") or []
+            if set_cookies:
+                parsed = SimpleCookie()
+                for raw in set_cookies:
+                    try:
+                        parsed.load(raw)
+                    except Exception:
+                        continue
+                with self.cookie_lock:
+                    host_jar = self.cookies.setdefault(parts.netloc, {})
+                    for key, morsel in parsed.items():
+                        host_jar[key] = morsel.value
+            if resp.will_close:
+                self._drop(parts.scheme, parts.netloc)
+            return resp.status, payload
+        raise ConnectionError("unreachable")
+
+    def close(self) -> None:
+        with self.conns_lock:
+            for conn in self.all_conns:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self.all_conns.clear()
+
+
+@dataclass
+class TrackingResult:
+    """
+    Outcome for one tracking code. `log` holds one (status_code, latency_ms,
+    result, error) entry per attempt, result being the tracking-log.csv values
+    ("ok", "no_data", "http_error", "timeout", "error"). history is set only
+    when the last attempt returned carrier data.
+    """
+
+    code: str
+    carrier: str
+    history: list[dict] | None = None
+    log: list[tuple[int | None, int, str, str | None]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.history is not None
+
+
+def _fetch_one(
+    code: str,
+    *,
+    client: KeepAliveClient,
+    bucket: TokenBucket,
+    base_url: str,
+    retries: int,
+    backoff_base: float,
+    backoff_max: float,
+    should_stop: Callable[[], bool] | None,
+    sleep: Callable[[float], None],
+    record_dir: Path | None,
+) -> TrackingResult:
+    carrier = carrier_for(code)
+    result = TrackingResult(code=code, carrier=carrier)
+    method, url, body, headers = build_tracking_request(carrier, code, base_url)
+    attempt = 0
+    while True:
+        if not bucket.acquire(should_stop):
+            return result
+        start_time = time.time()
+        retry = False
+        try:
+            status, payload = client.request(method, url, body, headers)
+            latency_ms = int((time.time() - start_time) * 1000)
+            if status >= 400:
+                result.log.append((status, latency_ms, "http_error", f"HTTP Error {status}"))
+                retry = status in _RETRY_STATUS
+            else:
+                try:
+                    data = json.loads(payload)
+                except json.JSONDecodeError:
+                    data = None
+                history = history_from_payload(carrier, data)
+                if history is None:
+                    result.log.append((status, latency_ms, "no_data", None))
+                else:
+                    result.history = history
+                    result.log.append((status, latency_ms, "ok", None))
+                    if record_dir is not None:
+                        record_dir.mkdir(parents=True, exist_ok=True)
+                        (record_dir / f"{code}.json").write_text(payload, encoding="utf-8")
+        except (OSError, http.client.HTTPException) as exc:
+            latency_ms = int((time.time() - start_time) * 1000)
+            result.log.append((None, latency_ms, "timeout", str(exc)))
+            retry = True
+        except Exception as exc:
+            latency_ms = int((time.time() - start_time) * 1000)
+            result.log.append((None, latency_ms, "error", str(exc)))
+        if not retry or attempt >= retries:
+            return result
+        attempt += 1
+        delay = min(backoff_max, backoff_base * (2 ** (attempt - 1)))
+        sleep(random.uniform(delay / 2.0, delay))
+
+
+def fetch_tracking_many(
+    codes: Iterable[str],
+    *,
+    base_urls: dict[str, str] | None = None,
+    concurrency: int = 4,
+    rate_per_min: float | dict[str, float] = 20.0,
+    burst: int = 2,
+    retries: int = 2,
+    backoff_base: float = 120.0,
+    backoff_max: float = 600.0,
+    timeout: float = 20.0,
+    should_stop: Callable[[], bool] | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+    record_dir: Path | None = None,
+    stats: dict | None = None,
+) -> Iterator[TrackingResult]:
+    """
+    Fetches tracking pages for `codes` on `concurrency` worker threads and
+    yields a TrackingResult per code as it completes. Every carrier has its own
+    token bucket (`rate_per_min`, a number or {"dexpress": .., "slanjepaketa": ..}),
+    so the limit holds no matter how many workers wait on it. Throttling
+    (403/429/5xx) and network errors are retried `retries` times with
+    exponential backoff (base `backoff_base` s, capped at `backoff_max` s).
+    Connections stay open per worker (keep-alive). The caller saves results,
+    so all DB writes stay on its thread. `base_urls` overrides the carrier
+    hosts (mock server); `record_dir` saves every successful payload as
+    <code>.json for replay. `stats`, if given, receives {"connections": n}.
+    """
+    hosts = {**CARRIER_BASE_URLS, **(base_urls or {})}
+    buckets = {
+        carrier: TokenBucket(
+            rate_per_min.get(carrier, 20.0) if isinstance(rate_per_min, dict) else rate_per_min,
+            burst,
+            sleep=sleep,
+        )
+        for carrier in CARRIER_BASE_URLS
+    }
+    client = KeepAliveClient(timeout=timeout)
+    codes = list(codes)
+    pending = iter(codes)
+    executor = ThreadPoolExecutor(max_workers=max(1, int(concurrency)))
+
+    def submit_next(futures: set) -> bool:
+        code = next(pending, None)
+        if code is None:
+            return False
+        futures.add(
+            executor.submit(
+                _fetch_one,
+                code,
+                client=client,
+                bucket=buckets[carrier_for(code)],
+                base_url=hosts[carrier_for(code)],
+                retries=retries,
+                backoff_base=backoff_base,
+                backoff_max=backoff_max,
+                should_stop=should_stop,
+                sleep=sleep,
+                record_dir=record_dir,
+            )
+        )
+        return True
+
+    futures: set = set()
+    try:
+        # Bounded queue: at most 2 x concurrency codes are in flight or waiting.
+        for _ in range(max(1, int(concurrency)) * 2):
+            if not submit_next(futures):
+                break
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                if should_stop is None or not should_stop():
+                    submit_next(futures)
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+        if stats is not None:
+            stats["connections"] = client.opened
+        client.close()
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+_DEXPRESS_PATH = "/rs/pracenje-posiljaka"
+_SLANJEPAKETA_PREFIX = "/api/v1/product-orders/status-info/"
+
+
+def synthetic_tracking_payload(tracking_code: str, *, seed: int = 5) -> str:
+    """Carrier-shaped JSON for a code (SPF* -> SlanjePaketa notes, else D Express history)."""
+    rng = random.Random(f"{seed}:{tracking_code}")
+    start = datetime(2025, 3, 1, 9, 0) + timedelta(hours=rng.randrange(0, 24 * 60))
+    steps = ["Pošiljka je preuzeta od pošiljaoca", "Pošiljka je zadužena za isporuku"]
+    ending = rng.choice(
+        [
+            ["Pošiljka je isporučena"],
+            ["Nema nikoga na adresi", "Pošiljka je zadužena za isporuku", "Pošiljka je vraćena pošiljaocu"],
+            ["Telefon netačan", "Pošiljka se vraća pošiljaocu"],
+        ]
+    )
+    events = []
+    at = start
+    for status in steps + ending:
+        events.append((at.strftime("%d.%m.%Y %H:%M:%S"), status))
+        at += timedelta(hours=rng.randrange(2, 30))
+    if tracking_code.upper().startswith("SPF"):
+        return json.dumps({"notes": [{"date": t, "note": s} for t, s in events]}, ensure_ascii=False)
+    return json.dumps(
+        {"flag": True, "historyStatuses": [{"statusTime": t, "statusValue": s} for t, s in events]},
+        ensure_ascii=False,
+    )
+
+
+def rate_violations(
+    timestamps: list[float], rate_per_min: float, burst: int, *, jitter: float = 0.05
+) -> int:
+    """
+    Number of request pairs (i, j) where more than burst + rate * (t_j - t_i)
+    requests arrived in [t_i, t_j], i.e. what a token bucket would not allow.
+    Server-side arrival times lag the client's send times by a varying amount
+    (thread scheduling, new connections), so the window is widened by `jitter`
+    seconds; keep jitter * rate below 1 so an extra request is still caught.
+    """
+    ts = sorted(timestamps)
+    rate = rate_per_min / 60.0
+    bad = 0
+    for i in range(len(ts)):
+        for j in range(i + burst, len(ts)):
+            if (j - i + 1) > burst + rate * (ts[j] - ts[i] + jitter) + 1e-9:
+                bad += 1
+    return bad
+
+
+class MockCarrierServer:
+    """
+    Local HTTP/1.1 stand-in for the D Express and SlanjePaketa tracking
+    endpoints. Serves recorded pages (<code>.json from `record_dir`, as saved by
+    fetch_tracking_many(record_dir=...)), falling back to synthetic payloads.
+    Keeps every request time per carrier and the number of TCP connections so
+    throughput, keep-alive and rate-limit compliance can be checked offline.
+    `throttle_per_min` makes it answer 429 above that per-carrier rate, like a
+    carrier that blocks clients going too fast.
+    """
+
+    def __init__(
+        self,
+        *,
+        record_dir: Path | None = None,
+        pages: dict[str, str] | None = None,
+        latency: float = 0.0,
+        throttle_per_min: float | None = None,
+        unknown_codes: set[str] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.record_dir = Path(record_dir) if record_dir else None
+        self.pages = dict(pages or {})
+        self.latency = latency
+        self.throttle_per_min = throttle_per_min
+        self.unknown_codes = set(unknown_codes or ())
+        self.requests: dict[str, list[float]] = {"dexpress": [], "slanjepaketa": []}
+        self.throttled = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_urls(self) -> dict[str, str]:
+        return {"dexpress": self.base_url, "slanjepaketa": self.base_url}
+
+    def start(self) -> MockCarrierServer:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> MockCarrierServer:
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def page_for(self, code: str) -> str | None:
+        if code in self.unknown_codes:
+            return None
+        if code in self.pages:
+            return self.pages[code]
+        if self.record_dir is not None:
+            path = self.record_dir / f"{code}.json"
+            if path.exists():
+                return path.read_text(encoding="utf-8")
+        return synthetic_tracking_payload(code)
+
+    def _admit(self, carrier: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            times = self.requests[carrier]
+            if self.throttle_per_min:
+                recent = [t for t in times if now - t < 60.0]
+                if len(recent) >= self.throttle_per_min:
+                    self.throttled += 1
+                    return False
+            times.append(now)
+            return True
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with mock._lock:
+                    mock.connections += 1
+
+            def log_message(self, format, *args):  # noqa: A002 - keep test output quiet
+                pass
+
+            def _send(self, status: int, body: str) -> None:
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _serve(self, carrier: str, code: str) -> None:
+                if mock.latency:
+                    time.sleep(mock.latency)
+                if not mock._admit(carrier):
+                    self._send(429, '{"error": "too many requests"}')
+                    return
+                page = mock.page_for(code)
+                if page is None:
+                    self._send(200, '{"flag": false}' if carrier == "dexpress" else "{}")
+                    return
+                self._send(200, page)
+
+            def do_GET(self):
+                path = urllib.parse.urlsplit(self.path).path
+                if path.startswith(_SLANJEPAKETA_PREFIX):
+                    self._serve("slanjepaketa", path[len(_SLANJEPAKETA_PREFIX):])
+                else:
+                    self._send(404, "{}")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8", errors="ignore")
+                if urllib.parse.urlsplit(self.path).path != _DEXPRESS_PATH:
+                    self._send(404, "{}")
+                    return
+                form = urllib.parse.parse_qs(body)
+                code = (form.get("data[package_tracking_search]") or [""])[0]
+                self._serve("dexpress", code)
+
+        return Handler
@@ -5,10 +5,11 @@ from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Any, Callable
 
-import pandas as pd
-
+from .startup import lazy_import
 from .ui_context import UIContext
 
+pd = lazy_import("pandas")
+
 
 @dataclass(frozen=True)
 class ProdajaLogicDeps:
@@ -183,7 +184,7 @@ def init_prodaja_logic(ctx: UIContext, deps: ProdajaLogicDeps) -> dict[str, Call
             return
 
         agg = (
-            df.groupby("sku", dropna=False)
+            df.groupby("sku", dropna=False, observed=True)
             .agg(
                 OOS_dani=("oos_flag", "sum"),
                 Potraznja=("demand_baseline_qty", "sum"),
@@ -362,8 +363,8 @@ def init_prodaja_logic(ctx: UIContext, deps: ProdajaLogicDeps) -> dict[str, Call
 
         cur = deps.filter_daily_by_period(daily, start, end)
         prev = deps.filter_daily_by_period(daily, prev_start, prev_end)
-        cur_sum = cur.groupby("sku")["demand_baseline_qty"].sum()
-        prev_sum = prev.groupby("sku")["demand_baseline_qty"].sum()
+        cur_sum = cur.groupby("sku", observed=True)["demand_baseline_qty"].sum()
+        prev_sum = prev.groupby("sku", observed=True)["demand_baseline_qty"].sum()
 
         rows = []
         for sku in set(cur_sum.index).union(prev_sum.index):
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import posixpath
+import time
+import zipfile
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+from xml.etree.ElementTree import iterparse
+
+from .db import file_hash as _file_hash
+from .sheet_cache import SheetCache
+from .startup import lazy_import
+
+pd = lazy_import("pandas")
+
+XLSX_ENGINES = ("auto", "calamine", "stream", "openpyxl")
+# What engine=None means; the app sets it from "xlsx_engine" in srb_settings.json.
+_default_engine = "auto"
+# Part of every sheet cache key: bump when the frames read_sheet returns change.
+XLSX_READER_VERSION = 1
+
+_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_ROW = _MAIN + "row"
+_CELL = _MAIN + "c"
+_VALUE = _MAIN + "v"
+_INLINE = _MAIN + "is"
+_TEXT = _MAIN + "t"
+_RUN = _MAIN + "r"
+
+Columns = Iterable[str] | Callable[[Any], bool] | None
+
+
+def calamine_available() -> bool:
+    return importlib.util.find_spec("python_calamine") is not None
+
+
+def set_default_engine(engine: str) -> None:
+    global _default_engine
+    if engine not in XLSX_ENGINES:
+        raise ValueError(f"Unknown xlsx engine: {engine}")
+    _default_engine = engine
+
+
+def resolve_engine(engine: str | None = None) -> str:
+    """
+    "auto": python-calamine (optional dependency) when installed, else openpyxl.
+    "stream" (the in-house xlsx XML reader) is only used when asked for.
+    """
+    if engine is None:
+        engine = _default_engine
+    if engine not in XLSX_ENGINES:
+        raise ValueError(f"Unknown xlsx engine: {engine}")
+    if engine == "auto":
+        return "calamine" if calamine_available() else "openpyxl"
+    return engine
+
+
+def sheet_cache_key(digest: str, sheet_name: str | int, columns: Columns, engine: str) -> str:
+    """
+    Cache key of one read: file content, reader version, sheet and column
+    selection. calamine frames can differ in dtypes from openpyxl ones, so they
+    get their own keys; stream and openpyxl frames are identical and share one.
+    """
+    if columns is None:
+        selection = "*"
+    elif callable(columns):
+        selection = f"{columns.__module__}.{getattr(columns, '__qualname__', repr(columns))}"
+    else:
+        selection = "\x1f".join(sorted(set(columns)))
+    family = "calamine" if engine == "calamine" else "openpyxl"
+    text = f"{digest}|{XLSX_READER_VERSION}|{family}|{sheet_name!r}|{selection}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def read_sheet(
+    path: str | Path,
+    sheet_name: str | int = 0,
+    *,
+    columns: Columns = None,
+    engine: str | None = None,
+    cache: SheetCache | None = None,
+    file_hash: str | None = None,
+) -> pd.DataFrame:
+    """
+    pd.read_excel(path, sheet_name=...) for the importers, limited to `columns`
+    (names as in the resulting frame, e.g. "Broj telefona.1", or a predicate
+    on the header). Missing columns are left out, not an error.
+
+    engine=None means the default engine (set_default_engine, "auto" unless
+    changed): python-calamine when installed, else openpyxl. "stream" (xlsx
+    XML read directly, same cells as pandas' openpyxl reader, cells of other
+    columns are not converted) is opt-in; calamine and stream fall back to
+    openpyxl on any error.
+    With `cache` the frame is looked up by the file's SHA-256 (`file_hash`,
+    computed when not given) before parsing and stored after. df.attrs gets
+    parse_seconds and xlsx_engine ("cache" on a hit) for per-file reporting.
+    """
+    started = time.perf_counter()
+    used = resolve_engine(engine)
+    key = None
+    if cache is not None:
+        digest = file_hash or _file_hash(Path(path))
+        key = sheet_cache_key(digest, sheet_name, columns, used)
+        df = cache.get(key)
+        if df is not None:
+            df.attrs["parse_seconds"] = round(time.perf_counter() - started, 4)
+            df.attrs["xlsx_engine"] = "cache"
+            return df
+    keep = _column_filter(columns)
+    df = None
+    if used != "openpyxl":
+        try:
+            if used == "calamine":
+                df = pd.read_excel(path, sheet_name=sheet_name, engine="calamine")
+            else:
+                df = _read_stream(Path(path), sheet_name, keep)
+        except Exception:
+            df = None
+            used = "openpyxl"
+    if df is None:
+        df = pd.read_excel(path, sheet_name=sheet_name, engine="openpyxl")
+    if keep is not None:
+        df = df[[c for c in df.columns if keep(c)]]
+    if key is not None and (used == "calamine") == (resolve_engine(engine) == "calamine"):
+        cache.put(key, df, file_hash=digest, source_name=Path(path).name, sheet=sheet_name)
+    df.attrs["parse_seconds"] = round(time.perf_counter() - started, 4)
+    df.attrs["xlsx_engine"] = used
+    return df
+
+
+def sheet_names(path: str | Path) -> list[str]:
+    """Worksheet names in workbook order (like pd.ExcelFile(path).sheet_names)."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return [name for name, _ in _workbook_sheets(zf)[0]]
+    except Exception:
+        return list(pd.ExcelFile(path, engine="openpyxl").sheet_names)
+
+
+def _column_filter(columns: Columns) -> Callable[[Any], bool] | None:
+    if columns is None:
+        return None
+    if callable(columns):
+        return columns
+    wanted = set(columns)
+    return lambda name: name in wanted
+
+
+def _workbook_sheets(zf: zipfile.ZipFile) -> tuple[list[tuple[str, str]], bool]:
+    """[(sheet name, zip member)] of the worksheets, and whether dates use the 1904 epoch."""
+    rels = {}
+    with zf.open("xl/_rels/workbook.xml.rels") as src:
+        for _, el in iterparse(src):
+            if el.tag == _PKG_REL + "Relationship":
+                target = el.get("Target", "")
+                if target.startswith("/"):
+                    member = target.lstrip("/")
+                else:
+                    member = posixpath.normpath(posixpath.join("xl", target))
+                rels[el.get("Id")] = (member, el.get("Type", ""))
+    sheets = []
+    date1904 = False
+    with zf.open("xl/workbook.xml") as src:
+        for _, el in iterparse(src):
+            if el.tag == _MAIN + "workbookPr":
+                date1904 = el.get("date1904", "0").lower() in ("1", "true")
+            elif el.tag == _MAIN + "sheet":
+                member, kind = rels.get(el.get(_REL + "id"), ("", ""))
+                if kind.endswith("/worksheet"):
+                    sheets.append((el.get("name"), member))
+    return sheets, date1904
+
+
+def _shared_strings(zf: zipfile.ZipFile) -> list[str]:
+    # Same text as openpyxl's read_string_table: plain <t> plus rich-text runs.
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings = []
+    with zf.open("xl/sharedStrings.xml") as src:
+        for _, el in iterparse(src):
+            if el.tag == _MAIN + "si":
+                strings.append(_rich_text(el).replace("x005F_", ""))
+                el.clear()
+    return strings
+
+
+def _rich_text(el) -> str:
+    parts = []
+    plain = el.find(_TEXT)
+    if plain is not None and plain.text:
+        parts.append(plain.text)
+    for run in el.findall(_RUN):
+        text = run.find(_TEXT)
+        if text is not None and text.text:
+            parts.append(text.text)
+    return "".join(parts)
+
+
+def _date_styles(zf: zipfile.ZipFile) -> tuple[set[int], set[int]]:
+    """Style indexes with a date / timedelta number format (openpyxl's rules)."""
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+
+    if "xl/styles.xml" not in zf.namelist():
+        return set(), set()
+    custom: dict[int, str] = {}
+    xf_formats: list[int] = []
+    in_cell_xfs = False
+    with zf.open("xl/styles.xml") as src:
+        for event, el in iterparse(src, events=("start", "end")):
+            if el.tag == _MAIN + "cellXfs":
+                in_cell_xfs = event == "start"
+            elif event == "end" and el.tag == _MAIN + "numFmt":
+                custom[int(el.get("numFmtId"))] = el.get("formatCode", "")
+            elif event == "end" and el.tag == _MAIN + "xf" and in_cell_xfs:
+                xf_formats.append(int(el.get("numFmtId", 0)))
+    dates, deltas = set(), set()
+    for idx, fmt_id in enumerate(xf_formats):
+        fmt = custom[fmt_id] if fmt_id in custom else BUILTIN_FORMATS.get(fmt_id)
+        if fmt is None:
+            continue
+        if is_date_format(fmt):
+            dates.add(idx)
+        if is_timedelta_format(fmt):
+            deltas.add(idx)
+    return dates, deltas
+
+
+def _column_index(ref: str) -> int:
+    col = 0
+    for ch in ref:
+        if "A" <= ch <= "Z":
+            col = col * 26 + ord(ch) - 64
+        elif "a" <= ch <= "z":
+            col = col * 26 + ord(ch) - 96
+        else:
+            break
+    return col
+
+
+def _read_stream(path: Path, sheet_name: str | int, keep: Callable[[Any], bool] | None) -> pd.DataFrame:
+    """
+    Rows exactly as pandas' openpyxl reader hands them to TextParser (read-only
+    cells, "" for empty, numbers as int when whole, dates by cell style), then
+    the same TextParser call as read_excel. With `keep`, cells of columns whose
+    header it rejects stay raw text (they are dropped afterwards anyway).
+    """
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_ISO8601, from_excel
+    from pandas.errors import EmptyDataError
+    from pandas.io.parsers import TextParser
+
+    with zipfile.ZipFile(path) as zf:
+        sheets, date1904 = _workbook_sheets(zf)
+        if isinstance(sheet_name, int):
+            member = sheets[sheet_name][1]
+        else:
+            matches = [m for name, m in sheets if name == sheet_name]
+            if not matches:
+                raise ValueError(f"Worksheet named '{sheet_name}' not found")
+            member = matches[0]
+        strings = _shared_strings(zf)
+        date_styles, delta_styles = _date_styles(zf)
+        epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+        data: list[list[Any]] = []
+        skip: set[int] = set()
+        header_done = False
+        last_with_data = -1
+        row_counter = 0
+        with zf.open(member) as src:
+            for _, el in iterparse(src):
+                if el.tag != _ROW:
+                    continue
+                r_attr = el.get("r")
+                row_counter = int(float(r_attr)) if r_attr else row_counter + 1
+                if row_counter <= len(data):
+                    # openpyxl drops rows numbered at or below one already read.
+                    el.clear()
+                    continue
+                if row_counter > 1 and not data:
+                    # Row 1 missing: the (empty) header covers every column.
+                    header_done = True
+                # Rows missing from the XML come through as empty rows.
+                while len(data) < row_counter - 1:
+                    data.append([])
+                values: dict[int, Any] = {}
+                col_counter = 0
+                for cell in el:
+                    if cell.tag != _CELL:
+                        continue
+                    ref = cell.get("r")
+                    col_counter = _column_index(ref) if ref else col_counter + 1
+                    kind = cell.get("t", "n")
+                    if kind == "inlineStr":
+                        raw = None
+                    else:
+                        raw = cell.findtext(_VALUE) or None
+                    if col_counter - 1 in skip and kind != "inlineStr":
+                        # Only "" vs non-empty matters for the row trimming.
+                        if raw is None or (kind == "s" and not strings[int(raw)]):
+                            values[col_counter] = ""
+                        else:
+                            values[col_counter] = "-"
+                        continue
+                    if raw is None:
+                        value: Any = ""
+                        if kind == "inlineStr":
+                            inline = cell.find(_INLINE)
+                            if inline is not None:
+                                value = _rich_text(inline)
+                    elif kind == "n":
+                        number = float(raw) if ("." in raw or "E" in raw or "e" in raw) else int(raw)
+                        style = int(cell.get("s") or 0)
+                        if style in date_styles:
+                            try:
+                                value = from_excel(number, epoch, timedelta=style in delta_styles)
+                            except (OverflowError, ValueError):
+                                value = float("nan")
+                        else:
+                            whole = int(number)
+                            value = whole if whole == number else float(number)
+                    elif kind == "s":
+                        value = strings[int(raw)]
+                    elif kind == "b":
+                        value = bool(int(raw))
+                    elif kind == "e":
+                        value = float("nan")
+                    elif kind == "d":
+                        value = from_ISO8601(raw)
+                    else:
+                        value = raw
+                    values[col_counter] = value
+                el.clear()
+                row = [""] * col_counter
+                for col, value in values.items():
+                    if col <= col_counter:
+                        row[col - 1] = value
+                while row and isinstance(row[-1], str) and row[-1] == "":
+                    row.pop()
+                if row:
+                    last_with_data = len(data)
+                data.append(row)
+                if not header_done:
+                    header_done = True
+                    if keep is not None:
+                        skip = {i for i, name in enumerate(row) if not _header_kept(keep, name)}
+
+    data = data[: last_with_data + 1]
+    if data:
+        width = max(len(r) for r in data)
+        if min(len(r) for r in data) < width:
+            data = [r + [""] * (width - len(r)) for r in data]
+    try:
+        return TextParser(data, header=0, skip_blank_lines=False).read()
+    except EmptyDataError:
+        return pd.DataFrame()
+
+
+def _header_kept(keep: Callable[[Any], bool], name: Any) -> bool:
+    # Duplicate headers come out as "name.1", "name.2"; keep the column if any form is wanted.
+    if name == "" or keep(name):
+        return True
+    return any(keep(f"{name}.{i}") for i in range(1, 10))